@@ -0,0 +1,872 @@
+# benchmarks.py — Benchmarks y comprobaciones de paridad sobre datos SINTÉTICOS
+#
+# Sin red: genera un universo de paseos aleatorios con tendencia (OHLCV) del tamaño
+# pedido y mide las piezas de infraestructura contra el camino clásico.
+#
+# Uso:
+#   python benchmarks.py memory --symbols 2000 --days 2520   # RAM dict float64 vs panel compacto
+#   python benchmarks.py parity --symbols 150 --days 900     # señales float64 vs compacto
+#   python benchmarks.py workers --symbols 2000 --days 2520  # pickle del dict vs panel mapeado
+#   python benchmarks.py chunked --symbols 300 --days 2520   # por tramos vs en memoria (paridad + RAM)
+#   python benchmarks.py robustness --days 2520              # 10.000 remuestreos bootstrap
+#   python benchmarks.py metrics --days 2520                 # métricas extendidas: por bloques vs una pasada
+#   python benchmarks.py features --symbols 300 --days 2520  # detectores con features compartidas
+#   python benchmarks.py imports                             # arranque en frío del núcleo
+#   python benchmarks.py kernels --symbols 300 --days 2520   # núcleos Numba vs NumPy (paridad)
+#   python benchmarks.py quality --symbols 300 --days 2520   # saneado: datos corruptos inyectados
+#   python benchmarks.py rs --symbols 1000 --days 2520       # matriz RS: construcción, update, paridad
+#   python benchmarks.py groups --symbols 1000 --days 2520   # fuerza de grupos vs groupby de pandas
+#   python benchmarks.py intraday --symbols 2000 --days 1260 # vista previa intradía: refresco + paridad
+#   python benchmarks.py paths --symbols 500 --days 2520     # recorridos precalculados vs barra a barra
+#   python benchmarks.py universe --symbols 300 --days 1260  # universo point-in-time: log, consulta, paridad
+#   python benchmarks.py snapshot --symbols 2000 --days 2520 # instantánea del almacén: tamaño, restaurar, paridad
+#   python benchmarks.py factors --symbols 300 --days 2520   # IC de factores: replay, caché, paridad con pandas
+
+import argparse
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+
+def synthetic_prices(n_symbols=200, n_days=900, seed=7, start='2010-01-04'):
+    """dict[símbolo] -> DataFrame OHLCV + benchmark (Open/High/Low/Close).
+    Paseos geométricos con deriva distinta por símbolo (hay líderes y rezagados),
+    listados escalonados y volumen lognormal alrededor de un dólar-volumen ~$30M."""
+    rng = np.random.default_rng(seed)
+    cal = pd.bdate_range(start, periods=n_days)
+    drift = rng.normal(0.0004, 0.0008, n_symbols)
+    vol = rng.uniform(0.012, 0.035, n_symbols)
+    rets = rng.normal(drift, vol, (n_days, n_symbols))
+    close = 40.0 * np.exp(np.cumsum(rets, axis=0))
+    spread = np.abs(rng.normal(0, 0.6, (n_days, n_symbols))) * vol * close
+    high = close + spread
+    low = np.maximum(close - spread, close * 0.5)
+    opn = np.clip(close * (1 + rng.normal(0, 0.004, (n_days, n_symbols))), low, high)
+    shares = np.exp(rng.normal(np.log(3e7 / 40.0), 0.4, (n_days, n_symbols))).round()
+    data = {}
+    for j in range(n_symbols):
+        first = int(rng.integers(0, n_days // 5)) if j % 4 == 0 else 0
+        data[f'S{j:04d}'] = pd.DataFrame(
+            dict(Open=opn[first:, j], High=high[first:, j], Low=low[first:, j],
+                 Close=close[first:, j], Volume=shares[first:, j]), index=cal[first:])
+    idx = 100.0 * np.exp(np.cumsum(rng.normal(0.0004, 0.01, n_days)))
+    spy = pd.DataFrame(dict(Open=idx, High=idx * 1.004, Low=idx * 0.996, Close=idx), index=cal)
+    return data, spy
+
+
+def bench_memory(n_symbols, n_days):
+    """RAM del dict de DataFrames float64 (+ arrays del walk-forward) vs PricePanel compacto."""
+    from momentum_strategy import _signal_arrays
+    from price_panel import PricePanel
+
+    data, spy = synthetic_prices(n_symbols, n_days)
+    tracemalloc.start()
+    frames = {s: d.copy() for s, d in data.items()}
+    arrays = _signal_arrays(frames, spy.index)
+    legacy = tracemalloc.get_traced_memory()[0]
+    del frames, arrays
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    panel = PricePanel.from_frames(data, calendar=spy.index, compact=True)
+    arrays = _signal_arrays(panel, spy.index)
+    compact = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del arrays
+    print(f"Universo sintético: {n_symbols} símbolos × {n_days} sesiones")
+    print(f"  dict float64 + arrays walk-forward: {legacy / 1e6:8.1f} MB")
+    print(f"  PricePanel compacto (+ vistas):     {compact / 1e6:8.1f} MB "
+          f"(arrays {panel.nbytes() / 1e6:.1f} MB) → x{legacy / max(compact, 1):.1f} menos")
+
+
+def check_compact_parity(n_symbols, n_days, step=5):
+    """Las señales del panel compacto deben coincidir con el camino float64: mismas
+    (symbol, date) y stops a ≤1e-4 relativo (redondeo de float32)."""
+    from momentum_strategy import generate_momentum_signals, evaluate_breakout, DEFAULTS
+    from price_panel import PricePanel
+
+    data, spy = synthetic_prices(n_symbols, n_days)
+    panel = PricePanel.from_frames(data, calendar=spy.index, compact=True)
+    ok = True
+    for name, kw in (('pullback', {}),
+                     ('breakout', dict(evaluator=evaluate_breakout, rs_floor=DEFAULTS['breakout_rs_min']))):
+        t0 = time.perf_counter()
+        ref = generate_momentum_signals(data, spy, step=step, **kw)
+        t1 = time.perf_counter()
+        cmp = generate_momentum_signals(panel, spy, step=step, **kw)
+        t2 = time.perf_counter()
+        same = len(ref) == len(cmp)
+        if same and len(ref):
+            same = (ref[['symbol', 'date']].values == cmp[['symbol', 'date']].values).all() and \
+                np.allclose(ref['sl'].values, cmp['sl'].values, rtol=1e-4)
+        ok &= bool(same)
+        print(f"  {name:<9} float64 {len(ref):4d} señales ({t1 - t0:.1f}s) | compacto "
+              f"{len(cmp):4d} ({t2 - t1:.1f}s) → {'OK' if same else 'DIFERENTE'}")
+    return ok
+
+
+def _last_close_sum(price_data, symbols):
+    # Trabajo mínimo de un worker: tocar la última barra de sus símbolos.
+    if hasattr(price_data, 'series'):
+        return float(sum(price_data.series(s)['c'][-1] for s in symbols))
+    return float(sum(price_data[s]['Close'].iloc[-1] for s in symbols))
+
+
+def bench_workers(n_symbols, n_days, workers=4):
+    """Coste de repartir el universo a `workers` procesos: dict pickleado vs panel mapeado."""
+    from price_panel import PricePanel
+
+    data, spy = synthetic_prices(n_symbols, n_days)
+    syms = list(data)
+    chunks = [syms[k::workers] for k in range(workers)]
+    blob = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = PricePanel.from_frames(data, calendar=spy.index, compact=True).save(
+            os.path.join(tmp, 'panel'))
+        panel = PricePanel.open(path)
+        with ProcessPoolExecutor(workers) as ex:
+            list(ex.map(abs, range(workers)))            # arrancar el pool fuera de la medida
+            t0 = time.perf_counter()
+            list(ex.map(_last_close_sum, [data] * workers, chunks))
+            t1 = time.perf_counter()
+            list(ex.map(_last_close_sum, [panel] * workers, chunks))
+            t2 = time.perf_counter()
+        print(f"Universo sintético: {n_symbols} símbolos × {n_days} sesiones, {workers} workers")
+        print(f"  dict pickleado:  {len(blob) / 1e6:8.1f} MB por worker, {t1 - t0:6.2f}s")
+        print(f"  panel mapeado:   {len(pickle.dumps(panel)):8d} bytes por worker, {t2 - t1:6.2f}s")
+
+
+def build_synthetic_store(root, n_symbols, n_days, compact=False):
+    """Almacén en disco (data_store.py) con el universo sintético, escrito por lotes."""
+    from data_store import DataStore
+
+    data, spy = synthetic_prices(n_symbols, n_days)
+    store = DataStore(root)
+    store.save_index(spy)
+    w = store.panel_writer(spy.index.values, list(data), compact=compact)
+    for sym, df in data.items():
+        w.write(sym, df)
+    w.close()
+    return store, data, spy
+
+
+def bench_chunked(n_symbols, n_days, chunk_days=(252, 756)):
+    """Backtest por tramos vs en memoria: mismo resultado y pico de RAM por tramo."""
+    from chunked_backtest import run_chunked_backtest
+    from momentum_strategy import generate_momentum_signals
+    from portfolio_backtest import run_portfolio_backtest
+
+    cfg = dict(market_filter_ma=200, trailing_pct=0.32)
+    with tempfile.TemporaryDirectory() as tmp:
+        store, data, spy = build_synthetic_store(os.path.join(tmp, 'store'), n_symbols, n_days)
+        tracemalloc.start()
+        frames = {s: d.copy() for s, d in data.items()}
+        ref = run_portfolio_backtest(generate_momentum_signals(frames, spy), frames, spy, cfg)
+        peak_mem = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        del frames
+        print(f"Universo sintético: {n_symbols} símbolos × {n_days} sesiones")
+        print(f"  en memoria:          pico {peak_mem / 1e6:7.1f} MB  | trades {len(ref['trades'])}")
+        for cd in chunk_days:
+            tracemalloc.start()
+            res = run_chunked_backtest(store, os.path.join(tmp, f'out{cd}'), chunk_days=cd, config=cfg)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            same = (np.allclose(res['equity_curve'].values, ref['equity_curve'].values)
+                    and len(res['trades']) == len(ref['trades']))
+            print(f"  tramos de {cd:4d}:     pico {peak / 1e6:7.1f} MB  | trades {len(res['trades'])}"
+                  f" → {'IDÉNTICO' if same else 'DIFERENTE'}")
+
+
+def bench_robustness(n_days, n=10_000, workers=(None, 4)):
+    """Tiempo de los bootstraps (bloques y trades) y que el pool no cambie el resultado."""
+    from robustness import bootstrap
+
+    rng = np.random.default_rng(3)
+    daily = rng.normal(0.0005, 0.012, n_days)
+    trades = rng.normal(0.004, 0.03, max(n_days // 8, 2))
+    years = n_days / 252
+    print(f"Bootstrap de {n} remuestreos: {n_days} retornos diarios, {len(trades)} trades")
+    ref = None
+    for w in workers:
+        t0 = time.perf_counter()
+        b = bootstrap(daily, 'blocks', n, 21, years, 252, workers=w)
+        t1 = time.perf_counter()
+        bootstrap(trades, 'trades', n, years=years, periods_per_year=len(trades) / years, workers=w)
+        t2 = time.perf_counter()
+        same = '' if ref is None else (' → IDÉNTICO' if all(np.array_equal(ref[k], b[k]) for k in b)
+                                       else ' → DIFERENTE')
+        ref = ref or b
+        print(f"  workers={w or 1}:  bloques {t1 - t0:5.2f}s  | trades {t2 - t1:5.2f}s{same}")
+
+
+def _same_metrics(a, b):
+    """Mismas métricas salvo el ruido de coma flotante de sumar por bloques."""
+    if a['summary'] != b['summary'] or a['drawdowns'] != b['drawdowns']:
+        return False
+    if a['monthly'] != b['monthly'] or a['yearly'] != b['yearly']:
+        return False
+    ra, rb = a.get('rolling'), b.get('rolling')
+    if ra is None or rb is None:
+        return ra is rb
+    return (np.array_equal(ra['date'], rb['date'])
+            and all(np.allclose(ra[k], rb[k], equal_nan=True) for k in ('cagr', 'sharpe', 'sortino')))
+
+
+def bench_metrics(n_days, blocks=(1, 7, 63, 1000)):
+    """Métricas extendidas (portfolio_metrics.py) en una pasada frente a por bloques
+    (MetricsStream.update encadenado y metrics_from_csv): equity en paseo aleatorio con
+    drawdowns que cruzan bloques y picos nuevos en la primera barra de un bloque."""
+    from portfolio_metrics import MetricsStream, extended_metrics, metrics_from_csv
+
+    rng = np.random.default_rng(11)
+    dates = pd.bdate_range('2010-01-04', periods=n_days)
+    eq = pd.Series(1e5 * np.exp(np.cumsum(rng.normal(0.0004, 0.012, n_days))), index=dates)
+    bench = pd.Series(100 * np.exp(np.cumsum(rng.normal(0.0003, 0.01, n_days))), index=dates)
+    t0 = time.perf_counter()
+    ref = extended_metrics(eq, bench)
+    print(f"Métricas de {n_days} sesiones: una pasada {(time.perf_counter() - t0) * 1000:.0f} ms, "
+          f"{len(ref['drawdowns'])} drawdowns principales")
+    d, e, b = (np.asarray(dates, dtype='datetime64[D]'), eq.values, bench.values)
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'equity.csv')
+        pd.DataFrame(dict(date=dates.strftime('%Y-%m-%d'), equity=e)).to_csv(path, index=False)
+        for n in blocks:
+            t0 = time.perf_counter()
+            st = MetricsStream()
+            for k in range(0, n_days, n):
+                st.update(d[k:k + n], e[k:k + n], b[k:k + n])
+            got = st.result()
+            got['rolling']['date'] = got['rolling']['date'].astype(str)
+            t_blocks = time.perf_counter() - t0
+            csv_got = metrics_from_csv(path, bench=bench, block=n)
+            same = _same_metrics(ref, got) and _same_metrics(ref, csv_got)
+            ok &= same
+            print(f"  bloques de {n:5d}: {t_blocks * 1000:6.0f} ms → {'IDÉNTICO' if same else 'DIFERENTE'}")
+    # Drawdown abierto al cerrar un bloque y pico nuevo en la primera barra del siguiente.
+    st = MetricsStream(rolling=False)
+    st.update(d[:3], [100, 90, 95])
+    st.update(d[3:6], [101, 102, 103])
+    dd = st.result()['drawdowns']
+    edge = len(dd) == 1 and dd[0]['recovery'] == str(d[3]) and dd[0]['bars'] == 2
+    ok &= edge
+    print(f"  recuperación en la primera barra de un bloque → {'OK' if edge else 'FALLA'}")
+    return ok
+
+
+def bench_features(n_symbols, n_days):
+    """Los tres detectores vectorizados en todas las barras de cada símbolo: cada uno con
+    sus propias ventanas vs un FeatureSet compartido (feature_graph.py). Mismas señales."""
+    from feature_graph import MIN_BAR, FeatureSet
+    from momentum_vectorized import evaluate_breakout_many, evaluate_entry_many, evaluate_watch_many
+
+    data, _ = synthetic_prices(n_symbols, n_days)
+    detectors = (evaluate_breakout_many, evaluate_entry_many, evaluate_watch_many)
+    arrays = [(df['Close'].values, df['High'].values, df['Low'].values) for df in data.values()]
+    out = {}
+    for shared in (False, True):
+        t0 = time.perf_counter()
+        hits = []
+        for c, h, l in arrays:
+            idx = np.arange(len(c))
+            rs = np.full(len(c), 95.0)
+            fs = FeatureSet(c, h, l, idx[idx >= MIN_BAR]) if shared else None
+            hits.append([ev(c, h, l, idx, rs, features=fs) for ev in detectors])
+        out[shared] = (time.perf_counter() - t0, hits)
+    n = sum(len(x) for hs in out[True][1] for x in hs)
+    print(f"Detectores en {n_symbols} símbolos × {n_days} sesiones ({n} señales)")
+    print(f"  ventanas por detector: {out[False][0]:6.2f}s")
+    print(f"  FeatureSet compartido: {out[True][0]:6.2f}s  → "
+          f"{'IDÉNTICO' if out[False][1] == out[True][1] else 'DIFERENTE'}")
+
+
+def bench_kernels(n_symbols, n_days):
+    """Núcleos de kernels.py con cada backend disponible (Numba / NumPy): evaluadores
+    barra a barra sobre datos con huecos NaN, walk-forward de señales y backtest.
+    Todos los backends deben dar exactamente lo mismo."""
+    import kernels
+    from momentum_strategy import (evaluate_breakout, evaluate_entry, evaluate_watch,
+                                   generate_momentum_signals)
+    from portfolio_backtest import run_portfolio_backtest
+
+    data, spy = synthetic_prices(n_symbols, n_days)
+    rng = np.random.default_rng(3)
+    bars = []
+    for df in list(data.values())[:50]:
+        c, h, l = (df[k].values.astype(float) for k in ('Close', 'High', 'Low'))
+        for x in (c, h, l):
+            x[rng.integers(0, len(x), 3)] = np.nan
+        bars.append((c, h, l))
+    evaluators = (evaluate_breakout, evaluate_entry, evaluate_watch)
+    out = {}
+    for backend in kernels.available():
+        kernels.use(backend)
+        t0 = time.perf_counter()
+        kernels.compiled()
+        kernels.rolling_median_rows(np.ones(60), np.arange(60), 50)
+        evaluate_breakout(*bars[0], 300, 99.0)         # primera llamada (compilación/caché)
+        warm = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        hits = [ev(c, h, l, i, 99.0) for c, h, l in bars for i in range(252, len(c)) for ev in evaluators]
+        t_eval = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        sig = generate_momentum_signals(data, spy, evaluator=evaluate_breakout, rs_floor=90, step=1)
+        t_sig = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        bt = run_portfolio_backtest(generate_momentum_signals(data, spy), data, spy)
+        t_bt = time.perf_counter() - t0
+        out[backend] = (hits, sig, bt['equity_curve'], bt['trades'])
+        print(f"  {backend:<6} arranque {warm:5.2f}s  evaluadores {t_eval:6.2f}s  "
+              f"señales (ruptura, step=1) {t_sig:6.2f}s  pullback + backtest {t_bt:6.2f}s")
+    kernels.use('auto')
+    ref = out['numpy']
+    same = all(repr(a[0]) == repr(ref[0])          # repr: un dict con NaN no es == a sí mismo
+               and all(x.equals(y) for x, y in zip(a[1:], ref[1:])) for a in out.values())
+    print(f"Backends {', '.join(out)} en {n_symbols} símbolos × {n_days} sesiones → "
+          f"{'IDÉNTICO' if same else 'DIFERENTE'}")
+    return same
+
+
+def bench_quality(n_symbols, n_days, per_rule=20):
+    """Saneado al ingestar (data_quality.py): falsos positivos sobre datos limpios y
+    cuántas barras corruptas INYECTADAS (pico, precio ≤ 0, High<Low, mecha, volumen,
+    última barra, fecha duplicada) detecta cada regla, con el tiempo de la pasada."""
+    from data_quality import sanitize_frames, summary
+
+    data, _ = synthetic_prices(n_symbols, n_days)
+    t0 = time.perf_counter()
+    _, log = sanitize_frames(data)
+    t_clean = time.perf_counter() - t0
+    rng = np.random.default_rng(11)
+    syms = list(data)
+    bad = dict(data)
+    injected = {}
+    corruptions = [('spike', ['Open', 'High', 'Low', 'Close'], 4.0), ('nonpositive', ['Low'], 0.0),
+                   ('hl', ['High', 'Low'], None), ('wick', ['High'], 3.0), ('volume', ['Volume'], 1e4),
+                   ('last_spike', ['Close'], 0.2), ('duplicate_date', [], None)]
+    for rule, cols, factor in corruptions:
+        for s in rng.choice(syms, per_rule, replace=False):
+            d = bad[s].copy()
+            i = len(d) - 1 if rule == 'last_spike' else int(rng.integers(260, len(d) - 2))
+            j = [d.columns.get_loc(c) for c in cols]
+            if rule == 'duplicate_date':
+                d = pd.concat([d, d.iloc[[i]]]).sort_index()
+            elif rule == 'hl':                                  # High y Low intercambiados
+                d.iloc[i, j] = d.iloc[i, j[::-1]].values
+            else:
+                d.iloc[i, j] = d.iloc[i, j].values * factor
+            bad[s] = d
+            injected.setdefault(rule, set()).add((s, data[s].index[i]))
+    t0 = time.perf_counter()
+    _, found = sanitize_frames(bad)
+    t_bad = time.perf_counter() - t0
+    print(f"Saneado de {n_symbols} símbolos × {n_days} sesiones")
+    print(f"  datos limpios:   {t_clean:5.2f}s  {summary(log)}")
+    print(f"  con corrupción:  {t_bad:5.2f}s  {summary(found)}")
+    hits = set(zip(found['symbol'], found['date']))
+    for rule, cells in injected.items():
+        print(f"  {rule:<15} detectadas {len(cells & hits):3d}/{len(cells)}")
+    return log.empty and all(cells <= hits for cells in injected.values())
+
+
+def bench_rs(n_symbols, n_days, checks=25):
+    """Matriz RS (rs_matrix.py) de toda la historia con cada backend: construcción, una
+    sesión nueva (update) y paridad con el screener de producción (liquid_symbols +
+    compute_rs_percentile sobre los datos cortados en la fecha) en `checks` fechas, sin
+    huecos y con huecos (1 de cada 5 símbolos pierde barras sueltas: sesiones sin
+    cotizar o enmascaradas). Y el walk-forward leyendo la matriz frente a recalcular el
+    RS en cada fecha."""
+    import kernels
+    from market_data import MarketData
+    from momentum_screener import compute_rs_percentile
+    from momentum_strategy import DEFAULTS, generate_momentum_signals
+    from price_panel import PricePanel
+    from rs_matrix import RSMatrix
+
+    data, spy = synthetic_prices(n_symbols, n_days)
+    panel = PricePanel.from_frames(data, calendar=spy.index)
+    same = True
+    for backend in kernels.available():
+        kernels.use(backend)
+        RSMatrix.build(panel.window(0, 300))                 # compilación/caché de Numba
+        t0 = time.perf_counter()
+        full = RSMatrix.build(panel)
+        t_build = time.perf_counter() - t0
+        rsm = RSMatrix.build(panel.window(0, n_days - 1))
+        t0 = time.perf_counter()
+        rsm.update(panel)
+        t_upd = time.perf_counter() - t0
+        upd_ok = (rsm.codes == full.codes).all() and (rsm.liquid == full.liquid).all()
+        print(f"  {backend:<6} construcción {t_build:6.2f}s ({n_days} sesiones)   "
+              f"update +1 sesión {t_upd * 1000:6.1f} ms   {'=' if upd_ok else '≠'} construcción")
+        same &= bool(upd_ok)
+    kernels.use('auto')
+
+    rng = np.random.default_rng(5)
+    gappy = {s: (d.drop(d.index[rng.choice(np.arange(1, len(d) - 1), 12, replace=False)])
+                 if k % 5 == 0 else d) for k, (s, d) in enumerate(data.items())}
+    for label, frames, rsm in (('sin huecos', data, full),
+                               ('con huecos', gappy, RSMatrix.build(PricePanel.from_frames(gappy, calendar=spy.index)))):
+        bad = 0
+        for r in np.linspace(DEFAULTS['mom_lookback'] + 1, n_days - 1, checks).astype(int):
+            cut = {s: d.loc[:spy.index[r]] for s, d in frames.items()}
+            cut = {s: d for s, d in cut.items() if len(d) and d.index[-1] == spy.index[r]}
+            liquid = set(MarketData.liquid_symbols(cut, min_dollar_vol=DEFAULTS['min_dollar_vol'],
+                                                   min_price=DEFAULTS['min_price'], window=DEFAULTS['liq_window']))
+            ref = compute_rs_percentile({s: cut[s] for s in liquid}).sort_index()
+            got = rsm.series(r).sort_index()
+            bad += not (ref.index.equals(got.index) and np.allclose(ref.values, got.values))
+        print(f"Paridad con el screener de producción en {checks} fechas ({label}): "
+              f"{'IDÉNTICO' if bad == 0 else f'{bad} fechas DIFERENTES'}")
+        same &= bad == 0
+
+    generate_momentum_signals(data, spy, rs_matrix=full)      # calentamiento (JIT/cachés)
+    t0 = time.perf_counter()
+    ref = generate_momentum_signals(data, spy)
+    t_ref = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    sig = generate_momentum_signals(data, spy, rs_matrix=full)
+    t_sig = time.perf_counter() - t0
+    common = len(ref.merge(sig, on=['symbol', 'date']))
+    print(f"Walk-forward: RS recalculado {t_ref:5.2f}s ({len(ref)} señales) | leído de la matriz "
+          f"{t_sig:5.2f}s ({len(sig)} señales, {common} en común)")
+    return same
+
+
+def bench_groups(n_symbols, n_days, n_groups=40, checks=10):
+    """Fuerza de grupos (group_strength.py) de toda la historia sobre la matriz RS y
+    paridad, en `checks` fechas, con un groupby de pandas (mediana del RS, % sobre
+    MA50/MA200, % en máximo de 52 semanas)."""
+    from group_strength import GroupStrength
+    from price_panel import PricePanel
+    from rs_matrix import RSMatrix
+
+    data, spy = synthetic_prices(n_symbols, n_days)
+    panel = PricePanel.from_frames(data, calendar=spy.index)
+    rng = np.random.default_rng(5)
+    groups = {s: dict(industry=f'G{rng.integers(n_groups)}', market_cap=float(rng.uniform(1e9, 1e11)))
+              for s in data}
+    rsm = RSMatrix.build(panel)
+    rows = np.arange(len(panel.dates))
+    t0 = time.perf_counter()
+    gs = GroupStrength.compute(panel, rows, groups, rs_matrix=rsm)
+    dt = time.perf_counter() - t0
+    print(f"Grupos de {n_symbols} símbolos × {n_days} sesiones ({n_groups} grupos): {dt:.2f}s")
+
+    close = pd.DataFrame({s: d['Close'] for s, d in data.items()}).reindex(spy.index)
+    high = pd.DataFrame({s: d['High'] for s, d in data.items()}).reindex(spy.index)
+    ma50, ma200 = close.rolling(50).mean(), close.rolling(200).mean()
+    hi52 = high.rolling(252).max()
+    member = pd.Series({s: g['industry'] for s, g in groups.items()})
+    _, rs = rsm.block(rows)
+    bad = 0
+    for r in np.linspace(300, n_days - 1, checks).astype(int):
+        df = pd.DataFrame(dict(g=member[panel.symbols].values, rs=rs[r]), index=panel.symbols)
+        for col, hit, ok in (('a50', close.iloc[r] > ma50.iloc[r], ma50.iloc[r].notna()),
+                             ('a200', close.iloc[r] > ma200.iloc[r], ma200.iloc[r].notna()),
+                             ('hi', high.iloc[r] >= hi52.iloc[r], hi52.iloc[r].notna())):
+            df[col] = hit.where(ok & close.iloc[r].notna()).astype(float)
+        ref = df.groupby('g').agg(rs=('rs', 'median'), n=('rs', 'count'), a50=('a50', 'mean'),
+                                  a200=('a200', 'mean'), hi=('hi', 'mean'))
+        ref.loc[ref['n'] < 3, 'rs'] = np.nan
+        got = gs.frame(r).loc[ref.index]
+        bad += not all(np.allclose(ref[a], got[b], equal_nan=True) for a, b in
+                       (('rs', 'rs_median'), ('a50', 'pct_ma50'), ('a200', 'pct_ma200'), ('hi', 'pct_high')))
+    print(f"Paridad con groupby de pandas en {checks} fechas: "
+          f"{'IDÉNTICO' if bad == 0 else f'{bad} fechas DIFERENTES'}")
+    return bad == 0
+
+
+def bench_intraday(n_symbols, n_days, refreshes=10, share=0.3):
+    """Vista previa intradía (intraday_preview.py): el almacén sin la última sesión, sus
+    barras llegan como cotizaciones por un FileQuoteFeed en `refreshes` tandas (una
+    fracción `share` del universo en cada una) y se mide cada refresco. Paridad: con la
+    barra completa, los detectores sobre la barra provisional frente al servicio tras
+    añadirla (append_bar) con todo el historial; y el RS provisional frente al de la
+    sesión cerrada."""
+    import json
+    from data_store import DataStore
+    from feature_graph import FeatureSet
+    from intraday_preview import FileQuoteFeed, IntradayPreview
+    from screener_service import EVALUATORS_MANY, ScreenerService
+
+    data, spy = synthetic_prices(n_symbols, n_days)
+    today = spy.index[-1]
+    with tempfile.TemporaryDirectory() as root:
+        store = DataStore(root)
+        store.save_index(spy.iloc[:-1])
+        w = store.panel_writer(spy.index.values[:-1], list(data))
+        for sym, df in data.items():
+            w.write(sym, df.iloc[:-1])
+        w.close()
+        svc = ScreenerService(store)
+        pv = IntradayPreview(svc)
+        print(f"Estado de ayer: {pv.stats['tracked']} líquidas, {pv.stats['evaluable']} evaluables, "
+              f"{pv.stats['setup_s']}s")
+
+        rng = np.random.default_rng(3)
+        bars = {s: d.loc[today] for s, d in data.items() if d.index[-1] == today}
+        feed_path = os.path.join(root, 'quotes.jsonl')
+        feed = FileQuoteFeed(feed_path)
+        times = []
+        syms = list(bars)
+        for k in range(refreshes):
+            final = k == refreshes - 1
+            pick = syms if final else rng.choice(syms, int(len(syms) * share), replace=False)
+            with open(feed_path, 'a') as f:
+                for s in pick:
+                    b = bars[s]
+                    frac = 1.0 if final else (k + 1) / refreshes
+                    px = b['Close'] if final else b['Open'] + (b['Close'] - b['Open']) * frac
+                    q = dict(symbol=s, price=float(px), open=float(b['Open']), volume=float(b['Volume'] * frac))
+                    if final:
+                        q.update(high=float(b['High']), low=float(b['Low']))
+                    f.write(json.dumps(q) + '\n')
+            pv.ingest(feed.poll())
+            res = pv.refresh()
+            times.append(res['meta']['ms'])
+        print(f"{refreshes} refrescos ({int(share * 100)}% del universo por tanda, la última todo): "
+              f"mediana {np.median(times):.1f} ms, máx {max(times):.1f} ms "
+              f"(última: {res['meta']['evaluated']} reevaluados)")
+
+        # Referencia: el servicio con la barra de hoy añadida, los detectores sin umbral RS.
+        t = spy.loc[today]
+        svc.append_bar(today, {s: [b['Open'], b['High'], b['Low'], b['Close'], b['Volume']]
+                               for s, b in bars.items()}, [t['Open'], t['High'], t['Low'], t['Close']])
+        diff = 0
+        for k in pv.eval_pos:
+            sym = pv.symbols[k]
+            a = svc.arrays(sym)
+            fs = FeatureSet(a['c'], a['h'], a['l'], [len(a['c']) - 1], a.get('v'))
+            for kind, ev in EVALUATORS_MANY.items():
+                hit = ev(fs.c, fs.h, fs.l, fs.i, [np.inf], pv.p, fs)
+                got = pv.hits[kind].get(sym)
+                ref = None if not hit else dict(hit[0][1], mom6m=round(float(fs('mom6m', pv.p['mom_lookback'])[0]), 1))
+                if ref is not None and kind == 'breakouts':
+                    ref.update(vol_ratio=round(float(fs('vol_ratio')[0]), 2), rsi=round(float(fs('rsi')[0]), 0))
+                diff += (got is None) != (ref is None) or (got is not None and dict(got, symbol=None) != dict(ref, symbol=None))
+        _, rs_ref = svc.liquidity_rs(pv.p)
+        rs_now = pv.rs()
+        both = np.isfinite(rs_now) & np.isfinite(rs_ref[pv.rs_idx])
+        dev = np.abs(rs_now[both] - rs_ref[pv.rs_idx][both])
+        n_hits = sum(len(v) for v in pv.hits.values())
+        print(f"Paridad de detectores con la barra completa ({n_hits} señales sin umbral RS): "
+              f"{'IDÉNTICO' if diff == 0 else f'{diff} DIFERENTES'}")
+        print(f"RS provisional vs sesión cerrada (liquidez de ayer): desviación media "
+              f"{dev.mean():.2f}, máx {dev.max():.1f} puntos")
+        return diff == 0
+
+
+def bench_paths(n_symbols, n_days):
+    """Re-simulación de la cartera con una rejilla de configs (trailing, plazo, filtro de
+    mercado, nº de posiciones) barra a barra frente a recorridos precalculados
+    (trade_paths.py), con datos float64 y panel compacto float32: tiempos y paridad
+    exacta de trades y equity."""
+    import itertools
+    from momentum_strategy import generate_momentum_signals
+    from portfolio_backtest import run_portfolio_backtest
+    from price_panel import PricePanel
+    from trade_paths import TradePaths
+
+    data, spy = synthetic_prices(n_symbols, n_days)
+    signals = generate_momentum_signals(data, spy)
+    grid = [dict(trailing_pct=t, max_hold_days=m, market_filter_ma=f, max_positions=n)
+            for t, m, f, n in itertools.product((0.15, 0.2, 0.32), (63, 252), (None, 200), (5, 10))]
+    rules = len({(c['trailing_pct'], c['max_hold_days']) for c in grid})
+    print(f"{len(signals)} señales, {len(grid)} configs ({rules} reglas de salida)")
+    ok = True
+    for label, prices in (('float64', data), ('compacto', PricePanel.from_frames(data, calendar=spy.index, compact=True))):
+        t0 = time.perf_counter()
+        ref = [run_portfolio_backtest(signals, prices, spy, c) for c in grid]
+        t_ref = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        tp = TradePaths(signals, prices, spy)
+        t_prep = time.perf_counter() - t0
+        got, t_rules = [], 0.0
+        t0 = time.perf_counter()
+        for c in grid:
+            t1 = time.perf_counter()
+            tp.exits(c)
+            t_rules += time.perf_counter() - t1
+            got.append(run_portfolio_backtest(signals, prices, spy, c, paths=tp))
+        t_got = time.perf_counter() - t0
+        same = all(a['trades'].equals(b['trades']) and a['equity_curve'].equals(b['equity_curve'])
+                   for a, b in zip(ref, got))
+        ok &= same
+        print(f"  {label:<9} barra a barra {t_ref:6.2f}s ({t_ref / len(grid) * 1000:5.0f} ms/config) | "
+              f"precalculado: preparación {t_prep:4.2f}s + recorridos {t_rules:4.2f}s + "
+              f"{(t_got - t_rules) / len(grid) * 1000:5.0f} ms/config → {'IDÉNTICO' if same else 'DIFERENTE'}")
+    return ok
+
+
+def bench_universe(n_symbols, n_days, n_list=5000, churn=0.0015, min_cap=2e9):
+    """Universo point-in-time (universe_store.py): `n_list` listados con altas/bajas
+    diarias (`churn`) y capitalizaciones en paseo aleatorio, guardados sesión a sesión.
+    Mide el log frente a guardar el listado completo cada día y la consulta de pertenencia
+    en todas las fechas; paridad con reproducir los listados completos (altas/bajas
+    exactas, capitalización dentro de la tolerancia) y, en el walk-forward, señales
+    IDÉNTICAS con un universo que lo admite todo y solo de miembros con el filtro."""
+    import json
+    from momentum_strategy import generate_momentum_signals
+    from universe_store import DEFAULTS as U, UniverseStore
+
+    data, spy = synthetic_prices(n_symbols, n_days)
+    cal = spy.index
+    rng = np.random.default_rng(11)
+    names = list(data) + [f'L{j:05d}' for j in range(max(n_list - n_symbols, 0))]
+    cap = np.exp(rng.normal(np.log(3e9), 1.2, len(names)))
+    listed = rng.random(len(names)) < 0.9
+    truth = []
+    with tempfile.TemporaryDirectory() as root:
+        us = UniverseStore(root)
+        full_bytes, t_rec = 0, 0.0
+        for d in cal:
+            cap *= np.exp(rng.normal(0, 0.02, len(names)))
+            listed ^= rng.random(len(names)) < churn
+            listing = {names[j]: dict(name=names[j], market_cap=cap[j], industry='I', sector='S')
+                       for j in np.flatnonzero(listed)}
+            truth.append((listed.copy(), cap.copy()))
+            full_bytes += len(json.dumps({s: list(m.values()) for s, m in listing.items()}))
+            t0 = time.perf_counter()
+            us.record(d, listing)
+            t_rec += time.perf_counter() - t0
+        log = os.path.getsize(us.path('log.jsonl'))
+        print(f"{len(names)} listados × {n_days} sesiones: log {log / 1e6:.1f} MB frente a "
+              f"{full_bytes / 1e6:.0f} MB de listados completos ({full_bytes / log:.0f}×); "
+              f"guardado {t_rec / n_days * 1000:.1f} ms/sesión")
+
+        us = UniverseStore(root)
+        t0 = time.perf_counter()
+        caps = [us.caps(names, d) for d in cal]
+        dt = time.perf_counter() - t0
+        print(f"Pertenencia de {len(names)} símbolos en cada sesión (incluye abrir el log): "
+              f"{dt / n_days * 1e6:.0f} µs/fecha")
+        tol = U['cap_tol'] + 10 ** (1 - U['cap_digits'])
+        bad = 0
+        for (lst, true), got in zip(truth, caps):
+            bad += not np.array_equal(~np.isnan(got), lst)
+            with np.errstate(invalid='ignore'):
+                bad += bool((np.abs(got[lst] / true[lst] - 1) > tol).any())
+        print(f"Paridad con los listados completos: "
+              f"{'IDÉNTICO' if bad == 0 else f'{bad} fechas DIFERENTES'}")
+
+        t0 = time.perf_counter()
+        ref = generate_momentum_signals(data, spy, step=5)
+        t_ref = time.perf_counter() - t0
+        everyone = UniverseStore(os.path.join(root, 'all'))
+        everyone.record(cal[0], {s: dict(market_cap=1e12) for s in data})
+        same = generate_momentum_signals(data, spy, step=5, universe=everyone.membership(min_cap))
+        t0 = time.perf_counter()
+        got = generate_momentum_signals(data, spy, step=5, universe=us.membership(min_cap))
+        t_got = time.perf_counter() - t0
+        member = all(us.mask([r.symbol], r.date, min_cap)[0] for r in got.itertuples())
+        ok_same = ref.equals(same)
+        print(f"Walk-forward: {len(ref)} señales sin filtro ({t_ref:.2f}s), {len(got)} con el universo "
+              f"point-in-time ≥ ${min_cap / 1e9:.0f}B ({t_got:.2f}s); universo total → "
+              f"{'IDÉNTICO' if ok_same else 'DIFERENTE'}, filtradas solo miembros → {'sí' if member else 'NO'}")
+    return bad == 0 and ok_same and member
+
+
+def bench_snapshot(n_symbols, n_days):
+    """Instantánea del almacén (store_snapshot.py): almacén compacto con matriz RS, grupos y
+    universo; tamaño y tiempos de exportar/importar con y sin byte-shuffle/XOR; paridad byte a
+    byte tras restaurar y arranque en frío (almacén intacto) con la instantánea corrupta."""
+    from data_store import DataStore
+    from store_snapshot import _files, PARTS, export_snapshot, import_snapshot
+
+    data, spy = synthetic_prices(n_symbols, n_days)
+    with tempfile.TemporaryDirectory() as root:
+        store = DataStore(os.path.join(root, 'store'))
+        store.merge(data, spy)
+        store.rs_matrix()
+        store.save_groups({s: dict(industry=f'G{i % 40}', sector=f'S{i % 11}', market_cap=1e9 + i)
+                           for i, s in enumerate(data)})
+        store.universe().record(spy.index[-1], {s: dict(name=s, market_cap=1e9 + i)
+                                                for i, s in enumerate(data)})
+        files = _files(store.root, PARTS)
+        read = lambda st: {f: open(st.path(*f.split('/')), 'rb').read() for f in files}
+        orig = read(store)
+        out = {}
+        for shuffle in (False, True):
+            path = os.path.join(root, f'snap{int(shuffle)}.zip')
+            r = export_snapshot(store, path, shuffle=shuffle)
+            cold = DataStore(os.path.join(root, f'cold{int(shuffle)}'))
+            t0 = time.perf_counter()
+            ok = import_snapshot(path, cold, verbose=False)
+            out[shuffle] = (r, time.perf_counter() - t0, ok and read(cold) == orig)
+        print(f"Almacén de {n_symbols} símbolos × {n_days} sesiones: {out[True][0]['bytes'] / 1e6:.0f} MB "
+              f"en {out[True][0]['files']} ficheros")
+        for shuffle, (r, t_imp, same) in out.items():
+            print(f"  {'shuffle/XOR + deflate' if shuffle else 'deflate':<24} {r['packed'] / 1e6:6.1f} MB "
+                  f"({r['bytes'] / r['packed']:4.1f}×)  exportar {r['seconds']:4.1f}s  restaurar {t_imp:4.1f}s"
+                  f"  → {'IDÉNTICO' if same else 'DIFERENTE'}")
+
+        raw = bytearray(open(os.path.join(root, 'snap1.zip'), 'rb').read())
+        raw[len(raw) // 2] ^= 0xFF
+        bad = os.path.join(root, 'bad.zip')
+        with open(bad, 'wb') as f:
+            f.write(bytes(raw))
+        cold = DataStore(os.path.join(root, 'cold1'))
+        refused = not import_snapshot(bad, cold, verbose=False) and read(cold) == orig
+        print(f"Instantánea corrupta: {'rechazada, almacén intacto' if refused else 'ACEPTADA'}")
+    return all(v[2] for v in out.values()) and refused
+
+
+def bench_factors(n_symbols, n_days, per_date=20):
+    """Analítica de factores (factor_ic.py). 1) Tabla de candidatos de toda la historia:
+    replay completo la primera vez, solo caché después (misma tabla). 2) Motor de IC sobre
+    ~`per_date` candidatos sintéticos por sesión con un factor plantado (rs ≈ retorno
+    futuro + ruido): resumen + decaimiento de todos los factores y score re-ponderado,
+    con paridad del IC por fecha frente a un bucle de pandas (rank().corr() por fecha).
+    3) t-stat bajo la hipótesis nula con ventanas solapadas de 21 sesiones: su dispersión
+    debe quedar cerca de 1 (la del t ingenuo se infla ~√21)."""
+    from data_store import DataStore
+    from factor_ic import FACTORS, FactorIC, newey_west_t, update_candidates
+    from feature_graph import MIN_BAR
+
+    data, spy = synthetic_prices(n_symbols, n_days)
+    with tempfile.TemporaryDirectory() as root:
+        store = DataStore(root)
+        store.merge(data, spy)
+        t0 = time.perf_counter()
+        first = update_candidates(store, verbose=False)
+        t_build = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        again = update_candidates(store, verbose=False)
+        t_cached = time.perf_counter() - t0
+        same_table = first.equals(again)
+        print(f"Candidatos (rupturas) de {n_symbols} símbolos × {n_days} sesiones: {len(first)} — "
+              f"replay + tabla {t_build:.1f}s, desde caché {t_cached * 1000:.0f} ms → "
+              f"{'IDÉNTICO' if same_table else 'DIFERENTE'}")
+
+        panel = store.panel()
+        c = panel.arrays['c']
+        rng = np.random.default_rng(3)
+        n = n_days * per_date
+        rows = rng.integers(MIN_BAR, len(panel.dates) - 21, n)
+        cols = rng.integers(0, len(panel.symbols), n)
+        keep = ~np.isnan(c[rows, cols]) & ~np.isnan(c[rows + 21, cols])
+        rows, cols = rows[keep], cols[keep]
+        fwd = c[rows + 21, cols] / c[rows, cols] - 1
+        table = pd.DataFrame(dict(date=pd.DatetimeIndex(panel.dates[rows]),
+                                  symbol=np.array(panel.symbols)[cols],
+                                  **{f: rng.normal(size=len(rows)) for f in FACTORS}))
+        table['rs'] = fwd / fwd.std() + rng.normal(size=len(rows)) * 3
+        table['retested'] = (table['retested'] > 0).astype(float)
+        table = table.drop_duplicates(['date', 'symbol']).reset_index(drop=True)
+        t0 = time.perf_counter()
+        fic = FactorIC(table, panel)
+        summary, decay = fic.summary(), fic.decay()
+        t_ic = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        comp = fic.composite_ic(dict(rs=35, mom6m=10, vol_ratio=15, retested=10, r1m=10))
+        t_comp = time.perf_counter() - t0
+        print(f"IC de {len(FACTORS)} factores × {len(fic.horizons)} horizontes sobre {len(fic.table)} "
+              f"candidatos en {len(fic.dates)} sesiones: {t_ic:.2f}s (resumen + decaimiento); "
+              f"score re-ponderado {t_comp * 1000:.0f} ms")
+        print(f"  IC plantado (rs, 21 sesiones) {summary.loc['rs', 'ic']} (t {summary.loc['rs', 't']}), "
+              f"ruido (mom6m) {summary.loc['mom6m', 'ic']}; combinación {comp['ic']}")
+
+        df = fic.table.assign(y=fic.Y[21])
+        t0 = time.perf_counter()
+        bad = 0
+        for f in FACTORS:
+            d = df.dropna(subset=[f, 'y'])
+            ref = d.groupby('date')[[f, 'y']].apply(lambda g: g[f].rank().corr(g['y'].rank()) if len(g) >= 5 else np.nan)
+            got = fic.by_date(f, 21).reindex(ref.index)
+            bad += not np.allclose(ref.values.astype(float), got.values, equal_nan=True)
+        t_loop = time.perf_counter() - t0
+        print(f"Paridad con el bucle de pandas por fecha ({t_loop:.1f}s, 1 horizonte): "
+              f"{'IDÉNTICO' if bad == 0 else f'{bad} factores DIFERENTES'}")
+
+    naive, nw = [], []
+    for _ in range(500):
+        v = np.convolve(rng.normal(size=n_days + 20), np.ones(21) / 21, 'valid')   # IC diario solapado
+        naive.append(v.mean() / v.std(ddof=1) * np.sqrt(len(v)))
+        nw.append(newey_west_t(v, 20))
+    calibrated = np.std(nw) < 1.5
+    print(f"t bajo la nula (ventanas de 21 sesiones solapadas, 500 series): dispersión ingenua "
+          f"{np.std(naive):.1f}, Newey-West {np.std(nw):.2f} → {'OK' if calibrated else 'INFLADO'}")
+    return same_table and bad == 0 and calibrated
+
+
+CORE_MODULES = ('price_panel', 'data_store', 'feature_graph', 'momentum_strategy',
+                'momentum_vectorized', 'portfolio_risk', 'portfolio_backtest', 'rs_matrix', 'group_strength',
+                'trade_paths', 'universe_store')
+HEAVY_MODULES = ('pandas', 'yfinance', 'requests', 'tqdm')
+
+
+def bench_imports(repeat=3):
+    """Arranque en FRÍO (intérprete nuevo por medida) del núcleo (evaluadores, panel,
+    simulador) frente a la integración de datos y el screener completo; y qué módulos
+    pesados arrastra cada uno."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    probe = ("import sys, time; t = time.perf_counter(); import {mods}; "
+             "print(time.perf_counter() - t, *[m for m in {heavy!r} if m in sys.modules])")
+    groups = [('núcleo', ','.join(CORE_MODULES)), ('market_data', 'market_data'),
+              ('momentum_screener', 'momentum_screener')]
+    print(f"Importación en frío (mejor de {repeat}):")
+    for label, mods in groups:
+        best, heavy = None, []
+        for _ in range(repeat):
+            out = subprocess.run([sys.executable, '-c', probe.format(mods=mods, heavy=HEAVY_MODULES)],
+                                 cwd=here, capture_output=True, text=True, check=True).stdout.split()
+            t = float(out[0])
+            best, heavy = (t, out[1:]) if best is None or t < best else (best, heavy)
+        print(f"  {label:<18} {best * 1000:7.0f} ms   pesados: {', '.join(heavy) or '—'}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('what', choices=['memory', 'parity', 'workers', 'chunked', 'robustness', 'metrics', 'features', 'imports', 'kernels', 'quality', 'rs', 'groups', 'intraday', 'paths', 'universe', 'snapshot', 'factors'])
+    ap.add_argument('--symbols', type=int, default=300)
+    ap.add_argument('--days', type=int, default=1260)
+    args = ap.parse_args()
+    if args.what == 'memory':
+        bench_memory(args.symbols, args.days)
+    elif args.what == 'parity':
+        ok = check_compact_parity(args.symbols, args.days)
+        raise SystemExit(0 if ok else 1)
+    elif args.what == 'workers':
+        bench_workers(args.symbols, args.days)
+    elif args.what == 'chunked':
+        bench_chunked(args.symbols, args.days)
+    elif args.what == 'robustness':
+        bench_robustness(args.days)
+    elif args.what == 'metrics':
+        raise SystemExit(0 if bench_metrics(args.days) else 1)
+    elif args.what == 'features':
+        bench_features(args.symbols, args.days)
+    elif args.what == 'imports':
+        bench_imports()
+    elif args.what == 'kernels':
+        raise SystemExit(0 if bench_kernels(args.symbols, args.days) else 1)
+    elif args.what == 'quality':
+        raise SystemExit(0 if bench_quality(args.symbols, args.days) else 1)
+    elif args.what == 'rs':
+        raise SystemExit(0 if bench_rs(args.symbols, args.days) else 1)
+    elif args.what == 'groups':
+        raise SystemExit(0 if bench_groups(args.symbols, args.days) else 1)
+    elif args.what == 'intraday':
+        raise SystemExit(0 if bench_intraday(args.symbols, args.days) else 1)
+    elif args.what == 'paths':
+        raise SystemExit(0 if bench_paths(args.symbols, args.days) else 1)
+    elif args.what == 'universe':
+        raise SystemExit(0 if bench_universe(args.symbols, args.days) else 1)
+    elif args.what == 'snapshot':
+        raise SystemExit(0 if bench_snapshot(args.symbols, args.days) else 1)
+    elif args.what == 'factors':
+        raise SystemExit(0 if bench_factors(args.symbols, args.days) else 1)
+
+
+if __name__ == "__main__":
+    main()
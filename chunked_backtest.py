@@ -0,0 +1,114 @@
+# chunked_backtest.py — Backtest POR TRAMOS (out-of-core) sobre el almacén en disco
+#
+# Para historias que no caben en RAM (miles de símbolos × 20 años). En vez de cargar
+# todo el universo, recorre el calendario en tramos de `chunk_days` sesiones:
+#   - de data_store/ carga SOLO el bloque de fechas del tramo + el solape que necesitan
+#     los evaluadores (252 sesiones de historia + la ventana de base de la ruptura),
+#   - genera las señales del tramo con generate_momentum_signals (mismo walk-forward,
+#     misma fase del `step`, cooldown arrastrado entre tramos),
+#   - simula la cartera con las MISMAS piezas que run_portfolio_backtest (caja,
+#     posiciones, trailing y entradas pendientes pasan al tramo siguiente),
+#   - vuelca trades y puntos de equity a CSV según avanza.
+# El pico de memoria depende del tamaño del tramo, no de la longitud de la historia.
+# Con los mismos datos, el resultado es IDÉNTICO al backtest en memoria (con la misma
+# fuente de RS: `rs_matrix=store.rs_matrix()` lee el RS precalculado, rs_matrix.py).
+
+import os
+
+import pandas as pd
+
+from data_store import DataStore
+from momentum_strategy import DEFAULTS, generate_momentum_signals
+from portfolio_backtest import (DEFAULT_CONFIG, _prepare_arrays, add_entries, compute_metrics,
+                                liquidate_all, market_filter, new_state, simulate_days)
+
+
+def lookback_overlap(params=None):
+    """Sesiones de historia previa que necesita cada tramo: 252 (máximo 52s, MA200
+    previa) + la ventana de base y el lead de la ruptura."""
+    p = {**DEFAULTS, **(params or {})}
+    return 252 + p['breakout_base_window'] + p['breakout_lead']
+
+
+def run_chunked_backtest(store, out_dir, chunk_days=504, step=5, params=None, evaluator=None,
+                         rs_floor=None, config=None, first_ci=290, rs_matrix=None, universe=None):
+    """Walk-forward + cartera por tramos leyendo de `store` (DataStore o ruta).
+    Escribe `out_dir`/trades.csv, equity.csv y signals.csv y devuelve el mismo dict
+    que run_portfolio_backtest (equity_curve, trades, metrics, config). Con
+    `rs_matrix` (RSMatrix de todo el calendario) el RS de cada tramo se lee de ella;
+    `universe` (Membership, universe_store.py) limita cada fecha a los listados entonces."""
+    store = DataStore(store) if isinstance(store, str) else store
+    cfg = {**DEFAULT_CONFIG, **(config or {})}
+    panel = store.panel()
+    spy = store.index()
+    cal = spy.index
+    if len(panel.dates) != len(cal) or (panel.dates != cal.values.astype('datetime64[D]')).any():
+        raise ValueError("El panel del almacén no usa el calendario del índice")
+    cal_pos = {ts: i for i, ts in enumerate(cal)}
+    market_ok_by_day = market_filter(spy, cfg)
+    overlap = lookback_overlap(params)
+    last_eval = len(cal) - 2
+
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {k: os.path.join(out_dir, f'{k}.csv') for k in ('trades', 'equity', 'signals')}
+    for f in paths.values():
+        if os.path.exists(f):
+            os.remove(f)
+
+    state = new_state(cfg)
+    entries_by_day, seen = {}, {}
+    arr = {}
+    for a in range(0, len(cal), chunk_days):
+        b = min(a + chunk_days, len(cal))
+        w0 = max(0, a - overlap)
+        chunk = panel.window(w0, b)
+        spy_w = spy.iloc[w0:b]
+
+        # Señales evaluadas en [a, b), misma fase del paso que el walk-forward completo.
+        lo = max(a, first_ci)
+        lo += (-(lo - first_ci)) % step
+        hi = min(b, last_eval)
+        if lo < hi:
+            seen_local = {s: ci - w0 for s, ci in seen.items()}
+            sig = generate_momentum_signals(chunk, spy_w, step=step, params=params,
+                                            evaluator=evaluator, rs_floor=rs_floor,
+                                            ci_range=(lo - w0, hi - w0), seen=seen_local,
+                                            rs_matrix=rs_matrix, universe=universe)
+            seen = {s: ci + w0 for s, ci in seen_local.items()}
+            if not sig.empty:
+                _append_csv(sig, paths['signals'])
+                sig['date'] = pd.to_datetime(sig['date'])
+                add_entries(entries_by_day, sig, cal, cal_pos)
+
+        days = cal[a:b]
+        held = {p['symbol'] for p in state['positions']}
+        pending = {e['symbol'] for d in days for e in entries_by_day.get(d, [])}
+        arr = _prepare_arrays(chunk, sorted(held | pending), cal)
+        trades, equity = [], []
+        simulate_days(days, state, cfg, arr, entries_by_day, market_ok_by_day, cal_pos,
+                      trades, equity)
+        for d in days:
+            entries_by_day.pop(d, None)
+        if b == len(cal):
+            liquidate_all(state, cal[-1], cfg, arr, cal_pos, trades)
+        _append_csv(pd.DataFrame(trades), paths['trades'])
+        _append_csv(pd.DataFrame(equity, columns=['date', 'equity']), paths['equity'])
+        del chunk, arr
+
+    eq = pd.read_csv(paths['equity'], index_col='date', parse_dates=['date'])['equity']
+    eq.index.name = None
+    trades_df = (pd.read_csv(paths['trades'], parse_dates=['entry_day', 'exit_day'])
+                 if os.path.getsize(paths['trades']) else pd.DataFrame())
+    metrics = compute_metrics(eq, spy, trades_df, cfg)
+    if state['gate'] is not None:
+        metrics['entries_rejected'] = dict(state['gate'].rejected)
+    return dict(equity_curve=eq, trades=trades_df, metrics=metrics, config=cfg, paths=paths)
+
+
+def _append_csv(df, path):
+    if df.empty:
+        if not os.path.exists(path):
+            open(path, 'w').close()
+        return
+    header = not os.path.exists(path) or os.path.getsize(path) == 0
+    df.to_csv(path, mode='a', header=header, index=False)
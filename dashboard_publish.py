@@ -0,0 +1,212 @@
+# dashboard_publish.py — Publicación del dashboard: data.json PEQUEÑO + gráficos e historia
+#
+# El dashboard bajaba un data.json con cache-busting (?t=...) en cada carga, y cada pick
+# repetía los mismos textos largos (note, sl_explanation, watch_zone) más los criterios.
+# Aquí el screener publica en docs/:
+#   data.json            núcleo versionado (SCHEMA_VERSION): listas, mercado, resumen.
+#                        Los textos repetidos van UNA vez en `texts` y cada pick guarda su
+#                        índice; criterios y estrategia van a meta/.
+#   meta/<hash>.json     criterios y estrategia (cambian solo si cambian los DEFAULTS)
+#   charts/<SYM>-<hash>.json   gráfico de cada candidato publicado, se pide al abrirlo:
+#                        OHLC de las últimas `chart_days` sesiones, MA50/MA200, ventana de
+#                        la base, nivel de ruptura, entrada y stop (codificación compacta,
+#                        ver chart_payload)
+#   history/<fecha>-<hash>.json   núcleo de cada sesión publicada; history/index.json las
+#                        lista (las `history_keep` más recientes; lo que ya no referencia
+#                        ninguna se borra)
+# Todo salvo data.json e history/index.json lleva el hash de su contenido en el nombre:
+# es inmutable y el navegador lo cachea sin volver a pedirlo. data.json e index.json se
+# piden con `cache: 'no-cache'` (revalidación con ETag → 304 si no cambió) en vez de
+# cache-busting. La escritura es atómica (tmp + os.replace).
+#
+#   publish(dash, candidate_charts(dash, data), out_dir='docs')
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from momentum_strategy import DEFAULTS as STRATEGY_DEFAULTS
+
+
+SCHEMA_VERSION = 2
+DEFAULTS = dict(
+    chart_days=180,      # sesiones por gráfico (~9 meses: la base y la MA200 se ven)
+    history_keep=60,     # sesiones en history/ (~3 meses)
+)
+TEXT_FIELDS = ('note', 'sl_explanation', 'watch_zone')
+META_FIELDS = ('strategy', 'criteria')
+LISTS = ('breakouts', 'pullbacks', 'watch')
+PRICE_SCALE = 100        # precios en céntimos enteros
+
+
+def _clean(obj):
+    """NaN/inf → null (JSON.parse del navegador no acepta NaN) y escalares NumPy → Python."""
+    if isinstance(obj, dict):
+        return {k: _clean(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_clean(v) for v in obj]
+    if isinstance(obj, (float, np.floating)):
+        return float(obj) if np.isfinite(obj) else None
+    if isinstance(obj, np.integer):
+        return int(obj)
+    if isinstance(obj, np.bool_):
+        return bool(obj)
+    return obj
+
+
+def _dumps(obj):
+    return json.dumps(_clean(obj), ensure_ascii=False, separators=(',', ':'), allow_nan=False)
+
+
+def _digest(text):
+    return hashlib.blake2b(text.encode(), digest_size=6).hexdigest()
+
+
+def _write(path, text):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def _write_hashed(out_dir, sub, stem, obj):
+    """Escribe `obj` en out_dir/sub/<stem>-<hash>.json (si no existe ya) y devuelve la ruta
+    relativa que se publica en el núcleo."""
+    text = _dumps(obj)
+    rel = f'{sub}/{stem}-{_digest(text)}.json'
+    path = os.path.join(out_dir, rel)
+    if not os.path.exists(path):
+        _write(path, text)
+    return rel
+
+
+def _deltas(x):
+    """Serie de precios → enteros en céntimos, el primero absoluto y el resto diferencias
+    con el anterior (números cortos en JSON); None donde falta el dato."""
+    out, prev = [], 0
+    for v in x:
+        if v is None or not np.isfinite(v):
+            out.append(None)
+            continue
+        q = int(round(float(v) * PRICE_SCALE))
+        out.append(q - prev)
+        prev = q
+    return out
+
+
+def chart_payload(df, pick, kind, params=None, days=DEFAULTS['chart_days']):
+    """Gráfico compacto de un candidato: `df` HLC (y Open si lo hay) del símbolo
+    (DataFrame), `pick` su fila del dashboard. Fechas = primera fecha + saltos en días
+    naturales; cada precio en céntimos delta-codificado (_deltas); o/h/l como diferencia
+    en céntimos con el cierre del mismo día. Sin Open (la descarga del screener no lo
+    trae) no hay `o` y la página dibuja barras HLC. Las medias se calculan sobre toda la
+    historia y luego se recortan."""
+    p = {**STRATEGY_DEFAULTS, **(params or {})}
+    close = df['Close'].astype(float)
+    ma50 = close.rolling(50).mean().values[-days:]
+    ma200 = close.rolling(200).mean().values[-days:]
+    w = df.iloc[-days:]
+    c = np.rint(w['Close'].values.astype(float) * PRICE_SCALE)
+    rel = lambda col: [None if not np.isfinite(v) else int(v)
+                       for v in np.rint(w[col].values.astype(float) * PRICE_SCALE) - c]
+    dates = w.index.values.astype('datetime64[D]')
+    out = dict(v=1, symbol=pick['symbol'], kind=kind, d0=str(dates[0]),
+               dd=[int(x) for x in np.diff(dates).astype(int)],
+               c=_deltas(w['Close'].values), h=rel('High'), l=rel('Low'),
+               ma50=_deltas(ma50), ma200=_deltas(ma200), scale=PRICE_SCALE,
+               levels={k: pick[k] for k in ('price', 'sl', 'breakout_level', 'recent_high', 'ma50')
+                       if pick.get(k) is not None})
+    if 'Open' in w.columns:
+        out['o'] = rel('Open')
+    if kind == 'breakouts':
+        n, bw, lead = len(w), p['breakout_base_window'], p['breakout_lead']
+        if n - 1 - bw - lead >= 0:
+            out['base'] = [n - 1 - bw - lead, n - 1 - lead]     # índices del gráfico, inclusivos
+    return out
+
+
+def candidate_charts(dash, price_data, params=None, days=DEFAULTS['chart_days']):
+    """Gráficos de los picks publicados en `dash`: dict (lista, símbolo) -> payload."""
+    out = {}
+    for kind in LISTS:
+        for pick in dash.get(kind, []):
+            df = price_data.get(pick['symbol'])
+            if df is None or len(df) < 2:
+                continue
+            out[(kind, pick['symbol'])] = chart_payload(df, pick, kind, params, days)
+    return out
+
+
+def slim(dash, out_dir):
+    """Núcleo de data.json: textos repetidos a una tabla y criterios/estrategia a meta/."""
+    core = {k: v for k, v in dash.items() if k not in META_FIELDS}
+    core['version'] = SCHEMA_VERSION
+    core['meta'] = _write_hashed(out_dir, 'meta', 'meta', {k: dash[k] for k in META_FIELDS if k in dash})
+    texts, index = [], {}
+    for kind in LISTS:
+        rows = []
+        for pick in dash.get(kind, []):
+            pick = dict(pick)
+            for f in TEXT_FIELDS:
+                t = pick.get(f)
+                if isinstance(t, str):
+                    if t not in index:
+                        index[t] = len(texts)
+                        texts.append(t)
+                    pick[f] = index[t]
+            rows.append(pick)
+        core[kind] = rows
+    core['texts'] = texts
+    return core
+
+
+def _referenced(core):
+    refs = {core.get('meta')}
+    for kind in LISTS:
+        refs.update(p.get('chart') for p in core.get(kind, []))
+    return {r for r in refs if r}
+
+
+def publish(dash, charts=None, out_dir='docs', history_keep=DEFAULTS['history_keep']):
+    """Escribe data.json (núcleo), meta/, charts/ e history/ en `out_dir` y borra los
+    ficheros con hash que ya no referencia ninguna sesión guardada. Devuelve el núcleo."""
+    charts = charts or {}
+    dash = {k: ([dict(p) for p in v] if k in LISTS else v) for k, v in dash.items()}
+    for kind in LISTS:
+        for pick in dash.get(kind, []):
+            payload = charts.get((kind, pick['symbol']))
+            if payload is not None:
+                pick['chart'] = _write_hashed(out_dir, 'charts', pick['symbol'], payload)
+    core = slim(dash, out_dir)
+
+    # Historia: una entrada por fecha de mercado (re-publicar el mismo día la sustituye).
+    idx_path = os.path.join(out_dir, 'history', 'index.json')
+    history = []
+    if os.path.exists(idx_path):
+        with open(idx_path, encoding='utf-8') as f:
+            history = json.load(f).get('sessions', [])
+    date = core.get('market_date') or str(core.get('timestamp', ''))[:10]
+    entry = dict(date=date, file=_write_hashed(out_dir, 'history', date, core),
+                 picks=len(core.get('breakouts', [])))
+    history = [entry] + [h for h in history if h['date'] != date]
+    history.sort(key=lambda h: h['date'], reverse=True)
+    history = history[:history_keep]
+    _write(idx_path, _dumps(dict(version=SCHEMA_VERSION, sessions=history)))
+
+    keep = _referenced(core) | {h['file'] for h in history}
+    for h in history:
+        path = os.path.join(out_dir, h['file'])
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                keep |= _referenced(json.load(f))
+    for sub in ('charts', 'meta', 'history'):
+        d = os.path.join(out_dir, sub)
+        for name in (os.listdir(d) if os.path.isdir(d) else []):
+            if name.endswith('.json') and name != 'index.json' and f'{sub}/{name}' not in keep:
+                os.remove(os.path.join(d, name))
+
+    _write(os.path.join(out_dir, 'data.json'), _dumps(core))
+    return core
@@ -0,0 +1,249 @@
+# data_quality.py — Saneado de datos AL INGESTAR (vectorizado sobre todo el panel)
+#
+# Un solo print erróneo de yfinance basta para fabricar una ruptura, un máximo de 52
+# semanas o un ATR absurdo. check_market_health ya descartaba la vela corrupta del
+# ^GSPC; aquí se aplica la misma idea a TODOS los símbolos, una vez por descarga y sobre
+# el panel entero (fechas × símbolos), para que los evaluadores nunca vean el dato malo
+# ni necesiten comprobaciones defensivas por llamada.
+#
+# Reglas (en este orden; cada cambio queda registrado por símbolo):
+#   duplicate_date  fechas repetidas en un DataFrame → se queda la última
+#   nonpositive     algún precio ≤ 0 → barra ENMASCARADA (como si no hubiera cotizado)
+#   spike           cierre que salta >spike_jump respecto a la barra anterior Y a la
+#                   siguiente, y la siguiente vuelve al nivel de la anterior (pico-y-
+#                   vuelta: imposible de operar, es un print malo) → enmascarada
+#   last_spike      la ÚLTIMA barra no tiene siguiente que confirme la vuelta: se
+#                   enmascara si se desvía >last_jump de la mediana de los 5 cierres
+#                   previos. Si era real, la próxima descarga la trae de nuevo y ya no
+#                   es la última → deja de marcarse sola.
+#   wick            High > max(Open, Close, cierre previo)·(1+wick_max) (o Low simétrico)
+#                   → se recorta a max/min(Open, Close)
+#   hl              High/Low incoherentes (High < Low, Close fuera del rango) → High/Low =
+#                   máximo/mínimo de los precios de la barra
+#   volume          volumen negativo → 0; volumen > vol_spike × su mediana de vol_window
+#                   sesiones → se sustituye por esa mediana
+# Enmascarar = NaN en precios (0 en volumen compacto): `PricePanel.series` y el
+# `.dropna()` de las descargas la tratan como una sesión sin barra.
+#
+#   clean, log = sanitize_frames(price_data)        # dict[símbolo] -> DataFrame
+#   log = sanitize_panel(panel)                     # PricePanel en RAM, in situ
+#   append_log(log, store.path('quality_log.csv'))  # historial de cambios por símbolo
+#   python data_quality.py --store data_store [--apply]   # auditar/sanear el almacén
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from price_panel import FIELDS, PricePanel
+
+
+DEFAULTS = dict(
+    spike_jump=0.35,      # salto del cierre frente a las barras vecinas...
+    spike_revert=0.25,    # ...y vuelta al nivel previo en la sesión siguiente: lo que
+                          #    separa a los vecinos es ≤25% del salto (en log)
+    last_jump=0.5,        # última barra: >50% de la mediana de 5 cierres previos
+    wick_max=0.5,         # mecha >50% más allá del cuerpo y del cierre previo
+    vol_spike=100,        # volumen >100× su mediana (inclusiones en índices: ~20-50×)
+    vol_window=50,
+)
+# El índice se mueve mucho menos: mismo umbral de 15% que check_market_health.
+INDEX_PARAMS = dict(spike_jump=0.15, last_jump=0.15, wick_max=0.15)
+
+LOG_COLUMNS = ['symbol', 'date', 'rule', 'field', 'old', 'new']
+
+
+def _entries(rule, field, mask, old, new, dates, symbols):
+    r, j = np.nonzero(mask)
+    if len(r) == 0:
+        return None
+    return pd.DataFrame(dict(symbol=np.asarray(symbols, dtype=object)[j], date=dates[r], rule=rule,
+                             field=field, old=np.asarray(old, dtype=np.float64)[r, j],
+                             new=np.broadcast_to(np.asarray(new, dtype=np.float64), mask.shape)[r, j]))
+
+
+def sanitize_arrays(arrays, dates, symbols, params=None):
+    """Sanea in situ los arrays (T, N) de un panel (o/h/l/c/v; Open y Volume opcionales).
+    Devuelve el registro de cambios (DataFrame LOG_COLUMNS, vacío si no hubo)."""
+    p = {**DEFAULTS, **(params or {})}
+    dates = np.asarray(dates, dtype='datetime64[D]')
+    px = {k: np.asarray(arrays[k], dtype=np.float64).copy() for k in 'ohlc' if k in arrays}
+    c = px['c']
+    log = []
+    add = lambda *a: log.append(_entries(*a, dates, symbols))
+
+    def mask_bars(rule, m):
+        add(rule, 'bar', m, c, np.nan)
+        for a in px.values():
+            a[m] = np.nan
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        valid = ~np.isnan(c)
+        bad = np.zeros_like(valid)
+        for a in px.values():
+            bad |= a <= 0
+        mask_bars('nonpositive', valid & bad)
+
+        # Pico-y-vuelta: vecinos = barra válida anterior / siguiente (saltando huecos)
+        cf = pd.DataFrame(c)
+        prev = cf.ffill().shift(1).values
+        nxt = cf.bfill().shift(-1).values
+        jp, jn = np.log(c / prev), np.log(c / nxt)          # salto desde / hasta los vecinos
+        big = np.log1p(p['spike_jump'])
+        spike = ((np.abs(jp) > big) & (np.abs(jn) > big) & ((jp > 0) == (jn > 0))
+                 & (np.abs(jp - jn) <= p['spike_revert'] * np.fmin(np.abs(jp), np.abs(jn))))
+        mask_bars('spike', spike)
+
+        valid = ~np.isnan(c)
+        n = valid.sum(axis=0)
+        last = len(c) - 1 - valid[::-1].argmax(axis=0)
+        cols = np.flatnonzero(n > 5)
+        rows = last[cols]
+        cff = pd.DataFrame(c).ffill().values
+        med5 = np.median(cff[rows[:, None] - np.arange(5, 0, -1), cols[:, None]], axis=1)
+        jump = np.zeros_like(valid)
+        jump[rows, cols] = np.abs(c[rows, cols] / med5 - 1) > p['last_jump']
+        mask_bars('last_spike', jump)
+
+        if 'h' in px and 'l' in px:            # (el índice del screener trae solo Close)
+            valid = ~np.isnan(c)
+            o = px.get('o', c)
+            body_hi, body_lo = np.fmax(o, c), np.fmin(o, c)
+            pc = pd.DataFrame(c).ffill().shift(1).values
+            h, l = px['h'], px['l']
+            wick_h = valid & (h > np.fmax(body_hi, pc) * (1 + p['wick_max']))
+            add('wick', 'High', wick_h, h, body_hi)
+            h[wick_h] = body_hi[wick_h]
+            wick_l = valid & (l < np.fmin(body_lo, pc) / (1 + p['wick_max']))
+            add('wick', 'Low', wick_l, l, body_lo)
+            l[wick_l] = body_lo[wick_l]
+
+            hi = np.fmax(np.fmax(body_hi, h), l)
+            lo = np.fmin(np.fmin(body_lo, h), l)
+            fix_h, fix_l = valid & (h != hi), valid & (l != lo)
+            add('hl', 'High', fix_h, h, hi)
+            add('hl', 'Low', fix_l, l, lo)
+            h[fix_h], l[fix_l] = hi[fix_h], lo[fix_l]
+
+    for k, a in px.items():
+        arrays[k][...] = a
+
+    if 'v' in arrays:
+        v = np.asarray(arrays['v'], dtype=np.float64).copy()
+        v[np.isnan(c)] = np.nan
+        neg = v < 0
+        add('volume', 'Volume', neg, v, 0.0)
+        v[neg] = 0.0
+        glitch, med = _volume_glitches(v, p['vol_spike'], p['vol_window'])
+        add('volume', 'Volume', glitch, v, med)
+        v[glitch] = med[glitch]
+        v[np.isnan(c)] = 0 if arrays['v'].dtype == np.uint32 else np.nan
+        arrays['v'][...] = v.astype(arrays['v'].dtype)
+    log = [x for x in log if x is not None]
+    if not log:
+        return pd.DataFrame(columns=LOG_COLUMNS)
+    out = pd.concat(log, ignore_index=True)
+    out['date'] = pd.to_datetime(out['date'])
+    return out.sort_values(['symbol', 'date'], kind='stable', ignore_index=True)
+
+
+def _volume_glitches(v, k, w):
+    """Celdas con volumen > k × la mediana de las `w` sesiones previas (≥ w/2 con dato).
+    v > k·mediana implica v > k·mínimo: el mínimo móvil (barato) preselecciona y la
+    mediana exacta solo se calcula en esas celdas. Devuelve (máscara, medianas)."""
+    vmin = pd.DataFrame(v).rolling(w, min_periods=w // 2).min().shift(1).values
+    with np.errstate(invalid='ignore'):
+        r, j = np.nonzero(v > k * vmin)
+    med = np.full(v.shape, np.nan)
+    if len(r):
+        vp = np.vstack([np.full((w, v.shape[1]), np.nan), v])
+        win = vp[r[:, None] + np.arange(w), j[:, None]]          # filas r-w .. r-1
+        with np.errstate(invalid='ignore'):
+            med[r, j] = np.nanmedian(win, axis=1)
+    with np.errstate(invalid='ignore'):
+        return (med > 0) & (v > k * med), med
+
+
+def sanitize_panel(panel, params=None):
+    """Sanea un PricePanel EN RAM (arrays escribibles) y recalcula su índice de filas."""
+    log = sanitize_arrays(panel.arrays, panel.dates, panel.symbols, params)
+    panel._index_rows()
+    return log
+
+
+def sanitize_frames(price_data, params=None):
+    """Sanea un dict[símbolo] -> DataFrame (descarga). Devuelve (dict saneado, registro).
+
+    Las reglas se aplican sobre un panel float64 con la unión de fechas (una pasada
+    vectorizada); solo se reconstruyen los DataFrames de los símbolos con cambios, con
+    sus mismas columnas y dtypes, y sin las barras enmascaradas."""
+    out, logs = dict(price_data), []
+    for s, d in price_data.items():
+        if d is None or d.empty:
+            continue
+        dup = d.index.duplicated(keep='last')
+        if dup.any() or not d.index.is_monotonic_increasing:
+            if dup.any():
+                logs.append(pd.DataFrame(dict(symbol=s, date=d.index[dup], rule='duplicate_date',
+                                              field='bar', old=np.nan, new=np.nan)))
+            out[s] = d[~dup].sort_index()
+    panel = PricePanel.from_frames(out)
+    if len(panel):
+        log = sanitize_panel(panel, params)
+        logs.append(log)
+        changed = set(log['symbol'])
+        for s in changed & set(panel.symbols):
+            d = out[s]
+            pos = pd.DatetimeIndex(panel.dates).get_indexer(d.index)
+            j = panel.sym_idx[s]
+            d = d.copy()
+            for k, col in FIELDS.items():
+                if col in d.columns:
+                    vals = panel.arrays[k][pos, j]
+                    d[col] = (vals if d[col].dtype.kind == 'f' else np.nan_to_num(vals)).astype(d[col].dtype)
+            out[s] = d[~np.isnan(panel.arrays['c'][pos, j])]
+    logs = [x for x in logs if len(x)]
+    log = (pd.concat(logs, ignore_index=True).sort_values(['symbol', 'date'], kind='stable', ignore_index=True)
+           if logs else pd.DataFrame(columns=LOG_COLUMNS))
+    return out, log
+
+
+def summary(log):
+    """'spike 3, hl 12 en 9 símbolos' (para el log de consola)."""
+    if log is None or log.empty:
+        return 'sin cambios'
+    counts = log['rule'].value_counts()
+    return f"{', '.join(f'{r} {n}' for r, n in counts.items())} en {log['symbol'].nunique()} símbolos"
+
+
+def append_log(log, path):
+    """Añade el registro de una ingesta al CSV histórico (columna `ingested` = ahora)."""
+    if log is None or log.empty:
+        return path
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    out = log.assign(ingested=pd.Timestamp.now().floor('s'))
+    out.to_csv(path, mode='a', header=not os.path.exists(path), index=False)
+    return path
+
+
+def main():
+    from data_store import DataStore
+
+    ap = argparse.ArgumentParser(description='Audita (o sanea con --apply) el almacén local')
+    ap.add_argument('--store', default='data_store')
+    ap.add_argument('--apply', action='store_true', help='Guardar el panel saneado y el registro')
+    args = ap.parse_args()
+    store = DataStore(args.store)
+    panel = store.panel(mmap_mode=None)
+    log = sanitize_panel(panel)
+    print(f"{len(panel)} símbolos × {len(panel.dates)} sesiones: {summary(log)}")
+    if not log.empty:
+        print(log.groupby(['symbol', 'rule']).size().sort_values(ascending=False).head(20).to_string())
+    if args.apply and not log.empty:
+        panel.save(store.path('panel'))
+        print(f"Guardado (registro → {append_log(log, store.path('quality_log.csv'))})")
+
+
+if __name__ == "__main__":
+    main()
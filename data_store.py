@@ -0,0 +1,158 @@
+# data_store.py — Almacén LOCAL de datos en disco (reutilizable)
+#
+# Un directorio con el panel de precios del universo y el del índice de mercado,
+# ambos en formato PricePanel (price_panel.py: .npy mapeados en memoria). Lo leen el
+# backtest por tramos y cualquier proceso que no quiera re-descargar ni cargar toda la
+# historia en RAM.
+#
+#   data_store/
+#     panel/   OHLCV del universo (fechas × símbolos, calendario del índice)
+#     index/   OHLC del índice de mercado (^GSPC) con el símbolo '_MARKET_INDEX'
+#     rs/      matriz de fuerza relativa (rs_matrix.py), una fila por sesión del panel
+#     groups.json  industria / sector / capitalización por símbolo (group_strength.py)
+#     universe/    listados diarios como diferencias, point-in-time (universe_store.py)
+#
+# `merge` incorpora cada descarga diaria del screener: la historia del almacén crece
+# sesión a sesión aunque cada descarga solo traiga ~540 días.
+
+import json
+import os
+
+import numpy as np
+
+from price_panel import PricePanel, PanelWriter
+
+
+DEFAULT_ROOT = 'data_store'
+INDEX_SYMBOL = '_MARKET_INDEX'
+
+
+class DataStore:
+    def __init__(self, root=DEFAULT_ROOT):
+        self.root = root
+
+    def path(self, *parts):
+        return os.path.join(self.root, *parts)
+
+    def exists(self):
+        return (os.path.exists(self.path('panel', 'symbols.json'))
+                and os.path.exists(self.path('index', 'symbols.json')))
+
+    # --- Lectura ---
+    def panel(self, mmap_mode='r'):
+        """Panel del universo, mapeado en memoria (solo lectura) por defecto."""
+        return PricePanel.open(self.path('panel'), mmap_mode=mmap_mode)
+
+    def index(self):
+        """DataFrame Open/High/Low/Close del índice (pequeño: se carga entero)."""
+        return PricePanel.open(self.path('index'), mmap_mode=None).frame(INDEX_SYMBOL)
+
+    def rs_matrix(self, params=None, panel=None):
+        """Matriz RS del almacén (rs_matrix.py) al día con el panel: la abre, añade las
+        sesiones nuevas y la guarda; la construye si falta o si se pidió con otros
+        params de liquidez/momentum."""
+        from rs_matrix import RSMatrix
+        panel = panel if panel is not None else self.panel()
+        path = self.path('rs')
+        rsm = RSMatrix.open(path) if os.path.exists(os.path.join(path, 'meta.json')) else None
+        if rsm is None or not rsm.matches(params):
+            rsm = RSMatrix.build(panel, params)
+        elif rsm.aligned(panel) or not rsm.update(panel):
+            return rsm
+        rsm.save(path)
+        return rsm
+
+    def groups(self):
+        """símbolo -> dict(industry, sector, market_cap) guardado con save_groups ({} si no hay)."""
+        path = self.path('groups.json')
+        if not os.path.exists(path):
+            return {}
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def universe(self):
+        """Universo point-in-time del almacén (UniverseStore de universe_store.py)."""
+        from universe_store import UniverseStore
+        return UniverseStore(self.path('universe'))
+
+    # --- Escritura ---
+    def save_groups(self, meta):
+        """Guarda industria/sector/capitalización de los listados (MarketData.symbol_industries)
+        sobre lo ya guardado: los símbolos que dejan de listarse conservan su grupo."""
+        groups = self.groups()
+        for s, m in meta.items():
+            groups[s] = {k: m.get(k) for k in ('industry', 'sector', 'market_cap')}
+        os.makedirs(self.root, exist_ok=True)
+        tmp = self.path(f'groups.json.{os.getpid()}.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(groups, f, ensure_ascii=False)
+        os.replace(tmp, self.path('groups.json'))
+        return groups
+
+    def save_index(self, df):
+        os.makedirs(self.root, exist_ok=True)
+        PricePanel.from_frames({INDEX_SYMBOL: df}, calendar=df.index).save(self.path('index'))
+
+    def merge(self, price_data, index_df, compact=True):
+        """Incorpora una descarga (dict[símbolo] -> DataFrame + índice) al almacén.
+
+        Une calendarios y símbolos; en las fechas descargadas manda el dato NUEVO. Como
+        yfinance ajusta (auto_adjust) toda la historia tras un split/dividendo, la parte
+        vieja de cada símbolo se re-escala por la mediana de nuevo/viejo en el solape,
+        para que la serie no quede con un escalón entre lo almacenado y lo descargado."""
+        import pandas as pd
+        new = PricePanel.from_frames(price_data, calendar=index_df.index, compact=compact)
+        if not self.exists():
+            os.makedirs(self.root, exist_ok=True)
+            new.save(self.path('panel'))
+            self.save_index(index_df)
+            return new
+        old = self.panel()
+        old_index = self.index()
+        dates = np.union1d(old.dates, new.dates)
+        syms = old.symbols + [s for s in new.symbols if s not in old.sym_idx]
+        sidx = {s: j for j, s in enumerate(syms)}
+        po, pn = np.searchsorted(dates, old.dates), np.searchsorted(dates, new.dates)
+        jo = np.arange(len(old.symbols))
+        jn = np.array([sidx[s] for s in new.symbols], dtype=np.int64)
+
+        # Re-escalado por ajuste retroactivo (solo símbolos comunes con solape).
+        ratio = np.ones(len(syms))
+        common = [s for s in new.symbols if s in old.sym_idx]
+        both = np.intersect1d(old.dates, new.dates)
+        if common and len(both):
+            ro = np.searchsorted(old.dates, both)
+            rn = np.searchsorted(new.dates, both)
+            co = old.arrays['c'][np.ix_(ro, [old.sym_idx[s] for s in common])].astype(np.float64)
+            cn = new.arrays['c'][np.ix_(rn, [new.sym_idx[s] for s in common])].astype(np.float64)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                r = np.nanmedian(np.where(co > 0, cn / co, np.nan), axis=0)
+            r = np.where(np.isfinite(r) & (np.abs(r - 1) > 1e-4), r, 1.0)
+            ratio[[sidx[s] for s in common]] = r
+
+        arrays = {}
+        for k, a_new in new.arrays.items():
+            a_old = old.arrays.get(k)
+            dt = a_new.dtype
+            merged = (np.zeros((len(dates), len(syms)), dtype=dt) if dt == np.uint32
+                      else np.full((len(dates), len(syms)), np.nan, dtype=dt))
+            if a_old is not None:
+                vals = np.asarray(a_old, dtype=np.float64)
+                scale = ratio[:len(old.symbols)]
+                vals = vals / scale if k == 'v' else vals * scale
+                merged[np.ix_(po, jo)] = vals.astype(dt) if dt != np.uint32 else \
+                    np.clip(np.nan_to_num(vals), 0, np.iinfo(np.uint32).max).astype(dt)
+            block = merged[np.ix_(pn, jn)]
+            ok = ~np.isnan(new.arrays['c'])
+            block[ok] = a_new[ok]
+            merged[np.ix_(pn, jn)] = block
+            arrays[k] = merged
+        panel = PricePanel(dates, syms, arrays)
+        panel.save(self.path('panel'))
+        self.save_index(index_df.combine_first(old_index).loc[pd.DatetimeIndex(dates)])
+        return panel
+
+    def panel_writer(self, dates, symbols, compact=True):
+        """PanelWriter sobre `panel/` (escritura por lotes; publicar con .close())."""
+        os.makedirs(self.root, exist_ok=True)
+        return PanelWriter(self.path('panel'), dates, symbols, compact=compact)
@@ -0,0 +1,311 @@
+# factor_ic.py — Evidencia de los FACTORES del score: IC de rango por fecha, decaimiento y cubos
+#
+# Los comentarios de find_momentum_picks y score_breakout dicen que las features de ranking
+# tienen correlación ≈0 con el retorno futuro y que el orden es "casi cosmético"; salía de
+# análisis sueltos. Aquí, sobre TODA la historia del almacén:
+#   1) candidatos de cada sesión = el replay del screener (screener_replay.py, archivo por
+#      fecha en data_store/replay): solo se replayan las sesiones que faltan,
+#   2) por candidato, cada entrada del score (FACTORS: RS, momentum 6m, volumen 10/50,
+#      r1m, retest, riesgo, extensión sobre la MA50, y el propio score) en una tabla
+#      columnar por lista cacheada por fecha (data_store/factors): cada ejecución lee del
+#      archivo solo las sesiones nuevas,
+#   3) retornos futuros a varios HORIZONS con un gather sobre el panel (cierre de la sesión
+#      de la señal → cierre h sesiones después; se rellenan solos a medida que pasan días),
+#   4) IC de rango (Spearman) POR FECHA de cada factor y horizonte con rangos agrupados y
+#      sumas por fecha (np.bincount, sin bucle por fecha) → media, t-stat y % de fechas
+#      con IC > 0; curva de decaimiento por horizonte; cubos (quintiles dentro de cada
+#      fecha) y spread top − bottom.
+# Con un horizonte h evaluado en CADA sesión, las ventanas de retorno de fechas vecinas
+# se solapan (h − 1 sesiones en común) y los IC diarios no son independientes: los t
+# (del IC y del spread) usan el error estándar de Newey-West con h − 1 retardos.
+# Re-ponderar el score es una consulta: composite_ic(pesos) combina los rangos por fecha de
+# los factores con esos pesos y devuelve el IC de la combinación, en milisegundos.
+#
+#   python factor_ic.py                                   # IC por factor y horizonte (rupturas)
+#   python factor_ic.py --list pullbacks --buckets mom6m
+#   python factor_ic.py --weights rs=35,mom6m=10,vol_ratio=15,retested=10,r1m=10
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_store import DataStore
+from feature_graph import MIN_BAR
+from results_archive import ResultsArchive
+from screener_replay import FundamentalsAsOf, replay_screener
+
+
+FACTORS = ('rs', 'mom6m', 'vol_ratio', 'r1m', 'retested', 'risk_pct', 'ext_ma50', 'score')
+COLUMNS = ('symbol', 'rs', 'mom6m', 'vol_ratio', 'r1m', 'retested', 'risk_pct', 'entry', 'ma50', 'score')
+HORIZONS = (1, 5, 10, 21, 42, 63)
+DEFAULTS = dict(
+    min_names=5,         # candidatos mínimos en una fecha para que cuente su IC
+    buckets=5,           # cubos por fecha (quintiles)
+    horizon=21,          # horizonte por defecto de resúmenes, cubos y combinaciones
+)
+
+
+# --- Tabla de candidatos (cacheada por fecha) ---
+def _load_cache(path):
+    if not os.path.exists(path):
+        return None, set()
+    with np.load(path, allow_pickle=False) as z:
+        cols = {k: z[k] for k in z.files if k != 'covered'}
+        covered = set(pd.DatetimeIndex(z['covered']))
+    return pd.DataFrame(cols), covered
+
+
+def _save_cache(path, df, covered):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.tmp.npz'
+    np.savez(tmp, covered=np.array(sorted(covered), dtype='datetime64[D]'),
+             date=df['date'].values.astype('datetime64[D]'), symbol=df['symbol'].values.astype(str),
+             **{f: df[f].values.astype(np.float64) for f in FACTORS})
+    os.replace(tmp, path)
+
+
+def _factor_frame(raw):
+    """Columnas del archivo → [date, symbol, *FACTORS] (float; el retest 0/1, NaN si falta)."""
+    out = pd.DataFrame(dict(date=pd.to_datetime(raw['date']), symbol=raw['symbol'].astype(str)))
+    for f in FACTORS:
+        if f == 'ext_ma50':
+            if {'entry', 'ma50'} <= set(raw.columns):
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    out[f] = (raw['entry'].astype(float) / raw['ma50'].astype(float) - 1) * 100
+            else:
+                out[f] = np.nan
+        else:
+            out[f] = raw[f].astype(float) if f in raw.columns else np.nan
+    return out
+
+
+def update_candidates(store=None, list_name='breakouts', cache_dir=None, replay_dir=None, verbose=True):
+    """Candidatos de `list_name` con sus factores en toda la historia del almacén.
+
+    Replaya (screener_replay.py) las sesiones del panel que falten en el archivo del replay
+    y añade a la caché solo las fechas que aún no tiene. DataFrame [date, symbol, *FACTORS]."""
+    store = DataStore(store) if isinstance(store, str) else (store or DataStore())
+    replay = ResultsArchive(replay_dir or store.path('replay'))
+    path = os.path.join(cache_dir or store.path('factors'), f'{list_name}.npz')
+    panel = store.panel()
+    cal = pd.DatetimeIndex(panel.dates)
+    have = set(replay.dates())
+    todo = [d for d in cal[MIN_BAR:] if d not in have]
+    if todo:
+        if verbose:
+            print(f"Replay de {len(todo)} sesiones sin archivar ({todo[0]:%Y-%m-%d} → {todo[-1]:%Y-%m-%d})...")
+        replay_screener(panel, store.index(), todo[0], todo[-1],
+                        fundamentals=FundamentalsAsOf(ResultsArchive(store.path('results'))),
+                        archive=replay, rs_matrix=store.rs_matrix(panel=panel))
+    table, covered = _load_cache(path)
+    new = [d for d in replay.dates() if d not in covered]
+    if new:
+        raw = replay.query(list_name, start=new[0], end=new[-1], columns=list(COLUMNS))
+        if len(raw):
+            raw = raw[pd.to_datetime(raw['date']).isin(new)]
+        add = _factor_frame(raw) if len(raw) else None
+        if add is not None:
+            table = add if table is None else pd.concat([table, add], ignore_index=True)
+        if table is None:
+            table = pd.DataFrame({'date': pd.DatetimeIndex([]), 'symbol': np.array([], dtype=str),
+                                  **{f: np.array([], dtype=np.float64) for f in FACTORS}})
+        table = table.sort_values(['date', 'symbol'], kind='stable').reset_index(drop=True)
+        covered |= set(new)
+        _save_cache(path, table, covered)
+        if verbose:
+            print(f"Factores de {list_name}: +{len(new)} sesiones → {len(table)} candidatos "
+                  f"en {len(covered)} sesiones")
+    elif table is None:
+        table = _factor_frame(pd.DataFrame(columns=['date', *COLUMNS]))
+    table['date'] = pd.to_datetime(table['date']).astype('datetime64[ns]')
+    return table
+
+
+# --- IC vectorizado ---
+def _ranks(g, x, pct=False):
+    """Rango de x dentro de cada fecha g (empates promediados)."""
+    return pd.Series(x).groupby(g).rank(pct=pct).values
+
+
+def rank_ic(g, x, y, n_groups, min_names=None):
+    """IC de rango (Spearman) de x con y en cada grupo 0..n_groups-1: Pearson de los
+    rangos con sumas por grupo. NaN en los grupos con menos de min_names pares válidos."""
+    min_names = DEFAULTS['min_names'] if min_names is None else min_names
+    ok = ~(np.isnan(x) | np.isnan(y))
+    g = g[ok]
+    rx, ry = _ranks(g, x[ok]), _ranks(g, y[ok])
+    s = lambda w=None: np.bincount(g, w, minlength=n_groups)
+    n = s()
+    sx, sy = s(rx), s(ry)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = s(rx * ry) - sx * sy / n
+        vx = s(rx * rx) - sx * sx / n
+        vy = s(ry * ry) - sy * sy / n
+        ic = cov / np.sqrt(vx * vy)
+    ic[(n < min_names) | ~(vx > 1e-12) | ~(vy > 1e-12)] = np.nan
+    return ic
+
+
+def newey_west_t(v, lags):
+    """t-stat de la media de v con error estándar de Newey-West (pesos de Bartlett,
+    `lags` retardos): corrige la autocorrelación de series con ventanas solapadas."""
+    n = len(v)
+    if n < 2:
+        return np.nan
+    e = v - v.mean()
+    var = e @ e / n
+    for k in range(1, min(int(lags), n - 1) + 1):
+        var += 2 * (1 - k / (lags + 1)) * (e[k:] @ e[:-k]) / n
+    return float(v.mean() / np.sqrt(var / n)) if var > 0 else np.nan
+
+
+def _stats(v, horizon=1):
+    v = v[~np.isnan(v)]
+    if len(v) < 2:
+        return dict(ic=np.nan, t=np.nan, hit_pct=np.nan, n_dates=len(v))
+    t = newey_west_t(v, horizon - 1)
+    return dict(ic=round(float(v.mean()), 4), t=round(t, 2) if np.isfinite(t) else np.nan,
+                hit_pct=round(float((v > 0).mean() * 100), 1), n_dates=len(v))
+
+
+class FactorIC:
+    """IC por fecha, decaimiento y cubos de los factores de una tabla de candidatos
+    (update_candidates) con retornos futuros del panel."""
+
+    def __init__(self, table, panel, horizons=HORIZONS, min_names=None):
+        self.min_names = DEFAULTS['min_names'] if min_names is None else min_names
+        self.horizons = tuple(horizons)
+        cols = np.array([panel.sym_idx.get(s, -1) for s in table['symbol']], dtype=np.int64)
+        rows = np.searchsorted(panel.dates, table['date'].values.astype('datetime64[D]'))
+        ok = (cols >= 0) & (rows < len(panel.dates))
+        ok[ok] &= panel.dates[rows[ok]] == table['date'].values[ok].astype('datetime64[D]')
+        table, rows, cols = table[ok].reset_index(drop=True), rows[ok], cols[ok]
+        self.table = table
+        self.dates, self.g = np.unique(table['date'].values, return_inverse=True)
+        self.X = {f: table[f].values.astype(np.float64) for f in FACTORS}
+        c, T = panel.arrays['c'], len(panel.dates)
+        base = c[rows, cols].astype(np.float64)
+        self.Y = {}
+        for h in self.horizons:
+            fwd = c[np.minimum(rows + h, T - 1), cols].astype(np.float64)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                self.Y[h] = np.where(rows + h < T, (fwd / base - 1) * 100, np.nan)
+
+    def by_date(self, factor, horizon=None):
+        """Serie fecha -> IC de rango del factor con el retorno a `horizon` sesiones."""
+        h = horizon or DEFAULTS['horizon']
+        x = self.X[factor] if isinstance(factor, str) else factor
+        ic = rank_ic(self.g, x, self.Y[h], len(self.dates), self.min_names)
+        return pd.Series(ic, index=pd.DatetimeIndex(self.dates)).dropna()
+
+    def summary(self, horizon=None, factors=FACTORS):
+        """Por factor: IC medio, t-stat (Newey-West, horizonte − 1 retardos), % de fechas
+        con IC > 0, nº de fechas y spread top − bottom de los cubos (retorno medio %, por fecha)."""
+        h = horizon or DEFAULTS['horizon']
+        out = {}
+        for f in factors:
+            row = _stats(self.by_date(f, h).values, h)
+            b = self.buckets(f, h)
+            row['spread'] = b.attrs.get('spread')
+            row['spread_t'] = b.attrs.get('spread_t')
+            out[f] = row
+        return pd.DataFrame(out).T
+
+    def decay(self, factors=FACTORS):
+        """IC medio de cada factor (filas) a cada horizonte (columnas)."""
+        return pd.DataFrame({h: {f: _stats(self.by_date(f, h).values, h)['ic'] for f in factors}
+                             for h in self.horizons})
+
+    def buckets(self, factor, horizon=None, n=None):
+        """Retorno medio (%) por cubo del factor dentro de cada fecha (1 = más bajo),
+        promediado entre fechas; attrs['spread'] / ['spread_t']: cubo alto − bajo (t de
+        Newey-West, como el del IC)."""
+        h = horizon or DEFAULTS['horizon']
+        n = n or DEFAULTS['buckets']
+        x = self.X[factor] if isinstance(factor, str) else factor
+        y = self.Y[h]
+        ok = ~(np.isnan(x) | np.isnan(y))
+        g, y = self.g[ok], y[ok]
+        cnt = np.bincount(g, minlength=len(self.dates))
+        keep = cnt[g] >= max(self.min_names, n)
+        g, y, x = g[keep], y[keep], x[ok][keep]
+        b = np.minimum((np.ceil(_ranks(g, x, pct=True) * n) - 1).astype(np.int64), n - 1)
+        k = g * n + b
+        m = len(self.dates) * n
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = (np.bincount(k, y, m) / np.bincount(k, minlength=m)).reshape(-1, n)
+            seen = (~np.isnan(mean)).sum(axis=0)
+            ret = np.nansum(mean, axis=0) / seen
+        df = pd.DataFrame(dict(ret_pct=ret.round(3), n_dates=seen), index=pd.RangeIndex(1, n + 1, name='cubo'))
+        sp = mean[:, -1] - mean[:, 0]
+        sp = sp[~np.isnan(sp)]
+        t = newey_west_t(sp, h - 1)
+        if np.isfinite(t):
+            df.attrs.update(spread=round(float(sp.mean()), 3), spread_t=round(t, 2))
+        return df
+
+    def composite(self, weights):
+        """Combinación por fecha de los rangos (0-1) de los factores con `weights`
+        (factor -> peso; negativo invierte el sentido). Factor ausente → rango neutro 0.5."""
+        z = np.zeros(len(self.g))
+        for f, w in weights.items():
+            r = _ranks(self.g, self.X[f], pct=True)
+            z += w * np.where(np.isnan(r), 0.5, r)
+        return z
+
+    def composite_ic(self, weights, horizon=None):
+        """IC (media, t, % positivas, fechas) y spread de cubos del score re-ponderado."""
+        h = horizon or DEFAULTS['horizon']
+        z = self.composite(weights)
+        row = _stats(self.by_date(z, h).values, h)
+        b = self.buckets(z, h)
+        row.update(spread=b.attrs.get('spread'), spread_t=b.attrs.get('spread_t'))
+        return row
+
+
+def _weights(text):
+    out = {}
+    for part in text.split(','):
+        k, v = part.split('=')
+        if k.strip() not in FACTORS:
+            raise SystemExit(f"Factor desconocido: {k} (válidos: {', '.join(FACTORS)})")
+        out[k.strip()] = float(v)
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description='IC de rango de los factores del score sobre toda la historia')
+    ap.add_argument('--store', default='data_store')
+    ap.add_argument('--list', default='breakouts', choices=['breakouts', 'pullbacks', 'watch'])
+    ap.add_argument('--horizon', type=int, default=DEFAULTS['horizon'], choices=HORIZONS)
+    ap.add_argument('--buckets', default=None, help='Factor cuyos cubos se muestran')
+    ap.add_argument('--min-names', type=int, default=DEFAULTS['min_names'],
+                    help='Candidatos mínimos por sesión para contar su IC')
+    ap.add_argument('--weights', default=None, help="Score re-ponderado: 'rs=35,mom6m=10,...'")
+    args = ap.parse_args()
+
+    store = DataStore(args.store)
+    table = update_candidates(store, args.list)
+    if table.empty:
+        print("Sin candidatos en el replay.")
+        return
+    fic = FactorIC(table, store.panel(), min_names=args.min_names)
+    pd.set_option('display.width', 160)
+    print(f"\nIC de rango por fecha — {args.list}, retorno a {args.horizon} sesiones "
+          f"({len(fic.table)} candidatos, {len(fic.dates)} sesiones):")
+    print(fic.summary(args.horizon).to_string())
+    print("\nDecaimiento (IC medio por horizonte, sesiones):")
+    print(fic.decay().round(4).to_string())
+    if args.buckets:
+        b = fic.buckets(args.buckets, args.horizon)
+        print(f"\nCubos de {args.buckets} (retorno medio % a {args.horizon} sesiones):")
+        print(b.to_string())
+        print(f"  spread alto − bajo: {b.attrs.get('spread')} (t {b.attrs.get('spread_t')})")
+    if args.weights:
+        print(f"\nScore re-ponderado {args.weights}: {fic.composite_ic(_weights(args.weights), args.horizon)}")
+
+
+if __name__ == "__main__":
+    main()
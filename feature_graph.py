@@ -0,0 +1,207 @@
+# feature_graph.py — Grafo de FEATURES perezoso y cacheado (entradas de detectores y score)
+#
+# Cada detector (ruptura, pullback, watch), el RSI, el ratio de volumen y el momentum 6m
+# del score se calculaban por su cuenta: la trend template (cuatro medias) se repetía en
+# los tres detectores, el máximo 52s en dos, el ATR en todos... y cada detector nuevo
+# añadía otra pasada completa. Aquí cada feature se REGISTRA una vez (@feature) y un
+# FeatureSet la calcula BAJO DEMANDA para las barras `i` de un símbolo, vectorizada
+# (vistas deslizantes, sin copias) y CACHEADA por (nombre, ventana) durante la pasada:
+# el primer detector que pide 'trend' la calcula, los demás la reutilizan, y lo que
+# ningún detector pide no se calcula nunca. Las features piden a su vez otras features
+# (ma50 → cmean(50, 50)), así que el grafo de dependencias es implícito.
+#
+# Las reducciones son EXACTAMENTE las de los evaluadores escalares de momentum_strategy.py
+# (mismas ventanas, mean en float64, max/min y luego float64) → mismos resultados.
+#
+#   fs = FeatureSet(c, h, l, bars, v)          # bars: posiciones (ordenadas) a evaluar
+#   fs('ma50'); fs('base_hi', 20, 5); fs('atr', 14); fs('rsi')
+#   sub = fs.at(bars_subset)                   # vista: mismas features en un subconjunto
+#   FEATURES                                   # registro nombre -> función
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+FEATURES = {}
+MIN_BAR = 252      # los detectores exigen un año de historia: sus ventanas caben siempre
+
+
+def feature(name):
+    """Registra `fn(fs, *args)` como la feature `name` (array alineado con fs.i)."""
+    def deco(fn):
+        FEATURES[name] = fn
+        return fn
+    return deco
+
+
+class FeatureSet:
+    """Features de UN símbolo en las barras `bars` (posiciones en sus arrays)."""
+
+    def __init__(self, c, h, l, bars, v=None):
+        self.c, self.h, self.l, self.v = c, h, l, v
+        self.i = np.asarray(bars, dtype=np.int64)
+        self._cache = {}
+
+    @classmethod
+    def last_bar(cls, df):
+        """FeatureSet de la última barra de un DataFrame OHLCV (screener diario)."""
+        c = df['Close'].values.astype(float)
+        v = df['Volume'].values.astype(float) if 'Volume' in df else None
+        return cls(c, df['High'].values.astype(float), df['Low'].values.astype(float), [len(c) - 1], v)
+
+    def __call__(self, name, *args):
+        key = (name,) + args
+        out = self._cache.get(key)
+        if out is None:
+            out = self._cache[key] = FEATURES[name](self, *args)
+        return out
+
+    def win(self, x, back, w):
+        """Ventanas x[i-back : i-back+w] para cada barra → (k, w), sin copiar."""
+        if len(self.i) == 1:                       # screener diario: una barra, un slice
+            s = int(self.i[0]) - back
+            return x[s:s + w][None, :]
+        return sliding_window_view(x, w)[self.i - back]
+
+    def at(self, bars):
+        """Vista sobre un subconjunto de las barras (debe estar contenido en self.i)."""
+        return _View(self, np.searchsorted(self.i, bars))
+
+    @property
+    def computed(self):
+        return sorted(self._cache)
+
+
+class _View:
+    """Mismas features que el FeatureSet padre, indexadas en un subconjunto de barras
+    (la caché es la del padre: lo que calcula un detector lo reutiliza el siguiente)."""
+
+    def __init__(self, parent, pos):
+        self.parent, self.pos = parent, pos
+        self.i = parent.i[pos]
+        self.c, self.h, self.l, self.v = parent.c, parent.h, parent.l, parent.v
+
+    def __call__(self, name, *args):
+        return self.parent(name, *args)[self.pos]
+
+
+# ── Ventanas base (el resto se define sobre ellas) ──
+@feature('px')
+def _px(fs):
+    return fs.c[fs.i].astype(np.float64)
+
+
+@feature('cmean')
+def _cmean(fs, back, w):
+    return fs.win(fs.c, back, w).mean(axis=1, dtype=np.float64)
+
+
+@feature('hmax')
+def _hmax(fs, back, w):
+    return fs.win(fs.h, back, w).max(axis=1).astype(np.float64)
+
+
+@feature('lmin')
+def _lmin(fs, back, w):
+    return fs.win(fs.l, back, w).min(axis=1).astype(np.float64)
+
+
+# ── Tendencia ──
+@feature('ma50')
+def _ma50(fs):
+    return fs('cmean', 50, 50)
+
+
+@feature('ma200')
+def _ma200(fs):
+    return fs('cmean', 200, 200)
+
+
+@feature('ma50_prev')
+def _ma50_prev(fs):
+    return fs('cmean', 70, 50)       # MA50 de hace 20 sesiones (pendiente)
+
+
+@feature('ma200_prev')
+def _ma200_prev(fs):
+    return fs('cmean', 221, 200)     # MA200 de hace 21 sesiones (pendiente)
+
+
+@feature('trend')
+def _trend(fs):
+    """Trend template compartido: px>MA50>MA200 con ambas medias subiendo."""
+    px, ma50, ma200 = fs('px'), fs('ma50'), fs('ma200')
+    return (px > ma50) & (ma50 > ma200) & (ma200 > fs('ma200_prev')) & (ma50 > fs('ma50_prev'))
+
+
+# ── Máximos / mínimos ──
+@feature('hi52')
+def _hi52(fs, today=True):
+    """Máximo 52 semanas, con o sin la barra de hoy."""
+    return fs('hmax', 252, 253) if today else fs('hmax', 252, 252)
+
+
+@feature('base_hi')
+def _base_hi(fs, window, lead):
+    return fs('hmax', window + lead, window)
+
+
+@feature('base_lo')
+def _base_lo(fs, window, lead):
+    return fs('lmin', window + lead, window)
+
+
+# ── Volatilidad, momentum, volumen ──
+@feature('atr')
+def _atr(fs, n=14):
+    tr = np.maximum(fs.win(fs.h, n - 1, n) - fs.win(fs.l, n - 1, n), 0.0)
+    return np.where(fs.i >= n, tr.mean(axis=1, dtype=np.float64), np.nan)
+
+
+@feature('r1m')
+def _r1m(fs):
+    c21 = fs.c[fs.i - 21]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(c21 > 0, fs.c[fs.i] / np.where(c21 > 0, c21, 1) - 1, 0.0)
+
+
+@feature('mom6m')
+def _mom6m(fs, lookback=126):
+    """Retorno (%) sobre `lookback` sesiones: el momentum del ranking y del score."""
+    base = fs.c[fs.i - lookback].astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(base > 0, (fs.c[fs.i] / np.where(base > 0, base, 1) - 1) * 100, 0.0)
+
+
+@feature('rsi_series')
+def _rsi_all(fs, n=14):
+    return rsi_series(fs.c, n)
+
+
+@feature('rsi')
+def _rsi(fs, n=14):
+    return fs('rsi_series', n)[fs.i]
+
+
+@feature('vol_ratio')
+def _vol_ratio(fs, short=10, long=50):
+    """Volumen medio `short` / `long` sesiones (>1 = sube con interés); 1.0 sin datos."""
+    if fs.v is None:
+        return np.ones(len(fs.i))
+    ok = fs.i >= long - 1
+    i = np.where(ok, fs.i, long - 1)
+    vl = sliding_window_view(fs.v, long)[i - long + 1].mean(axis=1)
+    vs = sliding_window_view(fs.v, short)[i - short + 1].mean(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(ok & (vl > 0), vs / np.where(vl > 0, vl, 1), 1.0)
+
+
+def rsi_series(c, n=14):
+    """RSI de Wilder en cada barra (el del dashboard, para todas las barras a la vez)."""
+    import pandas as pd
+    d = np.diff(np.asarray(c, dtype=np.float64))
+    ru = pd.Series(np.clip(d, 0, None)).ewm(alpha=1 / n, adjust=False).mean().values
+    rd = pd.Series(-np.clip(d, None, 0)).ewm(alpha=1 / n, adjust=False).mean().values
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r = np.where(rd == 0, 100.0, 100 - 100 / (1 + ru / rd))
+    return np.concatenate([[np.nan], r])
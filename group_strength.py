@@ -0,0 +1,213 @@
+# group_strength.py — Fuerza de los GRUPOS (industrias): RS del grupo y amplitud
+#
+# El proceso es comprar líderes en grupos líderes, pero nada agregaba el liderazgo por
+# grupo. Aquí, en la MISMA pasada por bloques de fechas que lee el RS de cada acción
+# (matriz RS, rs_matrix.py), se reduce por grupo con operaciones de arrays:
+#   - RS del grupo: mediana del RS de sus miembros líquidos y media ponderada por
+#     capitalización (la de hoy: no hay capitalización point-in-time),
+#   - amplitud: % de miembros sobre su MA50 y su MA200 y % en máximo de 52 semanas
+#     (entre los miembros con la ventana completa, como las features de feature_graph.py),
+#   - rank: percentil del RS mediano del grupo entre los grupos de esa sesión.
+# Las medias, máximos y recuentos por grupo son productos por la matriz de pertenencia
+# (símbolos × grupos); solo la mediana recorre los grupos (vectorizada en fechas). Sirve
+# para la última sesión (screener) y para toda la historia (backtests: `member` da el
+# valor del grupo de cada símbolo en cada fecha, (R, N)).
+#
+# Los grupos salen de los listados del NASDAQ (MarketData.symbol_industries: industria,
+# sector, capitalización) y se guardan en el almacén (data_store/groups.json). Sin
+# grupo conocido ('Unknown' / vacío) el símbolo no cuenta en ninguno. El nivel es la
+# clave de groups.json que agrupa: en la práctica 'industry', porque el NASDAQ devuelve
+# el sector vacío (ver market_data.py) y todos quedarían sin grupo.
+#
+#   gs = GroupStrength.compute(panel, rows, store.groups(), level='industry', rs_matrix=rsm)
+#   gs.frame(-1)               # DataFrame de los grupos de la última fila, por rank
+#   gs.of('LLY', -1)           # dict(group, group_rs, group_rank, ...) del grupo de LLY
+#
+# Uso:
+#   python group_strength.py --store data_store --top 15
+
+import argparse
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from momentum_vectorized import rank_pct
+
+
+DEFAULTS = dict(
+    level='industry',       # clave de groups.json que define el grupo
+    min_members=3,          # grupos con menos miembros líquidos: sin RS de grupo
+    ma_fast=50,
+    ma_slow=200,
+    high_window=252,
+)
+STATS = ('rs_median', 'rs_cap', 'n', 'pct_ma50', 'pct_ma200', 'pct_high', 'rank')
+
+
+def group_codes(symbols, groups, level='industry'):
+    """(código de grupo por símbolo (-1 = sin grupo), nombres de los grupos, capitalización
+    por símbolo (NaN si no se conoce))."""
+    names, codes, caps = {}, np.full(len(symbols), -1, dtype=np.int64), np.full(len(symbols), np.nan)
+    for j, s in enumerate(symbols):
+        meta = groups.get(s) or {}
+        g = (meta.get(level) or '').strip()
+        if g and g.lower() != 'unknown':
+            codes[j] = names.setdefault(g, len(names))
+        cap = meta.get('market_cap')
+        if cap:
+            caps[j] = float(cap)
+    return codes, list(names), caps
+
+
+def _rolling_mean_rows(x, rows, lo, w):
+    """Media de las `w` sesiones hasta cada fila (filas absolutas; `x` empieza en `lo`):
+    NaN si falta alguna barra de la ventana, como las MAs de feature_graph.py."""
+    ok = np.isfinite(x)
+    cs = np.concatenate([np.zeros((1, x.shape[1])), np.cumsum(np.where(ok, x, 0.0), axis=0)])
+    cn = np.concatenate([np.zeros((1, x.shape[1]), dtype=np.int64), np.cumsum(ok, axis=0)])
+    hi, start = rows - lo + 1, rows - lo + 1 - w
+    out = np.full((len(rows), x.shape[1]), np.nan)
+    good = start >= 0
+    s = np.maximum(start, 0)
+    full = (cn[hi] - cn[s]) == w
+    out[good] = np.where(full[good], (cs[hi] - cs[s])[good] / w, np.nan)
+    return out
+
+
+class GroupStrength:
+    """Estadísticas por grupo (R fechas × G grupos) en las filas `rows` del panel."""
+
+    def __init__(self, dates, symbols, names, codes, stats, level):
+        self.dates = dates
+        self.symbols = list(symbols)
+        self.sym_idx = {s: j for j, s in enumerate(self.symbols)}
+        self.names = names
+        self.codes = codes            # grupo de cada símbolo del panel (-1 = ninguno)
+        self.stats = stats            # nombre -> (R, G)
+        self.level = level
+
+    @classmethod
+    def compute(cls, panel, rows, groups, params=None, rs_matrix=None, liq_params=None, block=64):
+        """`groups`: símbolo -> dict(industry, sector, market_cap). El RS y la liquidez de
+        cada acción salen de `rs_matrix` (alineada con el panel) o se calculan en el
+        mismo bloque con rs_matrix.liquidity_and_rs."""
+        p = {**DEFAULTS, **(params or {})}
+        rows = np.asarray(rows, dtype=np.int64) % len(panel.dates)
+        codes, names, caps = group_codes(panel.symbols, groups, p['level'])
+        G, R = len(names), len(rows)
+        onehot = np.zeros((len(panel.symbols), G))
+        has = codes >= 0
+        onehot[np.flatnonzero(has), codes[has]] = 1.0
+        weight = onehot * np.nan_to_num(caps)[:, None]
+        stats = {k: np.full((R, G), np.nan) for k in STATS}
+        use_matrix = rs_matrix is not None and rs_matrix.aligned(panel, liq_params)
+        C = panel.arrays['c']
+        H = panel.arrays.get('h', C)
+        back = max(p['ma_slow'], p['high_window'])
+        for a in range(0, R, block):
+            rb = rows[a:a + block]
+            sl = slice(a, a + len(rb))
+            if use_matrix:
+                liquid, rs = rs_matrix.block(rb)
+            else:
+                from rs_matrix import liquidity_and_rs
+                liquid, rs = liquidity_and_rs(panel, rb, liq_params)
+            lo = max(0, int(rb.min()) - back + 1)
+            x = C[lo:rb.max() + 1].astype(np.float64)
+            px = x[rb - lo]
+            traded = np.isfinite(px)
+            with np.errstate(invalid='ignore'):
+                for key, w in (('pct_ma50', p['ma_fast']), ('pct_ma200', p['ma_slow'])):
+                    ma = _rolling_mean_rows(x, rb, lo, w)
+                    defined = (traded & np.isfinite(ma)).astype(np.float64)
+                    stats[key][sl] = _share((px > ma) & (defined > 0), defined, onehot)
+                hw = p['high_window']
+                hx = H[lo:rb.max() + 1].astype(np.float64)
+                ok = rb - lo >= hw - 1
+                high = np.zeros(px.shape, dtype=bool)
+                defined = np.zeros(px.shape)
+                if ok.any():
+                    fin = np.concatenate([np.zeros((1, hx.shape[1]), dtype=np.int64),
+                                          np.cumsum(np.isfinite(hx), axis=0)])
+                    end = rb[ok] - lo + 1
+                    full = (fin[end] - fin[end - hw]) == hw       # ventana completa, sin huecos
+                    win = sliding_window_view(hx, hw, axis=0)[end - hw]
+                    high[ok] = full & (hx[end - 1] >= np.fmax.reduce(win, axis=-1))
+                    defined[ok] = (traded[ok] & full).astype(np.float64)
+                stats['pct_high'][sl] = _share(high & (defined > 0), defined, onehot)
+
+            has_rs = np.isfinite(rs) & liquid
+            n = has_rs.astype(np.float64) @ onehot
+            stats['n'][sl] = n
+            wsum = has_rs.astype(np.float64) @ weight
+            with np.errstate(invalid='ignore', divide='ignore'):
+                cap_rs = np.where(has_rs, rs, 0.0) @ weight / wsum
+            stats['rs_cap'][sl] = np.where((n >= p['min_members']) & (wsum > 0), cap_rs, np.nan)
+            med = stats['rs_median'][sl]
+            for g in range(G):
+                m = onehot[:, g] > 0
+                vals = np.where(has_rs[:, m], rs[:, m], np.nan)
+                enough = n[:, g] >= p['min_members']
+                if enough.any():
+                    med[enough, g] = np.nanmedian(vals[enough], axis=1)
+            stats['rank'][sl] = rank_pct(med, np.isfinite(med))
+        return cls(panel.dates[rows], panel.symbols, names, codes, stats, p['level'])
+
+    # --- Lectura ---
+    def member(self, stat='rs_median'):
+        """Valor del grupo de cada símbolo en cada fecha: (R, N), NaN sin grupo."""
+        vals = self.stats[stat]
+        out = np.full((vals.shape[0], len(self.codes)), np.nan)
+        has = self.codes >= 0
+        out[:, has] = vals[:, self.codes[has]]
+        return out
+
+    def frame(self, k=-1):
+        """DataFrame de los grupos en la fila `k` (índice = grupo), del más fuerte al más
+        débil; los grupos sin RS (pocos miembros líquidos) al final."""
+        import pandas as pd
+        df = pd.DataFrame({s: self.stats[s][k] for s in STATS}, index=pd.Index(self.names, name=self.level))
+        df['n'] = df['n'].astype(int)
+        return df.sort_values(['rank', 'n'], ascending=False, na_position='last')
+
+    def of(self, sym, k=-1):
+        """Grupo de `sym` en la fila `k`: dict con su nombre, RS, rank y amplitud (None si
+        no tiene grupo)."""
+        j = self.sym_idx.get(sym)
+        g = -1 if j is None else self.codes[j]
+        if g < 0:
+            return None
+        v = {s: self.stats[s][k, g] for s in STATS}
+        fin = lambda x, nd=1: None if not np.isfinite(x) else round(float(x), nd)
+        return dict(group=self.names[g], group_rs=fin(v['rs_median']), group_rank=fin(v['rank']),
+                    group_rs_cap=fin(v['rs_cap']), group_n=int(v['n']),
+                    group_pct_ma50=fin(v['pct_ma50'] * 100), group_pct_ma200=fin(v['pct_ma200'] * 100),
+                    group_pct_high=fin(v['pct_high'] * 100))
+
+
+def _share(hit, defined, onehot):
+    """Fracción por grupo: Σ hit / Σ defined sobre los miembros ((R, N) @ (N, G))."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (hit.astype(np.float64) @ onehot) / (defined @ onehot)
+
+
+def main():
+    from data_store import DataStore
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--store', default='data_store')
+    ap.add_argument('--top', type=int, default=20)
+    args = ap.parse_args()
+    store = DataStore(args.store)
+    groups = store.groups()
+    if not groups:
+        print(f"Sin grupos en {store.path('groups.json')}: se guardan al correr el screener")
+        return
+    panel = store.panel()
+    gs = GroupStrength.compute(panel, [len(panel.dates) - 1], groups, dict(level=DEFAULTS['level']),
+                               rs_matrix=store.rs_matrix(panel=panel))
+    print(f"Grupos ({DEFAULTS['level']}) en {str(gs.dates[-1])[:10]}:")
+    print(gs.frame(-1).head(args.top).round(2).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+# intraday_preview.py — Vista PREVIA intradía: la barra diaria aún en formación, evaluada
+#
+# El screener corre a las 06:00 UTC sobre barras cerradas: una ruptura se ve a la mañana
+# siguiente. Aquí, con el servicio (screener_service.py) ya cargado con la sesión de
+# AYER, se reciben cotizaciones intradía de un feed enchufable y cada pocos minutos se
+# evalúa la barra de HOY como barra PROVISIONAL (o = primera cotización, h/l = extremos,
+# c = última, v = volumen acumulado):
+#   - estado de ayer, preparado una vez: para cada líquida con un año de historia, sus
+#     últimas 252 barras en un buffer plano (símbolos × 253 huecos; el último es la
+#     barra provisional), el estado de Wilder del RSI, la base del momentum 6m y la
+#     liquidez de ayer,
+#   - en cada refresco solo se reescribe el hueco de hoy de los símbolos con cotización
+#     nueva y solo ellos se reevalúan, en UNA llamada a los evaluadores vectorizados
+#     (momentum_vectorized.py) sobre el buffer plano: las ventanas (MA50/MA200, 52s,
+#     base, ATR) nunca cruzan de un símbolo a otro porque cada tramo mide 253,
+#   - el RS provisional re-rankea el retorno 6m con el precio actual (sin cotización: el
+#     cierre de ayer) entre las líquidas de ayer; los detectores se evalúan sin el
+#     umbral de RS y el umbral se aplica al montar las listas, así un cambio de RS no
+#     obliga a reevaluar.
+# La liquidez y la salud del mercado son las de la sesión cerrada (el volumen de hoy va
+# a medias): es una VISTA PREVIA, la lista oficial sigue siendo la del screener diario.
+#
+# Feed: cualquier objeto con poll() → lista de cotizaciones (dict symbol, price y
+# opcionales volume acumulado, open/high/low, date). Incluidos:
+#   FileQuoteFeed('quotes.jsonl')           líneas JSON que otro proceso va añadiendo
+#   SocketQuoteFeed('127.0.0.1', 9100)      líneas JSON por TCP
+#   {"symbol": "LLY", "price": 1012.4, "volume": 1830000}
+#
+#   pv = IntradayPreview(ScreenerService(store))
+#   pv.ingest(feed.poll()); pv.refresh()    # dict breakouts / pullbacks / watch + meta
+#
+# Uso:
+#   python intraday_preview.py --feed quotes.jsonl --every 300
+#   python intraday_preview.py --feed socket:127.0.0.1:9100 --out preview.json
+
+import argparse
+import json
+import os
+import socket
+import time
+
+import numpy as np
+import pandas as pd
+
+from feature_graph import MIN_BAR, FeatureSet
+from momentum_strategy import DEFAULTS as STRATEGY_DEFAULTS
+from momentum_vectorized import rank_pct
+from results_archive import LISTS
+from screener_replay import _finish_session
+from screener_service import EVALUATORS_MANY, RS_KEY, ScreenerService, parse_overrides
+
+
+SLOTS = MIN_BAR + 1         # 252 barras de ayer + la provisional de hoy por símbolo
+DEFAULTS = dict(
+    every=300,              # segundos entre refrescos
+    rsi_period=14,
+)
+
+
+# ── Feeds de cotizaciones ──
+class FileQuoteFeed:
+    """Cotizaciones como líneas JSON que otro proceso añade a un fichero (o un volcado
+    de prueba). Cada poll() devuelve solo las líneas COMPLETAS nuevas."""
+
+    def __init__(self, path):
+        self.path = path
+        self.pos = 0
+
+    def poll(self):
+        if not os.path.exists(self.path):
+            return []
+        out = []
+        with open(self.path, 'rb') as f:
+            f.seek(self.pos)
+            for line in f:
+                if not line.endswith(b'\n'):     # a medio escribir: en el próximo poll
+                    break
+                self.pos += len(line)
+                out.extend(_quotes(line))
+        return out
+
+
+class SocketQuoteFeed:
+    """Cotizaciones como líneas JSON por TCP (un puente local con el broker o el
+    proveedor de datos); poll() no bloquea."""
+
+    def __init__(self, host, port):
+        self.sock = socket.create_connection((host, int(port)))
+        self.sock.setblocking(False)
+        self.buf = b''
+
+    def poll(self):
+        while True:
+            try:
+                chunk = self.sock.recv(1 << 16)
+            except BlockingIOError:
+                break
+            if not chunk:
+                break
+            self.buf += chunk
+        *lines, self.buf = self.buf.split(b'\n')
+        return [q for line in lines for q in _quotes(line)]
+
+
+def _quotes(line):
+    line = line.strip()
+    if not line:
+        return []
+    q = json.loads(line)
+    return q if isinstance(q, list) else [q]
+
+
+def open_feed(spec):
+    """'socket:host:port' → SocketQuoteFeed; cualquier otra cosa, ruta de FileQuoteFeed."""
+    if spec.startswith('socket:'):
+        _, host, port = spec.split(':')
+        return SocketQuoteFeed(host, port)
+    return FileQuoteFeed(spec[5:] if spec.startswith('file:') else spec)
+
+
+# ── Vista previa ──
+class IntradayPreview:
+    """Barra provisional de hoy sobre el estado de la sesión cerrada del servicio."""
+
+    def __init__(self, svc, overrides=None, rsi_period=DEFAULTS['rsi_period']):
+        t0 = time.perf_counter()
+        self.svc = svc
+        self.p = p = {**STRATEGY_DEFAULTS, **(overrides or {})}
+        pn = svc.panel
+        last = len(pn.dates) - 1
+        self.last_date = svc.last_date
+        liq, _ = svc.liquidity_rs(p)
+
+        # RS: las líquidas de ayer con barra ayer; base del retorno 6m desde la fila de hoy.
+        self.rs_idx = np.flatnonzero(liq & (pn.last == last))
+        self.symbols = [pn.symbols[j] for j in self.rs_idx]
+        self.pos = {s: k for k, s in enumerate(self.symbols)}
+        row = last + 1 - p['mom_lookback']
+        C = pn.arrays['c']
+        self.prev_close = C[last, self.rs_idx].astype(np.float64)
+        self.base = (C[row, self.rs_idx].astype(np.float64) if row >= 0
+                     else np.full(len(self.rs_idx), np.nan))
+        with np.errstate(invalid='ignore'):
+            self.has_base = (pn.first[self.rs_idx] <= row) & (self.base > 0)
+        self.price = self.prev_close.copy()
+
+        # Detectores: buffer plano (S, SLOTS) con las últimas 252 barras de cada símbolo.
+        self.eval_pos = np.flatnonzero(pn.count[self.rs_idx] >= MIN_BAR)
+        S = len(self.eval_pos)
+        self.slot = np.full(len(self.symbols), -1, dtype=np.int64)
+        self.slot[self.eval_pos] = np.arange(S)
+        has_v = 'v' in pn.arrays
+        self.buf = {k: np.full((S, SLOTS), np.nan) for k in ('c', 'h', 'l', 'v') if k != 'v' or has_v}
+        self.rsi_state = np.full((S, 2), np.nan)
+        self.rsi_period = rsi_period
+        for s, k in enumerate(self.eval_pos):
+            ser = pn.series(self.symbols[k])
+            for key, b in self.buf.items():
+                b[s, :-1] = ser[key][-MIN_BAR:]
+            self.rsi_state[s] = _wilder_state(ser['c'], rsi_period)
+        self.flat = {k: b.ravel() for k, b in self.buf.items()}
+        self.dtype = {k: pn.arrays[k].dtype for k in self.buf}     # la barra de hoy, como la guardará el almacén
+        self.bars = {}                  # símbolo -> [o, h, l, c, v] de hoy
+        self.dirty = set()
+        self.hits = {k: {} for k in LISTS}
+        self.stats = dict(tracked=len(self.symbols), evaluable=S,
+                          setup_s=round(time.perf_counter() - t0, 2))
+
+    # --- Cotizaciones → barra provisional ---
+    def ingest(self, quotes):
+        """Aplica cotizaciones (dict symbol, price, volume acumulado y opcionales
+        open/high/low/date) a la barra de hoy. Devuelve cuántas se usaron."""
+        used = 0
+        for q in quotes:
+            k = self.pos.get(q.get('symbol'))
+            px = q.get('price', q.get('close'))
+            if k is None or px is None or not px > 0:
+                continue
+            if 'date' in q and pd.Timestamp(q['date']) <= self.last_date:
+                continue                                # cotización de la sesión cerrada
+            px = float(px)
+            b = self.bars.get(q['symbol'])
+            hi, lo = float(q.get('high', px)), float(q.get('low', px))
+            vol = float(q.get('volume') or 0)
+            if b is None:
+                b = self.bars[q['symbol']] = [float(q.get('open', px)), hi, lo, px, vol]
+            else:
+                b[1], b[2], b[3], b[4] = max(b[1], hi), min(b[2], lo), px, max(b[4], vol)
+            self.price[k] = self.dtype['c'].type(px)
+            s = self.slot[k]
+            if s >= 0:
+                for key, val in zip('hlcv', b[1:]):
+                    if key in self.buf:
+                        self.buf[key][s, -1] = self.dtype[key].type(val)
+                self.dirty.add(k)
+            used += 1
+        return used
+
+    def rs(self):
+        """RS provisional (0-100, redondeado a 0.1) de cada símbolo seguido."""
+        p = self.p
+        with np.errstate(invalid='ignore', divide='ignore'):
+            valid = self.has_base & (self.price >= p['min_price'])
+            mom = self.price / np.where(valid, self.base, 1.0) - 1
+        return np.round(rank_pct(mom[None, :], valid[None, :])[0], 1)
+
+    # --- Refresco ---
+    def refresh(self):
+        """Reevalúa la barra provisional de los símbolos con cotización nueva y devuelve
+        las tres listas (mismo post-proceso que el screener) + meta del refresco."""
+        t0 = time.perf_counter()
+        dirty = np.array(sorted(self.dirty), dtype=np.int64)
+        self.dirty.clear()
+        if len(dirty):
+            self._evaluate(dirty)
+        rs = self.rs()
+        found = {k: [] for k in LISTS}
+        if self.svc.healthy:
+            for kind in LISTS:
+                floor = self.p[RS_KEY[kind]]
+                for sym, row in self.hits[kind].items():
+                    r = rs[self.pos[sym]]
+                    if r >= floor:
+                        found[kind].append(dict(row, rs=float(r)))
+        date = self.last_date + pd.offsets.BDay(1)
+        out = _finish_session(date, found['breakouts'], found['pullbacks'], found['watch'],
+                              self.svc.fundamentals)
+        out['meta'] = dict(provisional=True, date=str(date.date()), after=str(self.last_date.date()),
+                           time=time.strftime('%H:%M:%S'), quoted=len(self.bars),
+                           evaluated=int(len(dirty)), healthy=bool(self.svc.healthy),
+                           ms=round((time.perf_counter() - t0) * 1000, 1))
+        return out
+
+    def _evaluate(self, dirty):
+        p = self.p
+        slots = self.slot[dirty]
+        keep = slots >= 0
+        dirty, slots = dirty[keep], slots[keep]
+        for kind in LISTS:
+            for k in dirty:
+                self.hits[kind].pop(self.symbols[k], None)
+        if not len(slots):
+            return
+        idx = slots * SLOTS + SLOTS - 1
+        f = self.flat
+        fs = FeatureSet(f['c'], f['h'], f['l'], idx, f.get('v'))
+        rsi = self._rsi(slots)
+        no_floor = np.full(len(idx), np.inf)          # umbral de RS: al montar las listas
+        for kind, ev in EVALUATORS_MANY.items():
+            for j, sig in ev(f['c'], f['h'], f['l'], idx, no_floor, p, fs):
+                sym = self.symbols[dirty[j]]
+                row = dict(symbol=sym, mom6m=round(float(fs('mom6m', p['mom_lookback'])[j]), 1))
+                if kind == 'breakouts':
+                    row.update(vol_ratio=round(float(fs('vol_ratio')[j]), 2), rsi=round(float(rsi[j]), 0))
+                row.update(sig)
+                self.hits[kind][sym] = row
+
+    def _rsi(self, slots):
+        """RSI de hoy: un paso de Wilder desde el estado de ayer (sin recorrer la historia)."""
+        n = self.rsi_period
+        d = self.buf['c'][slots, -1] - self.buf['c'][slots, -2]
+        ru = self.rsi_state[slots, 0] + (np.clip(d, 0, None) - self.rsi_state[slots, 0]) / n
+        rd = self.rsi_state[slots, 1] + (-np.clip(d, None, 0) - self.rsi_state[slots, 1]) / n
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(rd == 0, 100.0, 100 - 100 / (1 + ru / rd))
+
+    def run(self, feed, every=DEFAULTS['every'], on_refresh=None, poll=1.0):
+        """Bucle: lee el feed cada `poll` s y refresca cada `every` s (Ctrl+C para salir)."""
+        next_at = 0.0
+        try:
+            while True:
+                self.ingest(feed.poll())
+                if time.monotonic() >= next_at and (self.dirty or next_at == 0.0):
+                    res = self.refresh()
+                    (on_refresh or _print_refresh)(res)
+                    next_at = time.monotonic() + every
+                time.sleep(poll)
+        except KeyboardInterrupt:
+            pass
+
+
+def _wilder_state(c, n):
+    """(media de subidas, media de bajadas) de Wilder en la última barra: el estado del
+    RSI del dashboard (feature_graph.rsi_series)."""
+    d = np.diff(np.asarray(c, dtype=np.float64))
+    if len(d) == 0:
+        return np.nan, np.nan
+    ru = pd.Series(np.clip(d, 0, None)).ewm(alpha=1 / n, adjust=False).mean().values[-1]
+    rd = pd.Series(-np.clip(d, None, 0)).ewm(alpha=1 / n, adjust=False).mean().values[-1]
+    return ru, rd
+
+
+def _print_refresh(res):
+    m = res['meta']
+    print(f"[{m['time']}] {m['date']} provisional: {m['quoted']} cotizadas, {m['evaluated']} "
+          f"reevaluadas en {m['ms']} ms → {len(res['breakouts'])} rupturas, "
+          f"{len(res['pullbacks'])} pullbacks, {len(res['watch'])} a vigilar")
+    for r in res['breakouts'][:6]:
+        print(f"    {r['symbol']:<6} RS={r['rs']:.0f}  score={r['score']}  px={r['entry']:.2f}  "
+              f"ruptura={r['breakout_level']}  stop={r['sl']}")
+
+
+def main():
+    from data_store import DataStore
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--feed', required=True, help="fichero de líneas JSON o socket:host:puerto")
+    ap.add_argument('--store', default='data_store')
+    ap.add_argument('--every', type=float, default=DEFAULTS['every'], help='segundos entre refrescos')
+    ap.add_argument('--out', default=None, help='JSON con el último refresco')
+    ap.add_argument('--set', action='append', default=[], help='override clave=valor de los DEFAULTS de la estrategia')
+    args = ap.parse_args()
+
+    pv = IntradayPreview(ScreenerService(DataStore(args.store)),
+                         parse_overrides(dict(kv.split('=', 1) for kv in args.set)))
+    print(f"Vista previa: {pv.stats['tracked']} líquidas, {pv.stats['evaluable']} evaluables "
+          f"(estado de {pv.last_date.date()} preparado en {pv.stats['setup_s']}s)")
+
+    def on_refresh(res):
+        _print_refresh(res)
+        if args.out:
+            tmp = f'{args.out}.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(res, f, ensure_ascii=False, default=str)
+            os.replace(tmp, args.out)
+
+    pv.run(open_feed(args.feed), every=args.every, on_refresh=on_refresh)
+
+
+if __name__ == "__main__":
+    main()
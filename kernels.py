@@ -0,0 +1,352 @@
+# kernels.py — Núcleos numéricos con backend OPCIONAL compilado (Numba) y respaldo NumPy
+#
+# Lo que es secuencial y no se deja vectorizar bien se escribe aquí como bucle simple:
+#   - la cascada de filtros de evaluate_breakout / evaluate_entry / evaluate_watch (una
+#     llamada por líder y fecha en el walk-forward: ~40 µs en NumPy por las reducciones
+#     pequeñas, unos pocos µs compilada),
+#   - la mediana móvil del dólar-volumen (liquidez point-in-time, rs_matrix.py).
+# Con Numba instalado se compilan (njit, caché en disco) y se usan esos; sin Numba se
+# usa la versión NumPy (el evaluador de siempre / vistas deslizantes por lotes). Los
+# dos backends dan EXACTAMENTE los mismos números: las medias reproducen la suma por
+# pares de NumPy y los NaN se propagan igual. `python benchmarks.py kernels` lo comprueba.
+#
+# Selección: variable de entorno TRADING_KERNELS = auto (defecto) | numba | numpy, o
+# kernels.use('numpy') en tiempo de ejecución (p.ej. para comparar backends). Numba se
+# importa y compila al PRIMER uso de un núcleo, no al importar (arranque del núcleo).
+
+import importlib.util
+import os
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+# ── Reducciones con el MISMO orden de operaciones que NumPy ──
+# np.mean suma por pares (8 acumuladores, mitades de hasta 128 elementos); replicarlo
+# hace que las medias compiladas coincidan bit a bit con c[a:b].mean(dtype=float64).
+def _block(x, lo, n):
+    if n < 8:
+        res = 0.0
+        for k in range(lo, lo + n):
+            res += x[k]
+        return res
+    r0, r1, r2, r3 = x[lo], x[lo + 1], x[lo + 2], x[lo + 3]
+    r4, r5, r6, r7 = x[lo + 4], x[lo + 5], x[lo + 6], x[lo + 7]
+    m = n - n % 8
+    for k in range(lo + 8, lo + m, 8):
+        r0 += x[k]
+        r1 += x[k + 1]
+        r2 += x[k + 2]
+        r3 += x[k + 3]
+        r4 += x[k + 4]
+        r5 += x[k + 5]
+        r6 += x[k + 6]
+        r7 += x[k + 7]
+    res = ((r0 + r1) + (r2 + r3)) + ((r4 + r5) + (r6 + r7))
+    for k in range(lo + m, lo + n):
+        res += x[k]
+    return res
+
+
+def _pairwise(x, lo, n):
+    """Suma de x[lo:lo+n] como NumPy: bloques de ≤128 y mitades (n//2 múltiplo de 8).
+    Recorre el árbol con una pila explícita (Numba no cachea bien la recursión)."""
+    if n <= 128:
+        return _block(x, lo, n)
+    los = np.empty(64, np.int64)
+    ns = np.empty(64, np.int64)
+    stage = np.zeros(64, np.int64)
+    vals = np.empty(64)
+    los[0], ns[0], top, nv = lo, n, 1, 0
+    while top:
+        t = top - 1
+        if ns[t] <= 128:
+            vals[nv] = _block(x, los[t], ns[t])
+            nv += 1
+            top -= 1
+            continue
+        half = ns[t] // 2
+        half -= half % 8
+        if stage[t] == 0:                    # mitad izquierda
+            stage[t] = 1
+            los[top], ns[top], stage[top] = los[t], half, 0
+            top += 1
+        elif stage[t] == 1:                  # mitad derecha
+            stage[t] = 2
+            los[top], ns[top], stage[top] = los[t] + half, ns[t] - half, 0
+            top += 1
+        else:                                # izquierda + derecha
+            vals[nv - 2] = vals[nv - 2] + vals[nv - 1]
+            nv -= 1
+            top -= 1
+    return vals[0]
+
+
+def _mean(x, lo, hi):
+    return _pairwise(x, lo, hi - lo) / (hi - lo)
+
+
+def _max(x, lo, hi):
+    """x[lo:hi].max() (NaN si hay algún NaN, como NumPy)."""
+    m = x[lo]
+    for k in range(lo, hi):
+        if np.isnan(x[k]):
+            return np.nan
+        if x[k] > m:
+            m = x[k]
+    return m
+
+
+def _min(x, lo, hi):
+    m = x[lo]
+    for k in range(lo, hi):
+        if np.isnan(x[k]):
+            return np.nan
+        if x[k] < m:
+            m = x[k]
+    return m
+
+
+def _atr(h, l, i, n):
+    if i < n:
+        return np.nan
+    tr = np.empty(n)
+    for k in range(n):
+        d = h[i - n + 1 + k] - l[i - n + 1 + k]
+        tr[k] = d if (d > 0.0 or np.isnan(d)) else 0.0      # np.maximum(d, 0) propaga NaN
+    return _pairwise(tr, 0, n) / n
+
+
+def _trend(c, i):
+    px = c[i]
+    ma50 = _mean(c, i - 50, i)
+    ma200 = _mean(c, i - 200, i)
+    ok = (px > ma50 and ma50 > ma200 and ma200 > _mean(c, i - 221, i - 21)
+          and ma50 > _mean(c, i - 70, i - 20))
+    return ok, px, ma50, ma200
+
+
+# ── Cascadas de filtros de los evaluadores escalares (momentum_strategy.py) ──
+# Solo la parte numérica (RS e i ≥ 252 ya comprobados): devuelven (pasa, valores...) y
+# el evaluador arma el mismo dict que en su versión NumPy.
+def _breakout_gates(c, h, l, i, max_ext, bw, lead, max_range, near_high, atr_n, hw, hold_atr,
+                    hybrid, stop_atr, max_risk, min_r1m):
+    nan = np.nan
+    fail = (False, nan, nan, nan, nan, nan, nan, nan, nan)
+    ok, px, ma50, ma200 = _trend(c, i)
+    if not ok:
+        return fail
+    if not np.isnan(max_ext) and px > ma50 * (1 + max_ext):
+        return fail
+    if i - bw - lead < 0:
+        return fail
+    base_hi = _max(h, i - bw - lead, i - lead)
+    base_lo = _min(l, i - bw - lead, i - lead)
+    if base_lo <= 0:
+        return fail
+    if (base_hi - base_lo) / base_lo > max_range:
+        return fail
+    hi52 = _max(h, i - 252, i + 1)
+    if base_hi < hi52 * (1 - near_high):
+        return fail
+    if c[i - lead] > base_hi:
+        return fail
+    if not px > base_hi:
+        return fail
+    at = _atr(h, l, i, atr_n)
+    if not np.isfinite(at) or at <= 0:
+        return fail
+    recent_low = _min(l, i - hw, i + 1)
+    if recent_low < base_hi - hold_atr * at:
+        return fail
+    # min(recent_low, base_hi) de Python: el primero salvo que el segundo sea menor
+    anchor = (base_hi if base_hi < recent_low else recent_low) if hybrid else base_hi
+    sl = anchor - stop_atr * at
+    risk = (px - sl) / px
+    if risk <= 0 or risk > max_risk:
+        return fail
+    r1m = (c[i] / c[i - 21] - 1) if i >= 21 and c[i - 21] > 0 else 0.0
+    if r1m <= min_r1m:
+        return fail
+    return (True, ma50, ma200, base_hi, hi52, recent_low, sl, risk, r1m)
+
+
+def _entry_gates(c, h, l, i, near_high_below, sw, floor, touch, not_ext, atr_n, max_risk):
+    nan = np.nan
+    fail = (False, nan, nan, nan, nan, nan, nan)
+    ok, px, ma50, ma200 = _trend(c, i)
+    if not ok:
+        return fail
+    hi52 = _max(h, i - 252, i)
+    if px > hi52 or px < hi52 * (1 - near_high_below):
+        return fail
+    low_sw = _min(l, i - sw, i)
+    touched = ma50 * (1 - floor) <= low_sw and low_sw <= ma50 * (1 + touch)
+    bounce = px > ma50 and c[i] > c[i - 1] and px <= ma50 * (1 + not_ext)
+    if not (touched and bounce):
+        return fail
+    at = _atr(h, l, i, atr_n)
+    if not np.isfinite(at) or at <= 0:
+        return fail
+    sl = low_sw - 0.5 * at
+    risk = (px - sl) / px
+    if risk <= 0 or risk > max_risk:
+        return fail
+    return (True, ma50, ma200, hi52, sl, risk, at)
+
+
+def _watch_gates(c, h, l, i, ww, near_high, pullback_min, ma50_buffer, max_ext, atr_n):
+    nan = np.nan
+    fail = (False, nan, nan, nan, nan, nan)
+    ok, px, ma50, ma200 = _trend(c, i)
+    if not ok:
+        return fail
+    hi52 = _max(h, i - 252, i + 1)
+    hi_recent = _max(h, i - ww, i + 1)
+    if hi_recent < hi52 * (1 - near_high):
+        return fail
+    if not (px <= hi_recent * (1 - pullback_min) and px > ma50 * (1 + ma50_buffer)
+            and px <= ma50 * (1 + max_ext)):
+        return fail
+    return (True, ma50, ma200, hi52, hi_recent, _atr(h, l, i, atr_n))
+
+
+# ── Mediana móvil en filas sueltas ──
+def _rolling_median_rows(x, rows, w):
+    """Ventana ORDENADA deslizante: al avanzar de una fila a la siguiente (filas
+    crecientes) sale y entra un valor por sesión (búsqueda binaria + desplazamiento) en
+    vez de reordenar la ventana entera. Los NaN no entran en el buffer: se cuentan."""
+    out = np.empty(len(rows))
+    buf = np.empty(w)
+    m = 0                 # valores válidos en buf (ordenados)
+    cur = -1              # fila a la que corresponde el contenido de buf
+    for k in range(len(rows)):
+        r = rows[k]
+        if r < w - 1:
+            out[k] = np.nan
+            continue
+        if cur < 0 or r < cur or r - cur >= w:          # reconstruir
+            m = 0
+            for q in range(r - w + 1, r + 1):
+                if not np.isnan(x[q]):
+                    buf[m] = x[q]
+                    m += 1
+            buf[:m] = np.sort(buf[:m])
+        else:
+            for q in range(cur + 1, r + 1):
+                old = x[q - w]                          # sale
+                if not np.isnan(old):
+                    pos = np.searchsorted(buf[:m], old)
+                    buf[pos:m - 1] = buf[pos + 1:m].copy()
+                    m -= 1
+                new = x[q]                              # entra
+                if not np.isnan(new):
+                    pos = np.searchsorted(buf[:m], new)
+                    buf[pos + 1:m + 1] = buf[pos:m].copy()
+                    buf[pos] = new
+                    m += 1
+        cur = r
+        if m == 0:
+            out[k] = np.nan
+        elif m % 2:
+            out[k] = buf[m // 2]
+        else:
+            out[k] = (buf[m // 2 - 1] + buf[m // 2]) / 2
+    return out
+
+
+def _rolling_median_rows_np(x, rows, w):
+    out = np.full(len(rows), np.nan)
+    ok = rows >= w - 1
+    if ok.any():
+        out[ok] = nan_median(sliding_window_view(x, w)[rows[ok] - w + 1])
+    return out
+
+
+def nan_median(win):
+    """np.nanmedian(win, axis=-1) sin su bucle por fila: np.median donde la ventana está
+    completa y nanmedian solo en las que tienen huecos (las vacías quedan en NaN)."""
+    med = np.median(win, axis=-1)
+    n = (~np.isnan(win)).sum(axis=-1)
+    holes = (n > 0) & (n < win.shape[-1])
+    if holes.any():
+        med[holes] = np.nanmedian(win[holes], axis=-1)
+    return med
+
+
+# Se compilan en este orden (las auxiliares antes que quien las llama).
+_JIT = ('_block', '_pairwise', '_mean', '_max', '_min', '_atr', '_trend', '_breakout_gates',
+        '_entry_gates', '_watch_gates', '_rolling_median_rows')
+HAS_NUMBA = importlib.util.find_spec('numba') is not None
+BACKEND = None
+_compiled = False
+
+
+def available():
+    return ['numba', 'numpy'] if HAS_NUMBA else ['numpy']
+
+
+def use(backend='auto'):
+    """Fija el backend ('auto' = numba si está instalado). Devuelve el elegido."""
+    global BACKEND
+    if backend == 'auto':
+        backend = 'numba' if HAS_NUMBA else 'numpy'
+    if backend not in available():
+        raise ValueError(f"backend no disponible: {backend} (hay {available()})")
+    BACKEND = backend
+    return backend
+
+
+def compiled():
+    """¿Backend compilado? La primera vez sustituye las funciones de _JIT por su
+    versión Numba (njit con caché en disco: las siguientes ejecuciones no recompilan)."""
+    global _compiled
+    if BACKEND != 'numba':
+        return False
+    if not _compiled:
+        import numba
+        g = globals()
+        for name in _JIT:
+            g[name] = numba.njit(cache=True)(g[name])
+        _compiled = True
+    return True
+
+
+def use_compiled(*arrays):
+    """Camino compilado de los evaluadores: solo con Numba y arrays float64 (con float32
+    — panel compacto — NumPy opera parte en float32 y no se garantiza el mismo número)."""
+    return BACKEND == 'numba' and all(a.dtype == np.float64 for a in arrays) and compiled()
+
+
+def rolling_median_rows(x, rows, w):
+    """Mediana de x[r-w+1 : r+1] para cada r de `rows`, ignorando los NaN (huecos) como
+    np.nanmedian (float64; NaN si r < w-1 o si la ventana está vacía)."""
+    fn = _rolling_median_rows if compiled() else _rolling_median_rows_np
+    return fn(np.asarray(x, dtype=np.float64), np.asarray(rows, dtype=np.int64), int(w))
+
+
+def breakout_gates(c, h, l, i, p):
+    max_ext = p.get('breakout_max_ext_ma50')
+    return _breakout_gates(c, h, l, i, np.nan if max_ext is None else float(max_ext),
+                           int(p['breakout_base_window']), int(p['breakout_lead']),
+                           float(p['breakout_base_max_range']), float(p['breakout_base_near_high']),
+                           int(p['atr_period']), int(p['breakout_hold_window']),
+                           float(p['breakout_hold_atr']),
+                           p.get('breakout_stop_ref', 'hybrid') == 'hybrid',
+                           float(p['breakout_stop_atr']), float(p['max_risk_pct']),
+                           float(p['breakout_min_r1m']))
+
+
+def entry_gates(c, h, l, i, p):
+    return _entry_gates(c, h, l, i, float(p['near_high_max_below']), int(p['swing_window']),
+                        float(p['pullback_floor']), float(p['pullback_touch']),
+                        float(p['not_extended']), int(p['atr_period']), float(p['max_risk_pct']))
+
+
+def watch_gates(c, h, l, i, p):
+    return _watch_gates(c, h, l, i, int(p['watch_high_window']), float(p['watch_near_high']),
+                        float(p['watch_pullback_min']), float(p['watch_ma50_buffer']),
+                        float(p['watch_max_ext_ma50']), int(p['atr_period']))
+
+
+use(os.environ.get('TRADING_KERNELS', 'auto'))
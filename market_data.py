@@ -3,15 +3,17 @@
 # Universo (NYSE+NASDAQ, solo acciones comunes/ADRs), descarga de históricos y
 # salud del mercado. Desacoplado de cualquier estrategia: lo usan el screener de
 # momentum y los backtests.
+#
+# yfinance, requests y tqdm se importan al PRIMER uso (descarga, universo, enriquecido):
+# quien solo consulta la salud del mercado o las listas cripto no paga su import.
 
 import re
 import time
 from datetime import datetime, timedelta
 
 import pandas as pd
-import requests
-import yfinance as yf
-from tqdm import tqdm
+
+from data_quality import INDEX_PARAMS, sanitize_frames, summary
 
 
 # === FILTRO DE TIPO DE INSTRUMENTO ===
@@ -60,7 +62,15 @@ class MarketData:
         # momentum 6m (la estrategia evalúa la última barra y necesita ≥252 sesiones).
         self.history_days = history_days
         self.symbol_industries = {}
-        self.session = requests.Session()
+        self.quality_log = None      # cambios del saneado de la última descarga (data_quality.py)
+        self._session = None
+
+    @property
+    def session(self):
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+        return self._session
 
     # --- Universo ---
     def get_universe(self):
@@ -94,10 +104,15 @@ class MarketData:
                     continue
                 sym = row['symbol']
                 symbols.append(sym)
+                try:
+                    mcap = float(str(row.get('marketCap') or 0).replace(',', '') or 0)
+                except ValueError:
+                    mcap = 0.0
                 self.symbol_industries[sym] = {
                     'name': name,
                     'industry': row.get('industry', 'Unknown') or 'Unknown',
                     'sector': row.get('sector', 'Unknown') or 'Unknown',
+                    'market_cap': mcap or None,
                 }
             print(f"  {len(symbols)} acciones de {exchange} ({skipped} no-acciones descartadas).")
             return symbols
@@ -105,6 +120,19 @@ class MarketData:
             print(f"Error obteniendo símbolos de {exchange}: {e}")
             return []
 
+    def symbol_sectors(self):
+        """símbolo -> sector (o la industria si el NASDAQ no trae sector) de los listados
+        ya leídos con get_universe/get_exchange_symbols. Para los límites por sector del
+        backtest (portfolio_risk.py)."""
+        out = {}
+        for sym, meta in self.symbol_industries.items():
+            for k in ('sector', 'industry'):
+                v = (meta.get(k) or '').strip()
+                if v and v.lower() != 'unknown':
+                    out[sym] = v
+                    break
+        return out
+
     def get_backup_symbols(self):
         majors = [
             'JPM', 'BAC', 'WFC', 'C', 'GS', 'MS', 'AXP', 'SCHW', 'BLK', 'SPGI', 'V', 'MA',
@@ -121,6 +149,9 @@ class MarketData:
     # --- Descarga ---
     def download_all_data(self, symbols, batch_size=75):
         """Descarga OHLCV (sin Open) en lotes con reintentos. Incluye '_MARKET_INDEX' (^GSPC)."""
+        import yfinance as yf
+        from tqdm import tqdm
+
         end = datetime.now()
         start = end - timedelta(days=self.history_days)
         print(f"Descargando {len(symbols)} símbolos | ventana {start:%Y-%m-%d} → {end:%Y-%m-%d}")
@@ -144,12 +175,18 @@ class MarketData:
                 except Exception as e:
                     time.sleep(10 * (2 ** attempt))
         print(f"✓ Descargados {len(all_data)} símbolos.")
+        # Saneado al ingestar (data_quality.py): los evaluadores nunca ven un print malo.
+        all_data, self.quality_log = sanitize_frames(all_data)
+        print(f"✓ Saneado: {summary(self.quality_log)}")
         try:
             spy = yf.download('^GSPC', start=start, end=end, auto_adjust=True, progress=False, timeout=30)
             if not spy.empty:
                 if isinstance(spy.columns, pd.MultiIndex):
                     spy.columns = spy.columns.droplevel(-1)
-                all_data['_MARKET_INDEX'] = spy[['Close']]
+                spy, log = sanitize_frames({'_MARKET_INDEX': spy[['Close']]}, INDEX_PARAMS)
+                all_data.update(spy)
+                if len(log):
+                    self.quality_log = pd.concat([self.quality_log, log], ignore_index=True)
                 print("✓ ^GSPC descargado.")
         except Exception as e:
             print(f"⚠️ Error ^GSPC: {e}")
@@ -201,6 +238,7 @@ class MarketData:
         """Una pasada de yfinance .info sobre un símbolo. Devuelve dict enriquecido o None
         si Yahoo devolvió vacío (throttle) en todos los reintentos."""
         import time as _t
+        import yfinance as yf
         for attempt in range(retries):
             try:
                 info = yf.Ticker(s).info or {}
@@ -3,18 +3,29 @@
 # Flujo:
 #   - SOLO busca en mercado alcista (SPY > MA200). En bear: 0 candidatos, a liquidez.
 #   - Filtra el universo a nombres LÍQUIDOS (dólar-vol mediano ≥$20M, precio ≥$10).
-#   - Calcula la fuerza relativa (RS) sobre ese universo líquido.
+#   - Calcula la fuerza relativa (RS) sobre ese universo líquido (liquidez y RS se leen
+#     de la matriz RS del almacén, rs_matrix.py, que gana una fila por sesión).
+#   - Fuerza de los GRUPOS (group_strength.py): RS y amplitud de cada industria; cada
+#     candidato lleva la de su grupo y el dashboard los grupos líderes.
 #   - Lista PRIMARIA (find_breakouts → evaluate_breakout): RS top 10% con RUPTURA
 #     confirmada del máximo previo que aguanta como soporte; stop bajo el nivel roto,
 #     riesgo ≤12%, fresca (r1m>0). Enriquece con yfinance (cripto/fundamentales/sector/
 #     earnings), descarta cripto-directo y no rentables, y ORDENA por un score 0-100.
 #   - Lista SECUNDARIA (find_momentum_picks → evaluate_entry): pullback a la MA50.
 #   - Salida (gestión manual): dejar correr con trailing stop ~32% bajo el máximo.
+#   Las tres listas usan los MISMOS evaluadores escalares que el backtest
+#   (momentum_strategy.py) y leen los extras del ranking (momentum, volumen, RSI) de un
+#   FeatureSet por símbolo (feature_graph.py) compartido entre ellas.
 #
-# Genera docs/data.json con top MAX_BREAKOUTS rupturas + top MAX_PULLBACKS pullback.
+# Publica docs/data.json (núcleo pequeño, con gráficos por candidato e historia aparte:
+# dashboard_publish.py) con top MAX_BREAKOUTS rupturas + top MAX_PULLBACKS pullback, y
+# archiva las listas completas de la sesión en results_archive.py (data_store/results).
+# La descarga se incorpora al almacén local (data_store.py) y con ella se actualiza el
+# seguimiento de candidatos pasados (outcome_tracker.py → "track_record" del dashboard).
+# El listado del día se guarda como diferencia en el universo point-in-time del almacén
+# (universe_store.py), la base del backtest sin sesgo de supervivencia.
 # Es un DETECTOR para revisión manual (position trading), no un robot — ver README.
 
-import json
 import os
 import time
 from datetime import datetime
@@ -22,13 +33,22 @@ from datetime import datetime
 import numpy as np
 import pandas as pd
 
+from dashboard_publish import candidate_charts, publish
+from data_quality import append_log
+from data_store import DataStore
+from feature_graph import FeatureSet
+from group_strength import GroupStrength
 from market_data import MarketData
-from momentum_strategy import evaluate_entry, evaluate_breakout, evaluate_watch, DEFAULTS
+from momentum_strategy import DEFAULTS, evaluate_breakout, evaluate_entry, evaluate_watch
+from outcome_tracker import update_outcomes
+from results_archive import ResultsArchive
 
 MOM_LOOKBACK = DEFAULTS['mom_lookback']   # 126 sesiones (6 meses)
-MAX_BREAKOUTS = 6   # tope de la lista primaria (rápido de revisar; el resto en el CSV)
+MAX_BREAKOUTS = 6   # tope de la lista primaria (rápido de revisar; el resto en el archivo)
 MAX_PULLBACKS = 3   # tope de la lista secundaria
 MAX_WATCH = 3       # tope de la lista 'a vigilar / en testeo' (mismo nº que pullback)
+MAX_GROUPS = 10     # grupos líderes (industrias) en el dashboard
+GROUP_WEIGHT = 0    # puntos del score para el rank del grupo (0 = no puntúa: sin validar aún)
 
 
 def compute_rs_percentile(data, lookback=MOM_LOOKBACK):
@@ -43,36 +63,85 @@ def compute_rs_percentile(data, lookback=MOM_LOOKBACK):
     return (pd.Series(rets).rank(pct=True) * 100).round(1)
 
 
-def find_momentum_picks(data, rs_ratings, market_healthy):
+def store_liquidity_rs(rsm, data, last_date):
+    """(símbolos líquidos, RS Series) de la última sesión leídos de la matriz RS del
+    almacén (misma definición que liquid_symbols + compute_rs_percentile), o None si la
+    matriz no llega a `last_date`."""
+    if rsm.dates[-1] != np.datetime64(pd.Timestamp(last_date).date()):
+        return None
+    liquid = {s for s in data if s in rsm.sym_idx and rsm.liquid[-1, rsm.sym_idx[s]]}
+    rs = rsm.series(len(rsm.dates) - 1)
+    return liquid, rs[rs.index.isin(liquid)]
+
+
+def store_group_strength(store, panel, rsm, industries):
+    """Fuerza de las industrias en la última sesión del almacén (group_strength.py), con
+    los grupos de los listados de hoy sumados a los ya guardados. Solo industrias: el
+    NASDAQ deja el sector vacío y el de yfinance solo llega para los candidatos."""
+    groups = store.save_groups(industries)
+    last = [len(panel.dates) - 1]
+    return {'industry': GroupStrength.compute(panel, last, groups, dict(level='industry'),
+                                              rs_matrix=rsm)}
+
+
+def attach_groups(picks, groups):
+    """Añade a cada candidato su industria (RS, rank y amplitud del grupo). Sin grupo
+    conocido, None."""
+    for p in picks:
+        ind = groups['industry'].of(p['symbol']) if groups else None
+        p.update(ind or dict(group=None, group_rs=None, group_rank=None))
+
+
+def group_table(gs, top=MAX_GROUPS):
+    """Los `top` grupos más fuertes de la última sesión, para el dashboard."""
+    df = gs.frame(-1).dropna(subset=['rank']).head(top)
+    pct = lambda x: None if np.isnan(x) else round(float(x) * 100, 0)
+    return [dict(name=g, rs=round(float(r['rs_median']), 1),
+                 rs_cap=None if np.isnan(r['rs_cap']) else round(float(r['rs_cap']), 1),
+                 rank=round(float(r['rank']), 0), members=int(r['n']), pct_ma50=pct(r['pct_ma50']),
+                 pct_ma200=pct(r['pct_ma200']), pct_high=pct(r['pct_high']))
+            for g, r in df.iterrows()]
+
+
+def _last_bar_features(features, s, df):
+    """FeatureSet de la última barra de `s` (arrays OHLCV + features perezosas). Se guarda
+    en `features` para que las otras listas lo reutilicen."""
+    fs = features.get(s) if features is not None else None
+    if fs is None:
+        fs = FeatureSet.last_bar(df)
+        if features is not None:
+            features[s] = fs
+    return fs
+
+
+def find_momentum_picks(data, rs_ratings, market_healthy, features=None):
     """Evalúa la entrada de momentum en la última barra de cada acción."""
     picks = []
     if not market_healthy:
         return picks   # mercado bajista → no se opera
     for s, df in data.items():
         try:
-            c = df['Close'].values.astype(float)
-            h = df['High'].values.astype(float)
-            l = df['Low'].values.astype(float)
+            fs = _last_bar_features(features, s, df)
         except Exception:
             continue
-        i = len(c) - 1
-        sig = evaluate_entry(c, h, l, i, float(rs_ratings.get(s, 0)), DEFAULTS)
+        sig = evaluate_entry(fs.c, fs.h, fs.l, int(fs.i[0]), float(rs_ratings.get(s, 0)), DEFAULTS)
         if sig is None:
             continue
         # Fuerza bruta del momentum (retorno 6m) para el ranking — es lo único que
         # ordena (muy débilmente) mejor el retorno futuro. NO se usa el riesgo: el
         # backtest mostró que premiar bajo riesgo es contraproducente (el tramo <4%
         # de riesgo es el que peor rinde).
-        mom6m = (c[i] / c[i - MOM_LOOKBACK] - 1) * 100 if c[i - MOM_LOOKBACK] > 0 else 0.0
+        mom6m = float(fs('mom6m', MOM_LOOKBACK)[0])
         picks.append(dict(symbol=s, rs=float(rs_ratings.get(s, 0)), mom6m=round(mom6m, 1), **sig))
     # Ranking por fuerza de momentum. AVISO: ninguna feature predice fiablemente al
     # runner (correlaciones ≈0); el orden es casi cosmético. El edge está en operar
     # una CESTA diversificada de los top y dejar correr, no en clavar el #1.
+    # (IC de cada feature en toda la historia, por fecha y horizonte: factor_ic.py)
     picks.sort(key=lambda p: -p['mom6m'])
     return picks
 
 
-def find_watch(data, rs_ratings, market_healthy):
+def find_watch(data, rs_ratings, market_healthy, features=None):
     """Lista 'A VIGILAR / EN TESTEO' (radar): líderes que hicieron máximos recientes y han
     RETROCEDIDO desde ellos pero siguen sobre la MA50 — el paso PREVIO a la entrada. No
     son accionables (sin stop): se vigila si rebotan (→ posible ruptura) o caen al testeo
@@ -82,32 +151,20 @@ def find_watch(data, rs_ratings, market_healthy):
         return out
     for s, df in data.items():
         try:
-            c = df['Close'].values.astype(float)
-            h = df['High'].values.astype(float)
-            l = df['Low'].values.astype(float)
+            fs = _last_bar_features(features, s, df)
         except Exception:
             continue
-        i = len(c) - 1
-        sig = evaluate_watch(c, h, l, i, float(rs_ratings.get(s, 0)), DEFAULTS)
+        sig = evaluate_watch(fs.c, fs.h, fs.l, int(fs.i[0]), float(rs_ratings.get(s, 0)), DEFAULTS)
         if sig is None:
             continue
-        mom6m = (c[i] / c[i - MOM_LOOKBACK] - 1) * 100 if c[i - MOM_LOOKBACK] > 0 else 0.0
+        mom6m = float(fs('mom6m', MOM_LOOKBACK)[0])
         out.append(dict(symbol=s, rs=float(rs_ratings.get(s, 0)), mom6m=round(mom6m, 1), **sig))
     # Ranking por fuerza relativa (el candidato de vigilancia de mayor calidad primero).
     out.sort(key=lambda p: (-p['rs'], -p['mom6m']))
     return out
 
 
-def _rsi(c, n=14):
-    d = np.diff(c)
-    up = np.clip(d, 0, None)
-    dn = -np.clip(d, None, 0)
-    ru = pd.Series(up).ewm(alpha=1 / n, adjust=False).mean().iloc[-1]
-    rd = pd.Series(dn).ewm(alpha=1 / n, adjust=False).mean().iloc[-1]
-    return 100.0 if rd == 0 else float(100 - 100 / (1 + ru / rd))
-
-
-def find_breakouts(data, rs_ratings, market_healthy):
+def find_breakouts(data, rs_ratings, market_healthy, features=None):
     """Lista PRIMARIA: líderes con RUPTURA confirmada de su resistencia (máximo previo),
     que la mantienen como soporte, con stop natural ≤12% bajo el nivel roto. Position
     trading: comprar fuerza confirmada para revisar a mano y, si sigue, piramidar."""
@@ -116,21 +173,17 @@ def find_breakouts(data, rs_ratings, market_healthy):
         return out
     for s, df in data.items():
         try:
-            c = df['Close'].values.astype(float)
-            h = df['High'].values.astype(float)
-            l = df['Low'].values.astype(float)
-            v = df['Volume'].values.astype(float)
+            fs = _last_bar_features(features, s, df)
         except Exception:
             continue
-        i = len(c) - 1
-        sig = evaluate_breakout(c, h, l, i, float(rs_ratings.get(s, 0)), DEFAULTS)
+        sig = evaluate_breakout(fs.c, fs.h, fs.l, int(fs.i[0]), float(rs_ratings.get(s, 0)), DEFAULTS)
         if sig is None:
             continue
-        mom6m = (c[i] / c[i - MOM_LOOKBACK] - 1) * 100 if c[i - MOM_LOOKBACK] > 0 else 0.0
         # Volumen: media 10 sesiones / media 50 → >1 = la ruptura sube con interés.
-        vol_ratio = (v[-10:].mean() / v[-50:].mean()) if len(v) >= 50 and v[-50:].mean() > 0 else 1.0
-        out.append(dict(symbol=s, rs=float(rs_ratings.get(s, 0)), mom6m=round(mom6m, 1),
-                        vol_ratio=round(float(vol_ratio), 2), rsi=round(_rsi(c), 0), **sig))
+        out.append(dict(symbol=s, rs=float(rs_ratings.get(s, 0)),
+                        mom6m=round(float(fs('mom6m', MOM_LOOKBACK)[0]), 1),
+                        vol_ratio=round(float(fs('vol_ratio', 10, 50)[0]), 2),
+                        rsi=round(float(fs('rsi')[0]), 0), **sig))
     return out   # el orden definitivo (por score) se asigna en run, con los fundamentales
 
 
@@ -138,16 +191,19 @@ def _clip01(x):
     return max(0.0, min(1.0, x))
 
 
-def score_breakout(p):
+def score_breakout(p, group_weight=GROUP_WEIGHT):
     """Score 0-100 TRANSPARENTE para ordenar (no predice ganadores: ordena calidad de
     setup + convicción + fundamental para el triaje manual). Pesos: RS 35, fundamental
-    20, volumen 15, momentum 10, retest 10, frescura r1m 10.
+    20, volumen 15, momentum 10, retest 10, frescura r1m 10. Con `group_weight` > 0, esos
+    puntos pasan a ser del rank del grupo de industria (group_rank; sin grupo, neutro) y
+    el resto se reescala a 100 - group_weight.
 
     NO premia el riesgo/SL pequeño: el backtest mostró que premiar bajo riesgo es
     contraproducente (el tramo <4% de riesgo es el que peor rinde) — igual que ya hace la
     lista de pullback. Además el cap de extensión sobre la MA50 ya acota la distancia al
     soporte de forma estructural, así que no hay que ordenarlo también aquí. Esos 10 pts
-    fueron a RS (25→35), lo único que el backtest vio ordenar (débilmente) el retorno."""
+    fueron a RS (25→35), lo único que el backtest vio ordenar (débilmente) el retorno.
+    IC de cada entrada y de cualquier re-ponderación sobre toda la historia: factor_ic.py."""
     rs = _clip01((p['rs'] - 80) / 20)                       # RS 80→0, 100→1
     mom = _clip01(p['mom6m'] / 150)                          # momentum 6m, cap 150%
     vol = _clip01((p.get('vol_ratio', 1.0) - 0.8) / 0.6)    # vol10/50: 0.8→0, 1.4→1
@@ -158,10 +214,25 @@ def score_breakout(p):
     f_rev = _clip01((revg or 0) / 0.30) if revg is not None else 0.5
     f_eps = _clip01((epsg or 0) / 0.50) if epsg is not None else 0.5
     fund = f_prof * 0.5 + f_rev * 0.25 + f_eps * 0.25
-    return round(35 * rs + 10 * mom + 15 * vol + 10 * rete + 10 * fresh + 20 * fund, 1)
+    score = 35 * rs + 10 * mom + 15 * vol + 10 * rete + 10 * fresh + 20 * fund
+    if group_weight:
+        rank = p.get('group_rank')
+        grp = 0.5 if rank is None else _clip01(rank / 100)
+        score = score * (1 - group_weight / 100) + group_weight * grp
+    return round(score, 1)
+
 
+def _group_card(p):
+    """Grupo de industria de un candidato para el dashboard (None si no se conoce)."""
+    if not p.get('group'):
+        return None
+    return {"name": p['group'], "rs": p.get('group_rs'), "rank": p.get('group_rank'),
+            "pct_ma50": p.get('group_pct_ma50'), "pct_ma200": p.get('group_pct_ma200'),
+            "pct_high": p.get('group_pct_high')}
 
-def build_dashboard(breakouts, pullbacks, watch, market_healthy, market_score, n_universe, n_leaders):
+
+def build_dashboard(breakouts, pullbacks, watch, market_healthy, market_score, n_universe, n_leaders,
+                    track_record=None, groups=None):
     data = {
         "timestamp": datetime.now().isoformat(),
         "market_date": datetime.now().strftime("%Y-%m-%d"),
@@ -201,10 +272,18 @@ def build_dashboard(breakouts, pullbacks, watch, market_healthy, market_score, n
             "watch": ("A VIGILAR / EN TESTEO: líder (RS top 10%) que hizo máximos recientes y ha "
                       "retrocedido desde ellos pero sigue sobre la MA50. NO accionable (sin stop): "
                       "vigilar si rebota (→ posible ruptura) o cae a la MA50 (→ pullback)"),
+            "groups": ("GRUPOS: RS del grupo = mediana del RS de sus miembros líquidos; amplitud = "
+                       "% de miembros sobre MA50 / MA200 y en máximo de 52 semanas. Comprar "
+                       "líderes en grupos líderes"),
         },
         "breakouts": [],
         "pullbacks": [],
         "watch": [],
+        # Industrias más fuertes hoy (group_strength.py).
+        "groups": {"industries": group_table(groups['industry'])} if groups else {},
+        # Qué hicieron después los candidatos publicados (outcome_tracker.hit_rate_tables):
+        # por lista y tramo de score, % positivos / retorno medio / MFE / stop a 5-21-63s.
+        "track_record": track_record or {},
     }
     for rank, p in enumerate(breakouts[:MAX_BREAKOUTS], 1):
         vr = p.get('vol_ratio', 1.0)
@@ -232,6 +311,7 @@ def build_dashboard(breakouts, pullbacks, watch, market_healthy, market_score, n
             "volume": {"ratio_10_50": vr, "label": vol_label},
             "rsi": p.get('rsi'),
             "sector": p.get('sector') or "—",
+            "group": _group_card(p),
             "fundamentals": {
                 "profit_margin_pct": round(p['margin'] * 100, 1) if p.get('margin') is not None else None,
                 "rev_growth_pct": round(p['revg'] * 100, 0) if p.get('revg') is not None else None,
@@ -258,6 +338,7 @@ def build_dashboard(breakouts, pullbacks, watch, market_healthy, market_score, n
             "ma200": p['ma200'],
             "sl": p['sl'],
             "risk_pct": p['risk_pct'],
+            "group": _group_card(p),
             "note": "Rebote en la MA50 en subida (entrada de bajo riesgo)",
             "sl_explanation": "Mínimo del pullback − 0.5×ATR (rebote en MA50)",
         })
@@ -276,6 +357,7 @@ def build_dashboard(breakouts, pullbacks, watch, market_healthy, market_score, n
             "ma50": p['ma50'],
             "ma200": p['ma200'],
             "sector": p.get('sector') or "—",
+            "group": _group_card(p),
             "note": ("Retrocede desde máximos; aún sobre la MA50. Vigilar próximas sesiones: "
                      "si REBOTA → posible entrada de ruptura; si cae a la MA50 → pullback de bajo riesgo"),
             "watch_zone": ("Entrada ideal: rebote confirmado cerca de la zona de testeo o de la MA50 "
@@ -293,11 +375,38 @@ def run_momentum_screener():
     data = md.download_all_data(symbols)
     spy = data.pop('_MARKET_INDEX', None)
     print(f"Con datos: {len(data)} acciones")
+    # Al almacén local TODO lo descargado (no solo las líquidas): historia que crece a
+    # diario para el seguimiento de candidatos, el replay y el backtest sin re-descargar.
+    # Son extras: si el almacén falla (npy corrupto, log cortado, disco lleno) el dashboard
+    # sale igual, con liquidez y RS calculados en memoria y sin grupos.
+    store = DataStore()
+    from_store, groups = None, None
+    if spy is not None and len(spy):
+        try:
+            store.merge(data, spy)
+            append_log(md.quality_log, store.path('quality_log.csv'))
+            # Listado de hoy al universo point-in-time (universe_store.py): solo la diferencia.
+            snap = store.universe().record(spy.index[-1], md.symbol_industries)
+            if snap:
+                print(f"Universo point-in-time {snap['date']}: +{len(snap['added'])} altas, "
+                      f"−{len(snap['removed'])} bajas, {len(snap['changed'])} cambios")
+            panel = store.panel()
+            rsm = store.rs_matrix(panel=panel)
+            from_store = store_liquidity_rs(rsm, data, spy.index[-1])
+            if from_store is not None:
+                groups = store_group_strength(store, panel, rsm, md.symbol_industries)
+        except Exception as e:
+            print(f"⚠️ Almacén local no disponible ({type(e).__name__}: {e}): "
+                  f"liquidez y RS en memoria, sin grupos")
+            from_store, groups = None, None
 
     # Filtro de liquidez ANTES del RS: que el percentil de fuerza relativa se calcule
     # entre nombres institucionales, no contra microcaps que 'pop'ean una vez.
-    liquid = set(md.liquid_symbols(data, min_dollar_vol=DEFAULTS['min_dollar_vol'],
-                                   min_price=DEFAULTS['min_price'], window=DEFAULTS['liq_window']))
+    if from_store is not None:
+        liquid, rs = from_store
+    else:
+        liquid = set(md.liquid_symbols(data, min_dollar_vol=DEFAULTS['min_dollar_vol'],
+                                       min_price=DEFAULTS['min_price'], window=DEFAULTS['liq_window']))
     n_universe_raw = len(data)
     data = {s: df for s, df in data.items() if s in liquid}
     print(f"Líquidas (≥${DEFAULTS['min_dollar_vol']/1e6:.0f}M/día mediana, "
@@ -306,11 +415,13 @@ def run_momentum_screener():
     market_healthy, market_score = md.check_market_health(spy)
     print(f"Mercado: {'ALCISTA ✅' if market_healthy else 'BAJISTA ⚠️ (a liquidez)'} (score {market_score})")
 
-    rs = compute_rs_percentile(data)
+    if from_store is None:
+        rs = compute_rs_percentile(data)
     n_leaders = int((rs >= DEFAULTS['rs_min']).sum())
-    breakouts = find_breakouts(data, rs, market_healthy)
-    pullbacks = find_momentum_picks(data, rs, market_healthy)
-    watch = find_watch(data, rs, market_healthy)
+    features = {}      # símbolo -> FeatureSet de la última barra, compartido por las tres listas
+    breakouts = find_breakouts(data, rs, market_healthy, features)
+    pullbacks = find_momentum_picks(data, rs, market_healthy, features)
+    watch = find_watch(data, rs, market_healthy, features)
 
     # Enriquecer SOLO los candidatos finales con yfinance (una llamada por símbolo):
     # cripto-directo, sector, margen, crecimiento, recomendación, objetivo y earnings.
@@ -357,6 +468,7 @@ def run_momentum_screener():
         p['rating'] = e.get('rating')
         p['target'] = e.get('target')
         p['earnings_days'] = e.get('earnings_days')
+    attach_groups(breakouts + pullbacks + watch, groups)
     for p in breakouts:
         p['score'] = score_breakout(p)
     breakouts.sort(key=lambda x: -x['score'])
@@ -365,19 +477,31 @@ def run_momentum_screener():
           f"Rupturas confirmadas (RS≥{DEFAULTS['breakout_rs_min']}): {len(breakouts)} | "
           f"Pullback MA50: {len(pullbacks)} | A vigilar (testeo): {len(watch)}")
 
-    # Guardar CSV de rupturas (lista primaria)
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    if breakouts:
-        pd.DataFrame(breakouts).to_csv(f"momentum_breakouts_{ts}.csv", index=False)
+    # Archivar la sesión COMPLETA (las tres listas con todos sus campos + contexto de
+    # mercado) en el archivo columnar por fecha — sustituye al CSV suelto por ejecución.
+    session = spy.index[-1] if spy is not None and len(spy) else datetime.now()
+    track_record = None
+    try:
+        archive = ResultsArchive(store.path('results'))
+        archive.write(session, dict(breakouts=breakouts, pullbacks=pullbacks, watch=watch),
+                      market=dict(healthy=bool(market_healthy), health_score=float(market_score),
+                                  n_universe_raw=n_universe_raw, n_liquid=len(data),
+                                  n_leaders=n_leaders, excluded_crypto=crypto,
+                                  run_at=datetime.now().isoformat()))
+        # Seguimiento incremental de los candidatos de sesiones anteriores (solo ventanas abiertas).
+        _, track_record = update_outcomes(store, archive)
+    except Exception as e:
+        print(f"⚠️ Archivo de resultados / seguimiento no actualizado ({type(e).__name__}: {e})")
 
     # Guardar dashboard
-    dash = build_dashboard(breakouts, pullbacks, watch, market_healthy, market_score, len(data), n_leaders)
+    dash = build_dashboard(breakouts, pullbacks, watch, market_healthy, market_score, len(data), n_leaders,
+                           track_record=track_record, groups=groups)
     os.makedirs('docs', exist_ok=True)
-    with open('docs/data.json', 'w', encoding='utf-8') as f:
-        json.dump(dash, f, indent=2, ensure_ascii=False)
+    core = publish(dash, candidate_charts(dash, data), out_dir='docs')
     with open('docs/last_update.txt', 'w') as f:
         f.write(datetime.now().isoformat())
-    print(f"✅ Dashboard actualizado: docs/data.json ({len(breakouts)} rupturas)")
+    print(f"✅ Dashboard actualizado: docs/data.json ({len(breakouts)} rupturas, "
+          f"{sum(1 for k in ('breakouts', 'pullbacks', 'watch') for p in core[k] if p.get('chart'))} gráficos)")
     for p in breakouts[:12]:
         tag = "retest✓" if p['retested'] else "sin retest"
         print(f"  score={p['score']:5.1f}  {p['symbol']:<6} RS={p['rs']:.0f}  "
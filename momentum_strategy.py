@@ -7,7 +7,8 @@
 #   - evaluate_entry (SECUNDARIA / backtest): rebote en la MA50 en subida (pullback).
 #
 # generate_momentum_signals produce señales [symbol, date, sl] para portfolio_backtest.py
-# y aplica liquidez point-in-time (mismo universo que producción).
+# y aplica liquidez point-in-time (mismo universo que producción); generate_sleeve_signals
+# hace lo mismo para varias estrategias a la vez (columna `sleeve`, RS compartido).
 #
 # NOTA sobre el backtest (config market_filter_ma=200 + trailing ~0.32):
 #   El momentum MECÁNICO no bate al SPY sobre universo real (CAGR ~+6/+11% vs +14.6%;
@@ -15,12 +16,13 @@
 #   universo cherry-picked). Lo robusto: el filtro de mercado MA200 protege en bear
 #   (2022: capital intacto vs SPY −20%) y la liquidez es imprescindible. Por eso el
 #   uso real es un DETECTOR para revisión manual, no un robot. Ver README / memoria.
-
-import contextlib
-import io
+#
+# Núcleo ligero: los evaluadores solo necesitan NumPy; pandas se importa dentro de los
+# generadores de señales (devuelven DataFrame), no al importar el módulo.
 
 import numpy as np
-import pandas as pd
+
+import kernels
 
 
 DEFAULTS = dict(
@@ -126,52 +128,87 @@ DEFAULTS = dict(
 )
 
 
+def _gate(trace, name, ok, detail):
+    """Condición del detector: con `trace` (lista) anota (nombre, pasa, detalle()) en el
+    orden de evaluación — la explicación de screener_service.py sale de aquí mismo."""
+    if trace is not None:
+        trace.append((name, bool(ok), detail()))
+    return ok
+
+
+def _trend_gate(trace, c, i, px):
+    """Trend template común a los tres detectores: (pasa, ma50, ma200)."""
+    ma50 = c[i - 50:i].mean(dtype=np.float64)
+    ma200 = c[i - 200:i].mean(dtype=np.float64)
+    ma50_prev = c[i - 70:i - 20].mean(dtype=np.float64)
+    ma200_prev = c[i - 221:i - 21].mean(dtype=np.float64) if i >= 221 else ma200
+    ok = _gate(trace, 'tendencia', px > ma50 > ma200 and ma200 > ma200_prev and ma50 > ma50_prev,
+               lambda: f"px {px:.2f} MA50 {ma50:.2f} (prev {ma50_prev:.2f}) MA200 {ma200:.2f} "
+                       f"(prev {ma200_prev:.2f})")
+    return ok, ma50, ma200
+
+
+def _leader_gates(trace, rs_val, floor, i):
+    return (_gate(trace, 'rs', not (rs_val is None or rs_val < floor), lambda: f"RS {rs_val} (mín {floor})")
+            and _gate(trace, 'historia', i >= 252, lambda: f"{i + 1} sesiones (mín 253)"))
+
+
 def _atr(h, l, c, i, n=14):
     if i < n:
         return np.nan
     tr = np.maximum(h[i - n + 1:i + 1] - l[i - n + 1:i + 1], 0.0)
-    return float(tr.mean())
+    return float(tr.mean(dtype=np.float64))
 
 
-def evaluate_entry(c, h, l, i, rs_val, params=None):
+def evaluate_entry(c, h, l, i, rs_val, params=None, trace=None):
     """
     Evalúa la entrada de momentum en la barra i (sin look-ahead: solo usa datos
     hasta i incluido). Compartida por el backtest y el screener de producción para
     garantizar que ambos operan IDÉNTICAMENTE.
 
-    Devuelve dict(signal=True, sl, entry, risk_pct, ma50, hi52, ...) o None.
+    Devuelve dict(signal=True, sl, entry, risk_pct, ma50, hi52, ...) o None. Con `trace`
+    (lista) anota cada condición evaluada (nombre, pasa, detalle) hasta la que falla.
     """
     p = {**DEFAULTS, **(params or {})}
-    if rs_val is None or rs_val < p['rs_min'] or i < 252:
+    if not _leader_gates(trace, rs_val, p['rs_min'], i):
         return None
     px = c[i]
-    ma50 = c[i - 50:i].mean()
-    ma200 = c[i - 200:i].mean()
-    ma50_prev = c[i - 70:i - 20].mean()
-    ma200_prev = c[i - 221:i - 21].mean() if i >= 221 else ma200
-    hi52 = h[i - 252:i].max()
-
+    if trace is None and kernels.use_compiled(c, h, l):   # misma cascada, compilada (kernels.py)
+        ok, ma50, ma200, hi52, sl, risk, _ = kernels.entry_gates(c, h, l, i, p)
+        return _entry_dict(px, ma50, ma200, hi52, sl, risk, p) if ok else None
     # Trend template: líder en tendencia alcista
-    if not (px > ma50 > ma200 and ma200 > ma200_prev and ma50 > ma50_prev):
+    ok, ma50, ma200 = _trend_gate(trace, c, i, px)
+    if not ok:
         return None
-    if px > hi52 or px < hi52 * (1 - p['near_high_max_below']):
+    hi52 = h[i - 252:i].max()
+    if not _gate(trace, 'cerca_de_maximos', not (px > hi52 or px < hi52 * (1 - p['near_high_max_below'])),
+                 lambda: f"{(px / hi52 - 1) * 100:+.1f}% vs máx 52s "
+                         f"(máx {-p['near_high_max_below'] * 100:.0f}%, sin superarlo)"):
         return None
 
     # Entrada de bajo riesgo: retroceso que TOCA la MA50 en subida y rebota
     low_sw = l[i - p['swing_window']:i].min()
-    touched = ma50 * (1 - p['pullback_floor']) <= low_sw <= ma50 * (1 + p['pullback_touch'])
-    bounce = px > ma50 and c[i] > c[i - 1] and px <= ma50 * (1 + p['not_extended'])
-    if not (touched and bounce):
+    if not _gate(trace, 'toca_ma50', ma50 * (1 - p['pullback_floor']) <= low_sw <= ma50 * (1 + p['pullback_touch']),
+                 lambda: f"mínimo {p['swing_window']}s {low_sw:.2f} vs MA50 {ma50:.2f}"):
+        return None
+    if not _gate(trace, 'rebote', px > ma50 and c[i] > c[i - 1] and px <= ma50 * (1 + p['not_extended']),
+                 lambda: f"{(px / ma50 - 1) * 100:+.1f}% sobre MA50 (máx {p['not_extended'] * 100:.0f}%), "
+                         f"cierre {'sube' if c[i] > c[i - 1] else 'no sube'}"):
         return None
 
     at = _atr(h, l, c, i, p['atr_period'])
-    if not np.isfinite(at) or at <= 0:
+    if not _gate(trace, 'atr', np.isfinite(at) and at > 0, lambda: f"ATR {at:.2f}"):
         return None
     sl = low_sw - 0.5 * at
     risk = (px - sl) / px
-    if risk <= 0 or risk > p['max_risk_pct']:
+    if not _gate(trace, 'riesgo', not (risk <= 0 or risk > p['max_risk_pct']),
+                 lambda: f"{risk * 100:.1f}% (máx {p['max_risk_pct'] * 100:.0f}%)"):
         return None
 
+    return _entry_dict(px, ma50, ma200, hi52, sl, risk, p)
+
+
+def _entry_dict(px, ma50, ma200, hi52, sl, risk, p):
     return dict(signal=True, entry=float(px), sl=round(float(sl), 4),
                 risk_pct=round(float(risk) * 100, 2), ma50=round(float(ma50), 2),
                 ma200=round(float(ma200), 2), hi52=round(float(hi52), 2),
@@ -179,25 +216,26 @@ def evaluate_entry(c, h, l, i, rs_val, params=None):
                 trailing_stop_pct=round(p.get('trailing_stop_pct', 32.0), 1))
 
 
-def evaluate_breakout(c, h, l, i, rs_val, params=None):
+def evaluate_breakout(c, h, l, i, rs_val, params=None, trace=None):
     """
     Detector de RUPTURA CONFIRMADA (lista primaria). Caza líderes que han superado su
     resistencia (máximo previo de 52s) y la mantienen como SOPORTE, con stop natural
     justo bajo el nivel roto y riesgo ≤ max_risk_pct (12%). Acepta tanto las que ya
     han retesteado el nivel como las que solo lo han superado con claridad sin girarse.
 
-    Sin look-ahead: solo usa datos hasta la barra i. Devuelve dict o None.
+    Sin look-ahead: solo usa datos hasta la barra i. Devuelve dict o None; con `trace`
+    (lista) anota cada condición (nombre, pasa, detalle) como evaluate_entry.
     """
     p = {**DEFAULTS, **(params or {})}
-    if rs_val is None or rs_val < p['breakout_rs_min'] or i < 252:
+    if not _leader_gates(trace, rs_val, p['breakout_rs_min'], i):
         return None
     px = c[i]
-    ma50 = c[i - 50:i].mean()
-    ma200 = c[i - 200:i].mean()
-    ma50_prev = c[i - 70:i - 20].mean()
-    ma200_prev = c[i - 221:i - 21].mean() if i >= 221 else ma200
+    if trace is None and kernels.use_compiled(c, h, l):
+        ok, ma50, ma200, prior_high, hi52, recent_low, sl, risk, r1m = kernels.breakout_gates(c, h, l, i, p)
+        return _breakout_dict(px, ma50, ma200, prior_high, hi52, recent_low, sl, risk, r1m, p) if ok else None
     # Tendencia de fondo (stage 2): líder en tendencia alcista sostenida
-    if not (px > ma50 > ma200 and ma200 > ma200_prev and ma50 > ma50_prev):
+    ok, ma50, ma200 = _trend_gate(trace, c, i, px)
+    if not ok:
         return None
 
     # Cap de extensión sobre la MA50: el soporte fiable de un líder volátil es la MA50,
@@ -205,37 +243,43 @@ def evaluate_breakout(c, h, l, i, rs_val, params=None):
     # roto cae dentro del hueco hasta ella y un retroceso normal lo barre (SNEX/AMKR
     # jun-2026: rompieron, el techo no aguantó, fueron a la MA50 y saltó el stop).
     max_ext = p.get('breakout_max_ext_ma50')
-    if max_ext is not None and px > ma50 * (1 + max_ext):
+    if not _gate(trace, 'extension_ma50', not (max_ext is not None and px > ma50 * (1 + max_ext)),
+                 lambda: f"{(px / ma50 - 1) * 100:+.1f}% sobre MA50 "
+                         f"(máx {'—' if max_ext is None else f'{max_ext * 100:.0f}%'})"):
         return None
 
     # RUPTURA DE UNA BASE/consolidación, no una tendencia continua. El "nivel roto" es el
     # techo de una consolidación TIGHT reciente; una tendencia sostenida (sin base) se
     # descarta aquí aunque supere su máximo de hace 25 sesiones (caso PLXS/IESC/ARCB).
     bw, lead = p['breakout_base_window'], p['breakout_lead']
-    if i - bw - lead < 0:
+    if not _gate(trace, 'ventana_base', i - bw - lead >= 0, lambda: f"{i + 1} sesiones (base {bw} + {lead})"):
         return None
     base = slice(i - bw - lead, i - lead)
     base_hi = float(h[base].max())
     base_lo = float(l[base].min())
-    if base_lo <= 0:
+    if not _gate(trace, 'base_valida', not base_lo <= 0, lambda: f"mínimo de la base {base_lo:.2f}"):
         return None
     # (1) la base es TIGHT (consolidó, no trendeó): rango high-low acotado
-    if (base_hi - base_lo) / base_lo > p['breakout_base_max_range']:
+    rng = (base_hi - base_lo) / base_lo
+    if not _gate(trace, 'base_tight', not rng > p['breakout_base_max_range'],
+                 lambda: f"rango de la base {rng * 100:.1f}% (máx {p['breakout_base_max_range'] * 100:.0f}%)"):
         return None
     hi52 = float(h[i - 252:i + 1].max())
     # (2) la base se formó CERCA de máximos → ruptura a terreno nuevo, no un techo interno
-    if base_hi < hi52 * (1 - p['breakout_base_near_high']):
+    if not _gate(trace, 'base_cerca_de_maximos', not base_hi < hi52 * (1 - p['breakout_base_near_high']),
+                 lambda: f"techo de la base {base_hi:.2f} vs máx 52s {hi52:.2f}"):
         return None
     # (3) ruptura RECIENTE: hace `lead` sesiones el cierre seguía dentro/bajo la base...
-    if c[i - lead] > base_hi:
+    if not _gate(trace, 'ruptura_reciente', not c[i - lead] > base_hi,
+                 lambda: f"cierre hace {lead}s {float(c[i - lead]):.2f} vs techo {base_hi:.2f}"):
         return None
     # ...y ahora supera el techo de la consolidación (= nivel roto).
     prior_high = base_hi
-    if not (px > prior_high):
+    if not _gate(trace, 'supera_techo', px > prior_high, lambda: f"px {px:.2f} vs techo {prior_high:.2f}"):
         return None
 
     at = _atr(h, l, c, i, p['atr_period'])
-    if not np.isfinite(at) or at <= 0:
+    if not _gate(trace, 'atr', np.isfinite(at) and at > 0, lambda: f"ATR {at:.2f}"):
         return None
 
     # El nivel roto debe AGUANTAR como soporte: en las últimas N sesiones el mínimo no
@@ -243,7 +287,9 @@ def evaluate_breakout(c, h, l, i, rs_val, params=None):
     # barrido/overshoot normal del retest (si luego cierra sobre el nivel, px>prior_high).
     hw = p['breakout_hold_window']
     recent_low = l[i - hw:i + 1].min()
-    if recent_low < prior_high - p['breakout_hold_atr'] * at:
+    if not _gate(trace, 'aguanta_nivel', not recent_low < prior_high - p['breakout_hold_atr'] * at,
+                 lambda: f"mínimo {hw}s {recent_low:.2f} vs techo − {p['breakout_hold_atr']}·ATR "
+                         f"{prior_high - p['breakout_hold_atr'] * at:.2f}"):
         return None
 
     # Stop natural: bajo el SOPORTE REAL = el más bajo entre el mínimo local de testeo
@@ -256,14 +302,19 @@ def evaluate_breakout(c, h, l, i, rs_val, params=None):
     stop_anchor = min(recent_low, prior_high) if p.get('breakout_stop_ref', 'hybrid') == 'hybrid' else prior_high
     sl = stop_anchor - p['breakout_stop_atr'] * at
     risk = (px - sl) / px
-    if risk <= 0 or risk > p['max_risk_pct']:
+    if not _gate(trace, 'riesgo', not (risk <= 0 or risk > p['max_risk_pct']),
+                 lambda: f"{risk * 100:.1f}% (máx {p['max_risk_pct'] * 100:.0f}%)"):
         return None
 
     # Frescura: que el último mes siga subiendo (no una ruptura vieja ya girándose).
     r1m = (c[i] / c[i - 21] - 1) if i >= 21 and c[i - 21] > 0 else 0.0
-    if r1m <= p['breakout_min_r1m']:
+    if not _gate(trace, 'fresca_r1m', not r1m <= p['breakout_min_r1m'], lambda: f"r1m {r1m * 100:+.1f}%"):
         return None
 
+    return _breakout_dict(px, ma50, ma200, prior_high, hi52, recent_low, sl, risk, r1m, p)
+
+
+def _breakout_dict(px, ma50, ma200, prior_high, hi52, recent_low, sl, risk, r1m, p):
     retested = recent_low <= prior_high * (1 + p['retest_margin'])
     return dict(signal=True, entry=float(px), sl=round(float(sl), 4),
                 risk_pct=round(float(risk) * 100, 2),
@@ -276,7 +327,7 @@ def evaluate_breakout(c, h, l, i, rs_val, params=None):
                 retested=bool(retested))
 
 
-def evaluate_watch(c, h, l, i, rs_val, params=None):
+def evaluate_watch(c, h, l, i, rs_val, params=None, trace=None):
     """
     Lista 'A VIGILAR / EN TESTEO' (radar, NO accionable, sin stop/entrada). Detecta al
     líder que hizo NUEVOS MÁXIMOS recientes y ha RETROCEDIDO desde ellos, pero sigue por
@@ -287,36 +338,47 @@ def evaluate_watch(c, h, l, i, rs_val, params=None):
     El hueco que ni la ruptura (px aún bajo el máximo) ni el pullback (aún no toca la
     MA50) capturan. Ej.: LLY sale los días 23-25/06/2026 (retrocedida ~4-7% del máximo de
     1183, aún sobre la MA50) y deja de salir el 26 (de nuevo en máximos → tarde/extendida).
-    Sin look-ahead: solo usa datos hasta la barra i. Devuelve dict o None.
+    Sin look-ahead: solo usa datos hasta la barra i. Devuelve dict o None; con `trace`
+    (lista) anota cada condición (nombre, pasa, detalle) como evaluate_entry.
     """
     p = {**DEFAULTS, **(params or {})}
-    if rs_val is None or rs_val < p['watch_rs_min'] or i < 252:
+    if not _leader_gates(trace, rs_val, p['watch_rs_min'], i):
         return None
     px = c[i]
-    ma50 = c[i - 50:i].mean()
-    ma200 = c[i - 200:i].mean()
-    ma50_prev = c[i - 70:i - 20].mean()
-    ma200_prev = c[i - 221:i - 21].mean() if i >= 221 else ma200
+    if trace is None and kernels.use_compiled(c, h, l):
+        ok, ma50, ma200, hi52, hi_recent, at = kernels.watch_gates(c, h, l, i, p)
+        return _watch_dict(px, ma50, ma200, hi52, hi_recent, at) if ok else None
     # Líder en tendencia alcista sostenida (mismo trend template que la ruptura)
-    if not (px > ma50 > ma200 and ma200 > ma200_prev and ma50 > ma50_prev):
+    ok, ma50, ma200 = _trend_gate(trace, c, i, px)
+    if not ok:
         return None
 
     hi52 = h[i - 252:i + 1].max()
     hi_recent = h[i - p['watch_high_window']:i + 1].max()
     # Acaba de hacer máximos: el máximo reciente está pegado al máximo de 52s.
-    if hi_recent < hi52 * (1 - p['watch_near_high']):
+    if not _gate(trace, 'maximos_recientes', not hi_recent < hi52 * (1 - p['watch_near_high']),
+                 lambda: f"máx {p['watch_high_window']}s {hi_recent:.2f} vs máx 52s {hi52:.2f}"):
         return None
     # Ha retrocedido desde ese máximo (≥ watch_pullback_min) PERO sigue sobre la MA50
     # (uptrend intacto, aún no ha llegado al testeo de la media → no es pullback todavía)
     # Y ya está CERCA de la zona de testeo (≤ watch_max_ext_ma50 sobre la MA50): si no, es
     # un cohete extendido que solo ha bajado un poco, no algo en zona de decisión.
-    pulled = px <= hi_recent * (1 - p['watch_pullback_min'])
-    above_ma50 = px > ma50 * (1 + p['watch_ma50_buffer'])
-    near_zone = px <= ma50 * (1 + p['watch_max_ext_ma50'])
+    # (Las tres se anotan siempre: el detalle dice cuál o cuáles faltan.)
+    ext = lambda: f"{(px / ma50 - 1) * 100:+.1f}% sobre MA50"
+    pulled = _gate(trace, 'retroceso', px <= hi_recent * (1 - p['watch_pullback_min']),
+                   lambda: f"{(px / hi_recent - 1) * 100:+.1f}% desde el máximo reciente "
+                           f"(mín -{p['watch_pullback_min'] * 100:.0f}%)")
+    above_ma50 = _gate(trace, 'sobre_ma50', px > ma50 * (1 + p['watch_ma50_buffer']), ext)
+    near_zone = _gate(trace, 'zona_testeo', px <= ma50 * (1 + p['watch_max_ext_ma50']),
+                      lambda: f"{ext()} (máx {p['watch_max_ext_ma50'] * 100:.0f}%)")
     if not (pulled and above_ma50 and near_zone):
         return None
 
     at = _atr(h, l, c, i, p['atr_period'])
+    return _watch_dict(px, ma50, ma200, hi52, hi_recent, at)
+
+
+def _watch_dict(px, ma50, ma200, hi52, hi_recent, at):
     return dict(signal=True, entry=float(px),
                 recent_high=round(float(hi_recent), 2),
                 pct_from_recent_high=round((px / hi_recent - 1) * 100, 1),
@@ -327,7 +389,144 @@ def evaluate_watch(c, h, l, i, rs_val, params=None):
                 atr=round(float(at), 2) if np.isfinite(at) else None)
 
 
-def generate_momentum_signals(price_data, spy, step=5, params=None, evaluator=None, rs_floor=None):
+def _signal_arrays(price_data, cal):
+    """Arrays por símbolo para el walk-forward + mapa calendario → barra local.
+
+    `price_data` puede ser el dict[símbolo] -> DataFrame de siempre o un PricePanel
+    (price_panel.py). Con el panel no se copia nada: los arrays son vistas (float32 y
+    volumen entero en modo compacto). Si la historia del símbolo es contigua en el
+    calendario, la barra local es `ci - first` (sin dict por símbolo); si tiene huecos
+    o fechas fuera del calendario, se guarda el dict ci -> i como antes."""
+    A = {}
+    if hasattr(price_data, 'series'):
+        cal_of_row = cal.get_indexer(price_data.dates)
+        for s in price_data.symbols:
+            if price_data.count[price_data.sym_idx[s]] == 0:
+                continue
+            a = price_data.series(s)
+            rows = cal_of_row[price_data.rows(s)]
+            A[s] = _with_local_map(dict(h=a['h'], l=a['l'], c=a['c'], v=a.get('v')), rows)
+        return A
+    for s, d in price_data.items():
+        rows = cal.get_indexer(d.index)
+        A[s] = _with_local_map(dict(h=d['High'].values.astype(float),
+                                    l=d['Low'].values.astype(float),
+                                    c=d['Close'].values.astype(float),
+                                    v=(d['Volume'].values.astype(float) if 'Volume' in d.columns else None)),
+                               rows)
+    return A
+
+
+def _with_local_map(a, rows):
+    n = len(rows)
+    if n and rows[0] >= 0 and np.array_equal(rows, np.arange(rows[0], rows[0] + n)):
+        a.update(first=int(rows[0]), n=n, idx=None)
+    else:
+        a.update(first=None, n=n, idx={int(ci): i for i, ci in enumerate(rows) if ci >= 0})
+    return a
+
+
+def _local_index(a, ci):
+    """Barra local del símbolo en la posición de calendario `ci` (None si no cotiza)."""
+    if a['idx'] is None:
+        i = ci - a['first']
+        return i if 0 <= i < a['n'] else None
+    return a['idx'].get(ci)
+
+
+def _local_rows(a, cis):
+    """_local_index vectorizado: barras locales en las posiciones `cis` (-1 = no cotiza)."""
+    if a['idx'] is None:
+        i = cis - a['first']
+        return np.where((i >= 0) & (i < a['n']), i, -1)
+    return np.array([a['idx'].get(int(ci), -1) for ci in cis], dtype=np.int64)
+
+
+def _leaders_by_date(A, cal, p, step, ci_range=None, rs_matrix=None, universe=None):
+    """_leaders_by_date_all restringido al universo point-in-time: con `universe`
+    (Membership de universe_store.py) cada fecha conserva solo los símbolos listados
+    ENTONCES con la capitalización mínima. El RS se rankea antes, entre todo el universo
+    líquido (la fuerza relativa es contra el mercado); la pertenencia decide qué nombres
+    son elegibles. Fechas anteriores al primer snapshot: sin filtro."""
+    for ci, T, rs in _leaders_by_date_all(A, cal, p, step, ci_range, rs_matrix):
+        if universe is not None:
+            m = universe.mask(rs.index, T)
+            if m is not None:
+                rs = rs[m]
+        yield ci, T, rs
+
+
+def _leaders_by_date_all(A, cal, p, step, ci_range=None, rs_matrix=None):
+    """Paso 1 del walk-forward, compartido por todas las estrategias: en cada fecha
+    (cada `step` sesiones) el RS del universo líquido. Genera (ci, fecha, rs Series).
+
+    Momentum y liquidez se calculan por SÍMBOLO para todas las fechas de la rejilla de
+    una vez (la mediana móvil del dólar-volumen con kernels.py: Numba si está instalado)
+    y luego se rankea fecha a fecha — mismos números que evaluarlo fecha a fecha.
+
+    Con `rs_matrix` (RSMatrix de rs_matrix.py, p. ej. store.rs_matrix()) no se calcula nada: el
+    RS de cada fecha se lee por índice — la definición del screener (redondeado a 0.1,
+    rankeado entre las líquidas con 6m de historia)."""
+    import pandas as pd
+    lw, mdv, mp, lb = p['liq_window'], p['min_dollar_vol'], p['min_price'], p['mom_lookback']
+    ci_start, ci_stop = ci_range or (290, len(cal) - 2)
+    cis = np.arange(ci_start, ci_stop, step)
+    if len(cis) == 0:
+        return
+    if rs_matrix is not None:
+        yield from _leaders_from_matrix(A, cal, rs_matrix, cis)
+        return
+    syms = np.array(list(A), dtype=object)
+    M = np.full((len(cis), len(syms)), np.nan)
+    K = np.zeros((len(cis), len(syms)), dtype=bool)
+    for j, a in enumerate(A.values()):
+        # 1) momentum del universo LÍQUIDO (point-in-time) → ranking percentil.
+        #    Mismo filtro que producción (dólar-volumen mediano + precio mínimo) pero
+        #    evaluado en CADA fecha sin look-ahead, para que el RS se calcule entre
+        #    nombres institucionales en ese momento, no contra microcaps que 'pop'ean.
+        i = _local_rows(a, cis)
+        ok = i >= 200
+        if not ok.any():
+            continue
+        c, v = a['c'], a['v']
+        i = np.where(ok, i, 200)
+        px, base = c[i], c[i - lb]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mom = px / base - 1
+            keep = ok & (base > 0)
+            if v is not None:
+                liq = ok & (i >= lw)
+                dollar = np.full(len(i), np.nan)
+                dollar[liq] = kernels.rolling_median_rows(c * v, i[liq], lw)
+                keep &= ~(liq & ((px < mp) | (dollar < mdv)))
+        M[:, j] = mom
+        K[:, j] = keep
+    for k, ci in enumerate(cis):
+        cols = np.flatnonzero(K[k])
+        if len(cols) < 50:
+            continue
+        yield ci, cal[ci], pd.Series(M[k, cols], index=syms[cols]).rank(pct=True) * 100
+
+
+def _leaders_from_matrix(A, cal, rsm, cis):
+    """_leaders_by_date leyendo la matriz RS: filas = fechas de la rejilla, columnas =
+    símbolos de A (los que la matriz no tiene no rankean)."""
+    import pandas as pd
+    syms = np.array(list(A), dtype=object)
+    jm = np.array([rsm.sym_idx.get(s, -1) for s in syms], dtype=np.int64)
+    have = np.flatnonzero(jm >= 0)
+    rows = rsm.rows(cal[cis].values)
+    for k in np.flatnonzero(rows >= 0):
+        _, rs = rsm.block([rows[k]])
+        vals = rs[0, jm[have]]
+        ok = ~np.isnan(vals)
+        if ok.sum() < 50:
+            continue
+        yield cis[k], cal[cis[k]], pd.Series(vals[ok], index=syms[have[ok]])
+
+
+def generate_momentum_signals(price_data, spy, step=5, params=None, evaluator=None, rs_floor=None,
+                              ci_range=None, seen=None, rs_matrix=None, universe=None):
     """
     Walk-forward sin look-ahead. En cada fecha:
       1) calcula el momentum 6m de todo el universo y lo convierte en percentil (RS),
@@ -336,49 +535,29 @@ def generate_momentum_signals(price_data, spy, step=5, params=None, evaluator=No
       3) emite la señal con stop bajo el mínimo del retroceso − 0.5·ATR.
     Devuelve DataFrame [symbol, date, sl].
 
+    `price_data`: dict[símbolo] -> DataFrame o PricePanel (modo compacto float32,
+    price_panel.py) — las señales coinciden con el camino float64 salvo redondeo.
+
     `evaluator` permite backtestear OTRA forma de entrada con el MISMO universo/liquidez
     point-in-time: por defecto `evaluate_entry` (pullback a MA50); pásale `evaluate_breakout`
     para validar la lista PRIMARIA de rupturas. `rs_floor` (por defecto `rs_min`) es el
     corte de RS del bucle externo — para rupturas conviene `breakout_rs_min` (90).
+
+    Backtest por tramos (chunked_backtest.py): `ci_range=(inicio, fin)` limita las
+    posiciones de calendario evaluadas (por defecto (290, len(cal)-2)) y `seen`
+    (símbolo -> posición de su última señal) se actualiza in situ para arrastrar el
+    cooldown de un tramo al siguiente. `rs_matrix`: RSMatrix precalculada (ver _leaders_by_date).
+    `universe`: Membership (universe_store.py) — solo entran los listados a cada fecha.
     """
+    import pandas as pd
     p = {**DEFAULTS, **(params or {})}
     evaluator = evaluator or evaluate_entry
     rs_floor = p['rs_min'] if rs_floor is None else rs_floor
-    cal = spy.index
-    A = {}
-    for s, d in price_data.items():
-        A[s] = dict(idx={ts: i for i, ts in enumerate(d.index)},
-                    h=d['High'].values.astype(float),
-                    l=d['Low'].values.astype(float),
-                    c=d['Close'].values.astype(float),
-                    v=(d['Volume'].values.astype(float) if 'Volume' in d.columns else None))
-    lw, mdv, mp = p['liq_window'], p['min_dollar_vol'], p['min_price']
-
-    seen, rows = {}, []
-    for ci in range(290, len(cal) - 2, step):
-        T = cal[ci]
-        # 1) momentum del universo LÍQUIDO (point-in-time) → ranking percentil.
-        #    Mismo filtro que producción (dólar-volumen mediano + precio mínimo) pero
-        #    evaluado en CADA fecha sin look-ahead, para que el RS se calcule entre
-        #    nombres institucionales en ese momento, no contra microcaps que 'pop'ean.
-        mom = {}
-        for s, a in A.items():
-            i = a['idx'].get(T)
-            if i is None or i < 200:
-                continue
-            c = a['c']
-            v = a['v']
-            if v is not None and i >= lw:
-                dollar = float(np.median(c[i - lw + 1:i + 1] * v[i - lw + 1:i + 1]))
-                if c[i] < mp or dollar < mdv:
-                    continue
-            base = c[i - p['mom_lookback']]
-            if base > 0:
-                mom[s] = c[i] / base - 1
-        if len(mom) < 50:
-            continue
-        rs = pd.Series(mom).rank(pct=True) * 100
+    A = _signal_arrays(price_data, spy.index)
 
+    seen = {} if seen is None else seen
+    rows = []
+    for ci, T, rs in _leaders_by_date(A, spy.index, p, step, ci_range, rs_matrix, universe):
         # 2) trigger en los líderes (lógica compartida con el screener de producción)
         for s, rs_val in rs.items():
             if rs_val < rs_floor:
@@ -386,7 +565,7 @@ def generate_momentum_signals(price_data, spy, step=5, params=None, evaluator=No
             if s in seen and ci - seen[s] < p['cooldown']:
                 continue
             a = A[s]
-            i = a['idx'][T]
+            i = _local_index(a, ci)
             sig = evaluator(a['c'], a['h'], a['l'], i, rs_val, p)
             if sig is None:
                 continue
@@ -394,3 +573,56 @@ def generate_momentum_signals(price_data, spy, step=5, params=None, evaluator=No
             rows.append(dict(symbol=s, date=str(T.date()), sl=sig['sl']))
 
     return pd.DataFrame(rows)
+
+
+# Sleeves por defecto: las tres listas del screener como estrategias de cartera. El
+# 'watch' no trae stop propio → stop a `atr_stop` ATR bajo la entrada.
+SLEEVES = dict(
+    breakout=dict(evaluator=evaluate_breakout, rs_floor=DEFAULTS['breakout_rs_min']),
+    pullback=dict(evaluator=evaluate_entry, rs_floor=DEFAULTS['rs_min']),
+    watch=dict(evaluator=evaluate_watch, rs_floor=DEFAULTS['watch_rs_min'], atr_stop=2.0),
+)
+
+
+def generate_sleeve_signals(price_data, spy, sleeves=None, step=5, params=None, ci_range=None,
+                            seen=None, rs_matrix=None, universe=None):
+    """Señales de VARIAS estrategias (sleeves) en un solo walk-forward: el RS y la
+    liquidez de cada fecha se calculan una vez y se pasan a todos los evaluadores.
+    `sleeves`: dict nombre -> dict(evaluator, rs_floor, params (overrides), atr_stop).
+    El cooldown es por sleeve (`seen`: nombre -> {símbolo: ci}). Devuelve DataFrame
+    [symbol, date, sl, sleeve] — con un solo sleeve, las mismas señales que
+    generate_momentum_signals con ese evaluador y rs_floor. `rs_matrix`: RSMatrix precalculada;
+    `universe`: Membership point-in-time (universe_store.py)."""
+    import pandas as pd
+    sleeves = sleeves or SLEEVES
+    p = {**DEFAULTS, **(params or {})}
+    specs = {name: dict(evaluator=sp.get('evaluator') or evaluate_entry,
+                        p={**p, **(sp.get('params') or {})},
+                        floor=sp.get('rs_floor', p['rs_min']), atr_stop=sp.get('atr_stop', 2.0))
+             for name, sp in sleeves.items()}
+    floor = min(sp['floor'] for sp in specs.values())
+    A = _signal_arrays(price_data, spy.index)
+    seen = {} if seen is None else seen
+    for name in specs:
+        seen.setdefault(name, {})
+    rows = []
+    for ci, T, rs in _leaders_by_date(A, spy.index, p, step, ci_range, rs_matrix, universe):
+        leaders = rs[rs >= floor]
+        for name, sp in specs.items():
+            sn = seen[name]
+            for s, rs_val in leaders.items():
+                if rs_val < sp['floor'] or (s in sn and ci - sn[s] < sp['p']['cooldown']):
+                    continue
+                a = A[s]
+                i = _local_index(a, ci)
+                sig = sp['evaluator'](a['c'], a['h'], a['l'], i, rs_val, sp['p'])
+                if sig is None:
+                    continue
+                sl = sig.get('sl')
+                if sl is None:
+                    if not sig.get('atr'):
+                        continue
+                    sl = round(sig['entry'] - sp['atr_stop'] * sig['atr'], 4)
+                sn[s] = ci
+                rows.append(dict(symbol=s, date=str(T.date()), sl=sl, sleeve=name))
+    return pd.DataFrame(rows, columns=['symbol', 'date', 'sl', 'sleeve'])
@@ -0,0 +1,174 @@
+# momentum_vectorized.py — Evaluadores VECTORIZADOS (muchas barras de un símbolo a la vez)
+#
+# Misma lógica que evaluate_breakout / evaluate_entry / evaluate_watch de
+# momentum_strategy.py, pero evaluada de golpe sobre un array de barras `idx` del
+# símbolo (p.ej. todas las sesiones de un año en el replay del screener) en vez de
+# barra a barra. Cada ventana (MA50/MA200, máximo 52s, base, ATR...) se calcula solo en
+# las barras pedidas, con vistas deslizantes (sin copias) y las MISMAS reducciones que
+# la versión escalar → mismos resultados (incluido el redondeo de los campos de salida).
+#
+# Devuelven una lista de (k, dict) con la posición k en `idx` de cada señal y el MISMO
+# dict que devolvería el evaluador escalar en esa barra.
+#
+# Las entradas (medias, máximos, base, ATR...) salen del grafo de features
+# (feature_graph.py): con `features` (un FeatureSet del símbolo sobre las barras ≥252
+# de `idx`) los tres detectores comparten lo que calculan; sin él cada uno crea el suyo.
+#
+# Incluye también el ranking percentil (RS) por filas en NumPy puro, equivalente a
+# pandas `rank(pct=True)` (empates promediados).
+
+import numpy as np
+
+from feature_graph import MIN_BAR, FeatureSet
+from momentum_strategy import DEFAULTS
+
+
+def _select(idx, rs, rs_min):
+    idx = np.asarray(idx, dtype=np.int64)
+    rs = np.asarray(rs, dtype=np.float64)
+    keep = np.flatnonzero((rs >= rs_min) & (idx >= MIN_BAR))
+    return keep, idx[keep]
+
+
+def _features(c, h, l, i, features):
+    return FeatureSet(c, h, l, i) if features is None else features.at(i)
+
+
+def evaluate_breakout_many(c, h, l, idx, rs, params=None, features=None):
+    """evaluate_breakout en las barras `idx` (con su RS en `rs`). Lista de (k, dict)."""
+    p = {**DEFAULTS, **(params or {})}
+    keep, i = _select(idx, rs, p['breakout_rs_min'])
+    if len(i) == 0:
+        return []
+    f = _features(c, h, l, i, features)
+    px, ma50, ma200 = f('px'), f('ma50'), f('ma200')
+    ok = f('trend').copy()
+    max_ext = p.get('breakout_max_ext_ma50')
+    if max_ext is not None:
+        ok &= ~(px > ma50 * (1 + max_ext))
+    bw, lead = p['breakout_base_window'], p['breakout_lead']
+    base_hi = f('base_hi', bw, lead)
+    base_lo = f('base_lo', bw, lead)
+    ok &= base_lo > 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ok &= ~((base_hi - base_lo) / base_lo > p['breakout_base_max_range'])
+    hi52 = f('hi52')
+    ok &= ~(base_hi < hi52 * (1 - p['breakout_base_near_high']))
+    ok &= ~(c[i - lead] > base_hi)
+    ok &= px > base_hi
+    at = f('atr', p['atr_period'])
+    ok &= np.isfinite(at) & (at > 0)
+    hw = p['breakout_hold_window']
+    recent_low = f('lmin', hw, hw + 1)
+    ok &= ~(recent_low < base_hi - p['breakout_hold_atr'] * at)
+    anchor = (np.minimum(recent_low, base_hi) if p.get('breakout_stop_ref', 'hybrid') == 'hybrid'
+              else base_hi)
+    sl = anchor - p['breakout_stop_atr'] * at
+    with np.errstate(divide='ignore', invalid='ignore'):
+        risk = (px - sl) / px
+    r1m = f('r1m')
+    ok &= (risk > 0) & (risk <= p['max_risk_pct'])
+    ok &= r1m > p['breakout_min_r1m']
+    retested = recent_low <= base_hi * (1 + p['retest_margin'])
+
+    out = []
+    for k in np.flatnonzero(ok):
+        x, ph = px[k], float(base_hi[k])
+        out.append((int(keep[k]), dict(
+            signal=True, entry=float(x), sl=round(float(sl[k]), 4),
+            risk_pct=round(float(risk[k]) * 100, 2),
+            breakout_level=round(ph, 2),
+            pct_above_breakout=round((x / ph - 1) * 100, 1),
+            ma50=round(float(ma50[k]), 2), ma200=round(float(ma200[k]), 2),
+            hi52=round(float(hi52[k]), 2),
+            pct_from_high=round((x / hi52[k] - 1) * 100, 1),
+            r1m=round(float(r1m[k]) * 100, 1),
+            retested=bool(retested[k]))))
+    return out
+
+
+def evaluate_entry_many(c, h, l, idx, rs, params=None, features=None):
+    """evaluate_entry (pullback a MA50) en las barras `idx`. Lista de (k, dict)."""
+    p = {**DEFAULTS, **(params or {})}
+    keep, i = _select(idx, rs, p['rs_min'])
+    if len(i) == 0:
+        return []
+    f = _features(c, h, l, i, features)
+    px, ma50, ma200 = f('px'), f('ma50'), f('ma200')
+    ok = f('trend').copy()
+    hi52 = f('hi52', False)
+    ok &= ~((px > hi52) | (px < hi52 * (1 - p['near_high_max_below'])))
+    sw = p['swing_window']
+    low_sw = f('lmin', sw, sw)
+    touched = (ma50 * (1 - p['pullback_floor']) <= low_sw) & (low_sw <= ma50 * (1 + p['pullback_touch']))
+    bounce = (px > ma50) & (c[i] > c[i - 1]) & (px <= ma50 * (1 + p['not_extended']))
+    ok &= touched & bounce
+    at = f('atr', p['atr_period'])
+    ok &= np.isfinite(at) & (at > 0)
+    sl = low_sw - 0.5 * at
+    with np.errstate(divide='ignore', invalid='ignore'):
+        risk = (px - sl) / px
+    ok &= (risk > 0) & (risk <= p['max_risk_pct'])
+
+    out = []
+    for k in np.flatnonzero(ok):
+        x = px[k]
+        out.append((int(keep[k]), dict(
+            signal=True, entry=float(x), sl=round(float(sl[k]), 4),
+            risk_pct=round(float(risk[k]) * 100, 2), ma50=round(float(ma50[k]), 2),
+            ma200=round(float(ma200[k]), 2), hi52=round(float(hi52[k]), 2),
+            pct_from_high=round((x / hi52[k] - 1) * 100, 1),
+            trailing_stop_pct=round(p.get('trailing_stop_pct', 32.0), 1))))
+    return out
+
+
+def evaluate_watch_many(c, h, l, idx, rs, params=None, features=None):
+    """evaluate_watch (a vigilar / en testeo) en las barras `idx`. Lista de (k, dict)."""
+    p = {**DEFAULTS, **(params or {})}
+    keep, i = _select(idx, rs, p['watch_rs_min'])
+    if len(i) == 0:
+        return []
+    f = _features(c, h, l, i, features)
+    px, ma50, ma200 = f('px'), f('ma50'), f('ma200')
+    ok = f('trend').copy()
+    hi52 = f('hi52')
+    ww = p['watch_high_window']
+    hi_recent = f('hmax', ww, ww + 1)
+    ok &= ~(hi_recent < hi52 * (1 - p['watch_near_high']))
+    pulled = px <= hi_recent * (1 - p['watch_pullback_min'])
+    above_ma50 = px > ma50 * (1 + p['watch_ma50_buffer'])
+    near_zone = px <= ma50 * (1 + p['watch_max_ext_ma50'])
+    ok &= pulled & above_ma50 & near_zone
+    at = f('atr', p['atr_period'])
+
+    out = []
+    for k in np.flatnonzero(ok):
+        x = px[k]
+        out.append((int(keep[k]), dict(
+            signal=True, entry=float(x),
+            recent_high=round(float(hi_recent[k]), 2),
+            pct_from_recent_high=round((x / hi_recent[k] - 1) * 100, 1),
+            ma50=round(float(ma50[k]), 2), ma200=round(float(ma200[k]), 2),
+            hi52=round(float(hi52[k]), 2),
+            pct_from_high=round((x / hi52[k] - 1) * 100, 1),
+            ext_ma50_pct=round((x / ma50[k] - 1) * 100, 1),
+            atr=round(float(at[k]), 2) if np.isfinite(at[k]) else None)))
+    return out
+
+
+def rank_pct(values, valid):
+    """Percentil (0-100) por FILA entre las celdas válidas, empates promediados: igual
+    que pandas `rank(pct=True) * 100` fila a fila. NaN donde la celda no es válida."""
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(values.shape, np.nan)
+    for r in range(values.shape[0]):
+        m = valid[r]
+        n = int(m.sum())
+        if n == 0:
+            continue
+        v = values[r, m]
+        srt = np.sort(v)
+        left = np.searchsorted(srt, v, 'left')
+        right = np.searchsorted(srt, v, 'right')
+        out[r, m] = (left + right + 1) / 2 / n * 100
+    return out
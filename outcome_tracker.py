@@ -0,0 +1,238 @@
+# outcome_tracker.py — Seguimiento INCREMENTAL de lo que hicieron los candidatos publicados
+#
+# Cada candidato archivado (results_archive.py: rupturas, pullbacks y a vigilar) abre una
+# ventana de observación de 63 sesiones desde su publicación. En cada ejecución diaria
+# solo se procesan las barras NUEVAS de las ventanas ABIERTAS (trabajo O(abiertas), no
+# O(historia)), leyendo precios del almacén local (data_store.py), sin re-descargar:
+#   - retorno a 5/21/63 sesiones (último cierre conocido / precio de publicación − 1),
+#   - MFE (máxima excursión favorable: máximo alto desde la publicación / precio − 1),
+#   - si se tocó el stop publicado (`sl`) y en qué sesión.
+# Al cumplir 63 sesiones la ventana se cierra y no se vuelve a tocar.
+# Splits/dividendos: DataStore.merge re-escala la historia vieja del almacén; cada ventana
+# guarda el cierre del panel en su sesión de publicación (`pub_close`) y, si al volver a
+# leerlo ha cambiado, pasa entrada, stop, último cierre y máximo a la escala nueva antes
+# de procesar barras nuevas.
+#
+#   data_store/outcomes/state.pkl   una fila por (fecha, lista, símbolo) + última
+#                                   sesión procesada y acumulados (máximo, último cierre,
+#                                   cierre de publicación en la escala del panel)
+#
+# `hit_rate_tables` resume por lista y tramo de score (rupturas) las tasas de acierto que
+# muestra el dashboard (build_dashboard → "track_record").
+#
+# Uso:
+#   python outcome_tracker.py            # actualizar y mostrar las tablas
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_store import DataStore
+from results_archive import ResultsArchive, LISTS
+
+
+HORIZONS = (5, 21, 63)
+DEFAULT_PATH = os.path.join('data_store', 'outcomes', 'state.pkl')
+# Tramos de score de las rupturas (score_breakout, 0-100); pullbacks y a vigilar no
+# tienen score → un único tramo 'todas'.
+SCORE_BUCKETS = (0, 50, 60, 70, 80, 101)
+
+
+def _empty_state():
+    cols = dict(date='datetime64[ns]', list=object, symbol=object, rank=np.int32,
+                score=np.float64, entry=np.float64, sl=np.float64, last=np.float64,
+                run_max=np.float64, pub_close=np.float64, age=np.int32, sl_hit_age=np.float64,
+                closed=bool, last_date='datetime64[ns]')
+    for h in HORIZONS:
+        cols[f'ret_{h}'] = np.float64
+        cols[f'mfe_{h}'] = np.float64
+    return pd.DataFrame({c: pd.Series(dtype=t) for c, t in cols.items()})
+
+
+class OutcomeTracker:
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self.state = pd.read_pickle(path) if os.path.exists(path) else _empty_state()
+        if 'pub_close' not in self.state:                 # estados anteriores al re-escalado
+            self.state['pub_close'] = np.nan
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp = self.path + '.tmp'
+        self.state.to_pickle(tmp)
+        os.replace(tmp, self.path)
+
+    # --- Altas: sesiones archivadas que aún no están en el estado ---
+    def ingest(self, archive):
+        seen = self.state['date'].max() if len(self.state) else None
+        start = None if seen is None or pd.isna(seen) else seen + pd.Timedelta(days=1)
+        frames = []
+        for name in LISTS:
+            df = archive.query(name, start=start, columns=['symbol', 'rank', 'score', 'entry', 'sl'])
+            if df.empty:
+                continue
+            for c in ('score', 'sl'):
+                if c not in df:
+                    df[c] = np.nan
+            frames.append(df.assign(list=name))
+        if not frames:
+            return 0
+        new = pd.concat(frames, ignore_index=True)
+        new = new.assign(rank=new['rank'].astype(np.int32),
+                         score=new['score'].astype(np.float64), sl=new['sl'].astype(np.float64),
+                         last=np.nan, run_max=np.nan, pub_close=np.nan, age=np.int32(0),
+                         sl_hit_age=np.nan, closed=False, last_date=new['date'])
+        for h in HORIZONS:
+            new[f'ret_{h}'] = np.nan
+            new[f'mfe_{h}'] = np.nan
+        self.state = pd.concat([self.state, new[self.state.columns]], ignore_index=True)
+        return len(new)
+
+    # --- Avance de las ventanas abiertas con las barras nuevas del almacén ---
+    def update(self, panel):
+        """Procesa, para cada ventana abierta, las sesiones del panel posteriores a su
+        última sesión procesada (hasta cumplir max(HORIZONS)). Devuelve nº de ventanas tocadas."""
+        st = self.state
+        open_ = np.flatnonzero(~st['closed'].values)
+        if len(open_) == 0:
+            return 0
+        cal = pd.DatetimeIndex(panel.dates)
+        jcol = np.array([panel.sym_idx.get(s, -1) for s in st['symbol'].values[open_]])
+        has = jcol >= 0
+        open_, jcol = open_[has], jcol[has]
+        if len(open_) == 0:
+            return 0
+        pub = cal.searchsorted(st['date'].values[open_])
+        # Última sesión ya procesada de cada ventana (al alta: la de publicación).
+        done = np.maximum(cal.searchsorted(st['last_date'].values[open_], 'right') - 1, pub)
+        stop_at = np.minimum(pub + max(HORIZONS), len(cal) - 1)
+        todo = stop_at > done
+        C, H, L = panel.arrays['c'], panel.arrays['h'], panel.arrays['l']
+
+        # Ajuste retroactivo desde la última pasada: el cierre de publicación ya no es el
+        # que vimos → todos los precios absolutos de la ventana a la escala actual.
+        ref = C[np.minimum(pub, len(cal) - 1), jcol].astype(np.float64)
+        seen = st['pub_close'].values[open_]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            adj = np.where((seen > 0) & (ref > 0), ref / seen, 1.0)
+        adj = np.where(np.abs(adj - 1) > 1e-4, adj, 1.0)
+        pub_close = np.where(ref > 0, ref, seen)
+        if not todo.any() and (adj == 1).all():
+            return 0
+
+        entry = st['entry'].values[open_] * adj
+        sl = st['sl'].values[open_] * adj
+        last = st['last'].values[open_] * adj
+        run_max = st['run_max'].values[open_] * adj
+        hit = st['sl_hit_age'].values[open_].copy()
+        rets = {h: st[f'ret_{h}'].values[open_].copy() for h in HORIZONS}
+        mfes = {h: st[f'mfe_{h}'].values[open_].copy() for h in HORIZONS}
+        age = st['age'].values[open_].copy()
+
+        for t in range(int(done[todo].min()) + 1, int(stop_at.max()) + 1):
+            m = (t > done) & (t <= stop_at)
+            if not m.any():
+                continue
+            j = jcol[m]
+            c = C[t, j].astype(np.float64)
+            last[m] = np.where(np.isnan(c), last[m], c)
+            run_max[m] = np.fmax(run_max[m], H[t, j].astype(np.float64))
+            a = t - pub[m]
+            age[m] = a
+            with np.errstate(invalid='ignore'):
+                newly = np.isnan(hit[m]) & (L[t, j] <= sl[m])
+            hm = hit[m]
+            hm[newly] = a[newly]
+            hit[m] = hm
+            for h in HORIZONS:
+                at = a == h
+                if at.any():
+                    sel = np.flatnonzero(m)[at]
+                    rets[h][sel] = last[sel] / entry[sel] - 1
+                    mfes[h][sel] = run_max[sel] / entry[sel] - 1
+
+        st.loc[st.index[open_], 'entry'] = entry
+        st.loc[st.index[open_], 'sl'] = sl
+        st.loc[st.index[open_], 'pub_close'] = pub_close
+        st.loc[st.index[open_], 'last'] = last
+        st.loc[st.index[open_], 'run_max'] = run_max
+        st.loc[st.index[open_], 'sl_hit_age'] = hit
+        st.loc[st.index[open_], 'age'] = age.astype(np.int32)
+        ld = st['last_date'].values[open_].copy()
+        ld[todo] = cal[stop_at[todo]].values
+        st.loc[st.index[open_], 'last_date'] = ld
+        st.loc[st.index[open_], 'closed'] = (stop_at - pub >= max(HORIZONS)) & todo
+        for h in HORIZONS:
+            st.loc[st.index[open_], f'ret_{h}'] = rets[h]
+            st.loc[st.index[open_], f'mfe_{h}'] = mfes[h]
+        return int(todo.sum())
+
+
+def hit_rate_tables(state, horizons=HORIZONS):
+    """dict lista -> lista de filas {bucket, n, y por horizonte: n, % positivos, retorno
+    medio, MFE mediano, % stop tocado}. Solo cuentan ventanas que alcanzaron el horizonte."""
+    out = {}
+    for name in LISTS:
+        df = state[state['list'] == name]
+        if df.empty:
+            out[name] = []
+            continue
+        if name == 'breakouts':
+            labels = [f'{a}-{min(b, 100)}' for a, b in zip(SCORE_BUCKETS[:-1], SCORE_BUCKETS[1:])]
+            bucket = pd.cut(df['score'], SCORE_BUCKETS, right=False, labels=labels)
+        else:
+            bucket = pd.Series('todas', index=df.index)
+        rows = []
+        for b, g in df.groupby(bucket, observed=True, sort=True):
+            row = dict(bucket=str(b), n=int(len(g)))
+            for h in horizons:
+                r = g[f'ret_{h}'].dropna()
+                if r.empty:
+                    continue
+                hit = g.loc[r.index, 'sl_hit_age']
+                row[f'{h}d'] = dict(
+                    n=int(len(r)),
+                    win_pct=round(float((r > 0).mean() * 100), 1),
+                    avg_ret_pct=round(float(r.mean() * 100), 2),
+                    med_mfe_pct=round(float(g.loc[r.index, f'mfe_{h}'].median() * 100), 2),
+                    sl_hit_pct=(round(float((hit <= h).mean() * 100), 1)
+                                if g.loc[r.index, 'sl'].notna().any() else None))
+            rows.append(row)
+        out[name] = rows
+    return out
+
+
+def update_outcomes(store=None, archive=None, path=DEFAULT_PATH):
+    """Una ejecución diaria: altas de las sesiones nuevas + avance de ventanas abiertas.
+    Devuelve (tracker, tablas de acierto)."""
+    store = store or DataStore()
+    archive = archive or ResultsArchive(store.path('results'))
+    tracker = OutcomeTracker(path)
+    n_new = tracker.ingest(archive)
+    n_upd = tracker.update(store.panel()) if store.exists() else 0
+    tracker.save()
+    n_open = int((~tracker.state['closed']).sum())
+    print(f"Seguimiento: {n_new} candidatos nuevos, {n_upd} ventanas actualizadas, "
+          f"{n_open} abiertas / {len(tracker.state)} totales")
+    return tracker, hit_rate_tables(tracker.state)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--store', default='data_store')
+    ap.add_argument('--state', default=DEFAULT_PATH)
+    args = ap.parse_args()
+    _, tables = update_outcomes(DataStore(args.store), path=args.state)
+    for name, rows in tables.items():
+        print(f"\n{name}:")
+        for row in rows:
+            cells = '  '.join(f"{h}d n={row[f'{h}d']['n']} acierto={row[f'{h}d']['win_pct']}% "
+                              f"ret={row[f'{h}d']['avg_ret_pct']}%"
+                              for h in HORIZONS if f'{h}d' in row)
+            print(f"  {row['bucket']:<8} n={row['n']:<5} {cells}")
+
+
+if __name__ == "__main__":
+    main()
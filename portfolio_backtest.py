@@ -2,20 +2,28 @@
 #
 # Separa la GENERACIÓN DE SEÑALES (la estrategia) de la SIMULACIÓN DE CAPITAL.
 # Cualquier estrategia futura solo tiene que producir un DataFrame de señales con
-# columnas: symbol, date (fecha de señal), sl (stop loss inicial). El motor:
+# columnas: symbol, date (fecha de señal), sl (stop loss inicial) y opcionalmente
+# sleeve (varias estrategias sobre la misma caja, con presupuesto por sleeve). El motor:
 #   - entra en la apertura del día siguiente a la señal,
 #   - dimensiona la posición por riesgo (% de equity arriesgado hasta el SL),
-#   - respeta un nº máximo de posiciones simultáneas y un tope por posición,
-#   - gestiona la salida con trailing stop (configurable),
+#   - respeta un nº máximo de posiciones simultáneas y un tope por posición (y, si se
+#     configuran, límites por sector / correlación / volatilidad: portfolio_risk.py),
+#   - gestiona la salida con trailing stop (configurable); con los recorridos de las
+#     señales precalculados (trade_paths.py) solo resuelve caja, límites y filtro de
+#     mercado: re-simular con otra config de cartera es casi gratis,
 #   - calcula curva de equity, CAGR, max drawdown, Sharpe, exposición,
 #   - y compara contra comprar-y-mantener SPY sobre el mismo capital y periodo.
 #
 # Para probar una NUEVA forma de inversión: genera tus señales (con la lógica que
 # sea) en ese formato y llama a run_portfolio_backtest(). El motor no sabe ni le
 # importa cómo se generaron.
+#
+# Importarlo no carga pandas: el bucle diario (simulate_days y piezas) es Python/NumPy
+# sobre arrays; pandas entra en las funciones que reciben o devuelven DataFrames.
 
 import numpy as np
-import pandas as pd
+
+from portfolio_risk import EntryGate
 
 
 DEFAULT_CONFIG = dict(
@@ -29,18 +37,54 @@ DEFAULT_CONFIG = dict(
     min_position_value=200.0,  # no abrir posiciones ridículas
     market_filter_ma=None,     # si se fija (p.ej. 200): cierra TODA la cartera y no entra
                                # mientras el SPY esté bajo su MA(N). Protege drawdown.
+    # Límites de concentración al ENTRAR (portfolio_risk.py); None = sin límite.
+    max_per_sector=None,       # máx. posiciones por sector (requiere `sectors`)
+    sectors=None,              # dict símbolo -> sector (MarketData.symbol_sectors())
+    max_pair_corr=None,        # no entrar si correlaciona > X con alguna posición (p.ej. 0.8)
+    max_portfolio_vol=None,    # presupuesto de volatilidad anualizada de la cartera (p.ej. 0.25)
+    corr_window=63,            # sesiones de la covarianza móvil
+    # Varias estrategias con caja COMPARTIDA (señales con columna `sleeve`,
+    # generate_sleeve_signals): dict sleeve -> dict(risk_per_trade_pct, max_positions,
+    # budget_pct = tope de equity invertida en ese sleeve, a coste). None = un solo flujo.
+    sleeves=None,
 )
 
 
-def _prepare_arrays(price_data, symbols):
-    """Pre-indexa cada símbolo para acceso O(1) por fecha en el bucle diario."""
+def _date_index(dates, cal, cal_ts):
+    """{Timestamp: fila}. Construir un Timestamp por barra y símbolo era casi todo el coste
+    de preparar el backtest: con el calendario se reutilizan sus Timestamps (get_indexer
+    vectorizado); las fechas fuera de calendario caen al camino de siempre."""
+    if cal is not None:
+        pos = cal.get_indexer(dates)
+        if (pos >= 0).all():
+            return dict(zip([cal_ts[p] for p in pos], range(len(pos))))
+    return {ts: i for i, ts in enumerate(dates)}
+
+
+def _prepare_arrays(price_data, symbols, cal=None):
+    """Pre-indexa cada símbolo para acceso O(1) por fecha en el bucle diario.
+    Acepta también un PricePanel (price_panel.py): usa sus vistas, sin copias float64.
+    `cal` (DatetimeIndex del benchmark) es opcional: solo acelera el índice por fecha."""
     arr = {}
+    cal_ts = list(cal) if cal is not None else None
+    if hasattr(price_data, 'series'):
+        import pandas as pd
+        for s in symbols:
+            if s not in price_data:
+                continue
+            a = price_data.series(s)
+            dates = pd.DatetimeIndex(price_data.dates[price_data.rows(s)])
+            if len(dates) == 0:
+                continue
+            arr[s] = dict(idx=_date_index(dates, cal, cal_ts),
+                          o=a['o'], h=a['h'], l=a['l'], c=a['c'], dates=dates)
+        return arr
     for s in symbols:
         d = price_data.get(s)
         if d is None or d.empty:
             continue
         arr[s] = dict(
-            idx={ts: i for i, ts in enumerate(d.index)},
+            idx=_date_index(d.index, cal, cal_ts),
             o=d['Open'].values.astype(float),
             h=d['High'].values.astype(float),
             l=d['Low'].values.astype(float),
@@ -50,47 +94,96 @@ def _prepare_arrays(price_data, symbols):
     return arr
 
 
-def run_portfolio_backtest(signals, price_data, spy, config=None):
+def run_portfolio_backtest(signals, price_data, spy, config=None, paths=None):
     """
     signals:    DataFrame con columnas symbol, date, sl (stop inicial).
-    price_data: dict[symbol] -> DataFrame con Open/High/Low/Close indexado por fecha.
+    price_data: dict[symbol] -> DataFrame con Open/High/Low/Close indexado por fecha
+                (o un PricePanel con campo Open).
     spy:        DataFrame del benchmark (Open/High/Low/Close) — define el calendario.
+    paths:      TradePaths (trade_paths.py) de estas señales (o de un superconjunto):
+                reutiliza sus arrays y las salidas precalculadas de la regla de `config`.
     Devuelve dict con equity_curve (Series), trades (DataFrame) y metrics (dict).
     """
+    import pandas as pd
     cfg = {**DEFAULT_CONFIG, **(config or {})}
+    if cfg.get('sleeves') is not None and 'sleeve' not in signals.columns:
+        raise ValueError("config['sleeves'] requiere señales con columna 'sleeve' "
+                         "(generate_sleeve_signals); sin ella no se abriría ninguna posición")
     cal = spy.index
     cal_pos = {ts: i for i, ts in enumerate(cal)}
 
     sig = signals.copy()
     sig['date'] = pd.to_datetime(sig['date'])
-    arr = _prepare_arrays(price_data, sig['symbol'].unique())
-
-    # Mapear cada señal a su fecha de ENTRADA (apertura del día siguiente en el calendario)
-    entries_by_day = {}
-    for _, r in sig.iterrows():
-        d = r['date']
-        if d not in cal_pos:
-            # alinear a la siguiente fecha del calendario
-            future = cal[cal > d]
-            if len(future) == 0:
-                continue
-            d = future[0]
-        ci = cal_pos[d]
-        if ci + 1 >= len(cal):
-            continue
-        entry_day = cal[ci + 1]
-        entries_by_day.setdefault(entry_day, []).append(dict(symbol=r['symbol'], sl=float(r['sl'])))
+    arr = paths.arr if paths is not None else _prepare_arrays(price_data, sig['symbol'].unique(), cal)
+    entries_by_day = add_entries({}, sig, cal, cal_pos)
+    market_ok_by_day = market_filter(spy, cfg)
+
+    state = new_state(cfg)
+    trades, equity_curve = [], []
+    simulate_days(cal, state, cfg, arr, entries_by_day, market_ok_by_day, cal_pos,
+                  trades, equity_curve, exits=None if paths is None else paths.exits(cfg))
+    liquidate_all(state, cal[-1], cfg, arr, cal_pos, trades)
+
+    eq = pd.Series(dict(equity_curve)).sort_index()
+    trades_df = pd.DataFrame(trades)
+    metrics = compute_metrics(eq, spy, trades_df, cfg)
+    if state['gate'] is not None:
+        metrics['entries_rejected'] = dict(state['gate'].rejected)
+    if 'sleeve' in trades_df.columns:
+        metrics['by_sleeve'] = sleeve_metrics(trades_df)
+    return dict(equity_curve=eq, trades=trades_df, metrics=metrics, config=cfg)
+
+
+# ── Piezas del simulador (las reutiliza el backtest por tramos: chunked_backtest.py) ──
+
+def add_entries(entries_by_day, sig, cal, cal_pos):
+    """Mapea cada señal a su fecha de ENTRADA (apertura del día siguiente en el
+    calendario) y la añade a `entries_by_day` (dict día -> [dict(symbol, sl)]).
+    Una señal fuera del calendario se alinea a la siguiente fecha del calendario
+    (searchsorted); sin sesión siguiente, se descarta."""
+    ci = cal.searchsorted(sig['date'].values, 'left')
+    ok = np.flatnonzero(ci + 1 < len(cal))
+    if len(ok) == 0:
+        return entries_by_day
+    syms, sls = sig['symbol'].values[ok], sig['sl'].values[ok]
+    sleeves = sig['sleeve'].values[ok] if 'sleeve' in sig.columns else None
+    for k, day in enumerate(cal[ci[ok] + 1]):
+        e = dict(symbol=syms[k], sl=float(sls[k]))
+        if sleeves is not None:
+            e['sleeve'] = sleeves[k]
+        entries_by_day.setdefault(day, []).append(e)
+    return entries_by_day
 
-    # Filtro de mercado opcional: SPY sobre/bajo su MA(N)
-    market_ok_by_day = None
-    if cfg.get('market_filter_ma'):
-        spy_ma = spy['Close'].rolling(int(cfg['market_filter_ma'])).mean()
-        market_ok_by_day = (spy['Close'] >= spy_ma)
 
-    cash = cfg['initial_capital']
-    positions = []   # dicts: symbol, shares, entry, stop, peak, entry_day
-    trades = []
-    equity_curve = []
+def market_filter(spy, cfg):
+    """Filtro de mercado opcional: Series día -> SPY sobre/bajo su MA(N) (o None)."""
+    if not cfg.get('market_filter_ma'):
+        return None
+    spy_ma = spy['Close'].rolling(int(cfg['market_filter_ma'])).mean()
+    return spy['Close'] >= spy_ma
+
+
+def new_state(cfg):
+    """Estado de la cartera que se arrastra entre tramos: caja + posiciones abiertas
+    (+ los límites de concentración con su covarianza móvil, si se configuran)."""
+    return dict(cash=cfg['initial_capital'], positions=[],   # posiciones: symbol, shares, entry, stop, peak, entry_day
+                gate=EntryGate(cfg) if EntryGate.wanted(cfg) else None)
+
+
+def simulate_days(days, state, cfg, arr, entries_by_day, market_ok_by_day, cal_pos,
+                  trades, equity_curve, exits=None):
+    """Bucle diario de la cartera sobre `days`. Modifica `state` in situ y añade los
+    trades cerrados y los puntos de equity a las listas recibidas. `exits` (de
+    TradePaths.exits con la regla de `cfg`): las posiciones con recorrido precalculado
+    salen ese día a ese precio sin recorrer sus barras; las demás, barra a barra.
+    Con `cfg['sleeves']` toda entrada debe traer su sleeve (ValueError si no)."""
+    cash = state['cash']
+    positions = state['positions']
+    gate = state.get('gate')
+    sleeves = cfg.get('sleeves')
+    if sleeves is not None and any('sleeve' not in e for es in entries_by_day.values() for e in es):
+        raise ValueError("config['sleeves'] requiere señales con columna 'sleeve' "
+                         "(generate_sleeve_signals); sin ella no se abriría ninguna posición")
 
     def price_at(sym, day, field):
         a = arr.get(sym)
@@ -98,7 +191,7 @@ def run_portfolio_backtest(signals, price_data, spy, config=None):
             return None
         return a[field][a['idx'][day]]
 
-    for day in cal:
+    for day in days:
         # ── 1. Gestionar posiciones abiertas (salidas + trailing) ──────────────
         still_open = []
         for p in positions:
@@ -111,7 +204,11 @@ def run_portfolio_backtest(signals, price_data, spy, config=None):
             held = cal_pos[day] - cal_pos[p['entry_day']]
 
             exit_price = None
-            if lo <= p['stop']:
+            path = p.get('path')
+            if path is not None:
+                if cal_pos[day] == path[0]:
+                    exit_price = path[1]
+            elif lo <= p['stop']:
                 # gap a la baja: si abre bajo el stop, sale en la apertura
                 exit_price = op if op <= p['stop'] else p['stop']
             elif held >= cfg['max_hold_days']:
@@ -121,13 +218,14 @@ def run_portfolio_backtest(signals, price_data, spy, config=None):
                 proceeds = p['shares'] * exit_price * (1 - cfg['commission_pct'])
                 cash += proceeds
                 pnl = proceeds - p['cost_basis']
-                trades.append(dict(symbol=p['symbol'], entry_day=p['entry_day'], exit_day=day,
-                                   entry=p['entry'], exit=exit_price, shares=p['shares'],
-                                   pnl=pnl, ret_pct=(exit_price / p['entry'] - 1) * 100,
-                                   bars=held))
-            else:
+                trades.append(_tagged(p, dict(symbol=p['symbol'], entry_day=p['entry_day'], exit_day=day,
+                                               entry=p['entry'], exit=exit_price, shares=p['shares'],
+                                               pnl=pnl, ret_pct=(exit_price / p['entry'] - 1) * 100,
+                                               bars=held)))
+            elif path is None:
                 p['peak'] = max(p['peak'], hi)
                 p['stop'] = max(p['stop'], p['peak'] * (1 - cfg['trailing_pct']))
+            if exit_price is None:
                 still_open.append(p)
         positions = still_open
 
@@ -135,7 +233,7 @@ def run_portfolio_backtest(signals, price_data, spy, config=None):
         market_ok = True
         if market_ok_by_day is not None:
             mo = market_ok_by_day.get(day)
-            market_ok = bool(mo) if mo is not None and not pd.isna(mo) else True
+            market_ok = bool(mo) if mo is not None and mo == mo else True   # NaN → sin filtro
         if not market_ok and positions:
             survivors = []
             for p in positions:
@@ -145,11 +243,11 @@ def run_portfolio_backtest(signals, price_data, spy, config=None):
                     continue
                 proceeds = p['shares'] * px_c * (1 - cfg['commission_pct'])
                 cash += proceeds
-                trades.append(dict(symbol=p['symbol'], entry_day=p['entry_day'], exit_day=day,
-                                   entry=p['entry'], exit=px_c, shares=p['shares'],
-                                   pnl=proceeds - p['cost_basis'],
-                                   ret_pct=(px_c / p['entry'] - 1) * 100,
-                                   bars=cal_pos[day] - cal_pos[p['entry_day']]))
+                trades.append(_tagged(p, dict(symbol=p['symbol'], entry_day=p['entry_day'], exit_day=day,
+                                               entry=p['entry'], exit=px_c, shares=p['shares'],
+                                               pnl=proceeds - p['cost_basis'],
+                                               ret_pct=(px_c / p['entry'] - 1) * 100,
+                                               bars=cal_pos[day] - cal_pos[p['entry_day']])))
             positions = survivors
 
         # equity al inicio (para dimensionar) = cash + MTM
@@ -171,11 +269,24 @@ def run_portfolio_backtest(signals, price_data, spy, config=None):
             risk_per_share = entry - s['sl']
             if risk_per_share <= 0:
                 continue
-            risk_cap = cfg['risk_per_trade_pct'] * equity
+            sc = None
+            if sleeves is not None:
+                sc = sleeves.get(s.get('sleeve'))
+                if sc is None:
+                    continue                       # sleeve sin presupuesto configurado
+                mine = [p for p in positions if p.get('sleeve') == s['sleeve']]
+                if len(mine) >= sc.get('max_positions', cfg['max_positions']):
+                    continue
+            risk_cap = (sc or cfg).get('risk_per_trade_pct', cfg['risk_per_trade_pct']) * equity
             pos_value = risk_cap / risk_per_share * entry
             pos_value = min(pos_value, cfg['max_position_pct'] * equity, cash)
+            if sc is not None and sc.get('budget_pct') is not None:
+                used = sum(p['shares'] * p['entry'] for p in mine)
+                pos_value = min(pos_value, sc['budget_pct'] * equity - used)
             if pos_value < cfg['min_position_value']:
                 continue
+            if gate is not None and not gate.allow(s['symbol'], pos_value / equity, positions, equity, arr):
+                continue
             shares = pos_value / entry
             cost = shares * entry * (1 + cfg['commission_pct'])
             if cost > cash:
@@ -183,24 +294,53 @@ def run_portfolio_backtest(signals, price_data, spy, config=None):
             cash -= cost
             positions.append(dict(symbol=s['symbol'], shares=shares, entry=entry,
                                   stop=s['sl'], peak=entry, entry_day=day, cost_basis=cost))
+            if 'sleeve' in s:
+                positions[-1]['sleeve'] = s['sleeve']
+            if exits is not None:
+                path = exits.get((s['symbol'], day, s['sl']))
+                if path is not None:
+                    positions[-1]['path'] = path
 
         equity_curve.append((day, mtm()))
+        if gate is not None:
+            gate.end_of_day(day, positions, arr)
 
-    # Liquidar lo que quede al final (al último cierre)
-    last = cal[-1]
-    for p in positions:
-        c = price_at(p['symbol'], last, 'c') or p['entry']
-        proceeds = p['shares'] * c * (1 - cfg['commission_pct'])
-        cash += proceeds
-        trades.append(dict(symbol=p['symbol'], entry_day=p['entry_day'], exit_day=last,
-                           entry=p['entry'], exit=c, shares=p['shares'],
-                           pnl=proceeds - p['cost_basis'], ret_pct=(c / p['entry'] - 1) * 100,
-                           bars=cal_pos[last] - cal_pos[p['entry_day']]))
+    state['cash'] = cash
+    state['positions'] = positions
+    return state
 
-    eq = pd.Series(dict(equity_curve)).sort_index()
-    trades_df = pd.DataFrame(trades)
-    metrics = compute_metrics(eq, spy, trades_df, cfg)
-    return dict(equity_curve=eq, trades=trades_df, metrics=metrics, config=cfg)
+
+def _tagged(p, trade):
+    """El trade hereda el sleeve de la posición (si lo tiene)."""
+    if 'sleeve' in p:
+        trade['sleeve'] = p['sleeve']
+    return trade
+
+
+def sleeve_metrics(trades):
+    """Resumen por sleeve del log de trades: nº, % ganadores, P&L y profit factor."""
+    out = {}
+    for name, g in trades.groupby('sleeve', sort=True):
+        loss = -g.loc[g['pnl'] < 0, 'pnl'].sum()
+        out[name] = dict(n_trades=len(g), win_rate_pct=round((g['pnl'] > 0).mean() * 100, 1),
+                         pnl=round(g['pnl'].sum(), 0),
+                         profit_factor=round(g.loc[g['pnl'] > 0, 'pnl'].sum() / loss, 2) if loss > 0
+                         else float('inf'))
+    return out
+
+
+def liquidate_all(state, last, cfg, arr, cal_pos, trades):
+    """Liquidar lo que quede al final (al último cierre)."""
+    for p in state['positions']:
+        a = arr.get(p['symbol'])
+        c = (a['c'][a['idx'][last]] if a is not None and last in a['idx'] else None) or p['entry']
+        proceeds = p['shares'] * c * (1 - cfg['commission_pct'])
+        state['cash'] += proceeds
+        trades.append(_tagged(p, dict(symbol=p['symbol'], entry_day=p['entry_day'], exit_day=last,
+                                       entry=p['entry'], exit=c, shares=p['shares'],
+                                       pnl=proceeds - p['cost_basis'], ret_pct=(c / p['entry'] - 1) * 100,
+                                       bars=cal_pos[last] - cal_pos[p['entry_day']])))
+    state['positions'] = []
 
 
 def compute_metrics(eq, spy, trades, cfg):
@@ -269,6 +409,12 @@ def print_report(results):
         print(f"  Avg win / loss:     {m['avg_win_pct']:+.1f}% / {m['avg_loss_pct']:+.1f}%")
         print(f"  Hold medio:         {m['avg_hold_bars']:.0f} sesiones")
         print(f"  Mejor / peor:       {m['best_trade_pct']:+.1f}% / {m['worst_trade_pct']:+.1f}%")
+    for name, r in m.get('by_sleeve', {}).items():
+        print(f"  Sleeve {name:<10}  trades {r['n_trades']:4d}  win {r['win_rate_pct']:5.1f}%  "
+              f"P&L ${r['pnl']:>10,.0f}  PF {r['profit_factor']:.2f}")
+    if 'entries_rejected' in m:
+        r = m['entries_rejected']
+        print(f"  Entradas vetadas:   sector {r['sector']}  correlación {r['corr']}  volatilidad {r['vol']}")
     print("=" * 64)
 
 
@@ -0,0 +1,297 @@
+# portfolio_metrics.py — Métricas EXTENDIDAS de una curva de equity en una sola pasada
+#
+# compute_metrics (portfolio_backtest.py) da cifras de todo el periodo a base de
+# reindexar, pct_change y cummax de pandas en varias pasadas. Aquí un acumulador que
+# recorre la equity (y el benchmark) UNA vez, por bloques, sobre arrays NumPy:
+#   - resumen: CAGR, volatilidad, Sharpe, Sortino, max drawdown, Calmar (y del benchmark),
+#   - CAGR / Sharpe / Sortino móviles a 1 año (sumas acumuladas sobre cola + bloque),
+#   - tabla de drawdowns: pico, valle, recuperación, profundidad y duración en sesiones,
+#   - retornos mensuales y anuales,
+#   - exposición en el tiempo y atribución por símbolo / sector desde el log de trades.
+# El estado entre bloques es O(1) (más la cola de 252 sesiones), así que sirve tal cual
+# sobre el equity.csv que va escribiendo el backtest por tramos (metrics_from_csv) sin
+# cargarlo en pandas, y con rolling=False es lo bastante barato para cada config de un
+# barrido de params.
+
+import csv
+import math
+
+import numpy as np
+
+
+YEAR = 252
+
+
+class MetricsStream:
+    """Acumulador de métricas: llamar a update() con bloques consecutivos y result()."""
+
+    def __init__(self, rolling=True, window=YEAR):
+        self.rolling, self.window = rolling, window
+        self.n = 0
+        self.first = self.last = None          # (fecha, equity)
+        self.s1 = self.s2 = self.sneg2 = 0.0   # sumas de retornos, cuadrados y negativos²
+        self.peak, self.peak_date = -np.inf, None
+        self.max_dd = 0.0
+        self.episode = None                    # drawdown abierto: dict(start, trough, depth)
+        self.drawdowns = []
+        self.month_end, self.year_end = {}, {}
+        self.tail_eq = np.empty(0)             # últimas `window` equities (rolling)
+        self.roll = dict(date=[], cagr=[], sharpe=[], sortino=[])
+        self.bench = None                      # MetricsStream del benchmark (sin rolling)
+
+    def update(self, dates, equity, bench=None):
+        dates = np.asarray(dates, dtype='datetime64[D]')
+        eq = np.asarray(equity, dtype=np.float64)
+        if len(eq) == 0:
+            return self
+        if bench is not None:
+            self.bench = self.bench or MetricsStream(rolling=False)
+            self.bench.update(dates, bench)
+        prev = self.last[1] if self.last is not None else eq[0]
+        r = np.diff(np.concatenate([[prev], eq])) / np.concatenate([[prev], eq[:-1]])
+        if self.last is None:
+            r = r[1:]
+            self.first = (dates[0], eq[0])
+        self.n += len(r)
+        self.s1 += float(r.sum())
+        self.s2 += float((r * r).sum())
+        self.sneg2 += float((np.minimum(r, 0) ** 2).sum())
+        self._drawdowns(dates, eq)
+        self._periods(dates, eq)
+        if self.rolling:
+            self._rolling(dates, eq)
+        self.last = (dates[-1], eq[-1])
+        return self
+
+    def _drawdowns(self, dates, eq):
+        run = np.maximum.accumulate(np.concatenate([[self.peak], eq]))[1:]
+        dd = eq / run - 1
+        self.max_dd = min(self.max_dd, float(dd.min()))
+        new_peak = eq >= run
+        # Fechas de pico vigentes en cada barra (la última barra en máximos hasta ella).
+        pk_idx = np.maximum.accumulate(np.where(new_peak, np.arange(len(eq)), -1))
+        k = 0
+        while k < len(eq):
+            if self.episode is None:
+                under = np.flatnonzero(~new_peak[k:])
+                if len(under) == 0:
+                    break
+                k += under[0]
+                start = dates[pk_idx[k]] if pk_idx[k] >= 0 else self.peak_date
+                self.episode = dict(peak=start, trough=dates[k], depth=float(dd[k]), bars=0)
+            rec = np.flatnonzero(new_peak[k:])
+            end = k + rec[0] if len(rec) else len(eq)
+            if end > k:                  # end == k: el bloque abre con la recuperación del episodio anterior
+                seg = dd[k:end]
+                j = int(seg.argmin())
+                if seg[j] < self.episode['depth']:
+                    self.episode.update(trough=dates[k + j], depth=float(seg[j]))
+                self.episode['bars'] += end - k
+            if len(rec) == 0:
+                break
+            self.episode['recovery'] = dates[end]
+            self.drawdowns.append(self.episode)
+            self.episode = None
+            k = end
+        last_peak = np.flatnonzero(new_peak)
+        if len(last_peak):
+            self.peak_date = dates[last_peak[-1]]
+        self.peak = float(run[-1])
+
+    def _periods(self, dates, eq):
+        for key, store in (('M', self.month_end), ('Y', self.year_end)):
+            k = dates.astype(f'datetime64[{key}]')
+            ends = np.flatnonzero(np.concatenate([k[1:] != k[:-1], [True]]))
+            for e in ends:
+                store[str(k[e])] = float(eq[e])
+
+    def _rolling(self, dates, eq):
+        w = self.window
+        ext = np.concatenate([self.tail_eq, eq])
+        off = len(self.tail_eq)
+        if len(ext) > w:
+            r = ext[1:] / ext[:-1] - 1
+            c1 = np.concatenate([[0.0], np.cumsum(r)])
+            c2 = np.concatenate([[0.0], np.cumsum(r * r)])
+            cn = np.concatenate([[0.0], np.cumsum(np.minimum(r, 0) ** 2)])
+            ends = np.arange(max(off, w), len(ext))          # posición en ext de la equity final
+            s1, s2, sn = (c[ends] - c[ends - w] for c in (c1, c2, cn))
+            mean = s1 / w
+            var = np.maximum(s2 - w * mean * mean, 0) / (w - 1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                sd = np.sqrt(var)
+                ds = np.sqrt(sn / w)
+                self.roll['cagr'].append((ext[ends] / ext[ends - w]) ** (YEAR / w) - 1)
+                self.roll['sharpe'].append(np.where(sd > 0, mean / sd * math.sqrt(YEAR), np.nan))
+                self.roll['sortino'].append(np.where(ds > 0, mean / ds * math.sqrt(YEAR), np.nan))
+            self.roll['date'].append(dates[ends - off])
+        self.tail_eq = ext[-w:]
+
+    def result(self, top_drawdowns=10):
+        if self.first is None:
+            return {}
+        days = int((self.last[0] - self.first[0]).astype(int))
+        years = days / 365.25
+        total = self.last[1] / self.first[1]
+        n = max(self.n, 1)
+        mean = self.s1 / n
+        sd = math.sqrt(max(self.s2 - n * mean * mean, 0) / (n - 1)) if n > 1 else 0.0
+        ds = math.sqrt(self.sneg2 / n)
+        cagr = total ** (1 / years) - 1 if years > 0 and total > 0 else 0.0
+        summary = dict(
+            years=round(years, 2), total_return_pct=round((total - 1) * 100, 1),
+            cagr_pct=round(cagr * 100, 2), vol_pct=round(sd * math.sqrt(YEAR) * 100, 1),
+            sharpe=round(mean / sd * math.sqrt(YEAR), 2) if sd > 0 else 0.0,
+            sortino=round(mean / ds * math.sqrt(YEAR), 2) if ds > 0 else 0.0,
+            max_drawdown_pct=round(self.max_dd * 100, 1),
+            calmar=round(cagr / abs(self.max_dd), 2) if self.max_dd < 0 else None)
+        if self.bench is not None:
+            b = self.bench.result()['summary']
+            summary.update({f'bench_{k}': b[k] for k in ('cagr_pct', 'sharpe', 'sortino',
+                                                          'max_drawdown_pct')})
+            summary['alpha_cagr_pct'] = round(summary['cagr_pct'] - b['cagr_pct'], 2)
+
+        dds = list(self.drawdowns) + ([dict(self.episode, recovery=None)] if self.episode else [])
+        dds.sort(key=lambda e: e['depth'])
+        table = [dict(peak=str(e['peak']), trough=str(e['trough']),
+                      recovery=None if e.get('recovery') is None else str(e['recovery']),
+                      depth_pct=round(e['depth'] * 100, 1), bars=int(e['bars']))
+                 for e in dds[:top_drawdowns]]
+
+        out = dict(summary=summary, drawdowns=table,
+                   monthly=_period_returns(self.month_end, self.first[1]),
+                   yearly=_period_returns(self.year_end, self.first[1]))
+        if self.rolling:
+            out['rolling'] = {k: (np.concatenate(v) if v else np.empty(0)) for k, v in self.roll.items()}
+        return out
+
+
+def _period_returns(ends, first):
+    out, prev = {}, first
+    for k in sorted(ends):
+        out[k] = round((ends[k] / prev - 1) * 100, 2)
+        prev = ends[k]
+    return out
+
+
+def exposure(dates, trades, equity=None):
+    """Posiciones abiertas por sesión y, con `equity`, % de la equity invertido (a coste
+    de entrada) — con arrays de diferencias sobre el calendario, sin bucle diario."""
+    dates = np.asarray(dates, dtype='datetime64[D]')
+    n = np.zeros(len(dates) + 1)
+    notional = np.zeros(len(dates) + 1)
+    if trades is not None and len(trades):
+        a = np.searchsorted(dates, np.asarray(trades['entry_day'], dtype='datetime64[D]'))
+        b = np.searchsorted(dates, np.asarray(trades['exit_day'], dtype='datetime64[D]'))
+        cost = np.asarray(trades['shares'], dtype=np.float64) * np.asarray(trades['entry'], dtype=np.float64)
+        np.add.at(n, a, 1)
+        np.add.at(n, b, -1)
+        np.add.at(notional, a, cost)
+        np.add.at(notional, b, -cost)
+    out = dict(positions=np.cumsum(n)[:-1])
+    if equity is not None:
+        out['invested_pct'] = np.cumsum(notional)[:-1] / np.asarray(equity, dtype=np.float64) * 100
+    return out
+
+
+def attribution(trades, sectors=None):
+    """P&L por símbolo y por sector (dict símbolo -> sector) desde el log de trades."""
+    if trades is None or len(trades) == 0:
+        return dict(by_symbol=[], by_sector=[])
+    sym = np.asarray(trades['symbol'], dtype=str)
+    pnl = np.asarray(trades['pnl'], dtype=np.float64)
+    total = pnl.sum()
+
+    def table(keys):
+        u, inv = np.unique(keys, return_inverse=True)
+        s = np.bincount(inv, weights=pnl)
+        cnt = np.bincount(inv)
+        wins = np.bincount(inv, weights=(pnl > 0).astype(float))
+        order = np.argsort(-s)
+        return [dict(key=str(u[k]), pnl=round(float(s[k]), 2), n_trades=int(cnt[k]),
+                     win_rate_pct=round(float(wins[k] / cnt[k] * 100), 1),
+                     share_pct=round(float(s[k] / total * 100), 1) if total else None)
+                for k in order]
+
+    out = dict(by_symbol=table(sym))
+    sectors = sectors or {}
+    out['by_sector'] = table(np.array([sectors.get(s) or '—' for s in sym]))
+    return out
+
+
+def extended_metrics(equity_curve, bench=None, trades=None, sectors=None, rolling=True):
+    """Métricas extendidas de un resultado en memoria (equity Series/arrays, benchmark
+    alineado o Series de cierres, log de trades)."""
+    dates = np.asarray(getattr(equity_curve, 'index', None), dtype='datetime64[D]')
+    eq = np.asarray(equity_curve, dtype=np.float64)
+    b = None
+    if bench is not None:
+        b = _align(dates, np.asarray(bench.index, dtype='datetime64[D]'),
+                   np.asarray(bench, dtype=np.float64)) if hasattr(bench, 'index') else bench
+    out = MetricsStream(rolling=rolling).update(dates, eq, b).result()
+    if rolling:
+        out['rolling']['date'] = out['rolling']['date'].astype(str)
+    if trades is not None:
+        out['exposure'] = exposure(dates, trades, eq)
+        out['summary']['avg_invested_pct'] = round(float(np.nanmean(out['exposure']['invested_pct'])), 1)
+        out['attribution'] = attribution(trades, sectors)
+    return out
+
+
+def _align(dates, bdates, bvals):
+    """Cierres del benchmark en `dates` (último conocido: ffill)."""
+    k = np.searchsorted(bdates, dates, 'right') - 1
+    return np.where(k >= 0, bvals[np.maximum(k, 0)], np.nan)
+
+
+def metrics_from_csv(path, bench=None, trades=None, sectors=None, rolling=True, block=100_000):
+    """Igual que extended_metrics pero leyendo el equity.csv (date,equity) por bloques,
+    sin pandas. `bench`: tupla (fechas, cierres) o Series; `trades`: dict de columnas o DataFrame."""
+    if bench is not None and hasattr(bench, 'index'):
+        bench = (np.asarray(bench.index, dtype='datetime64[D]'), np.asarray(bench, dtype=np.float64))
+    st = MetricsStream(rolling=rolling)
+    all_dates, all_eq = [], []
+    with open(path, newline='') as f:
+        rd = csv.reader(f)
+        header = next(rd, None)
+        if header is None:
+            return {}
+        ci, ce = header.index('date'), header.index('equity')
+        while True:
+            rows = [r for _, r in zip(range(block), rd)]
+            if not rows:
+                break
+            d = np.array([r[ci][:10] for r in rows], dtype='datetime64[D]')
+            e = np.array([r[ce] for r in rows], dtype=np.float64)
+            st.update(d, e, None if bench is None else _align(d, *bench))
+            if trades is not None:
+                all_dates.append(d)
+                all_eq.append(e)
+    out = st.result()
+    if rolling:
+        out['rolling']['date'] = out['rolling']['date'].astype(str)
+    if trades is not None and all_dates:
+        d, e = np.concatenate(all_dates), np.concatenate(all_eq)
+        out['exposure'] = exposure(d, trades, e)
+        out['summary']['avg_invested_pct'] = round(float(np.nanmean(out['exposure']['invested_pct'])), 1)
+        out['attribution'] = attribution(trades, sectors)
+    return out
+
+
+def print_extended(rep, top=5):
+    s = rep['summary']
+    print("MÉTRICAS EXTENDIDAS")
+    print(f"  CAGR {s['cagr_pct']:+.2f}%  vol {s['vol_pct']:.1f}%  Sharpe {s['sharpe']:.2f}  "
+          f"Sortino {s['sortino']:.2f}  maxDD {s['max_drawdown_pct']:.1f}%  Calmar {s['calmar']}")
+    if 'rolling' in rep and len(rep['rolling']['cagr']):
+        rc = rep['rolling']['cagr'] * 100
+        print(f"  CAGR 1 año móvil: mín {np.nanmin(rc):+.1f}%  mediana {np.nanmedian(rc):+.1f}%  "
+              f"máx {np.nanmax(rc):+.1f}%")
+    print("  Peores drawdowns:")
+    for d in rep['drawdowns'][:top]:
+        print(f"    {d['depth_pct']:6.1f}%  {d['peak']} → {d['trough']} → {d['recovery'] or 'abierto'}"
+              f"  ({d['bars']} sesiones)")
+    print("  Años: " + "  ".join(f"{k}: {v:+.1f}%" for k, v in rep['yearly'].items()))
+    if 'attribution' in rep:
+        best = rep['attribution']['by_symbol'][:top]
+        print("  Mejores símbolos: " + ", ".join(f"{r['key']} ${r['pnl']:,.0f}" for r in best))
@@ -0,0 +1,170 @@
+# portfolio_risk.py — Límites de cartera por SECTOR y CORRELACIÓN al entrar
+#
+# Los líderes de momentum van en racimo (semis: Micron, SanDisk, ADI...) y la cartera
+# acaba siendo la misma apuesta diez veces. Filtros opcionales (config del backtest):
+#   - max_per_sector:     máx. posiciones abiertas por sector (`sectors`: símbolo -> sector,
+#                         p.ej. MarketData.symbol_sectors()),
+#   - max_pair_corr:      no entrar si el candidato correlaciona > X con alguna posición,
+#   - max_portfolio_vol:  no entrar si la volatilidad anualizada de la cartera resultante
+#                         (pesos a cierre previo, covarianza móvil) supera el presupuesto.
+# La covarianza es MÓVIL e INCREMENTAL sobre los símbolos en cartera (+ el candidato que
+# se evalúa): un anillo de `corr_window` retornos diarios con sumas y productos cruzados
+# que se actualizan al cerrar cada sesión — O(k²) por día con k posiciones, en vez de
+# recalcular correlaciones con toda la historia. Un candidato nuevo se rellena una vez
+# con sus retornos de la ventana (O(ventana·k)). Solo usa cierres hasta la sesión previa
+# a la entrada (sin look-ahead).
+
+import math
+
+import numpy as np
+
+
+MIN_OBS = 20   # con menos retornos en la ventana no se aplican los filtros de correlación/vol
+
+
+class RollingCovariance:
+    def __init__(self, window=63):
+        self.window = window
+        self.syms = []
+        self.pos = {}
+        self.buf = np.zeros((window, 0))       # anillo (ventana × símbolos) de retornos
+        self.S = np.zeros(0)                   # suma de retornos por símbolo
+        self.SS = np.zeros((0, 0))             # suma de productos cruzados
+        self.days = []                         # últimas window+1 sesiones (la 1ª es base)
+        self.head = 0
+        self.n = 0
+        self.last_close = {}
+
+    def _close(self, a, day):
+        i = a['idx'].get(day) if a is not None else None
+        return None if i is None else float(a['c'][i])
+
+    def add(self, sym, arr):
+        """Empieza a seguir `sym`: rellena sus retornos en las sesiones del anillo."""
+        if sym in self.pos:
+            return
+        a = arr.get(sym)
+        x = np.zeros(self.window)
+        prev = self._close(a, self.days[0]) if self.days else None
+        for t, day in enumerate(self.days[1:]):
+            c = self._close(a, day)
+            if c is not None and prev:
+                # posición en el anillo de la t-ésima sesión más antigua
+                x[(self.head - self.n + t) % self.window] = c / prev - 1
+            prev = c if c is not None else prev
+        if prev:
+            self.last_close[sym] = prev
+        self.pos[sym] = len(self.syms)
+        self.syms.append(sym)
+        cross = self.buf.T @ x
+        self.buf = np.column_stack([self.buf, x])
+        self.S = np.append(self.S, x.sum())
+        k = len(self.syms)
+        SS = np.zeros((k, k))
+        SS[:-1, :-1] = self.SS
+        SS[-1, :-1] = SS[:-1, -1] = cross
+        SS[-1, -1] = x @ x
+        self.SS = SS
+
+    def remove(self, sym):
+        k = self.pos.pop(sym, None)
+        if k is None:
+            return
+        self.syms.pop(k)
+        self.pos = {s: j for j, s in enumerate(self.syms)}
+        self.buf = np.delete(self.buf, k, axis=1)
+        self.S = np.delete(self.S, k)
+        self.SS = np.delete(np.delete(self.SS, k, axis=0), k, axis=1)
+        self.last_close.pop(sym, None)
+
+    def advance(self, day, arr):
+        """Cierre de la sesión `day`: añade el retorno de cada símbolo seguido (0 si no
+        cotizó) y saca del anillo el más antiguo. O(k²)."""
+        r = np.zeros(len(self.syms))
+        for j, s in enumerate(self.syms):
+            c = self._close(arr.get(s), day)
+            prev = self.last_close.get(s)
+            if c is not None:
+                if prev:
+                    r[j] = c / prev - 1
+                self.last_close[s] = c
+        if self.days:
+            old = self.buf[self.head]
+            if self.n == self.window:
+                self.S -= old
+                self.SS -= np.outer(old, old)
+            self.buf[self.head] = r
+            self.S += r
+            self.SS += np.outer(r, r)
+            self.head = (self.head + 1) % self.window
+            self.n = min(self.n + 1, self.window)
+        self.days.append(day)
+        if len(self.days) > self.window + 1:
+            self.days.pop(0)
+
+    def cov(self, syms):
+        j = [self.pos[s] for s in syms]
+        n = self.n
+        return (self.SS[np.ix_(j, j)] - np.outer(self.S[j], self.S[j]) / n) / (n - 1)
+
+    def corr_with(self, sym, others):
+        c = self.cov([sym] + list(others))
+        d = np.sqrt(np.maximum(np.diag(c), 0))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where((d[0] > 0) & (d[1:] > 0), c[0, 1:] / (d[0] * d[1:]), 0.0)
+
+
+class EntryGate:
+    """Filtros de cartera que consulta simulate_days antes de cada entrada."""
+
+    def __init__(self, cfg):
+        self.cfg = cfg
+        self.sectors = cfg.get('sectors') or {}
+        self.cov = (RollingCovariance(cfg.get('corr_window', 63))
+                    if cfg.get('max_pair_corr') is not None or cfg.get('max_portfolio_vol') is not None
+                    else None)
+        self.rejected = dict(sector=0, corr=0, vol=0)
+
+    @staticmethod
+    def wanted(cfg):
+        return any(cfg.get(k) is not None for k in ('max_per_sector', 'max_pair_corr', 'max_portfolio_vol'))
+
+    def allow(self, sym, weight, positions, equity, arr):
+        """¿Se puede abrir `sym` con peso `weight` (fracción de equity) sobre `positions`?"""
+        cfg = self.cfg
+        if cfg.get('max_per_sector') is not None:
+            sec = self.sectors.get(sym)
+            if sec and sum(self.sectors.get(p['symbol']) == sec for p in positions) >= cfg['max_per_sector']:
+                self.rejected['sector'] += 1
+                return False
+        held = [p['symbol'] for p in positions]
+        if self.cov is None or not held or self.cov.n < MIN_OBS:
+            return True
+        self.cov.add(sym, arr)
+        for s in held:
+            self.cov.add(s, arr)
+        if cfg.get('max_pair_corr') is not None:
+            if self.cov.corr_with(sym, held).max() > cfg['max_pair_corr']:
+                self.rejected['corr'] += 1
+                return False
+        if cfg.get('max_portfolio_vol') is not None:
+            lc = self.cov.last_close
+            w = np.array([weight] + [p['shares'] * lc.get(p['symbol'], p['entry']) / equity
+                                     for p in positions])
+            var = float(w @ self.cov.cov([sym] + held) @ w)
+            if math.sqrt(max(var, 0) * 252) > cfg['max_portfolio_vol']:
+                self.rejected['vol'] += 1
+                return False
+        return True
+
+    def end_of_day(self, day, positions, arr):
+        """Deja de seguir lo que no está en cartera y avanza la covarianza con el cierre."""
+        if self.cov is None:
+            return
+        held = {p['symbol'] for p in positions}
+        for s in list(self.cov.syms):
+            if s not in held:
+                self.cov.remove(s)
+        for s in held:
+            self.cov.add(s, arr)
+        self.cov.advance(day, arr)
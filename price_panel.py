@@ -0,0 +1,284 @@
+# price_panel.py — Panel de precios COLUMNAR (calendario compartido + arrays densos)
+#
+# Alternativa compacta al dict[símbolo] -> DataFrame de market_data/run_portfolio_demo.
+# Con 6.000 símbolos × 20 años × 5 campos, un DataFrame float64 por símbolo (cada uno
+# con su propio DatetimeIndex) pesa varios GB. El panel guarda:
+#   - UN calendario compartido (datetime64[D]) en vez de un índice por símbolo,
+#   - un array 2D (fechas × símbolos) por campo: o/h/l/c/v (mismos nombres que
+#     portfolio_backtest._prepare_arrays),
+#   - en modo `compact`: precios float32 y volumen entero (uint32, saturado). Las medias
+#     de los evaluadores acumulan en float64 (`mean(dtype=np.float64)`), así que la
+#     precisión de float32 (~7 dígitos) basta para precios.
+#
+# Orden de los ejes: FECHAS × SÍMBOLOS. Una ventana temporal es un bloque contiguo en
+# memoria (la serie de un símbolo es una vista con stride, sin copia).
+# Una celda sin barra (antes del listado, huecos) es NaN en precios y 0 en volumen
+# compacto. `series(sym)` devuelve solo las barras válidas del símbolo, igual que el
+# `.dropna()` de la descarga → los evaluadores ven EXACTAMENTE los mismos arrays.
+#
+# Persistencia (save/open): un directorio con un .npy por campo + calendario + tabla de
+# símbolos. `open` lo mapea en memoria (solo lectura): N procesos que abren el mismo
+# panel comparten la caché de páginas del SO, sin pickle ni copia por worker. Un panel
+# mapeado se serializa como su RUTA (ver __reduce__), así que pasarlo a un
+# ProcessPoolExecutor cuesta lo mismo que pasar un string.
+
+import json
+import os
+import shutil
+
+import numpy as np
+
+
+FIELDS = dict(o='Open', h='High', l='Low', c='Close', v='Volume')
+_VOL_MAX = np.iinfo(np.uint32).max
+_ATTACHED = {}   # ruta -> PricePanel mapeado (uno por proceso)
+
+
+class PricePanel:
+    def __init__(self, dates, symbols, arrays, path=None, row_index=None):
+        """dates: (T,) fechas; symbols: lista (N); arrays: dict campo -> array (T, N)."""
+        self.dates = np.asarray(dates, dtype='datetime64[D]')
+        self.symbols = list(symbols)
+        self.sym_idx = {s: j for j, s in enumerate(self.symbols)}
+        self.arrays = arrays
+        self.path = path
+        self._date_pos = None
+        if row_index is None:
+            self._index_rows()
+        else:
+            self.first, self.last, self.count, self.contiguous = row_index
+
+    # --- Construcción ---
+    @classmethod
+    def from_frames(cls, price_data, calendar=None, compact=False):
+        """Panel desde dict[símbolo] -> DataFrame (High/Low/Close[/Open/Volume]).
+
+        `calendar` (p.ej. el índice del SPY) fija el eje temporal; por defecto es la
+        unión de las fechas de todos los símbolos. Las barras fuera del calendario se
+        DESCARTAN: el panel cambia la entrada. El walk-forward sobre el dict de
+        DataFrames sí las conserva en los arrays de cada símbolo (y desplazan sus
+        índices de barra), así que con un calendario que no cubre todas las barras los
+        dos caminos no ven las mismas series."""
+        import pandas as pd
+        syms = [s for s, d in price_data.items() if d is not None and not d.empty]
+        if calendar is None:
+            idx = pd.DatetimeIndex([])
+            for s in syms:
+                idx = idx.union(price_data[s].index)
+        else:
+            idx = pd.DatetimeIndex(calendar)
+        fields = [k for k, col in FIELDS.items()
+                  if any(col in price_data[s].columns for s in syms)]
+        T, N = len(idx), len(syms)
+        px_dtype = np.float32 if compact else np.float64
+        arrays = {}
+        for k in fields:
+            if k == 'v':
+                arrays[k] = np.zeros((T, N), dtype=np.uint32) if compact else np.full((T, N), np.nan)
+            else:
+                arrays[k] = np.full((T, N), np.nan, dtype=px_dtype)
+        for j, s in enumerate(syms):
+            d = price_data[s]
+            pos = idx.get_indexer(d.index)
+            ok = pos >= 0
+            for k in fields:
+                col = FIELDS[k]
+                if col not in d.columns:
+                    continue
+                vals = d[col].values[ok].astype(float)
+                if k == 'v' and compact:
+                    vals = np.clip(np.nan_to_num(vals), 0, _VOL_MAX)
+                arrays[k][pos[ok], j] = vals
+        return cls(idx.values, syms, arrays)
+
+    def _index_rows(self):
+        """Primera/última barra válida de cada símbolo y si su historia es contigua
+        (sin huecos) — en ese caso `series` devuelve vistas, sin copiar."""
+        c = self.arrays['c']
+        valid = ~np.isnan(c)
+        n = valid.sum(axis=0)
+        T = len(self.dates)
+        self.first = np.where(n > 0, valid.argmax(axis=0), 0)
+        self.last = np.where(n > 0, T - 1 - valid[::-1].argmax(axis=0), -1)
+        self.count = n
+        self.contiguous = (self.last - self.first + 1) == n
+
+    # --- Acceso ---
+    @property
+    def compact(self):
+        return self.arrays['c'].dtype == np.float32
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __contains__(self, sym):
+        return sym in self.sym_idx
+
+    def date_pos(self, ts):
+        """Posición de una fecha en el calendario del panel (None si no está)."""
+        if self._date_pos is None:
+            self._date_pos = {d: i for i, d in enumerate(self.dates.tolist())}
+        d = np.datetime64(ts, 'D').item()
+        return self._date_pos.get(d)
+
+    def rows(self, sym):
+        """Posiciones de calendario de las barras válidas del símbolo (ordenadas)."""
+        j = self.sym_idx[sym]
+        if self.contiguous[j]:
+            return np.arange(self.first[j], self.last[j] + 1)
+        return np.flatnonzero(~np.isnan(self.arrays['c'][:, j]))
+
+    def series(self, sym):
+        """dict o/h/l/c/v (solo barras válidas) + `first`/`contiguous`.
+        Historia contigua → vistas del panel (cero copias); con huecos → copia."""
+        j = self.sym_idx[sym]
+        if self.contiguous[j]:
+            sl = slice(int(self.first[j]), int(self.last[j]) + 1)
+            out = {k: a[sl, j] for k, a in self.arrays.items()}
+        else:
+            r = self.rows(sym)
+            out = {k: a[r, j] for k, a in self.arrays.items()}
+        out['first'] = int(self.first[j])
+        out['contiguous'] = bool(self.contiguous[j])
+        return out
+
+    def frame(self, sym):
+        """DataFrame del símbolo (compatibilidad con el código basado en dict)."""
+        import pandas as pd
+        s = self.series(sym)
+        idx = pd.DatetimeIndex(self.dates[self.rows(sym)])
+        return pd.DataFrame({FIELDS[k]: s[k] for k in self.arrays}, index=idx)
+
+    def nbytes(self):
+        return int(sum(a.nbytes for a in self.arrays.values()) + self.dates.nbytes)
+
+    # --- Persistencia / memoria compartida ---
+    def save(self, path):
+        """Escribe el panel en `path` (directorio). Escritura atómica: se prepara en
+        `path.tmp` y se intercambia al final, así un worker nunca ve un panel a medias."""
+        tmp = _fresh_tmp(path)
+        for k, a in self.arrays.items():
+            np.save(os.path.join(tmp, f'{k}.npy'), a)
+        _write_meta(tmp, self.dates, self.symbols, list(self.arrays), self.compact,
+                    (self.first, self.last, self.count, self.contiguous))
+        _swap_in(tmp, path)
+        return path
+
+    def window(self, start, stop, load=True):
+        """Sub-panel de las posiciones de calendario [start, stop). Con `load` se copia a
+        RAM (bloque contiguo: fechas × símbolos) — es lo que carga el backtest por
+        tramos; sin `load` queda como vista del mapa en disco."""
+        arrays = {k: (np.array(a[start:stop]) if load else a[start:stop])
+                  for k, a in self.arrays.items()}
+        return PricePanel(self.dates[start:stop], self.symbols, arrays)
+
+    @classmethod
+    def open(cls, path, mmap_mode='r'):
+        """Abre un panel guardado con `save`. Por defecto mapeado en memoria y de solo
+        lectura (cero copias); `mmap_mode=None` lo carga entero en RAM."""
+        with open(os.path.join(path, 'symbols.json')) as f:
+            meta = json.load(f)
+        arrays = {k: np.load(os.path.join(path, f'{k}.npy'), mmap_mode=mmap_mode)
+                  for k in meta['fields']}
+        dates = np.load(os.path.join(path, 'dates.npy'))
+        with np.load(os.path.join(path, 'rows.npz')) as r:
+            row_index = (r['first'], r['last'], r['count'], r['contiguous'])
+        return cls(dates, meta['symbols'], arrays, path=os.path.abspath(path), row_index=row_index)
+
+    def __reduce__(self):
+        # Mapeado → viaja como ruta y el worker se engancha a los mismos ficheros.
+        if self.path is not None and isinstance(self.arrays['c'], np.memmap):
+            return attach, (self.path,)
+        return object.__reduce__(self)
+
+
+class PanelWriter:
+    """Escribe un panel en disco por LOTES de símbolos, sin tenerlo entero en RAM
+    (descarga de historias largas: el pico de memoria es un lote, no el universo).
+    Los arrays son .npy mapeados que se rellenan columna a columna; `close` escribe
+    el índice de filas y publica el directorio de forma atómica."""
+
+    def __init__(self, path, dates, symbols, fields=tuple(FIELDS), compact=True):
+        self.path = path
+        self.dates = np.asarray(dates, dtype='datetime64[D]')
+        self.symbols = list(symbols)
+        self.sym_idx = {s: j for j, s in enumerate(self.symbols)}
+        self.compact = compact
+        self.tmp = _fresh_tmp(path)
+        T, N = len(self.dates), len(self.symbols)
+        px_dtype = np.float32 if compact else np.float64
+        self.arrays = {}
+        for k in fields:
+            dt = np.uint32 if (k == 'v' and compact) else px_dtype
+            a = np.lib.format.open_memmap(os.path.join(self.tmp, f'{k}.npy'), mode='w+',
+                                          dtype=dt, shape=(T, N))
+            a[:] = 0 if dt == np.uint32 else np.nan
+            self.arrays[k] = a
+        self.first = np.zeros(N, dtype=np.int64)
+        self.last = np.full(N, -1, dtype=np.int64)
+        self.count = np.zeros(N, dtype=np.int64)
+
+    def write(self, sym, df):
+        """Vuelca el DataFrame OHLCV de un símbolo (fechas fuera del calendario: fuera)."""
+        import pandas as pd
+        j = self.sym_idx[sym]
+        pos = pd.DatetimeIndex(self.dates).get_indexer(df.index)
+        ok = pos >= 0
+        pos = pos[ok]
+        if len(pos) == 0:
+            return
+        for k, a in self.arrays.items():
+            col = FIELDS[k]
+            if col not in df.columns:
+                continue
+            vals = df[col].values[ok].astype(float)
+            if k == 'v' and self.compact:
+                vals = np.clip(np.nan_to_num(vals), 0, _VOL_MAX)
+            a[pos, j] = vals
+        valid = pos[~np.isnan(df['Close'].values[ok].astype(float))]
+        if len(valid):
+            self.first[j], self.last[j], self.count[j] = valid[0], valid[-1], len(valid)
+
+    def close(self):
+        for a in self.arrays.values():
+            a.flush()
+        contiguous = (self.last - self.first + 1) == self.count
+        _write_meta(self.tmp, self.dates, self.symbols, list(self.arrays), self.compact,
+                    (self.first, self.last, self.count, contiguous))
+        self.arrays = {}
+        _swap_in(self.tmp, self.path)
+        return self.path
+
+
+def _fresh_tmp(path):
+    tmp = path.rstrip('/') + '.tmp'
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    return tmp
+
+
+def _write_meta(d, dates, symbols, fields, compact, row_index):
+    first, last, count, contiguous = row_index
+    np.save(os.path.join(d, 'dates.npy'), np.asarray(dates, dtype='datetime64[D]'))
+    np.savez(os.path.join(d, 'rows.npz'), first=first, last=last, count=count,
+             contiguous=contiguous)
+    with open(os.path.join(d, 'symbols.json'), 'w') as f:
+        json.dump(dict(symbols=list(symbols), fields=list(fields), compact=bool(compact)), f)
+
+
+def _swap_in(tmp, path):
+    old = path.rstrip('/') + '.old'
+    shutil.rmtree(old, ignore_errors=True)
+    if os.path.exists(path):
+        os.replace(path, old)
+    os.replace(tmp, path)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def attach(path):
+    """Panel mapeado de `path`, abierto UNA vez por proceso (workers de un pool)."""
+    path = os.path.abspath(path)
+    panel = _ATTACHED.get(path)
+    if panel is None:
+        panel = _ATTACHED[path] = PricePanel.open(path)
+    return panel
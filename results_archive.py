@@ -0,0 +1,136 @@
+# results_archive.py — Archivo COLUMNAR de resultados del screener (append-only)
+#
+# Sustituye a los CSV sueltos por ejecución (momentum_breakouts_{ts}.csv) y a mirar
+# data.json viejos. Cada sesión es una partición de fecha con las TRES listas completas
+# (no solo el top del dashboard) y todos sus campos (score, fundamentales, stop, RS...)
+# más el contexto de mercado:
+#
+#   data_store/results/
+#     date=2026-06-30/
+#       breakouts.npz   una columna por campo (npz: cada columna se lee por separado)
+#       pullbacks.npz
+#       watch.npz
+#       market.json
+#
+# Las consultas leen solo las particiones del rango pedido y solo las columnas pedidas
+# (np.load de un .npz es perezoso por miembro). Re-ejecutar la misma sesión reescribe
+# su partición (idempotente); las sesiones pasadas no se tocan.
+
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+
+DEFAULT_ROOT = os.path.join('data_store', 'results')
+LISTS = ('breakouts', 'pullbacks', 'watch')
+
+
+# Campos de texto: siempre str, aunque en una sesión vengan todos a None (una lista corta
+# sin sector ni rating), para que el tipo de la columna no dependa del día.
+TEXT_FIELDS = ('symbol', 'name', 'sector', 'rating', 'group')
+
+
+def _column(values, name=None):
+    """Lista de valores → array tipado: texto (None→'') si `name` es de TEXT_FIELDS; si no,
+    según los valores: bool, float64 (None→NaN) o texto."""
+    if name in TEXT_FIELDS:
+        return np.array(['' if v is None else str(v) for v in values], dtype=str)
+    if all(isinstance(v, (bool, np.bool_)) for v in values):
+        return np.array(values, dtype=bool)
+    if all(v is None or (isinstance(v, (int, float, np.integer, np.floating))
+                         and not isinstance(v, (bool, np.bool_))) for v in values):
+        return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    return np.array(['' if v is None else str(v) for v in values], dtype=str)
+
+
+class ResultsArchive:
+    def __init__(self, root=DEFAULT_ROOT):
+        self.root = root
+
+    def _part(self, date):
+        return os.path.join(self.root, f'date={pd.Timestamp(date):%Y-%m-%d}')
+
+    # --- Escritura ---
+    def write(self, date, lists, market=None):
+        """Guarda la sesión `date`: `lists` = dict nombre -> lista de dicts (en su orden
+        final; se añade la columna `rank`), `market` = contexto de mercado (dict)."""
+        part = self._part(date)
+        tmp = part + '.tmp'
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        for name, rows in lists.items():
+            rows = [{k: v for k, v in r.items() if not isinstance(v, (dict, list))} for r in rows]
+            keys = sorted({k for r in rows for k in r})
+            cols = {k: _column([r.get(k) for r in rows], k) for k in keys}
+            cols['rank'] = np.arange(1, len(rows) + 1, dtype=np.int32)
+            np.savez_compressed(os.path.join(tmp, f'{name}.npz'), **cols)
+        with open(os.path.join(tmp, 'market.json'), 'w', encoding='utf-8') as f:
+            json.dump(market or {}, f, ensure_ascii=False, default=str)
+        if os.path.exists(part):
+            shutil.rmtree(part)
+        os.replace(tmp, part)
+        return part
+
+    # --- Lectura ---
+    def dates(self, start=None, end=None):
+        """Sesiones archivadas (Timestamps ordenados) dentro de [start, end]."""
+        if not os.path.isdir(self.root):
+            return []
+        out = sorted(pd.Timestamp(d[5:]) for d in os.listdir(self.root)
+                     if d.startswith('date=') and not d.endswith('.tmp'))
+        lo = pd.Timestamp(start) if start is not None else None
+        hi = pd.Timestamp(end) if end is not None else None
+        return [d for d in out if (lo is None or d >= lo) and (hi is None or d <= hi)]
+
+    def query(self, list_name='breakouts', start=None, end=None, columns=None, symbols=None):
+        """DataFrame [date, ...columnas] de una lista en un rango de fechas. `columns`
+        recorta lo que se lee de disco; `symbols` filtra antes de leer el resto."""
+        frames = []
+        want = set(symbols) if symbols is not None else None
+        for d in self.dates(start, end):
+            path = os.path.join(self._part(d), f'{list_name}.npz')
+            if not os.path.exists(path):
+                continue
+            with np.load(path) as z:
+                names = z.files if columns is None else [c for c in columns if c in z.files]
+                mask = None
+                if want is not None:
+                    mask = np.isin(z['symbol'], list(want)) if 'symbol' in z.files else None
+                    if mask is None or not mask.any():
+                        continue
+                cols = {c: (z[c] if mask is None else z[c][mask]) for c in names}
+            n = len(next(iter(cols.values()))) if cols else 0
+            for c in TEXT_FIELDS:                # particiones anteriores: todo None → NaN
+                if c in cols and cols[c].dtype.kind == 'f':
+                    cols[c] = np.full(n, '', dtype=str)
+            if n:
+                frames.append(pd.DataFrame({'date': [d] * n, **cols}))
+        if not frames:
+            return pd.DataFrame(columns=['date'] + list(columns or []))
+        return pd.concat(frames, ignore_index=True)
+
+    def symbol_history(self, symbol, start=None, end=None, columns=None, lists=LISTS):
+        """Todas las apariciones de `symbol` (en las listas pedidas), con columna `list`."""
+        cols = None if columns is None else ['symbol', 'rank'] + [c for c in columns
+                                                                   if c not in ('symbol', 'rank')]
+        frames = []
+        for name in lists:
+            df = self.query(name, start, end, columns=cols, symbols=[symbol])
+            if not df.empty:
+                frames.append(df.assign(list=name))
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True).sort_values(['date', 'list'], ignore_index=True)
+
+    def market(self, start=None, end=None):
+        """Contexto de mercado por sesión (DataFrame indexado por fecha)."""
+        rows = {}
+        for d in self.dates(start, end):
+            path = os.path.join(self._part(d), 'market.json')
+            if os.path.exists(path):
+                with open(path, encoding='utf-8') as f:
+                    rows[d] = json.load(f)
+        return pd.DataFrame.from_dict(rows, orient='index')
@@ -0,0 +1,174 @@
+# robustness.py — Robustez del backtest: Monte Carlo / bootstrap VECTORIZADO
+#
+# compute_metrics da una sola cifra por métrica sobre un solo periodo/universo. Aquí se
+# remuestrea el resultado de run_portfolio_backtest para ver cuánto de esa cifra es
+# suerte de la secuencia concreta:
+#   - bootstrap de TRADES: secuencias de los retornos por trade (pnl / equity al entrar)
+#     con reemplazo, compuestas una tras otra (aproximación clásica: ignora el solape
+#     temporal de las posiciones),
+#   - bootstrap por BLOQUES de los retornos diarios de la equity (bloques circulares de
+#     ~1 mes: conserva la autocorrelación y las rachas de volatilidad),
+#   - perturbación de SEÑALES: se descarta al azar un % de las señales y se re-simula la
+#     cartera completa (la que dice si el resultado depende de un puñado de trades); la
+#     salida de cada señal se precalcula una vez (trade_paths.py) y cada muestra solo
+#     resuelve la caja.
+# Los dos bootstraps son matrices (remuestreos × periodos) en NumPy, por lotes de tamaño
+# fijo con semilla propia → 10.000 remuestreos en segundos y el MISMO resultado con o
+# sin pool de procesos. Intervalos de confianza para CAGR, max drawdown, Sharpe y PF.
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from portfolio_backtest import run_portfolio_backtest
+from trade_paths import TradePaths
+
+
+METRICS = ('cagr_pct', 'max_drawdown_pct', 'sharpe', 'profit_factor')
+BATCH = 1000          # remuestreos por lote (memoria: BATCH × periodos float64)
+
+
+def path_metrics(r, years, periods_per_year):
+    """Métricas por FILA de una matriz de retornos por periodo (remuestreos × periodos)."""
+    r = np.atleast_2d(np.asarray(r, dtype=np.float64))
+    eq = np.cumprod(1 + r, axis=1)
+    final = eq[:, -1]
+    cagr = np.where(final > 0, np.abs(final) ** (1 / years) - 1, -1.0) if years > 0 else final - 1
+    peak = np.maximum(np.maximum.accumulate(eq, axis=1), 1.0)
+    max_dd = (eq / peak - 1).min(axis=1)
+    sd = r.std(axis=1, ddof=1) if r.shape[1] > 1 else np.zeros(len(r))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.where(sd > 0, r.mean(axis=1) / sd * np.sqrt(periods_per_year), 0.0)
+        gains = np.where(r > 0, r, 0).sum(axis=1)
+        losses = -np.where(r < 0, r, 0).sum(axis=1)
+        pf = np.where(losses > 0, gains / losses, np.inf)
+    return dict(cagr_pct=cagr * 100, max_drawdown_pct=max_dd * 100, sharpe=sharpe, profit_factor=pf)
+
+
+def trade_returns(results):
+    """Retorno de cada trade sobre la equity del día anterior a su entrada."""
+    eq, trades = results['equity_curve'], results['trades']
+    if trades is None or len(trades) == 0:
+        return np.array([])
+    pos = np.searchsorted(eq.index.values, pd.to_datetime(trades['entry_day']).values) - 1
+    base = eq.values[np.clip(pos, 0, len(eq) - 1)]
+    order = np.argsort(pd.to_datetime(trades['entry_day']).values, kind='stable')
+    return (trades['pnl'].values / base)[order]
+
+
+def _resample(kind, base, n, block, seed):
+    rng = np.random.default_rng(seed)
+    T = len(base)
+    if kind == 'trades':
+        return base[rng.integers(0, T, (n, T))]
+    n_blocks = -(-T // block)
+    starts = rng.integers(0, T, (n, n_blocks))
+    idx = (starts[:, :, None] + np.arange(block)).reshape(n, -1)[:, :T] % T
+    return base[idx]
+
+
+def _batch(kind, base, n, block, seed, years, ppy):
+    return path_metrics(_resample(kind, base, n, block, seed), years, ppy)
+
+
+def bootstrap(base, kind='blocks', n=10_000, block=21, years=1.0, periods_per_year=252,
+              seed=0, workers=None):
+    """Remuestrea `base` (retornos diarios si kind='blocks', por trade si 'trades') n veces.
+    Devuelve dict métrica -> array (n,). Lotes de BATCH con semillas derivadas de `seed`:
+    el resultado no depende de `workers` (None/1 = en proceso)."""
+    base = np.asarray(base, dtype=np.float64)
+    sizes = [BATCH] * (n // BATCH) + ([n % BATCH] if n % BATCH else [])
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(kind, base, k, block, s, years, periods_per_year) for k, s in zip(sizes, seeds)]
+    if workers and workers > 1 and len(args) > 1:
+        with ProcessPoolExecutor(workers) as ex:
+            parts = list(ex.map(_batch, *zip(*args)))
+    else:
+        parts = [_batch(*a) for a in args]
+    return {m: np.concatenate([p[m] for p in parts]) for m in METRICS}
+
+
+# ── Perturbación de señales: re-simulación completa por muestra ──
+_CTX = {}
+
+
+def _init_skip(signals, price_data, spy, config):
+    _CTX.update(signals=signals, price_data=price_data, spy=spy, config=config,
+                paths=TradePaths(signals, price_data, spy))
+
+
+def _skip_one(keep):
+    res = run_portfolio_backtest(_CTX['signals'][keep], _CTX['price_data'], _CTX['spy'], _CTX['config'],
+                                 paths=_CTX['paths'])
+    m = res['metrics']
+    return dict(cagr_pct=m['cagr_pct'], max_drawdown_pct=m['max_drawdown_pct'], sharpe=m['sharpe'],
+                profit_factor=m.get('profit_factor', np.nan))
+
+
+def signal_skip(signals, price_data, spy, config=None, n=100, skip=0.10, seed=0, workers=None):
+    """Re-simula la cartera n veces descartando al azar `skip` de las señales.
+    Con `workers` usa un pool (price_data se envía una vez por worker; un PricePanel
+    guardado en disco viaja como su ruta)."""
+    rng = np.random.default_rng(seed)
+    masks = rng.random((n, len(signals))) >= skip
+    if workers and workers > 1:
+        with ProcessPoolExecutor(workers, initializer=_init_skip,
+                                 initargs=(signals, price_data, spy, config)) as ex:
+            rows = list(ex.map(_skip_one, masks))
+    else:
+        _init_skip(signals, price_data, spy, config)
+        rows = [_skip_one(k) for k in masks]
+        _CTX.clear()
+    return {m: np.array([r[m] for r in rows], dtype=np.float64) for m in METRICS}
+
+
+def confidence_intervals(samples, ci=0.95, point=None):
+    """dict métrica -> dict(lo, median, hi[, point]) con percentiles del intervalo `ci`."""
+    a = (1 - ci) / 2 * 100
+    out = {}
+    for m, v in samples.items():
+        v = v[~np.isnan(v)]
+        if len(v) == 0:
+            continue
+        lo, med, hi = np.percentile(v, [a, 50, 100 - a])
+        out[m] = dict(lo=round(float(lo), 2), median=round(float(med), 2), hi=round(float(hi), 2))
+        if point is not None and m in point:
+            out[m]['point'] = point[m]
+    return out
+
+
+def run_robustness(results, signals=None, price_data=None, spy=None, n=10_000, block=21,
+                   n_skip=100, skip=0.10, ci=0.95, seed=0, workers=None):
+    """Los tres análisis sobre un resultado de run_portfolio_backtest. La perturbación de
+    señales solo corre si se pasan signals/price_data/spy (y n_skip > 0)."""
+    eq = results['equity_curve']
+    m = results['metrics']
+    years = m['years'] or 1.0
+    point = {k: m.get(k) for k in METRICS}
+    daily = eq.pct_change().dropna().values
+    # En el bootstrap por bloques el PF es de retornos DIARIOS (no comparable al de trades).
+    out = dict(blocks=confidence_intervals(
+        bootstrap(daily, 'blocks', n, block, years, 252, seed, workers), ci,
+        {k: v for k, v in point.items() if k != 'profit_factor'}))
+    tr = trade_returns(results)
+    if len(tr) > 1:
+        out['trades'] = confidence_intervals(
+            bootstrap(tr, 'trades', n, block, years, len(tr) / years, seed, workers), ci, point)
+    if signals is not None and price_data is not None and spy is not None and n_skip:
+        out['signal_skip'] = confidence_intervals(
+            signal_skip(signals, price_data, spy, results['config'], n_skip, skip, seed, workers),
+            ci, point)
+    return out
+
+
+def print_robustness(rob, ci=0.95):
+    names = dict(blocks='Bootstrap por bloques (retornos diarios)',
+                 trades='Bootstrap de secuencias de trades', signal_skip='Señales descartadas al azar')
+    print(f"ROBUSTEZ — intervalos al {ci * 100:.0f}%")
+    for kind, tab in rob.items():
+        print(f"  {names.get(kind, kind)}:")
+        for metric, r in tab.items():
+            pt = r.get('point')
+            pt = f"   (backtest: {pt})" if pt is not None else ''
+            print(f"    {metric:<18} [{r['lo']:>8.2f} … {r['hi']:>8.2f}]  mediana {r['median']:>8.2f}{pt}")
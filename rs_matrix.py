@@ -0,0 +1,301 @@
+# rs_matrix.py — Matriz de FUERZA RELATIVA (fechas × símbolos) de toda la historia
+#
+# El RS (percentil del retorno 6m entre las acciones LÍQUIDAS de esa sesión) se
+# calculaba en tres sitios y de tres formas: el screener solo para hoy (iloc por
+# símbolo), el walk-forward un rank de pandas en cada fecha y el replay por bloques de
+# fechas. Aquí se calcula UNA vez, en una pasada vectorizada sobre el panel, y se guarda
+# junto al almacén de precios; cada sesión nueva añade una fila (update). El screener,
+# el walk-forward, el replay y el servicio leen el RS por índice.
+#
+# Definición (la del screener de producción, que trabaja con las barras PROPIAS de cada
+# símbolo — la descarga sin huecos):
+#   líquida  = precio ≥ min_price y dólar-volumen MEDIANO de sus últimas `liq_window`
+#              barras ≥ min_dollar_vol (con al menos `liq_window` barras de historia)
+#   RS       = percentil (0-100, empates promediados, redondeado a 0.1) del retorno desde
+#              su barra `mom_lookback` atrás, entre las líquidas con esa historia.
+# En un símbolo sin huecos barra propia = fila del calendario; si tiene huecos (sesiones
+# sin cotizar, barras enmascaradas por data_quality.py) las ventanas se cuentan en sus
+# barras válidas, no en filas del calendario (_own_bars).
+# Se guarda como uint16 (RS×10; 65535 = sin RS): exacto para valores redondeados a 0.1,
+# 2 bytes por celda (6.000 símbolos × 20 años ≈ 60 MB).
+#
+# Features derivadas: historia del RS de un símbolo, tendencia del RS en N semanas
+# (puntos de percentil ganados/perdidos) y máximos de la LÍNEA RS (precio / índice).
+#
+#   rsm = store.rs_matrix()                  # abre data_store/rs, añade sesiones nuevas, guarda
+#   liquid, rs = rsm.block(rows)             # (R, N) para esas posiciones de la matriz
+#   rsm.series(-1); rsm.history('LLY'); rsm.trend(rows, weeks=4)
+#   rs_line_high(panel, index_close, rows)   # línea RS en máximo de 52 semanas
+#
+# Uso:
+#   python rs_matrix.py --store data_store              # construye/actualiza data_store/rs
+#   python rs_matrix.py --store data_store --symbol LLY # + historia y tendencia de LLY
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+import kernels
+from momentum_strategy import DEFAULTS
+from momentum_vectorized import rank_pct
+from price_panel import PricePanel, _fresh_tmp, _swap_in
+
+
+LIQ_PARAMS = ('liq_window', 'mom_lookback', 'min_price', 'min_dollar_vol')
+NO_RS = np.iinfo(np.uint16).max
+MIN_NAMES = 50          # el walk-forward no rankea sesiones con menos líquidas que esto
+
+
+def _dollar_median(C, V, rows, lw, block=16, col_block=256):
+    """Mediana del dólar-volumen de las `lw` sesiones hasta cada fila (R, N), sin huecos.
+    Historia larga con Numba: ventana ordenada deslizante por símbolo (kernels.py); si
+    no, por bloques de fechas sobre vistas deslizantes del panel."""
+    R, N = len(rows), C.shape[1]
+    med = np.full((R, N), np.nan)
+    if R > 4 * block and kernels.compiled():
+        lo = max(0, int(rows[0]) - lw + 1)
+        local = rows - lo
+        for j0 in range(0, N, col_block):
+            dv = C[lo:rows[-1] + 1, j0:j0 + col_block].astype(np.float64) * V[lo:rows[-1] + 1, j0:j0 + col_block]
+            for jj in range(dv.shape[1]):
+                med[:, j0 + jj] = kernels.rolling_median_rows(np.ascontiguousarray(dv[:, jj]), local, lw)
+        return med
+    for a in range(0, R, block):
+        rb = rows[a:a + block]
+        ok = rb >= lw - 1
+        if not ok.any():
+            continue
+        lo = int(rb[ok][0]) - lw + 1
+        dv = C[lo:rb[-1] + 1].astype(np.float64) * V[lo:rb[-1] + 1]
+        win = sliding_window_view(dv, lw, axis=0)[rb[ok] - lw + 1 - lo]     # (r, N, lw)
+        med[a + np.flatnonzero(ok)] = kernels.nan_median(win)
+    return med
+
+
+def _own_bars(panel, rows, lw, lb, med, base, hist_liq, hist_mom):
+    """Símbolos CON huecos: ventanas de liquidez y base del momentum en sus barras válidas
+    (las del screener), no en filas del calendario. Sobrescribe sus columnas de
+    med/base/hist_liq/hist_mom (R, N)."""
+    C, V = panel.arrays['c'], panel.arrays.get('v')
+    for j in np.flatnonzero(~panel.contiguous & (panel.count > 0)):
+        own = np.flatnonzero(~np.isnan(C[:rows[-1] + 1, j]))     # filas de sus barras
+        n = np.searchsorted(own, rows, 'right')                  # barras propias hasta cada fila
+        hist_liq[:, j] = n >= lw
+        hist_mom[:, j] = n > lb
+        if not len(own):
+            continue
+        base[:, j] = np.where(n > lb, C[own[np.maximum(n - 1 - lb, 0)], j], np.nan)
+        if V is not None:
+            dv = C[own, j].astype(np.float64) * V[own, j]
+            med[:, j] = kernels.rolling_median_rows(dv, np.maximum(n - 1, 0), lw)
+
+
+def liquidity_and_rs(panel, rows, params=None):
+    """Para las posiciones de calendario `rows` del panel: (liquid bool (R, N), rs float
+    (R, N)). RS = percentil (redondeado a 0.1, como el screener) del retorno 6m entre
+    las líquidas; NaN fuera de ellas."""
+    p = {**DEFAULTS, **(params or {})}
+    lw, lb = p['liq_window'], p['mom_lookback']
+    rows = np.asarray(rows, dtype=np.int64)
+    C, V = panel.arrays['c'], panel.arrays.get('v')
+    first = panel.first
+    px = C[rows].astype(np.float64)
+    if V is None:                                   # sin volumen: solo precio e historia
+        med = np.full(px.shape, np.inf)
+    else:
+        med = _dollar_median(C, V, rows, lw)
+    hist_liq = first[None, :] <= (rows - lw + 1)[:, None]
+    hist_mom = first[None, :] <= (rows - lb)[:, None]
+    base = C[np.maximum(rows - lb, 0)].astype(np.float64)
+    _own_bars(panel, rows, lw, lb, med, base, hist_liq, hist_mom)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        liquid = (px >= p['min_price']) & (med >= p['min_dollar_vol']) & hist_liq & (panel.count > 0)[None, :]
+        valid = liquid & hist_mom & (base > 0)
+        mom = px / np.where(valid, base, 1.0) - 1
+    return liquid, np.round(rank_pct(mom, valid), 1)
+
+
+class RSMatrix:
+    """RS y liquidez de cada símbolo en cada sesión (filas = sesiones del panel)."""
+
+    def __init__(self, dates, symbols, codes, liquid, params):
+        self.dates = np.asarray(dates, dtype='datetime64[D]')
+        self.symbols = list(symbols)
+        self.sym_idx = {s: j for j, s in enumerate(self.symbols)}
+        self.codes = codes            # uint16 (T, N): RS×10, NO_RS = sin RS
+        self.liquid = liquid          # bool (T, N)
+        self.params = {k: params[k] for k in LIQ_PARAMS}
+
+    # --- Construcción ---
+    @classmethod
+    def build(cls, panel, params=None):
+        p = {**DEFAULTS, **(params or {})}
+        T, N = len(panel.dates), len(panel.symbols)
+        m = cls(panel.dates, panel.symbols, np.full((T, N), NO_RS, dtype=np.uint16),
+                np.zeros((T, N), dtype=bool), p)
+        m._fill(panel, np.arange(T))
+        return m
+
+    @classmethod
+    def for_prices(cls, price_data, calendar, params=None):
+        """Matriz de un PricePanel o de un dict[símbolo] -> DataFrame (calendario = el
+        del índice): para el walk-forward cuando no viene del almacén."""
+        if not hasattr(price_data, 'series'):
+            price_data = PricePanel.from_frames(
+                {s: d[[c for c in ('Close', 'Volume') if c in d.columns]] for s, d in price_data.items()},
+                calendar=calendar)
+        return cls.build(price_data, params)
+
+    def _fill(self, panel, rows):
+        p = {**DEFAULTS, **self.params}
+        for a in range(0, len(rows), 512):            # RAM acotada en historias largas
+            rb = rows[a:a + 512]
+            liq, rs = liquidity_and_rs(panel, rb, p)
+            self.liquid[rb] = liq
+            self.codes[rb] = np.where(np.isnan(rs), NO_RS, np.rint(np.nan_to_num(rs) * 10)).astype(np.uint16)
+
+    def update(self, panel, refresh=5):
+        """Añade las sesiones nuevas del panel (una fila por sesión) y sus símbolos nuevos.
+        Las `refresh` últimas sesiones ya calculadas se rehacen (la descarga diaria pisa
+        las fechas solapadas del almacén). Un símbolo nuevo con historia cambia el ranking
+        de las sesiones en que ya cotizaba: se recalculan desde su primera barra. Devuelve
+        cuántas filas se recalcularon (si el panel no extiende a la matriz — fechas o
+        símbolos reordenados — se reconstruye)."""
+        T0, N0 = self.codes.shape
+        dates = np.asarray(panel.dates, dtype='datetime64[D]')
+        if (len(dates) < T0 or (dates[:T0] != self.dates).any()
+                or panel.symbols[:N0] != self.symbols):
+            fresh = RSMatrix.build(panel, self.params)
+            self.__dict__.update(fresh.__dict__)
+            return len(dates)
+        T, N = len(dates), len(panel.symbols)
+        start = max(0, T0 - refresh)
+        if N > N0:
+            new = np.arange(N0, N)
+            listed = new[panel.count[new] > 0]
+            if len(listed):
+                start = min(start, int(panel.first[listed].min()))
+        codes = np.full((T, N), NO_RS, dtype=np.uint16)
+        liquid = np.zeros((T, N), dtype=bool)
+        codes[:T0, :N0], liquid[:T0, :N0] = self.codes, self.liquid
+        self.dates, self.symbols = dates, list(panel.symbols)
+        self.sym_idx = {s: j for j, s in enumerate(self.symbols)}
+        self.codes, self.liquid = codes, liquid
+        self._fill(panel, np.arange(start, T))
+        return T - start
+
+    # --- Persistencia ---
+    def save(self, path):
+        tmp = _fresh_tmp(path)
+        np.save(os.path.join(tmp, 'rs.npy'), self.codes)
+        np.save(os.path.join(tmp, 'liquid.npy'), self.liquid)
+        np.save(os.path.join(tmp, 'dates.npy'), self.dates)
+        with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+            json.dump(dict(symbols=self.symbols, params=self.params), f)
+        _swap_in(tmp, path)
+        return path
+
+    @classmethod
+    def open(cls, path):
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        return cls(np.load(os.path.join(path, 'dates.npy')), meta['symbols'],
+                   np.load(os.path.join(path, 'rs.npy')), np.load(os.path.join(path, 'liquid.npy')),
+                   meta['params'])
+
+    # --- Lectura ---
+    def matches(self, params=None):
+        """¿Se construyó con los mismos params de liquidez/momentum que `params`?"""
+        p = {**DEFAULTS, **(params or {})}
+        return all(p[k] == self.params[k] for k in LIQ_PARAMS)
+
+    def aligned(self, panel, params=None):
+        """¿Sus filas/columnas son las del panel (mismas fechas y símbolos) y sus params
+        los de `params`? Entonces se lee por posición sin recalcular nada."""
+        return (self.matches(params) and len(self.dates) == len(panel.dates)
+                and self.dates[-1] == np.datetime64(panel.dates[-1], 'D')
+                and self.symbols == list(panel.symbols))
+
+    def rows(self, dates):
+        """Filas de la matriz de esas fechas (-1 si no están)."""
+        d = np.asarray(dates, dtype='datetime64[D]')
+        pos = np.searchsorted(self.dates, d)
+        ok = (pos < len(self.dates)) & (self.dates[np.minimum(pos, len(self.dates) - 1)] == d)
+        return np.where(ok, pos, -1)
+
+    def block(self, rows):
+        """(liquid bool (R, N), rs float64 (R, N)) — lo mismo que liquidity_and_rs."""
+        codes = self.codes[rows]
+        return self.liquid[rows], np.where(codes == NO_RS, np.nan, codes / 10.0)
+
+    def series(self, row):
+        """RS de las líquidas en la fila `row` como Series símbolo -> RS."""
+        import pandas as pd
+        _, rs = self.block([row])
+        ok = ~np.isnan(rs[0])
+        return pd.Series(rs[0, ok], index=np.asarray(self.symbols, dtype=object)[ok])
+
+    def history(self, sym, start=None, end=None):
+        """RS del símbolo sesión a sesión (NaN cuando no era líquido)."""
+        import pandas as pd
+        _, rs = self.block(slice(None))
+        s = pd.Series(rs[:, self.sym_idx[sym]], index=pd.DatetimeIndex(self.dates))
+        return s.loc[start:end]
+
+    def trend(self, rows, weeks=4):
+        """Puntos de percentil ganados en `weeks` semanas (5 sesiones cada una) en las
+        filas `rows`: (R, N), NaN si falta el RS de hoy o el de entonces."""
+        rows = np.asarray(rows, dtype=np.int64)
+        _, now = self.block(rows)
+        back = rows - 5 * weeks
+        _, then = self.block(np.maximum(back, 0))
+        then[back < 0] = np.nan
+        return now - then
+
+
+def rs_line_high(panel, index_close, rows, window=252):
+    """¿La LÍNEA RS (cierre / cierre del índice) marca máximo de `window` sesiones en cada
+    fila de `rows`? bool (R, N). `index_close`: cierres del índice alineados con
+    panel.dates (el almacén usa el calendario del índice)."""
+    rows = np.asarray(rows, dtype=np.int64)
+    idx = np.asarray(index_close, dtype=np.float64)
+    out = np.zeros((len(rows), len(panel.symbols)), dtype=bool)
+    ok = rows >= window - 1
+    if not ok.any():
+        return out
+    lo = int(rows[ok][0]) - window + 1
+    with np.errstate(invalid='ignore', divide='ignore'):
+        line = panel.arrays['c'][lo:rows[-1] + 1].astype(np.float64) / idx[lo:rows[-1] + 1, None]
+        for k in np.flatnonzero(ok):
+            r = rows[k] - lo
+            w = line[r - window + 1:r + 1]
+            out[k] = (w[-1] >= np.nanmax(np.where(np.isnan(w), -np.inf, w), axis=0)) & (w[-1] > 0)
+    return out
+
+
+def main():
+    from data_store import DataStore
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--store', default='data_store')
+    ap.add_argument('--symbol', default=None, help='Historia del RS de un símbolo')
+    ap.add_argument('--weeks', type=int, default=4, help='Semanas de la tendencia del RS')
+    args = ap.parse_args()
+    store = DataStore(args.store)
+    t0 = time.perf_counter()
+    rsm = store.rs_matrix()
+    last = len(rsm.dates) - 1
+    print(f"Matriz RS {store.path('rs')}: {len(rsm.dates)} sesiones × {len(rsm.symbols)} símbolos "
+          f"en {time.perf_counter() - t0:.1f}s | líquidas hoy: {int(rsm.liquid[last].sum())}")
+    if args.symbol:
+        h = rsm.history(args.symbol).dropna()
+        trend = rsm.trend([last], args.weeks)[0, rsm.sym_idx[args.symbol]]
+        print(h.tail(10).to_string())
+        print(f"Tendencia {args.weeks} semanas: {trend:+.1f} puntos de percentil")
+
+
+if __name__ == "__main__":
+    main()
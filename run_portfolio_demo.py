@@ -11,18 +11,30 @@
 #   python run_portfolio_demo.py --demo          # universo demo (~60 líquidas hand-picked)
 #   python run_portfolio_demo.py --quick         # pocas acciones, para validar el pipeline
 #   python run_portfolio_demo.py --max 800 --min-cap 1e9   # ajustar tamaño/umbral del universo
+#   python run_portfolio_demo.py --compact       # panel float32 columnar (menos RAM)
+#   python run_portfolio_demo.py --store data_store --chunk-days 504   # por tramos desde disco
+#   python run_portfolio_demo.py --robustness 10000   # + intervalos de confianza (robustness.py)
+#   python run_portfolio_demo.py --extended           # + drawdowns, móviles 1 año, atribución
+#   python run_portfolio_demo.py --max-per-sector 3 --max-pair-corr 0.8   # límites de concentración
+#   python run_portfolio_demo.py --sleeves            # ruptura + pullback + watch con caja compartida
 
 import argparse
 import time
 import warnings
 
 import pandas as pd
-import requests
 import yfinance as yf
 
-from market_data import is_common_stock
-from momentum_strategy import generate_momentum_signals
+from market_data import MarketData
+from chunked_backtest import run_chunked_backtest
+from data_quality import INDEX_PARAMS, sanitize_frames, summary
+from data_store import DataStore
+from momentum_strategy import generate_momentum_signals, generate_sleeve_signals
+from signal_cache import DEFAULT_DIR as SIGNAL_CACHE_DIR, cached_signals
 from portfolio_backtest import run_portfolio_backtest, print_report
+from portfolio_metrics import extended_metrics, metrics_from_csv, print_extended
+from price_panel import PricePanel
+from robustness import run_robustness, print_robustness
 
 warnings.filterwarnings('ignore')
 
@@ -37,50 +49,54 @@ DEMO_UNIVERSE = [
 ]
 
 
-def get_broad_universe(min_market_cap=2e9, max_symbols=500):
+# Presupuestos por sleeve para --sleeves (portfolio_backtest: DEFAULT_CONFIG['sleeves']).
+SLEEVE_BUDGETS = dict(
+    breakout=dict(budget_pct=0.60, max_positions=6),
+    pullback=dict(budget_pct=0.40, max_positions=4),
+    watch=dict(budget_pct=0.20, max_positions=2, risk_per_trade_pct=0.005),
+)
+
+
+def get_broad_universe(min_market_cap=2e9, max_symbols=500, store=None, max_age_days=4):
     """Universo AMPLIO sin cherry-picking: acciones comunes de NYSE+NASDAQ con
     capitalización ≥ min_market_cap, ordenadas por capitalización y limitadas a
     max_symbols. NO elige nombres a mano — solo pone un suelo de tamaño y deja que
     el filtro de liquidez point-in-time de la estrategia haga el resto.
 
-    CAVEAT: la API devuelve los listados ACTUALES → persiste sesgo de supervivencia
-    (faltan las que cotizaban y luego quebraron/deslistaron). Eliminarlo del todo
-    exige una base de constituyentes históricos; esto es lo mejor sin ella.
+    Los listados salen del universo point-in-time del almacén (universe_store.py): si el
+    último snapshot tiene ≤ max_age_days días se reutiliza sin descargar; si no, se
+    descargan (MarketData.get_universe) y se guardan como diferencia. Se añaden las que
+    cumplieron el suelo en algún snapshot y ya no cotizan, y el walk-forward filtra cada
+    fecha con `store.universe().membership(min_market_cap)`.
+
+    CAVEAT: antes del primer snapshot solo hay listados ACTUALES → en ese tramo persiste
+    el sesgo de supervivencia; se va corrigiendo a medida que se acumulan snapshots.
     """
-    url = "https://api.nasdaq.com/api/screener/stocks"
-    headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
-    rows = []
-    for exch in ('NYSE', 'NASDAQ'):
-        try:
-            r = requests.get(url, headers=headers,
-                             params={'tableonly': 'true', 'limit': '25000', 'exchange': exch},
-                             timeout=20)
-            if r.status_code == 200:
-                rows += r.json()['data']['table']['rows']
-        except Exception as e:
-            print(f"  ⚠️ Error universo {exch}: {e}")
-    cand = []
-    for row in rows:
-        sym = row.get('symbol', '')
-        if not sym or any(ch in sym for ch in '^./'):
-            continue
-        if not is_common_stock(row.get('name', '') or ''):
-            continue
-        try:
-            mcap = float(str(row.get('marketCap', '0')).replace(',', '') or 0)
-        except ValueError:
-            mcap = 0.0
-        if mcap >= min_market_cap:
-            cand.append((sym, mcap))
-    cand.sort(key=lambda x: -x[1])
-    syms = [s for s, _ in cand[:max_symbols]]
-    print(f"Universo amplio: {len(syms)} acciones (cap ≥ ${min_market_cap/1e9:.1f}B, top {max_symbols}).")
-    return syms or list(DEMO_UNIVERSE)
-
-
-def download(symbols, start='2019-09-01', end=None, batch_size=75):
+    us = (store or DataStore()).universe()
+    day, listing = us.latest()
+    today = pd.Timestamp.today().normalize()
+    if day is not None and (today - pd.Timestamp(day)).days <= max_age_days:
+        print(f"Listados del snapshot {day} ({len(listing)} acciones, sin descargar).")
+    else:
+        md = MarketData()
+        md.get_universe()
+        if md.symbol_industries:
+            listing = md.symbol_industries
+            us.record(today - pd.offsets.BDay(1), listing)
+    plain = lambda s: not any(ch in s for ch in '^./')
+    cand = sorted(((s, m.get('market_cap') or 0.0) for s, m in listing.items() if plain(s)),
+                  key=lambda x: -x[1])
+    syms = [s for s, mcap in cand if mcap >= min_market_cap][:max_symbols]
+    gone = [s for s in us.ever(min_market_cap) if s not in listing and plain(s)] if len(us) else []
+    print(f"Universo amplio: {len(syms)} acciones (cap ≥ ${min_market_cap/1e9:.1f}B, top {max_symbols})"
+          f" + {len(gone)} ya deslistadas.")
+    return (syms + gone) or list(DEMO_UNIVERSE)
+
+
+def download(symbols, start='2019-09-01', end=None, batch_size=75, compact=False, with_index=True):
     """Descarga OHLCV (con Open y Volume) + SPY por lotes con reintentos.
-    Devuelve (dict[sym]->DataFrame, spy_df)."""
+    Devuelve (dict[sym]->DataFrame, spy_df). Con `compact` cada lote se reduce a
+    float32/uint32 al llegar (el pico de RAM no acumula float64 de todo el universo)."""
     end = end or pd.Timestamp.today().strftime('%Y-%m-%d')
     data = {}
     n_batches = (len(symbols) + batch_size - 1) // batch_size
@@ -94,7 +110,7 @@ def download(symbols, start='2019-09-01', end=None, batch_size=75):
                     try:
                         d = raw[s][['Open', 'High', 'Low', 'Close', 'Volume']].dropna()
                         if len(d) > 300:
-                            data[s] = d
+                            data[s] = _compact_frame(d) if compact else d
                     except Exception:
                         pass
                 break
@@ -102,13 +118,50 @@ def download(symbols, start='2019-09-01', end=None, batch_size=75):
                 time.sleep(5 * (2 ** attempt))
         print(f"  lote {b + 1}/{n_batches} — acumuladas {len(data)} acciones", end='\r')
     print()
+    data, log = sanitize_frames(data)
+    print(f"  Saneado: {summary(log)}")
+    if not with_index:
+        return data, None
     spy = yf.download('^GSPC', start=start, end=end, auto_adjust=True, progress=False)
     if isinstance(spy.columns, pd.MultiIndex):
         spy.columns = spy.columns.droplevel(-1)
     spy = spy[['Open', 'High', 'Low', 'Close']].dropna()
+    spy = sanitize_frames({'^GSPC': spy}, INDEX_PARAMS)[0]['^GSPC']
     return data, spy
 
 
+def download_to_store(symbols, store, start='2019-09-01', end=None, batch_size=75):
+    """Descarga directa al almacén en disco (data_store.py) lote a lote: el universo
+    nunca está entero en RAM. El calendario es el del índice (^GSPC)."""
+    end = end or pd.Timestamp.today().strftime('%Y-%m-%d')
+    spy = yf.download('^GSPC', start=start, end=end, auto_adjust=True, progress=False)
+    if isinstance(spy.columns, pd.MultiIndex):
+        spy.columns = spy.columns.droplevel(-1)
+    spy = spy[['Open', 'High', 'Low', 'Close']].dropna()
+    spy = sanitize_frames({'^GSPC': spy}, INDEX_PARAMS)[0]['^GSPC']
+    store.save_index(spy)
+    writer = store.panel_writer(spy.index.values, symbols)
+    n_batches = (len(symbols) + batch_size - 1) // batch_size
+    n_ok = 0
+    for b in range(n_batches):
+        batch = symbols[b * batch_size:(b + 1) * batch_size]
+        part, _ = download(batch, start=start, end=end, batch_size=batch_size, with_index=False)
+        for s, d in part.items():
+            writer.write(s, d)
+        n_ok += len(part)
+        del part
+    writer.close()
+    print(f"Almacén {store.root}: {n_ok} acciones × {len(spy)} sesiones")
+    return store
+
+
+def _compact_frame(d):
+    """OHLC float32 + volumen entero (mismo criterio que PricePanel compacto)."""
+    d = d.astype({c: 'float32' for c in ('Open', 'High', 'Low', 'Close')})
+    d['Volume'] = d['Volume'].clip(0, 2 ** 32 - 1).astype('uint32')
+    return d
+
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument('--demo', action='store_true', help='Universo demo hand-picked (~60)')
@@ -117,22 +170,78 @@ def main():
     ap.add_argument('--step', type=int, default=5, help='Frecuencia del walk-forward (sesiones)')
     ap.add_argument('--max', type=int, default=500, help='Máx. acciones en el universo amplio')
     ap.add_argument('--min-cap', type=float, default=2e9, help='Capitalización mínima (USD)')
+    ap.add_argument('--compact', action='store_true',
+                    help='Panel columnar float32 (universos grandes / historias largas)')
+    ap.add_argument('--store', default=None,
+                    help='Almacén en disco (data_store.py): --chunk-days y universo point-in-time')
+    ap.add_argument('--signal-cache', default=SIGNAL_CACHE_DIR,
+                    help="Caché de señales en disco ('' para desactivar)")
+    ap.add_argument('--chunk-days', type=int, default=None,
+                    help='Backtest por tramos de N sesiones leyendo del almacén (out-of-core)')
+    ap.add_argument('--robustness', type=int, default=0,
+                    help='Remuestreos bootstrap para intervalos de confianza (0 = no)')
+    ap.add_argument('--workers', type=int, default=None, help='Procesos para la robustez')
+    ap.add_argument('--max-per-sector', type=int, default=None, help='Máx. posiciones por sector')
+    ap.add_argument('--max-pair-corr', type=float, default=None,
+                    help='Máx. correlación del candidato con una posición abierta')
+    ap.add_argument('--max-vol', type=float, default=None,
+                    help='Presupuesto de volatilidad anualizada de la cartera (p.ej. 0.25)')
+    ap.add_argument('--sleeves', action='store_true',
+                    help='Ruptura + pullback + watch en una sola cartera (un walk-forward)')
+    ap.add_argument('--extended', action='store_true',
+                    help='Métricas extendidas (portfolio_metrics.py)')
     args = ap.parse_args()
 
+    store = DataStore(args.store or 'data_store')
+    membership = None          # universo point-in-time (solo el amplio; el demo es a mano)
     if args.quick:
         universe = DEMO_UNIVERSE[:12]
     elif args.demo:
         universe = DEMO_UNIVERSE
     else:
-        universe = get_broad_universe(min_market_cap=args.min_cap, max_symbols=args.max)
+        universe = get_broad_universe(min_market_cap=args.min_cap, max_symbols=args.max, store=store)
+        membership = store.universe().membership(args.min_cap)
+
+    # Config validada para momentum: salida de cartera (SPY<MA200→liquidez) + trailing ancho
+    cfg = dict(market_filter_ma=200, trailing_pct=0.32, max_pair_corr=args.max_pair_corr,
+               max_portfolio_vol=args.max_vol)
+    if args.max_per_sector:
+        md = MarketData()
+        md.symbol_industries = store.universe().latest()[1]
+        if not md.symbol_industries:
+            md.get_universe()
+        cfg.update(max_per_sector=args.max_per_sector, sectors=md.symbol_sectors())
+
+    if args.chunk_days:
+        if not store.exists():
+            print(f"Descargando {len(universe)} acciones al almacén {store.root} (desde {args.start})...")
+            download_to_store(universe, store, start=args.start)
+        print(f"Backtest por tramos de {args.chunk_days} sesiones...")
+        results = run_chunked_backtest(store, f"{store.root}/backtest", chunk_days=args.chunk_days,
+                                       step=args.step, config=cfg, rs_matrix=store.rs_matrix(),
+                                       universe=membership)
+        print_report(results)
+        if args.extended:
+            print_extended(metrics_from_csv(results['paths']['equity'], store.index()['Close'],
+                                            trades=results['trades']))
+        return
 
     print(f"Descargando {len(universe)} acciones (desde {args.start})...")
-    price_data, spy = download(universe, start=args.start)
+    price_data, spy = download(universe, start=args.start, compact=args.compact)
+    if args.compact:
+        price_data = PricePanel.from_frames(price_data, calendar=spy.index, compact=True)
+        print(f"Panel compacto: {len(price_data)} símbolos × {len(price_data.dates)} sesiones "
+              f"({price_data.nbytes() / 1e6:.0f} MB)")
     print(f"Con datos: {len(price_data)} | Generando señales momentum (walk-forward)...")
 
-    signals = generate_momentum_signals(price_data, spy, step=args.step)
-    # Config validada para momentum: salida de cartera (SPY<MA200→liquidez) + trailing ancho
-    cfg = dict(market_filter_ma=200, trailing_pct=0.32)
+    if args.sleeves:
+        signals = generate_sleeve_signals(price_data, spy, step=args.step, universe=membership)
+        cfg['sleeves'] = SLEEVE_BUDGETS
+    elif args.signal_cache:
+        signals = cached_signals(price_data, spy, step=args.step, cache_dir=args.signal_cache,
+                                 universe=membership)
+    else:
+        signals = generate_momentum_signals(price_data, spy, step=args.step, universe=membership)
 
     print(f"Señales: {len(signals)}\n")
     if signals.empty:
@@ -140,6 +249,11 @@ def main():
         return
     results = run_portfolio_backtest(signals, price_data, spy, cfg)
     print_report(results)
+    if args.extended:
+        print_extended(extended_metrics(results['equity_curve'], spy['Close'], results['trades']))
+    if args.robustness:
+        print_robustness(run_robustness(results, signals, price_data, spy, n=args.robustness,
+                                        workers=args.workers))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,206 @@
+# screener_replay.py — REPLAY histórico del screener: las listas de cada sesión de un rango
+#
+# ¿Qué habría publicado run_momentum_screener cada día del último año? En vez de
+# recortar los datos N veces y relanzar todo, una sola pasada sobre el almacén:
+#   1) salud de mercado (check_market_health) en cada fecha con el índice hasta esa fecha,
+#   2) liquidez point-in-time (dólar-volumen mediano 50s + precio mínimo) y RS (percentil
+#      del retorno 6m entre las líquidas) de TODAS las fechas del rango: leídos por índice
+#      de la matriz RS del almacén (rs_matrix.py) o, sin ella, calculados a la vez sobre el
+#      panel (fechas × símbolos),
+#   3) por símbolo, los tres detectores vectorizados (momentum_vectorized.py) solo en las
+#      sesiones en que es líder — mismos resultados que los evaluadores escalares — sobre
+#      UN FeatureSet del símbolo (feature_graph.py): trend template, máximos, ATR, RSI...
+#      se calculan una vez y los comparten detectores y score,
+#   4) fundamentales "as of": el último snapshot archivado del símbolo en o antes de la
+#      fecha (results_archive.py de producción; sin snapshot → None, score neutro), el
+#      mismo filtro de rentabilidad y el mismo orden por score_breakout. Cripto: las que
+#      producción excluyó (enrich → is_crypto, archivadas en market.json como
+#      `excluded_crypto`) más la lista fija KNOWN_CRYPTO_DIRECT.
+# La salida va a un ResultsArchive propio (data_store/replay por defecto), con el mismo
+# formato que las sesiones reales, para compararlas con las mismas consultas.
+#
+# Diferencia conocida con producción: el RSI del dashboard es una media exponencial
+# que arranca al inicio de la historia disponible (aquí el almacén, allí 540 días); la
+# diferencia es despreciable tras unas decenas de sesiones.
+#
+# Uso:
+#   python screener_replay.py --start 2025-07-01 --end 2026-06-30
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_store import DataStore
+from feature_graph import MIN_BAR, FeatureSet
+from market_data import MarketData
+from momentum_screener import score_breakout
+from momentum_strategy import DEFAULTS
+from momentum_vectorized import evaluate_breakout_many, evaluate_entry_many, evaluate_watch_many
+from results_archive import ResultsArchive, LISTS
+from rs_matrix import liquidity_and_rs
+
+
+DEFAULT_OUT = 'data_store/replay'
+FUNDAMENTAL_FIELDS = ('name', 'sector', 'margin', 'revg', 'epsg', 'rating', 'target')
+
+
+class FundamentalsAsOf:
+    """Último snapshot de fundamentales de cada símbolo en o antes de una fecha, sacado
+    de las sesiones archivadas de producción (sin look-ahead). Además, el conjunto de
+    símbolos que producción excluyó por cripto-directo en alguna sesión: las excluidas
+    no llegan a las listas archivadas, así que se leen de `excluded_crypto` del contexto
+    de mercado. Es una propiedad del negocio, no del precio: se aplica a cualquier fecha."""
+
+    def __init__(self, archive=None):
+        self.by_symbol = {}
+        self.crypto = set(MarketData.KNOWN_CRYPTO_DIRECT)
+        if archive is None:
+            return
+        market = archive.market()
+        if 'excluded_crypto' in market:
+            for syms in market['excluded_crypto']:
+                if isinstance(syms, list):
+                    self.crypto.update(syms)
+        frames = [archive.query(name, columns=['symbol', *FUNDAMENTAL_FIELDS]) for name in LISTS]
+        frames = [f for f in frames if not f.empty]
+        if not frames:
+            return
+        df = pd.concat(frames, ignore_index=True).sort_values('date', kind='stable')
+        for sym, g in df.groupby('symbol', sort=False):
+            self.by_symbol[sym] = (g['date'].values, g.to_dict('records'))
+
+    def get(self, symbol, date):
+        hit = self.by_symbol.get(symbol)
+        if hit is None:
+            return {}
+        dates, recs = hit
+        k = np.searchsorted(dates, np.datetime64(date), 'right') - 1
+        if k < 0:
+            return {}
+        r = recs[k]
+        return {f: (None if (r.get(f) is None or (isinstance(r.get(f), float) and np.isnan(r[f]))
+                             or r.get(f) == '') else r[f]) for f in FUNDAMENTAL_FIELDS}
+
+    def is_crypto(self, symbol):
+        return symbol in self.crypto
+
+
+def replay_screener(panel, index_df, start, end, params=None, fundamentals=None, archive=None,
+                    rs_matrix=None):
+    """Reconstruye las tres listas del screener en cada sesión de [start, end].
+    Devuelve dict fecha -> dict(breakouts, pullbacks, watch, market); si se pasa
+    `archive` (ResultsArchive) además escribe cada sesión en él. Con `rs_matrix`
+    (RSMatrix alineada con el panel y los mismos params) liquidez y RS se leen de ella."""
+    p = {**DEFAULTS, **(params or {})}
+    fundamentals = fundamentals or FundamentalsAsOf()
+    cal = pd.DatetimeIndex(panel.dates)
+    rows = np.flatnonzero((cal >= pd.Timestamp(start)) & (cal <= pd.Timestamp(end)))
+    if len(rows) == 0:
+        return {}
+    md = MarketData()
+    health = [md.check_market_health(index_df.loc[:cal[r]]) for r in rows]
+    healthy = np.array([h[0] for h in health])
+
+    if rs_matrix is not None and rs_matrix.aligned(panel, p):
+        liquid, rs = rs_matrix.block(rows)
+    else:
+        liquid, rs = liquidity_and_rs(panel, rows, p)
+    floor = min(p['rs_min'], p['breakout_rs_min'], p['watch_rs_min'])
+    with np.errstate(invalid='ignore'):
+        cand = (rs >= floor) & healthy[:, None]
+    lists = {k: {} for k in range(len(rows))}      # k (fecha) -> dict listas
+
+    for j in np.flatnonzero(cand.any(axis=0)):
+        sym = panel.symbols[j]
+        ks = np.flatnonzero(cand[:, j])
+        srows = panel.rows(sym)
+        idx = np.searchsorted(srows, rows[ks])
+        a = panel.series(sym)
+        c = a['c'].astype(np.float64)
+        h = a['h'].astype(np.float64)
+        l = a['l'].astype(np.float64)
+        v = a['v'].astype(np.float64) if 'v' in a else None
+        r_s = rs[ks, j]
+        fs = FeatureSet(c, h, l, idx[idx >= MIN_BAR], v)
+
+        hits = dict(breakouts=evaluate_breakout_many(c, h, l, idx, r_s, p, fs),
+                    pullbacks=evaluate_entry_many(c, h, l, idx, r_s, p, fs),
+                    watch=evaluate_watch_many(c, h, l, idx, r_s, p, fs))
+        for name, found in hits.items():
+            for q, sig in found:
+                i, k = int(idx[q]), int(ks[q])
+                f = fs.at([i])
+                row = dict(symbol=sym, rs=float(r_s[q]),
+                           mom6m=round(float(f('mom6m', p['mom_lookback'])[0]), 1))
+                if name == 'breakouts':
+                    row.update(vol_ratio=round(float(f('vol_ratio')[0]), 2),
+                               rsi=round(float(f('rsi')[0]), 0))
+                row.update(sig)
+                lists[k].setdefault(name, []).append(row)
+
+    out = {}
+    for k, r in enumerate(rows):
+        date = cal[r]
+        found = lists[k]
+        session = _finish_session(date, found.get('breakouts', []), found.get('pullbacks', []),
+                                  found.get('watch', []), fundamentals)
+        with np.errstate(invalid='ignore'):
+            n_leaders = int((rs[k] >= p['rs_min']).sum())
+        session['market'] = dict(healthy=bool(health[k][0]), health_score=float(health[k][1]),
+                                 n_liquid=int(liquid[k].sum()), n_leaders=n_leaders, replay=True)
+        out[date] = session
+        if archive is not None:
+            archive.write(date, {n: session[n] for n in LISTS}, market=session['market'])
+    return out
+
+
+def _finish_session(date, breakouts, pullbacks, watch, fundamentals):
+    """Mismo post-proceso que run_momentum_screener: fundamentales, filtro cripto /
+    no rentables, score y orden de cada lista. El filtro cripto usa lo que producción
+    marcó is_crypto (FundamentalsAsOf.is_crypto) más la lista fija."""
+    for p in breakouts + pullbacks + watch:
+        p.update(fundamentals.get(p['symbol'], date) or {f: None for f in FUNDAMENTAL_FIELDS})
+
+    def keep(p):
+        if fundamentals.is_crypto(p['symbol']):
+            return False
+        m = p.get('margin')
+        return not (m is not None and m <= 0)
+
+    breakouts = [p for p in breakouts if keep(p)]
+    pullbacks = [p for p in pullbacks if keep(p)]
+    actionable = {p['symbol'] for p in breakouts} | {p['symbol'] for p in pullbacks}
+    watch = [p for p in watch if keep(p) and p['symbol'] not in actionable]
+    for p in breakouts:
+        p['score'] = score_breakout(p)
+    breakouts.sort(key=lambda x: -x['score'])
+    pullbacks.sort(key=lambda x: -x['mom6m'])
+    watch.sort(key=lambda x: (-x['rs'], -x['mom6m']))
+    return dict(breakouts=breakouts, pullbacks=pullbacks, watch=watch)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--start', required=True)
+    ap.add_argument('--end', default=None)
+    ap.add_argument('--store', default='data_store')
+    ap.add_argument('--out', default=DEFAULT_OUT, help='ResultsArchive de salida')
+    args = ap.parse_args()
+
+    store = DataStore(args.store)
+    panel, index_df = store.panel(), store.index()
+    live = ResultsArchive(store.path('results'))
+    t0 = time.perf_counter()
+    res = replay_screener(panel, index_df, args.start, args.end or str(index_df.index[-1].date()),
+                          fundamentals=FundamentalsAsOf(live), archive=ResultsArchive(args.out),
+                          rs_matrix=store.rs_matrix(panel=panel))
+    dt = time.perf_counter() - t0
+    n = {name: sum(len(s[name]) for s in res.values()) for name in LISTS}
+    print(f"Replay: {len(res)} sesiones en {dt:.1f}s → {args.out} | "
+          f"rupturas {n['breakouts']}, pullbacks {n['pullbacks']}, a vigilar {n['watch']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+# screener_service.py — Servicio LOCAL del screener con el panel en memoria (consultas ad hoc)
+#
+# "¿Por qué no salió LLY hoy?", "¿qué rupturas saldrían con breakout_max_ext_ma50=0.15?"
+# obligaban a relanzar el screener entero (descarga incluida). Aquí un proceso que carga
+# UNA vez el almacén (data_store.py) en RAM y responde en milisegundos:
+#   - evaluar un símbolo con overrides de DEFAULTS y explicar QUÉ filtro lo descarta
+#     (datos → liquidez → mercado → cada condición del detector, en orden: la traza del
+#     PROPIO evaluador de momentum_strategy.py, `trace=`, no una copia de sus reglas),
+#   - las tres listas del universo en la última sesión (mismo post-proceso que el
+#     screener/replay: fundamentales archivados, filtro cripto/no rentables, score),
+#   - añadir la barra de un nuevo día sin reiniciar (POST /bar).
+# RS y liquidez de la última sesión se leen de la matriz RS del almacén (rs_matrix.py; al
+# añadir una barra gana una fila) o, con otros params de liquidez, se calculan y se
+# cachean por juego de params; los arrays float64 y las features (feature_graph.py) de cada símbolo se
+# materializan una vez, al consultarlos, y se reutilizan entre consultas.
+#
+# API HTTP (JSON, solo localhost):
+#   GET  /health
+#   GET  /symbol/LLY?breakout_max_ext_ma50=0.15     evaluación + explicación por detector
+#   GET  /rank/breakouts?breakout_max_ext_ma50=0.15  (breakouts | pullbacks | watch)
+#   POST /bar   {"date": "2026-07-01", "index": [o,h,l,c], "bars": {"LLY": [o,h,l,c,v], ...}}
+#
+# Uso:
+#   python screener_service.py serve --port 8765
+#   python screener_service.py explain LLY --set breakout_max_ext_ma50=0.15   # una consulta
+
+import argparse
+import copy
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+from data_store import DataStore
+from feature_graph import FeatureSet
+from market_data import MarketData
+from momentum_strategy import DEFAULTS, evaluate_breakout, evaluate_entry, evaluate_watch
+from momentum_vectorized import evaluate_breakout_many, evaluate_entry_many, evaluate_watch_many
+from price_panel import FIELDS, PricePanel, _VOL_MAX
+from results_archive import ResultsArchive, LISTS
+from rs_matrix import LIQ_PARAMS, liquidity_and_rs
+from screener_replay import FundamentalsAsOf, _finish_session
+
+
+EVALUATORS = dict(breakouts=evaluate_breakout, pullbacks=evaluate_entry, watch=evaluate_watch)
+EVALUATORS_MANY = dict(breakouts=evaluate_breakout_many, pullbacks=evaluate_entry_many,
+                       watch=evaluate_watch_many)
+RS_KEY = dict(breakouts='breakout_rs_min', pullbacks='rs_min', watch='watch_rs_min')
+
+
+def parse_overrides(pairs):
+    """{'clave': 'valor'} → overrides tipados según DEFAULTS (claves desconocidas: error)."""
+    out = {}
+    for k, v in pairs.items():
+        if k not in DEFAULTS:
+            raise KeyError(f"param desconocido: {k}")
+        ref = DEFAULTS[k]
+        if isinstance(ref, bool):
+            out[k] = str(v).lower() in ('1', 'true', 'yes', 'si', 'sí')
+        elif isinstance(ref, int):
+            out[k] = int(float(v))
+        elif isinstance(ref, float) or ref is None:
+            out[k] = None if str(v).lower() == 'none' else float(v)
+        else:
+            out[k] = v
+    return out
+
+
+class ScreenerService:
+    """Panel + índice en RAM y respuestas a consultas sobre la ÚLTIMA sesión. `lock`
+    serializa consultas y append_bar en el servidor HTTP (varios hilos): una barra nueva
+    sustituye los arrays del panel y vacía las cachés que leen las consultas."""
+
+    def __init__(self, store=None, archive=None):
+        self.lock = threading.Lock()
+        self.store = store or DataStore()
+        t0 = time.perf_counter()
+        self.panel = self.store.panel(mmap_mode=None)          # en RAM (hot)
+        self.index = self.store.index()
+        self.rs_matrix = self.store.rs_matrix(panel=self.panel)
+        self.fundamentals = FundamentalsAsOf(archive or ResultsArchive(self.store.path('results')))
+        self._series = {}
+        self._features = {}
+        self._rs = {}
+        self._sessions = {}
+        self._refresh_market()
+        print(f"Servicio: {len(self.panel.symbols)} símbolos × {len(self.panel.dates)} sesiones "
+              f"cargados en {time.perf_counter() - t0:.1f}s (última {self.last_date.date()})")
+
+    @property
+    def last_date(self):
+        return pd.Timestamp(self.panel.dates[-1])
+
+    def _refresh_market(self):
+        self.healthy, self.health_score = MarketData().check_market_health(self.index)
+        self._series.clear()
+        self._features.clear()
+        self._rs.clear()
+        self._sessions.clear()
+
+    def arrays(self, sym):
+        """c/h/l/v float64 del símbolo (una vez por símbolo y sesión cargada)."""
+        a = self._series.get(sym)
+        if a is None:
+            s = self.panel.series(sym)
+            a = {k: np.asarray(s[k], dtype=np.float64) for k in ('c', 'h', 'l', 'v') if k in s}
+            self._series[sym] = a
+        return a
+
+    def features(self, sym):
+        """FeatureSet de la última barra de `sym` (feature_graph.py): las features que
+        piden las consultas quedan cacheadas hasta la siguiente sesión."""
+        fs = self._features.get(sym)
+        if fs is None:
+            a = self.arrays(sym)
+            fs = self._features[sym] = FeatureSet(a['c'], a['h'], a['l'], [len(a['c']) - 1], a.get('v'))
+        return fs
+
+    def liquidity_rs(self, p):
+        """(líquidas bool (N,), RS (N,)) de la última sesión, cacheado por params de liquidez."""
+        key = tuple(p[k] for k in LIQ_PARAMS)
+        if key not in self._rs:
+            last = np.array([len(self.panel.dates) - 1])
+            if self.rs_matrix.aligned(self.panel, p):
+                liq, rs = self.rs_matrix.block(last)
+            else:
+                liq, rs = liquidity_and_rs(self.panel, last, p)
+            self._rs[key] = (liq[0], rs[0])
+        return self._rs[key]
+
+    # --- Consultas ---
+    def health(self):
+        return dict(last_date=str(self.last_date.date()), symbols=len(self.panel.symbols),
+                    sessions=len(self.panel.dates), healthy=bool(self.healthy),
+                    health_score=float(self.health_score))
+
+    def symbol(self, sym, overrides=None):
+        """Evaluación de `sym` en la última sesión con los tres detectores + explicación."""
+        p = {**DEFAULTS, **(overrides or {})}
+        out = dict(symbol=sym, date=str(self.last_date.date()), params=overrides or {})
+        if sym not in self.panel or self.panel.count[self.panel.sym_idx[sym]] == 0:
+            return dict(out, rejected_by='datos', detail='sin datos en el almacén')
+        j = self.panel.sym_idx[sym]
+        if self.panel.last[j] != len(self.panel.dates) - 1:
+            return dict(out, rejected_by='datos', detail='sin barra en la última sesión')
+        liq, rs = self.liquidity_rs(p)
+        out['rs'] = None if np.isnan(rs[j]) else float(rs[j])
+        if not liq[j]:
+            return dict(out, rejected_by='liquidez',
+                        detail=f"dólar-vol mediano {p['liq_window']}s < ${p['min_dollar_vol'] / 1e6:.0f}M "
+                               f"o precio < ${p['min_price']:.0f}")
+        if not self.healthy:
+            return dict(out, rejected_by='mercado', detail='índice bajo su MA200: no se busca')
+        a = self.arrays(sym)
+        i = len(a['c']) - 1
+        out['lists'] = {}
+        for kind, ev in EVALUATORS.items():
+            gates = []
+            sig = ev(a['c'], a['h'], a['l'], i, out['rs'], p, trace=gates)
+            failed = next((g for g in gates if not g[1]), None)
+            out['lists'][kind] = dict(
+                signal=sig is not None, result=sig,
+                rejected_by=None if failed is None else failed[0],
+                gates=[dict(name=n, ok=ok, detail=d) for n, ok, d in gates])
+        return out
+
+    def rank(self, list_name='breakouts', overrides=None, top=None):
+        """Una lista del screener sobre todo el universo en la última sesión (las tres
+        listas se calculan juntas y se cachean por juego de overrides)."""
+        if list_name not in EVALUATORS:
+            raise KeyError(f"lista desconocida: {list_name}")
+        key = repr(sorted((overrides or {}).items()))
+        if key not in self._sessions:
+            self._sessions[key] = self._session({**DEFAULTS, **(overrides or {})})
+        rows = self._sessions[key][list_name]
+        return rows[:top] if top else rows
+
+    def _session(self, p):
+        if not self.healthy:
+            return {k: [] for k in LISTS}
+        liq, rs = self.liquidity_rs(p)
+        floor = min(p['rs_min'], p['breakout_rs_min'], p['watch_rs_min'])
+        found = {k: [] for k in LISTS}
+        last = len(self.panel.dates) - 1
+        with np.errstate(invalid='ignore'):
+            leaders = np.flatnonzero(liq & (rs >= floor) & (self.panel.last == last))
+        # Las tres listas siempre: el watch excluye lo accionable (ruptura/pullback).
+        for j in leaders:
+            sym = self.panel.symbols[j]
+            fs = self.features(sym)
+            r = float(rs[j])
+            for kind, ev in EVALUATORS_MANY.items():
+                hit = ev(fs.c, fs.h, fs.l, fs.i, [r], p, fs)
+                if not hit:
+                    continue
+                sig = hit[0][1]
+                row = dict(symbol=sym, rs=r, mom6m=round(float(fs('mom6m', p['mom_lookback'])[0]), 1))
+                if kind == 'breakouts':
+                    row.update(vol_ratio=round(float(fs('vol_ratio')[0]), 2),
+                               rsi=round(float(fs('rsi')[0]), 0))
+                row.update(sig)
+                found[kind].append(row)
+        return _finish_session(self.last_date, found['breakouts'], found['pullbacks'],
+                               found['watch'], self.fundamentals)
+
+    # --- Nueva sesión ---
+    def append_bar(self, date, bars, index_bar):
+        """Añade la sesión `date` (bars: símbolo -> [o,h,l,c,v], index_bar: [o,h,l,c(,v)])
+        al panel en RAM; los símbolos sin barra quedan en NaN ese día. La fila del índice
+        se arma por nombre de columna (el screener guarda el índice solo con Close). Todo
+        se valida y se construye aparte antes de sustituir panel, índice y matriz RS a la
+        vez: una barra rechazada deja el servicio como estaba."""
+        date = pd.Timestamp(date)
+        if date <= self.last_date:
+            raise ValueError(f"{date.date()} no es posterior a la última sesión {self.last_date.date()}")
+        pn = self.panel
+        ix = _numeric(index_bar, 'index')
+        if len(ix) < 4 or not np.isfinite(ix[3]):
+            raise ValueError("index: se espera [o, h, l, c(, v)] con cierre numérico")
+        pos = {col: k for k, col in enumerate(FIELDS.values())}
+        missing = [col for col in self.index.columns if col not in pos]
+        if missing:
+            raise ValueError(f"columnas del índice sin campo en la barra: {missing}")
+        index_row = pd.DataFrame([[ix[pos[col]] if pos[col] < len(ix) else np.nan
+                                   for col in self.index.columns]],
+                                 index=pd.DatetimeIndex([date]), columns=self.index.columns)
+        rows = {k: np.full((1, arr.shape[1]), 0 if arr.dtype == np.uint32 else np.nan, dtype=arr.dtype)
+                for k, arr in pn.arrays.items()}
+        for sym, b in bars.items():
+            j = pn.sym_idx.get(sym)
+            if j is None:
+                continue
+            b = _numeric(b, sym)
+            if len(b) < 4:
+                raise ValueError(f"{sym}: se espera [o, h, l, c, v]")
+            for k, row in rows.items():
+                f = 'ohlcv'.index(k)
+                v = b[f] if f < len(b) else np.nan
+                row[0, j] = np.clip(np.nan_to_num(v), 0, _VOL_MAX) if row.dtype == np.uint32 else v
+
+        panel = PricePanel(np.append(pn.dates, np.datetime64(date.date())), pn.symbols,
+                           {k: np.concatenate([arr, rows[k]]) for k, arr in pn.arrays.items()})
+        rs_matrix = copy.copy(self.rs_matrix)       # update() reasigna sus arrays: el original no cambia
+        rs_matrix.update(panel)
+        index = pd.concat([self.index, index_row])
+        self.panel, self.index, self.rs_matrix = panel, index, rs_matrix
+        self._refresh_market()
+        return self.health()
+
+
+def _numeric(bar, what):
+    try:
+        return np.asarray(bar, dtype=np.float64).ravel()
+    except (TypeError, ValueError):
+        raise ValueError(f"{what}: barra no numérica {bar!r}") from None
+
+
+def _handler(svc):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, code, payload):
+            body = json.dumps(payload, ensure_ascii=False, default=str).encode()
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            u = urlparse(self.path)
+            parts = [x for x in u.path.split('/') if x]
+            q = {k: v[-1] for k, v in parse_qs(u.query).items()}
+            top = int(q.pop('top')) if 'top' in q else None
+            try:
+                t0 = time.perf_counter()
+                with svc.lock:
+                    if parts == ['health']:
+                        res = svc.health()
+                    elif len(parts) == 2 and parts[0] == 'symbol':
+                        res = svc.symbol(parts[1].upper(), parse_overrides(q))
+                    elif len(parts) == 2 and parts[0] == 'rank':
+                        res = svc.rank(parts[1], parse_overrides(q), top)
+                    else:
+                        res = None
+                if res is None:
+                    return self._send(404, dict(error='ruta desconocida'))
+                self._send(200, dict(result=res, ms=round((time.perf_counter() - t0) * 1000, 1)))
+            except (KeyError, ValueError) as e:
+                self._send(400, dict(error=str(e)))
+
+        def do_POST(self):
+            if urlparse(self.path).path != '/bar':
+                return self._send(404, dict(error='ruta desconocida'))
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                with svc.lock:
+                    res = svc.append_bar(body['date'], body.get('bars', {}), body['index'])
+                self._send(200, dict(result=res))
+            except (KeyError, ValueError) as e:
+                self._send(400, dict(error=str(e)))
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('cmd', choices=['serve', 'explain', 'rank'])
+    ap.add_argument('arg', nargs='?', help='símbolo (explain) o lista (rank)')
+    ap.add_argument('--store', default='data_store')
+    ap.add_argument('--port', type=int, default=8765)
+    ap.add_argument('--set', action='append', default=[], help='override clave=valor de DEFAULTS')
+    args = ap.parse_args()
+
+    svc = ScreenerService(DataStore(args.store))
+    overrides = parse_overrides(dict(kv.split('=', 1) for kv in args.set))
+    if args.cmd == 'serve':
+        srv = ThreadingHTTPServer(('127.0.0.1', args.port), _handler(svc))
+        print(f"Escuchando en http://127.0.0.1:{args.port} (Ctrl+C para salir)")
+        try:
+            srv.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    elif args.cmd == 'explain':
+        print(json.dumps(svc.symbol(args.arg.upper(), overrides), indent=2, ensure_ascii=False, default=str))
+    else:
+        for r in svc.rank(args.arg or 'breakouts', overrides):
+            print(f"  {r['symbol']:<6} RS={r['rs']:.0f}  score={r.get('score', '—')}  entry={r['entry']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# signal_cache.py — Caché en disco de generate_momentum_signals (direccionada por contenido)
+#
+# Las señales son una función PURA de (datos de precios, calendario, params, evaluador,
+# step, rs_floor). Al afinar solo la cartera (trailing_pct, max_positions,
+# market_filter_ma...) el walk-forward se repetía entero cada vez. Aquí la clave es el
+# hash de todas las entradas:
+#   - huella por símbolo de los datos (blake2b de sus arrays H/L/C/V + fechas),
+#   - huella del calendario del benchmark,
+#   - params canónicos ({**DEFAULTS, **params} en JSON ordenado),
+#   - identidad del código: hash del fuente COMPLETO de los módulos que producen las
+#     señales (CODE_MODULES: evaluadores con sus auxiliares, walk-forward, núcleos de
+#     kernels.py, matriz RS...), del evaluador si viene de fuera, y el backend activo de
+#     kernels.py: si cambia cualquier función de la cadena, cambia la clave,
+#   - step, rs_floor y ci_range,
+#   - si se lee el RS de una matriz precalculada (rs_matrix.py), su huella,
+#   - si se filtra por el universo point-in-time (universe_store.py), su log y el suelo.
+# Cualquier cambio invalida la entrada sola; si nada cambia se reutiliza, también entre
+# procesos (escritura atómica: tmp + os.replace).
+
+import hashlib
+import inspect
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import kernels
+import momentum_strategy
+import momentum_vectorized
+import price_panel
+import rs_matrix as rs_matrix_mod
+from momentum_strategy import DEFAULTS, evaluate_entry, generate_momentum_signals
+
+
+DEFAULT_DIR = os.path.join('data_store', 'signal_cache')
+# Módulos cuyo código entero entra en la clave (no solo funciones sueltas: una auxiliar
+# o un núcleo editado también invalida).
+CODE_MODULES = (momentum_strategy, kernels, rs_matrix_mod, momentum_vectorized, price_panel)
+
+
+def _h(*parts):
+    m = hashlib.blake2b(digest_size=16)
+    for p in parts:
+        m.update(p if isinstance(p, (bytes, memoryview)) else str(p).encode())
+        m.update(b'\x1f')
+    return m.hexdigest()
+
+
+def data_fingerprint(price_data):
+    """Huella de los datos: una por símbolo (nombre, nº de barras, fechas y bytes de
+    H/L/C/V), combinadas en orden de símbolo. Lee los arrays una vez (secuencial,
+    ~GB/s); no depende del orden de inserción del dict."""
+    per_symbol = []
+    if hasattr(price_data, 'series'):
+        for s in sorted(price_data.symbols):
+            if price_data.count[price_data.sym_idx[s]] == 0:
+                continue
+            a = price_data.series(s)
+            rows = price_data.dates[price_data.rows(s)]
+            per_symbol.append(_h(s, rows[0], rows[-1], len(rows),
+                                 *(np.ascontiguousarray(a[k]).tobytes() for k in 'hlcv' if k in a)))
+    else:
+        for s in sorted(price_data):
+            d = price_data[s]
+            cols = [c for c in ('High', 'Low', 'Close', 'Volume') if c in d.columns]
+            per_symbol.append(_h(s, d.index.asi8.tobytes(),
+                                 np.ascontiguousarray(d[cols].values, dtype=float).tobytes()))
+    return _h(*per_symbol)
+
+
+def rs_fingerprint(rsm):
+    """Huella de una RSMatrix (fechas, símbolos, params y códigos RS)."""
+    if rsm is None:
+        return None
+    return _h(rsm.dates.tobytes(), json.dumps(rsm.symbols), json.dumps(rsm.params, sort_keys=True),
+              memoryview(np.ascontiguousarray(rsm.codes)).cast('B'))
+
+
+def universe_fingerprint(universe):
+    """Huella de un Membership (universe_store.py): log de listados + capitalización mínima."""
+    return None if universe is None else _h(*universe.key())
+
+
+def _source(obj):
+    try:
+        return inspect.getsource(obj)
+    except (OSError, TypeError):
+        return ''
+
+
+def _code_id(fn):
+    return f"{getattr(fn, '__module__', '')}.{getattr(fn, '__qualname__', repr(fn))}:{_h(_source(fn))}"
+
+
+_CODE_FP = None
+
+
+def code_fingerprint():
+    """Huella del código de las señales: fuente de CODE_MODULES + backend de kernels.py."""
+    global _CODE_FP
+    if _CODE_FP is None:
+        _CODE_FP = _h(*(f'{m.__name__}:{_h(_source(m))}' for m in CODE_MODULES))
+    return _h(_CODE_FP, kernels.BACKEND)
+
+
+def signal_key(price_data, spy, step=5, params=None, evaluator=None, rs_floor=None,
+               ci_range=None, data_fp=None, rs_matrix=None, universe=None):
+    """Clave de caché de una llamada a generate_momentum_signals."""
+    p = {**DEFAULTS, **(params or {})}
+    evaluator = evaluator or evaluate_entry
+    return _h(data_fp or data_fingerprint(price_data),
+              spy.index.asi8.tobytes(),
+              json.dumps(p, sort_keys=True, default=str),
+              _code_id(evaluator), code_fingerprint(),
+              step, rs_floor, ci_range, rs_fingerprint(rs_matrix), universe_fingerprint(universe))
+
+
+def cached_signals(price_data, spy, step=5, params=None, evaluator=None, rs_floor=None,
+                   ci_range=None, cache_dir=DEFAULT_DIR, data_fp=None, verbose=True, rs_matrix=None,
+                   universe=None):
+    """generate_momentum_signals con memoización en disco. `data_fp` permite reutilizar
+    la huella de datos entre varias llamadas (barrido de params sobre los mismos datos)."""
+    key = signal_key(price_data, spy, step, params, evaluator, rs_floor, ci_range, data_fp, rs_matrix,
+                     universe)
+    path = os.path.join(cache_dir, f'{key}.pkl')
+    if os.path.exists(path):
+        try:
+            sig = pd.read_pickle(path)
+            if verbose:
+                print(f"  señales desde caché ({len(sig)}) — {key[:12]}")
+            return sig
+        except Exception:
+            pass   # entrada corrupta/incompatible → se regenera
+    sig = generate_momentum_signals(price_data, spy, step=step, params=params,
+                                    evaluator=evaluator, rs_floor=rs_floor, ci_range=ci_range,
+                                    rs_matrix=rs_matrix, universe=universe)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    sig.to_pickle(tmp)
+    os.replace(tmp, path)
+    if verbose:
+        print(f"  señales calculadas y cacheadas ({len(sig)}) — {key[:12]}")
+    return sig
@@ -0,0 +1,211 @@
+# store_snapshot.py — Instantánea PORTÁTIL del almacén: un fichero comprimido y verificado
+#
+# El job diario corre en un runner efímero (ubuntu-latest): el almacén local (data_store/)
+# se perdía en cada ejecución y todo arrancaba en frío — panel reducido a la última
+# descarga, matriz RS reconstruida entera, sin universo point-in-time ni archivo de
+# resultados (los fundamentales as-of del servicio). Aquí el almacén se empaqueta en UN zip:
+#   - solo las partes que no se regeneran baratas (PARTS); fuera la caché de señales y
+#     las salidas de backtest/replay,
+#   - los .npy con sus bytes agrupados por plano (byte-shuffle: el primer byte de cada
+#     float32, luego el segundo...) antes del deflate: signos y exponentes repetidos
+#     quedan juntos y comprimen mejor que intercalados; en los paneles de precios
+#     (fechas × símbolos, float) cada fila va además en XOR con la sesión anterior
+#     (precios vecinos comparten signo, exponente y bits altos → planos casi a cero),
+#   - MANIFEST.json con tamaño y blake2b de cada fichero ORIGINAL; el hash del propio
+#     manifiesto va en el comentario del zip.
+# La importación descomprime en un directorio temporal, verifica cada fichero contra el
+# manifiesto y solo entonces sustituye esas partes del almacén. Cualquier discrepancia
+# (zip truncado, hash, otro formato) deja el almacén como estaba y devuelve False: el
+# screener arranca en frío, igual que sin instantánea.
+#
+#   python store_snapshot.py export data_store.snapshot.zip
+#   python store_snapshot.py import data_store.snapshot.zip
+
+import hashlib
+import io
+import json
+import os
+import shutil
+import time
+import zipfile
+
+import numpy as np
+
+from data_store import DataStore
+
+
+FORMAT = 1
+MANIFEST = 'MANIFEST.json'
+PARTS = ('panel', 'index', 'rs', 'universe', 'results', 'outcomes', 'groups.json', 'quality_log.csv')
+DEFAULTS = dict(
+    level=6,             # nivel de deflate (9 apenas reduce más y tarda el doble)
+    shuffle=True,        # byte-shuffle (y XOR por filas en los paneles float) de los .npy
+)
+
+
+def _hash(raw):
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+def _files(root, parts):
+    """Rutas relativas ('/' como separador) de los ficheros de `parts` bajo `root`."""
+    out = []
+    for part in parts:
+        top = os.path.join(root, part)
+        if os.path.isfile(top):
+            out.append(part)
+            continue
+        for d, _, names in os.walk(top):
+            rel = os.path.relpath(d, root).replace(os.sep, '/')
+            out += [f'{rel}/{n}' for n in names if '.tmp' not in n]
+    return sorted(out)
+
+
+def _shuffle(raw):
+    """(bytes agrupados por plano, tamaño de la cabecera, itemsize, ancho de fila del XOR
+    o 0) de un .npy, o None si no es un array de tipo fijo."""
+    f = io.BytesIO(raw)
+    try:
+        version = np.lib.format.read_magic(f)
+        read = (np.lib.format.read_array_header_1_0 if version == (1, 0)
+                else np.lib.format.read_array_header_2_0)
+        shape, fortran, dtype = read(f)
+    except ValueError:
+        return None
+    head, k = f.tell(), dtype.itemsize
+    if dtype.hasobject or k < 2 or (len(raw) - head) % k:
+        return None
+    width = (shape[1] if dtype.kind == 'f' and len(shape) == 2 and shape[0] > 1 and shape[1]
+             and not fortran else 0)
+    bits = np.frombuffer(raw, f'u{k}', offset=head) if k in (2, 4, 8) else None
+    if width and bits is not None:
+        bits = bits.reshape(-1, width)
+        x = bits.copy()
+        x[1:] ^= bits[:-1]
+        body = x.view(np.uint8).reshape(-1, k).T
+    else:
+        width = 0
+        body = np.frombuffer(raw, np.uint8, offset=head).reshape(-1, k).T
+    return raw[:head] + body.tobytes(), head, k, width
+
+
+def _unshuffle(data, head, k, width=0):
+    body = np.ascontiguousarray(np.frombuffer(data, np.uint8, offset=head).reshape(k, -1).T)
+    if width:
+        body = np.bitwise_xor.accumulate(body.view(f'u{k}').reshape(-1, width), axis=0)
+    return data[:head] + body.tobytes()
+
+
+def export_snapshot(store, path, parts=PARTS, level=None, shuffle=None):
+    """Empaqueta las `parts` del almacén (DataStore o ruta) en el zip `path` (escritura
+    atómica). Devuelve dict(files, bytes originales, packed bytes, seconds)."""
+    t0 = time.perf_counter()
+    store = DataStore(store) if isinstance(store, str) else store
+    level = DEFAULTS['level'] if level is None else level
+    shuffle = DEFAULTS['shuffle'] if shuffle is None else shuffle
+    entries = []
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with zipfile.ZipFile(tmp, 'w', zipfile.ZIP_DEFLATED, compresslevel=level) as z:
+        for rel in _files(store.root, parts):
+            with open(store.path(*rel.split('/')), 'rb') as f:
+                raw = f.read()
+            entry = dict(path=rel, size=len(raw), hash=_hash(raw))
+            packed = _shuffle(raw) if shuffle and rel.endswith('.npy') else None
+            if packed is not None:
+                raw, entry['head'], entry['itemsize'], entry['xor'] = packed
+            z.writestr(rel, raw)
+            entries.append(entry)
+        manifest = json.dumps(dict(format=FORMAT, created=time.strftime('%Y-%m-%dT%H:%M:%S'),
+                                   files=entries), separators=(',', ':')).encode()
+        z.writestr(MANIFEST, manifest)
+        z.comment = _hash(manifest).encode()
+    os.replace(tmp, path)
+    return dict(files=len(entries), bytes=sum(e['size'] for e in entries),
+                packed=os.path.getsize(path), seconds=time.perf_counter() - t0)
+
+
+def _read_verified(path, dest):
+    """Descomprime `path` en `dest` verificando todo contra el manifiesto. Devuelve el
+    manifiesto; ValueError (o el error del zip) ante cualquier discrepancia."""
+    with zipfile.ZipFile(path) as z:
+        manifest = z.read(MANIFEST)
+        if z.comment.decode() != _hash(manifest):
+            raise ValueError("manifiesto alterado")
+        meta = json.loads(manifest)
+        if meta.get('format') != FORMAT:
+            raise ValueError(f"formato {meta.get('format')} (se espera {FORMAT})")
+        for e in meta['files']:
+            parts = e['path'].split('/')
+            if e['path'].startswith('/') or '..' in parts:
+                raise ValueError(f"ruta no válida: {e['path']}")
+            raw = z.read(e['path'])                     # el zip comprueba su CRC
+            if 'head' in e:
+                raw = _unshuffle(raw, e['head'], e['itemsize'], e.get('xor', 0))
+            if len(raw) != e['size'] or _hash(raw) != e['hash']:
+                raise ValueError(f"{e['path']}: contenido distinto del manifiesto")
+            out = os.path.join(dest, *parts)
+            os.makedirs(os.path.dirname(out), exist_ok=True)
+            with open(out, 'wb') as f:
+                f.write(raw)
+    return meta
+
+
+def import_snapshot(path, store=None, verbose=True):
+    """Restaura en `store` (DataStore, ruta o el almacén por defecto) las partes de la
+    instantánea `path`, sustituyendo las existentes; el resto del almacén (caché de
+    señales...) se conserva. True si quedó restaurado; False, con el almacén intacto, si
+    falta la instantánea o no pasa la verificación (→ arranque en frío)."""
+    t0 = time.perf_counter()
+    store = DataStore(store) if isinstance(store, str) else (store or DataStore())
+    if not os.path.exists(path):
+        if verbose:
+            print(f"Sin instantánea {path}: arranque en frío")
+        return False
+    tmp = f"{store.root.rstrip(os.sep)}.restore.{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    try:
+        meta = _read_verified(path, tmp)
+    except Exception as e:
+        shutil.rmtree(tmp, ignore_errors=True)
+        if verbose:
+            print(f"⚠️ Instantánea {path} descartada ({e}): arranque en frío")
+        return False
+    os.makedirs(store.root, exist_ok=True)
+    for part in sorted({e['path'].split('/')[0] for e in meta['files']}):
+        dst, old = store.path(part), store.path(f'{part}.old.{os.getpid()}')
+        if os.path.exists(dst):
+            os.replace(dst, old)
+        os.replace(os.path.join(tmp, part), dst)
+        if os.path.isdir(old):
+            shutil.rmtree(old)
+        elif os.path.exists(old):
+            os.remove(old)
+    shutil.rmtree(tmp, ignore_errors=True)
+    if verbose:
+        n = sum(e['size'] for e in meta['files'])
+        print(f"✓ Almacén restaurado de {path} ({meta['created']}): {len(meta['files'])} ficheros, "
+              f"{n / 1e6:.0f} MB en {time.perf_counter() - t0:.1f}s")
+    return True
+
+
+def main():
+    import argparse
+    ap = argparse.ArgumentParser(description='Instantánea comprimida y verificada del almacén')
+    ap.add_argument('action', choices=['export', 'import'])
+    ap.add_argument('path', help='Fichero de la instantánea (.zip)')
+    ap.add_argument('--store', default='data_store', help='Almacén (data_store.py)')
+    ap.add_argument('--level', type=int, default=DEFAULTS['level'], help='Nivel de compresión (1-9)')
+    args = ap.parse_args()
+    if args.action == 'import':
+        import_snapshot(args.path, DataStore(args.store))
+        return
+    if not DataStore(args.store).exists():
+        print(f"Almacén {args.store} vacío: no se exporta")
+        return
+    r = export_snapshot(DataStore(args.store), args.path, level=args.level)
+    print(f"✓ Instantánea {args.path}: {r['files']} ficheros, {r['bytes'] / 1e6:.0f} MB → "
+          f"{r['packed'] / 1e6:.1f} MB en {r['seconds']:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# test_kernels.py — Paridad de los backends de kernels.py (Numba / NumPy)
+#
+# Los dos backends deben dar EXACTAMENTE los mismos números. La paridad de las medias
+# depende de replicar a mano la suma por pares de NumPy (_block / _pairwise): si una
+# versión nueva de NumPy cambia ese orden, estos tests fallan en vez de cambiar las
+# señales en silencio. `python benchmarks.py kernels` mide además los tiempos.
+#
+# Uso:
+#   python -m pytest -q test_kernels.py
+
+import warnings
+
+import numpy as np
+import pytest
+
+import kernels
+from momentum_strategy import evaluate_breakout, evaluate_entry, evaluate_watch
+
+
+needs_numba = pytest.mark.skipif('numba' not in kernels.available(), reason='Numba no instalado')
+
+
+@pytest.fixture(autouse=True)
+def _restore_backend():
+    before = kernels.BACKEND
+    yield
+    kernels.use(before or 'auto')
+
+
+def _bars(n_symbols=12, n_days=700, seed=11):
+    """Paseos con deriva (hay líderes: salen señales de los tres detectores) y huecos NaN."""
+    rng = np.random.default_rng(seed)
+    out = []
+    for j in range(n_symbols):
+        vol = rng.uniform(0.012, 0.03)
+        c = 40.0 * np.exp(np.cumsum(rng.normal(rng.normal(0.0008, 0.0006), vol, n_days)))
+        spread = np.abs(rng.normal(0, 0.6, n_days)) * vol * c
+        h, l = c + spread, np.maximum(c - spread, c * 0.5)
+        for x in (c, h, l):
+            x[rng.integers(0, n_days, 3)] = np.nan
+        out.append((c, h, l))
+    return out
+
+
+def _run(backend, fn):
+    kernels.use(backend)
+    return fn()
+
+
+@needs_numba
+@pytest.mark.parametrize('evaluator', [evaluate_breakout, evaluate_entry, evaluate_watch],
+                         ids=['breakout', 'entry', 'watch'])
+def test_evaluators_same_on_both_backends(evaluator):
+    bars = _bars()
+    walk = lambda: [evaluator(c, h, l, i, 99.0) for c, h, l in bars for i in range(252, len(c))]
+    ref, got = _run('numpy', walk), _run('numba', walk)
+    assert any(r is not None for r in ref)             # el test no es trivial
+    assert repr(got) == repr(ref)                      # repr: un dict con NaN no es == a sí mismo
+
+
+@needs_numba
+def test_mean_matches_numpy_pairwise_sum():
+    rng = np.random.default_rng(3)
+    x = rng.lognormal(3, 1, 2000)
+    kernels.use('numba')
+    assert kernels.compiled()
+    for lo, n in [(0, 1), (3, 7), (1, 8), (5, 127), (0, 128), (9, 129), (2, 200), (7, 255),
+                  (11, 256), (0, 1000), (13, 1987)]:
+        assert kernels._mean(x, lo, lo + n) == x[lo:lo + n].mean(dtype=np.float64), (lo, n)
+
+
+@pytest.mark.parametrize('backend', kernels.available())
+@pytest.mark.parametrize('w', [1, 2, 50])
+def test_rolling_median_rows(backend, w):
+    rng = np.random.default_rng(5)
+    x = np.round(rng.lognormal(17, 0.5, 400), -5)           # empates
+    x[rng.integers(0, len(x), 40)] = np.nan
+    x[100:100 + w] = np.nan                                 # una ventana entera vacía
+    rows = np.sort(rng.choice(len(x), 150, replace=False))
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)        # nanmedian de ventana vacía
+        ref = np.array([np.nanmedian(x[r - w + 1:r + 1]) if r >= w - 1 else np.nan for r in rows])
+    got = _run(backend, lambda: kernels.rolling_median_rows(x, rows, w))
+    np.testing.assert_array_equal(got, ref)
+
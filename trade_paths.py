@@ -0,0 +1,152 @@
+# trade_paths.py — Recorrido PRECALCULADO de cada señal bajo cada regla de salida
+#
+# Re-simular la cartera con otro trailing_pct / max_hold_days / market_filter_ma volvía a
+# recorrer cada posición barra a barra para encontrar su salida. Pero la salida de una
+# posición AISLADA (entrada en la apertura del día siguiente a la señal, stop inicial
+# `sl`, trailing al `trailing_pct` bajo el máximo alcanzado, cierre forzoso a las
+# `max_hold_days` sesiones) depende solo de la señal y de la regla, no de la cartera.
+# Aquí, para cada señal y cada regla (trailing_pct, max_hold_days):
+#   - por símbolo, las ventanas de barras tras la entrada de todas sus señales a la vez
+#     (vistas deslizantes) y su máximo acumulado (np.maximum.accumulate) → el stop de
+#     cada día,
+#   - la PRIMERA barra que toca el stop o cumple el plazo (argmax sobre la máscara), con
+#     la misma aritmética que simulate_days (mismo tipo en el producto del trailing:
+#     el stop y el precio de salida salen idénticos),
+#   - cacheado por regla: la primera config con esa regla lo calcula, las demás lo leen.
+# El simulador (simulate_days con `exits`) ya solo resuelve caja, límites de posiciones
+# y el filtro de mercado: la posición sale el día precalculado salvo que el filtro de
+# mercado la liquide antes. El filtro de mercado no entra en el recorrido (es de la
+# cartera), así que cambiar market_filter_ma reutiliza los mismos recorridos.
+#
+#   tp = TradePaths(signals, price_data, spy)
+#   for cfg in configs:
+#       run_portfolio_backtest(signals, price_data, spy, cfg, paths=tp)
+#   tp.frame(0.25, 252)        # trades aislados: salida, motivo, retorno y máximo alcanzado
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from portfolio_backtest import DEFAULT_CONFIG, _prepare_arrays, add_entries
+
+
+NO_EXIT = np.iinfo(np.int64).max      # sin salida dentro de los datos: abierta hasta liquidar
+BLOCK = 256                           # señales por bloque (acota la memoria de las ventanas)
+
+
+class TradePaths:
+    """Salidas de todas las señales de `signals` (las mismas claves que usa el simulador:
+    símbolo, día de entrada, stop inicial), por regla de salida."""
+
+    def __init__(self, signals, price_data, spy, arr=None, rules=()):
+        import pandas as pd
+        cal = spy.index
+        self.cal = cal
+        self.cal_pos = {ts: i for i, ts in enumerate(cal)}
+        sig = signals.copy()
+        sig['date'] = pd.to_datetime(sig['date'])
+        self.arr = arr if arr is not None else _prepare_arrays(price_data, sig['symbol'].unique(), cal)
+        self._cands = {}
+        for day, entries in add_entries({}, sig, cal, self.cal_pos).items():
+            for e in entries:
+                a = self.arr.get(e['symbol'])
+                if a is None or day not in a['idx']:
+                    continue                          # sin barra el día de entrada: no entra
+                self._cands.setdefault(e['symbol'], {})[(e['symbol'], day, e['sl'])] = a['idx'][day]
+        self._cpos = {}
+        self._cache = {}
+        for rule in rules:
+            self.exits(dict(zip(('trailing_pct', 'max_hold_days'), rule)))
+
+    @staticmethod
+    def rule(cfg):
+        c = {**DEFAULT_CONFIG, **(cfg or {})}
+        return float(c['trailing_pct']), int(c['max_hold_days'])
+
+    def exits(self, cfg=None):
+        """dict (símbolo, día de entrada, sl) -> (posición de calendario de la salida,
+        precio de salida) con la regla de `cfg`; NO_EXIT si no sale dentro de los datos."""
+        rule = self.rule(cfg)
+        if rule not in self._cache:
+            self._cache[rule] = self._compute(*rule)
+        return self._cache[rule][0]
+
+    def frame(self, trailing_pct=None, max_hold_days=None):
+        """Trades AISLADOS de cada señal con esa regla (sin cartera): entrada, salida,
+        motivo ('stop' | 'plazo' | 'abierta'), retorno y máximo alcanzado (%)."""
+        import pandas as pd
+        cfg = {k: v for k, v in (('trailing_pct', trailing_pct), ('max_hold_days', max_hold_days))
+               if v is not None}
+        exits = self.exits(cfg)
+        info = self._cache[self.rule(cfg)][1]
+        rows = []
+        for key, (ci, px) in exits.items():
+            sym, day, sl = key
+            entry, reason, peak = info[key]
+            rows.append(dict(symbol=sym, entry_day=day, sl=sl, entry=entry,
+                             exit_day=None if ci == NO_EXIT else self.cal[ci], exit=px, reason=reason,
+                             ret_pct=None if px is None else (px / entry - 1) * 100,
+                             max_gain_pct=(peak / entry - 1) * 100))
+        return pd.DataFrame(rows).sort_values(['entry_day', 'symbol']).reset_index(drop=True)
+
+    # --- Cálculo ---
+    def _calendar(self, sym):
+        """Posición de calendario de cada barra del símbolo (-1 fuera del calendario)."""
+        cp = self._cpos.get(sym)
+        if cp is None:
+            a = self.arr[sym]
+            cp = self._cpos[sym] = self.cal.get_indexer(a['dates']).astype(np.int64)
+        return cp
+
+    def _compute(self, trail, max_hold):
+        exits, info = {}, {}
+        for sym, cands in self._cands.items():
+            a = self.arr[sym]
+            cp = self._calendar(sym)
+            o, h, l, c = a['o'], a['h'], a['l'], a['c']
+            keys = list(cands)
+            e = np.fromiter(cands.values(), dtype=np.int64, count=len(keys))
+            if (cp < 0).any():                       # barras fuera del calendario: el bucle no las ve
+                keep = np.flatnonzero(cp >= 0)
+                e = np.searchsorted(keep, e)
+                o, h, l, c, cp = o[keep], h[keep], l[keep], c[keep], cp[keep]
+            n = len(c)
+            L = max(1, min(max_hold, n))
+            # Mismo tipo que el producto escalar del bucle (peak * (1 - trailing)).
+            dt = np.asarray(o[0] * (1 - trail)).dtype
+            pad = lambda x, fill=np.nan: np.concatenate([x, np.full(L, fill, dtype=x.dtype)])
+            hw, lw = (sliding_window_view(pad(x), L) for x in (h, l))
+            cpw = sliding_window_view(pad(cp, -1), L)
+            sl_all = np.array([k[2] for k in keys])
+            for b in range(0, len(keys), BLOCK):
+                eb, sl = e[b:b + BLOCK], sl_all[b:b + BLOCK]
+                entry = o[eb]
+                H = hw[eb + 1]
+                # peak[:, j] = máx(entrada, highs de las barras anteriores a la j)
+                peak = np.maximum.accumulate(np.concatenate([entry[:, None], H], axis=1), axis=1)
+                stop = np.maximum(sl[:, None], peak[:, :L].astype(dt) * (1 - trail))
+                stop[:, 0] = sl                                  # el primer día manda el stop inicial
+                valid = (eb[:, None] + 1 + np.arange(L)) < n
+                with np.errstate(invalid='ignore'):
+                    hit = valid & (lw[eb + 1] <= stop)
+                    tout = valid & ((cpw[eb + 1] - cp[eb][:, None]) >= max_hold)
+                first = np.argmax(hit | tout, axis=1)
+                r = np.arange(len(eb))
+                has = (hit | tout)[r, first]
+                top = np.where(has, peak[r, first + 1],              # máximo hasta la salida incluida
+                               np.fmax.reduce(np.where(valid, H, np.nan), axis=1, initial=entry.min()))
+                for k in range(len(eb)):
+                    key, j = keys[b + k], int(eb[k]) + 1 + int(first[k])
+                    if not has[k]:
+                        exits[key] = (NO_EXIT, None)
+                        info[key] = (entry[k].item(), 'abierta', float(max(top[k], entry[k])))
+                        continue
+                    if hit[k, first[k]]:
+                        # El stop del bucle: el inicial (float) hasta que el trailing lo supera.
+                        st = stop[k, first[k]]
+                        st = sl[k].item() if st == sl[k] else dt.type(st)
+                        px = o[j] if o[j] <= st else st
+                    else:
+                        px = c[j]
+                    exits[key] = (int(cp[j]), px)
+                    info[key] = (entry[k].item(), 'stop' if hit[k, first[k]] else 'plazo', float(top[k]))
+        return exits, info
@@ -0,0 +1,281 @@
+# universe_store.py — Universo POINT-IN-TIME: listados diarios guardados como diferencias
+#
+# El universo amplio (get_broad_universe) y el screener leían los listados ACTUALES de
+# NYSE+NASDAQ (API del NASDAQ), re-descargados y re-parseados en cada ejecución: el
+# backtest arrastraba sesgo de supervivencia (solo las que cotizan HOY, con su tamaño de
+# HOY). Aquí cada listado parseado (MarketData.symbol_industries) se guarda como
+# DIFERENCIA contra el anterior:
+#
+#   data_store/universe/
+#     log.jsonl     una línea por fecha: altas (nombre, capitalización, industria, sector),
+#                   bajas y cambios (la capitalización solo si se mueve más de `cap_tol`;
+#                   nombre/industria/sector si cambian). La primera línea es el listado
+#                   completo; las siguientes, unos cientos de símbolos como mucho.
+#     latest.json   el último listado completo (reutilizable sin volver a descargar).
+#
+# Al abrir, el log se reproduce en un índice de EVENTOS (símbolo, snapshot, capitalización)
+# ordenado por (símbolo, snapshot): "universo a fecha D con cap ≥ X" es una búsqueda
+# binaria (searchsorted) por símbolo, barata en cada fecha del walk-forward. Antes del
+# primer snapshot no hay información → sin filtro (None): el sesgo se va corrigiendo a
+# medida que se acumula historia, y las que se deslistan siguen en el log.
+#
+#   us = UniverseStore('data_store/universe')
+#   us.record('2026-10-16', md.symbol_industries)
+#   us.members('2026-03-02', min_cap=2e9)
+#   generate_momentum_signals(price_data, spy, universe=us.membership(2e9))
+
+import json
+import os
+
+import numpy as np
+
+
+DEFAULT_ROOT = os.path.join('data_store', 'universe')
+FIELDS = ('name', 'market_cap', 'industry', 'sector')
+DEFAULTS = dict(
+    cap_tol=0.05,        # cambio relativo de capitalización que se registra
+    cap_digits=3,        # cifras significativas guardadas
+)
+
+
+def _day(date):
+    return np.datetime64(str(date)[:10], 'D')
+
+
+def _cap(v, digits=DEFAULTS['cap_digits']):
+    """Capitalización redondeada a `digits` cifras significativas (0.0 si falta)."""
+    try:
+        v = float(v or 0)
+    except (TypeError, ValueError):
+        return 0.0
+    return float(f'{v:.{digits}g}') if v > 0 else 0.0
+
+
+def _moved(old, new, tol):
+    if old == new:
+        return False
+    if old <= 0 or new <= 0:
+        return True
+    return abs(new / old - 1) > tol
+
+
+class UniverseStore:
+    def __init__(self, root=DEFAULT_ROOT, cap_tol=None):
+        self.root = root
+        self.cap_tol = DEFAULTS['cap_tol'] if cap_tol is None else cap_tol
+        self.dates = []                  # fechas de los snapshots ('YYYY-MM-DD'), crecientes
+        self.symbols, self.sym_idx = [], {}
+        self._state = {}                 # símbolo -> [name, cap, industry, sector] del último snapshot
+        self._ev = []                    # (columna, snapshot, cap); NaN = baja
+        self._index = None
+        path = self.path('log.jsonl')
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        self._apply(json.loads(line))
+                    except ValueError:
+                        continue         # línea a medio escribir (proceso interrumpido)
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+
+    def __len__(self):
+        return len(self.dates)
+
+    # --- Escritura ---
+    def record(self, date, listing):
+        """Guarda el listado de `date` (símbolo -> dict(name, market_cap, industry, sector),
+        el formato de MarketData.symbol_industries) como diferencia contra el último
+        snapshot. Devuelve la diferencia guardada, o None si el listado está vacío (una
+        descarga fallida no da de baja todo el universo) o si ya hay un snapshot de esa
+        fecha o posterior (el log solo crece hacia delante)."""
+        day = str(_day(date))
+        if not listing or (self.dates and day <= self.dates[-1]):
+            return None
+        new = {s: [m.get('name') or '', _cap(m.get('market_cap')),
+                   m.get('industry') or 'Unknown', m.get('sector') or 'Unknown']
+               for s, m in listing.items()}
+        changed = {}
+        for s, rec in new.items():
+            old = self._state.get(s)
+            if old is None:
+                continue
+            ch = {k: rec[i] for i, k in enumerate(FIELDS) if k != 'market_cap' and rec[i] != old[i]}
+            if _moved(old[1], rec[1], self.cap_tol):
+                ch['market_cap'] = rec[1]
+            if ch:
+                changed[s] = ch
+        entry = dict(date=day,
+                     added={s: rec for s, rec in new.items() if s not in self._state},
+                     removed=sorted(s for s in self._state if s not in new),
+                     changed=changed)
+        os.makedirs(self.root, exist_ok=True)
+        self._drop_torn_tail()
+        with open(self.path('log.jsonl'), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n')
+        tmp = self.path(f'latest.json.{os.getpid()}.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(dict(date=day, listing=new), f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp, self.path('latest.json'))
+        self._apply(entry)
+        return entry
+
+    def _drop_torn_tail(self):
+        """Recorta el log hasta su último salto de línea: una línea a medio escribir (la
+        que el replay ya ignora) no debe pegarse a la siguiente entrada."""
+        path = self.path('log.jsonl')
+        if not os.path.exists(path):
+            return
+        with open(path, 'rb+') as f:
+            raw = f.read()
+            keep = raw.rfind(b'\n') + 1
+            if keep < len(raw):
+                f.truncate(keep)
+
+    def _apply(self, entry):
+        row = len(self.dates)
+        self.dates.append(entry['date'])
+        for s, rec in entry.get('added', {}).items():
+            self._state[s] = list(rec)
+            self._event(s, row, rec[1])
+        for s in entry.get('removed', ()):
+            self._state.pop(s, None)
+            self._event(s, row, np.nan)
+        for s, ch in entry.get('changed', {}).items():
+            # Símbolo sin alta conocida (su entrada se perdió en una escritura cortada):
+            # se reconstruye desde los cambios en vez de abortar la apertura.
+            rec = self._state.setdefault(s, ['', 0.0, 'Unknown', 'Unknown'])
+            for k, v in ch.items():
+                rec[FIELDS.index(k)] = v
+            if 'market_cap' in ch:
+                self._event(s, row, ch['market_cap'])
+        self._index = None
+
+    def _event(self, sym, row, cap):
+        j = self.sym_idx.get(sym)
+        if j is None:
+            j = self.sym_idx[sym] = len(self.symbols)
+            self.symbols.append(sym)
+        self._ev.append((j, row, cap))
+
+    # --- Lectura ---
+    def latest(self):
+        """(fecha, símbolo -> dict(name, market_cap, industry, sector)) del último listado
+        guardado; (None, {}) si no hay ninguno."""
+        path = self.path('latest.json')
+        if not os.path.exists(path):
+            return None, {}
+        with open(path, encoding='utf-8') as f:
+            snap = json.load(f)
+        return snap['date'], {s: dict(zip(FIELDS, rec)) for s, rec in snap['listing'].items()}
+
+    def log_bytes(self):
+        path = self.path('log.jsonl')
+        if not os.path.exists(path):
+            return b''
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def _build(self):
+        if self._index is None:
+            E = max(len(self.dates), 1)
+            ev = np.array(self._ev, dtype=np.float64).reshape(-1, 3)
+            key = ev[:, 0].astype(np.int64) * E + ev[:, 1].astype(np.int64)
+            order = np.argsort(key, kind='stable')
+            self._index = (np.array(self.dates, dtype='datetime64[D]'), E, key[order], ev[order, 2])
+        return self._index
+
+    def caps(self, symbols, date):
+        """Capitalización de cada símbolo en el último snapshot ≤ `date` (NaN = no listado
+        entonces). None si `date` es anterior al primer snapshot (sin información)."""
+        dates, E, key, cap = self._build()
+        r = np.searchsorted(dates, _day(date), 'right') - 1
+        if r < 0:
+            return None
+        j = np.fromiter((self.sym_idx.get(s, -1) for s in symbols), dtype=np.int64, count=len(symbols))
+        out = np.full(len(j), np.nan)
+        if len(key):
+            pos = np.searchsorted(key, j * E + r, 'right') - 1
+            ok = (j >= 0) & (pos >= 0)
+            pos = np.maximum(pos, 0)
+            ok &= key[pos] // E == j
+            out[ok] = cap[pos[ok]]
+        return out
+
+    def mask(self, symbols, date, min_cap=0.0):
+        """Booleano por símbolo: listado a `date` con capitalización ≥ min_cap (None antes
+        del primer snapshot)."""
+        c = self.caps(symbols, date)
+        if c is None:
+            return None
+        with np.errstate(invalid='ignore'):
+            return c >= min_cap
+
+    def members(self, date, min_cap=0.0):
+        """Símbolos del universo a `date` con capitalización ≥ min_cap (None sin información)."""
+        m = self.mask(self.symbols, date, min_cap)
+        return None if m is None else [s for s, k in zip(self.symbols, m) if k]
+
+    def ever(self, min_cap=0.0):
+        """Símbolos que cumplieron el suelo en ALGÚN snapshot (incluidos los ya deslistados)."""
+        _, _, key, cap = self._build()
+        E = self._index[1]
+        with np.errstate(invalid='ignore'):
+            cols = np.unique(key[cap >= min_cap] // E)
+        return [self.symbols[j] for j in cols]
+
+    def membership(self, min_cap=0.0):
+        return Membership(self, min_cap)
+
+
+class Membership:
+    """Filtro point-in-time del walk-forward (momentum_strategy: `universe=`): universo
+    del almacén a cada fecha con capitalización ≥ min_cap."""
+
+    def __init__(self, store, min_cap=0.0):
+        self.store, self.min_cap = store, float(min_cap)
+
+    def mask(self, symbols, date):
+        return self.store.mask(symbols, date, self.min_cap)
+
+    def key(self):
+        """Identidad para claves de caché (signal_cache.py): el log y el suelo."""
+        return self.store.log_bytes(), self.min_cap
+
+
+def main():
+    import argparse
+    ap = argparse.ArgumentParser(description='Universo point-in-time (listados diarios como diferencias)')
+    ap.add_argument('--store', default='data_store', help='Almacén (data_store.py)')
+    ap.add_argument('--date', default=None, help='Fecha de la consulta (por defecto, el último snapshot)')
+    ap.add_argument('--min-cap', type=float, default=2e9, help='Capitalización mínima (USD)')
+    ap.add_argument('--record', action='store_true',
+                    help='Descarga los listados de hoy (MarketData) y los guarda antes de consultar')
+    args = ap.parse_args()
+    us = UniverseStore(os.path.join(args.store, 'universe'))
+    if args.record:
+        from datetime import date
+        from market_data import MarketData
+        md = MarketData()
+        md.get_universe()
+        entry = us.record(date.today(), md.symbol_industries)
+        if entry:
+            print(f"Snapshot {entry['date']}: +{len(entry['added'])} −{len(entry['removed'])} "
+                  f"~{len(entry['changed'])}")
+    if not len(us):
+        print("Sin snapshots guardados.")
+        return
+    size = os.path.getsize(us.path('log.jsonl'))
+    print(f"{len(us)} snapshots ({us.dates[0]} → {us.dates[-1]}), {len(us.symbols)} símbolos, "
+          f"log {size / 1e3:.0f} KB")
+    day = args.date or us.dates[-1]
+    members = us.members(day, args.min_cap)
+    if members is None:
+        print(f"{day}: anterior al primer snapshot (sin filtro).")
+    else:
+        print(f"{day}: {len(members)} acciones con cap ≥ ${args.min_cap / 1e9:.1f}B")
+
+
+if __name__ == "__main__":
+    main()
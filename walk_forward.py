@@ -0,0 +1,240 @@
+# walk_forward.py — Optimización WALK-FORWARD (ventanas móviles in-sample / out-of-sample)
+#
+# Los params de DEFAULTS (breakout_max_ext_ma50, breakout_hold_atr...) y de la cartera
+# se eligieron mirando TODO 2019-26. Aquí el calendario se parte en ventanas móviles:
+# en cada una se elige la mejor combinación de la rejilla SOLO con el tramo in-sample
+# (IS) y se mide esa combinación en el tramo siguiente, out-of-sample (OOS), que no vio.
+# Las equities OOS encadenadas son la estimación honesta de la estrategia+selección.
+#
+# Reutilización (lo caro se hace una vez):
+#   - las señales son point-in-time (el walk-forward de generate_momentum_signals no mira
+#     el futuro), así que se generan UNA vez por combinación de params de ESTRATEGIA sobre
+#     todo el calendario (memoizadas en disco con signal_cache.py, huella de datos
+#     calculada una sola vez) y cada ventana solo recorta las suyas; los params de
+#     CARTERA (trailing_pct, max_positions...) comparten señales,
+#   - los arrays de precios se preparan una vez por proceso y cada ventana simula con
+#     las piezas de portfolio_backtest.py sobre su tramo de calendario; la salida de cada
+#     señal por regla (trailing_pct, max_hold_days) se precalcula una vez (trade_paths.py)
+#     y la comparten todas las ventanas y combinaciones de cartera,
+#   - ventanas (y combinaciones de señales) en paralelo con un pool de procesos; con un
+#     PricePanel guardado en disco cada worker lo abre mapeado (viaja como su ruta).
+#
+# Uso:
+#   from walk_forward import run_walk_forward
+#   wf = run_walk_forward(price_data, spy, dict(trailing_pct=[0.25, 0.32],
+#                         breakout_hold_atr=[0.75, 1.0]), evaluator=evaluate_breakout,
+#                         rs_floor=90, workers=4)
+
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from momentum_strategy import DEFAULTS, generate_momentum_signals
+from portfolio_backtest import (DEFAULT_CONFIG, _prepare_arrays, add_entries, compute_metrics,
+                                liquidate_all, market_filter, new_state, simulate_days)
+from signal_cache import DEFAULT_DIR as SIGNAL_CACHE_DIR, cached_signals, data_fingerprint
+from trade_paths import TradePaths
+
+
+WF_DEFAULTS = dict(
+    train_days=756,       # 3 años in-sample
+    test_days=252,        # 1 año out-of-sample (también el paso entre ventanas)
+    first_ci=290,         # primera sesión con historia suficiente (igual que el walk-forward)
+    objective='sharpe',   # métrica de compute_metrics a maximizar, o 'calmar' (CAGR / |maxDD|)
+    min_trades=10,        # combinaciones IS con menos trades no compiten
+)
+
+
+def rolling_windows(n_days, train_days=756, test_days=252, first_ci=290):
+    """Posiciones de calendario [(is_lo, is_hi, oos_lo, oos_hi)] (extremos incluidos).
+    Ventanas IS de `train_days` que avanzan `test_days`; la última OOS puede ser corta."""
+    out = []
+    lo = first_ci
+    while lo + train_days < n_days - 1:
+        oos_lo = lo + train_days
+        oos_hi = min(oos_lo + test_days, n_days) - 1
+        out.append((lo, oos_lo - 1, oos_lo, oos_hi))
+        lo += test_days
+    return out
+
+
+def param_grid(grid):
+    """dict param -> lista de valores → lista de combinaciones, separando en cada una los
+    params de estrategia (DEFAULTS) de los de cartera (DEFAULT_CONFIG)."""
+    keys = list(grid)
+    unknown = [k for k in keys if k not in DEFAULTS and k not in DEFAULT_CONFIG]
+    if unknown:
+        raise ValueError(f"Params desconocidos en la rejilla: {unknown}")
+    combos = []
+    for vals in itertools.product(*(grid[k] for k in keys)):
+        c = dict(zip(keys, vals))
+        combos.append(dict(params={k: v for k, v in c.items() if k in DEFAULTS},
+                           config={k: v for k, v in c.items() if k in DEFAULT_CONFIG}, label=c))
+    return combos
+
+
+def objective_value(metrics, objective):
+    if objective == 'calmar':
+        dd = abs(metrics['max_drawdown_pct'])
+        return metrics['cagr_pct'] / dd if dd > 0 else -np.inf
+    v = metrics.get(objective)
+    return float(v) if v is not None and np.isfinite(v) else -np.inf
+
+
+# ── Estado por proceso: datos, señales por combinación y arrays preparados ──
+_CTX = {}
+
+
+def _init(price_data, spy, signals, base_config):
+    cal = spy.index
+    syms = sorted({s for sig in signals.values() for s in sig['symbol'].unique()})
+    arr = _prepare_arrays(price_data, syms, cal)
+    _CTX.update(spy=spy, cal=cal, cal_pos={ts: i for i, ts in enumerate(cal)},
+                signals=signals, base_config=base_config or {}, arr=arr, market_ok={},
+                paths={k: TradePaths(sig, price_data, spy, arr=arr) for k, sig in signals.items()})
+
+
+def backtest_window(sig_key, config, lo, hi):
+    """Cartera sobre las sesiones [lo, hi] con las señales de `sig_key` cuya ENTRADA cae
+    en el tramo (señal en [lo-1, hi-1]). Capital inicial al empezar, liquidación al final."""
+    cfg = {**DEFAULT_CONFIG, **_CTX['base_config'], **config}
+    cal, cal_pos = _CTX['cal'], _CTX['cal_pos']
+    sig = _CTX['signals'][sig_key]
+    d = sig['date'].values
+    sig = sig[(d >= cal[max(lo - 1, 0)].to_datetime64()) & (d <= cal[hi - 1].to_datetime64())]
+    ma = cfg.get('market_filter_ma')
+    if ma not in _CTX['market_ok']:
+        # Con la historia COMPLETA del índice: la MA(N) ya está formada el primer día del tramo.
+        _CTX['market_ok'][ma] = market_filter(_CTX['spy'], cfg)
+    entries = add_entries({}, sig, cal, cal_pos)
+    state, trades, curve = new_state(cfg), [], []
+    simulate_days(cal[lo:hi + 1], state, cfg, _CTX['arr'], entries, _CTX['market_ok'][ma],
+                  cal_pos, trades, curve, exits=_CTX['paths'][sig_key].exits(cfg))
+    liquidate_all(state, cal[hi], cfg, _CTX['arr'], cal_pos, trades)
+    eq = pd.Series(dict(curve)).sort_index()
+    trades = pd.DataFrame(trades)
+    return eq, trades, compute_metrics(eq, _CTX['spy'], trades, cfg)
+
+
+def _run_window(w, combos, objective, min_trades):
+    is_lo, is_hi, oos_lo, oos_hi = w
+    scores = []
+    for c in combos:
+        _, _, m = backtest_window(c['sig_key'], c['config'], is_lo, is_hi)
+        scores.append(objective_value(m, objective) if m['n_trades'] >= min_trades else -np.inf)
+    best = int(np.argmax(scores))
+    eq, trades, m = backtest_window(combos[best]['sig_key'], combos[best]['config'], oos_lo, oos_hi)
+    return dict(best=best, is_score=scores[best], scores=scores, oos_equity=eq,
+                oos_trades=trades, oos_metrics=m)
+
+
+def _signals_one(price_data, spy, step, params, evaluator, rs_floor, cache_dir, data_fp, rsm=None,
+                 universe=None):
+    if not cache_dir:
+        return generate_momentum_signals(price_data, spy, step=step, params=params,
+                                         evaluator=evaluator, rs_floor=rs_floor, rs_matrix=rsm,
+                                         universe=universe)
+    return cached_signals(price_data, spy, step=step, params=params, evaluator=evaluator,
+                          rs_floor=rs_floor, cache_dir=cache_dir, data_fp=data_fp, verbose=False,
+                          rs_matrix=rsm, universe=universe)
+
+
+def run_walk_forward(price_data, spy, grid, evaluator=None, rs_floor=None, step=5, config=None,
+                     wf=None, cache_dir=SIGNAL_CACHE_DIR, workers=None, verbose=True, rs_matrix=None,
+                     universe=None):
+    """WFO completo. `grid`: dict param -> valores (params de estrategia y/o de cartera);
+    `config`: config de cartera fija para todo; `wf`: overrides de WF_DEFAULTS.
+    `rs_matrix` (RSMatrix, p. ej. store.rs_matrix()): las combinaciones con sus mismos
+    params de liquidez/momentum leen el RS de ella en vez de recalcularlo. `universe`
+    (Membership, universe_store.py): cada fecha solo con los listados entonces.
+    Devuelve dict(equity_curve OOS encadenada, trades OOS, metrics, windows DataFrame)."""
+    w = {**WF_DEFAULTS, **(wf or {})}
+    cal = spy.index
+    windows = rolling_windows(len(cal), w['train_days'], w['test_days'], w['first_ci'])
+    if not windows:
+        raise ValueError("Calendario demasiado corto para una ventana IS + OOS")
+    combos = param_grid(grid)
+
+    # 1) Señales: una generación por combinación DISTINTA de params de estrategia.
+    sig_keys = {}
+    for c in combos:
+        c['sig_key'] = sig_keys.setdefault(repr(sorted(c['params'].items())), len(sig_keys))
+    distinct = {v: next(c['params'] for c in combos if c['sig_key'] == v) for v in sig_keys.values()}
+    data_fp = data_fingerprint(price_data) if cache_dir else None
+    args = [(price_data, spy, step, distinct[k], evaluator, rs_floor, cache_dir, data_fp,
+             rs_matrix if rs_matrix is not None and rs_matrix.matches(distinct[k]) else None, universe)
+            for k in sorted(distinct)]
+    if verbose:
+        print(f"WFO: {len(windows)} ventanas × {len(combos)} combinaciones "
+              f"({len(distinct)} juegos de señales)")
+    if workers and workers > 1 and len(args) > 1:
+        with ProcessPoolExecutor(workers) as ex:
+            sigs = list(ex.map(_signals_one, *zip(*args)))
+    else:
+        sigs = [_signals_one(*a) for a in args]
+    signals = {}
+    for k, s in zip(sorted(distinct), sigs):
+        s = s.copy()
+        s['date'] = pd.to_datetime(s['date'])
+        signals[k] = s
+
+    # 2) Ventanas: IS (todas las combinaciones) → mejor → OOS.
+    task = (combos, w['objective'], w['min_trades'])
+    if workers and workers > 1 and len(windows) > 1:
+        with ProcessPoolExecutor(workers, initializer=_init,
+                                 initargs=(price_data, spy, signals, config)) as ex:
+            res = list(ex.map(_run_window, windows, *([t] * len(windows) for t in task)))
+    else:
+        _init(price_data, spy, signals, config)
+        res = [_run_window(win, *task) for win in windows]
+        _CTX.clear()
+
+    # 3) Equity OOS encadenada: cada tramo arranca donde acabó el anterior. Sus trades se
+    # escalan igual (acciones y P&L), para que profit factor y P&L medio salgan en la
+    # misma base de capital que la curva encadenada.
+    cfg = {**DEFAULT_CONFIG, **(config or {})}
+    parts, trades, rows = [], [], []
+    level = cfg['initial_capital']
+    for win, r in zip(windows, res):
+        k = level / cfg['initial_capital']
+        if len(r['oos_trades']):
+            t = r['oos_trades'].copy()
+            t['shares'] *= k
+            t['pnl'] *= k
+            trades.append(t)
+        eq = r['oos_equity']
+        if len(eq):
+            scaled = eq * k
+            parts.append(scaled)
+            level = float(scaled.iloc[-1])
+        rows.append(dict(is_start=cal[win[0]].date(), is_end=cal[win[1]].date(),
+                         oos_start=cal[win[2]].date(), oos_end=cal[win[3]].date(),
+                         best=combos[r['best']]['label'], is_score=round(r['is_score'], 3),
+                         oos_cagr_pct=r['oos_metrics']['cagr_pct'],
+                         oos_max_drawdown_pct=r['oos_metrics']['max_drawdown_pct'],
+                         oos_sharpe=r['oos_metrics']['sharpe'],
+                         oos_trades=r['oos_metrics']['n_trades']))
+    equity = pd.concat(parts).sort_index()
+    trades_df = pd.concat(trades, ignore_index=True) if trades else pd.DataFrame()
+    out = dict(equity_curve=equity, trades=trades_df,
+               metrics=compute_metrics(equity, spy, trades_df, cfg),
+               windows=pd.DataFrame(rows), config=cfg)
+    if verbose:
+        print_walk_forward(out)
+    return out
+
+
+def print_walk_forward(wf):
+    print("=" * 64)
+    print("WALK-FORWARD (selección in-sample → medida out-of-sample)")
+    print("=" * 64)
+    for _, r in wf['windows'].iterrows():
+        print(f"  OOS {r['oos_start']} → {r['oos_end']}: CAGR {r['oos_cagr_pct']:+6.2f}%  "
+              f"DD {r['oos_max_drawdown_pct']:6.1f}%  Sharpe {r['oos_sharpe']:5.2f}  "
+              f"trades {r['oos_trades']:3d}  | {r['best']}")
+    m = wf['metrics']
+    print(f"  OOS encadenado: CAGR {m['cagr_pct']:+.2f}% (SPY {m['spy_cagr_pct']:+.2f}%)  "
+          f"DD {m['max_drawdown_pct']:.1f}%  Sharpe {m['sharpe']:.2f}  trades {m['n_trades']}")
+    print("=" * 64)